@@ -26,6 +26,9 @@ from app.models.user import User
 from app.models.refresh_token import RefreshToken
 from app.models.trusted_device import TrustedDevice
 from app.models.mfa_recovery_code import MFARecoveryCode
+from app.models.email_outbox import EmailOutbox
+from app.models.user_sync_event import UserSyncEvent
+from app.models.access_token_revocation import AccessTokenRevocation
 # ... (adicione outros modelos se houver)
 
 # ... (código do Alembic) ...
@@ -0,0 +1,38 @@
+"""trusted device expiry and retention indexes
+
+Revision ID: 3f9a1c7e2b4d
+Revises: 66584ba2f396
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7e2b4d'
+down_revision: Union[str, Sequence[str], None] = '66584ba2f396'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # trusted_devices.expires_at já era usado pelo CRUD mas não existia na tabela.
+    # Linhas antigas recebem created_at (ficam expiradas e são limpas pelo job de retenção).
+    op.add_column('trusted_devices', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE trusted_devices SET expires_at = created_at")
+    with op.batch_alter_table('trusted_devices') as batch_op:
+        batch_op.alter_column('expires_at', existing_type=sa.DateTime(), nullable=False)
+    op.create_index('ix_trusted_devices_expires_at', 'trusted_devices', ['expires_at'], unique=False)
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
+    op.drop_index('ix_trusted_devices_expires_at', table_name='trusted_devices')
+    with op.batch_alter_table('trusted_devices') as batch_op:
+        batch_op.drop_column('expires_at')
@@ -0,0 +1,47 @@
+"""add user sync events
+
+Revision ID: 5c7d9e1f3a2b
+Revises: 8b2e4d6f1a3c
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7d9e1f3a2b'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a3c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_sync_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(length=20), nullable=False),
+    sa.Column('target', sa.String(length=50), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_user_sync_events_id'), 'user_sync_events', ['id'], unique=False)
+    op.create_index('ix_user_sync_events_status_next_attempt', 'user_sync_events', ['status', 'next_attempt_at'], unique=False)
+    op.create_index('ix_user_sync_events_user_target', 'user_sync_events', ['user_id', 'target', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_sync_events_user_target', table_name='user_sync_events')
+    op.drop_index('ix_user_sync_events_status_next_attempt', table_name='user_sync_events')
+    op.drop_index(op.f('ix_user_sync_events_id'), table_name='user_sync_events')
+    op.drop_table('user_sync_events')
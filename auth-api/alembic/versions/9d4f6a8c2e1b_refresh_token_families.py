@@ -0,0 +1,35 @@
+"""refresh token families for rotation reuse detection
+
+Revision ID: 9d4f6a8c2e1b
+Revises: 5c7d9e1f3a2b
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f6a8c2e1b'
+down_revision: Union[str, Sequence[str], None] = '5c7d9e1f3a2b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tokens existentes passam a ser, cada um, uma família própria
+    op.add_column('refresh_tokens', sa.Column('family_id', sa.String(length=36), nullable=True))
+    op.execute("UPDATE refresh_tokens SET family_id = 'legacy-' || CAST(id AS VARCHAR(28))")
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('family_id', existing_type=sa.String(length=36), nullable=False)
+    op.create_index('ix_refresh_tokens_family_id', 'refresh_tokens', ['family_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_family_id', table_name='refresh_tokens')
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.drop_column('family_id')
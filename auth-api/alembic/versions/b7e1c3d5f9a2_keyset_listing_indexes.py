@@ -0,0 +1,41 @@
+"""keyset pagination indexes for sessions and trusted devices
+
+Revision ID: b7e1c3d5f9a2
+Revises: 9d4f6a8c2e1b
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e1c3d5f9a2'
+down_revision: Union[str, Sequence[str], None] = '9d4f6a8c2e1b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GET /sessions: user_id + is_revoked por igualdade, depois ordem/cursor por id;
+    # expires_at no fim para filtrar os expirados sem ir à tabela
+    op.create_index(
+        'ix_refresh_tokens_user_active', 'refresh_tokens',
+        ['user_id', 'is_revoked', 'id', 'expires_at'], unique=False
+    )
+    # GET /devices: substitui o índice simples em user_id (que passa a ser prefixo deste)
+    op.create_index(
+        'ix_trusted_devices_user_active', 'trusted_devices',
+        ['user_id', 'id', 'expires_at'], unique=False
+    )
+    op.drop_index('ix_trusted_devices_user_id', table_name='trusted_devices')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_trusted_devices_user_id', 'trusted_devices', ['user_id'], unique=False)
+    op.drop_index('ix_trusted_devices_user_active', table_name='trusted_devices')
+    op.drop_index('ix_refresh_tokens_user_active', table_name='refresh_tokens')
@@ -0,0 +1,39 @@
+"""add access token revocation list
+
+Revision ID: c2a4e6f8b0d1
+Revises: b7e1c3d5f9a2
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a4e6f8b0d1'
+down_revision: Union[str, Sequence[str], None] = 'b7e1c3d5f9a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('access_token_revocations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=8), nullable=False),
+    sa.Column('value', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_access_token_revocations_id'), 'access_token_revocations', ['id'], unique=False)
+    op.create_index('ix_access_token_revocations_expires_at', 'access_token_revocations', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_access_token_revocations_expires_at', table_name='access_token_revocations')
+    op.drop_index(op.f('ix_access_token_revocations_id'), table_name='access_token_revocations')
+    op.drop_table('access_token_revocations')
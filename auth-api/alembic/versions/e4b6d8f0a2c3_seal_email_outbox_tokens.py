@@ -0,0 +1,35 @@
+"""seal tokens in the email outbox
+
+Revision ID: e4b6d8f0a2c3
+Revises: c2a4e6f8b0d1
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b6d8f0a2c3'
+down_revision: Union[str, Sequence[str], None] = 'c2a4e6f8b0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('email_outbox', sa.Column('template', sa.String(length=50), nullable=True))
+    op.add_column('email_outbox', sa.Column('template_params_encrypted', sa.Text(), nullable=True))
+    op.alter_column('email_outbox', 'html_content', existing_type=sa.Text(), nullable=True)
+    # Mensagens já enviadas não precisam do conteúdo (e os links dariam acesso às contas)
+    op.execute("UPDATE email_outbox SET html_content = NULL WHERE status = 'sent'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE email_outbox SET html_content = '' WHERE html_content IS NULL")
+    op.alter_column('email_outbox', 'html_content', existing_type=sa.Text(), nullable=False)
+    op.drop_column('email_outbox', 'template_params_encrypted')
+    op.drop_column('email_outbox', 'template')
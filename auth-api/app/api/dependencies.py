@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import AsyncGenerator
 import secrets 
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db, is_replica_session
 from app.core.config import settings
 
 # --- CORREÇÕES CRÍTICAS AQUI ---
@@ -17,6 +17,9 @@ from app.crud.crud_user import crud_user
 
 from app.schemas.token import TokenPayload
 from app.core import security # Necessário para security.decode_access_token
+from app.core.principal_cache import principal_cache
+from app.core.revocation import revocation_set
+from app.crud.crud_access_token_revocation import crud_access_token_revocation
 
 # Define oauth2_scheme (Para o endpoint /token - Password Flow)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token") 
@@ -72,7 +75,33 @@ async def get_current_user_from_token(
     creds: HTTPAuthorizationCredentials = Depends(bearer_scheme)
 ) -> UserModel:
     """Busca o usuário através do token de Access (HTTPBearer)."""
-    
+    return await _resolve_user_from_token(db, creds, revocation_db=db)
+
+
+async def get_current_user_from_token_read(
+    db: AsyncSession = Depends(get_read_db),
+    primary_db: AsyncSession = Depends(get_db),
+    creds: HTTPAuthorizationCredentials = Depends(bearer_scheme)
+) -> UserModel:
+    """
+    Igual a get_current_user_from_token, para endpoints só de leitura: o utilizador é
+    lido da réplica. A lista de revogação continua a vir do primário (a sessão só abre
+    ligação quando há sincronização), para que o atraso da réplica não salte entradas.
+    Um utilizador lido da réplica não entra no cache do principal: podia ser anterior a
+    uma escrita cuja invalidação já passou, e ficaria servido até ao fim do TTL.
+    """
+    return await _resolve_user_from_token(
+        db, creds, revocation_db=primary_db, store_principal=not is_replica_session(db)
+    )
+
+
+async def _resolve_user_from_token(
+    db: AsyncSession,
+    creds: HTTPAuthorizationCredentials,
+    *,
+    revocation_db: AsyncSession,
+    store_principal: bool = True,
+) -> UserModel:
     # ATENÇÃO: O erro anterior foi resolvido removendo a importação circular incorreta aqui.
     
     credentials_exception = HTTPException(
@@ -94,6 +123,12 @@ async def get_current_user_from_token(
     if payload is None:
         raise credentials_exception
 
+    # Lista de revogação (logout, sessão revogada, reset de senha) mantida em memória:
+    # no máximo uma consulta incremental por REVOCATION_SYNC_INTERVAL_SECONDS, não por pedido
+    await crud_access_token_revocation.sync_revocation_set(revocation_db)
+    if revocation_set.is_revoked(payload):
+        raise credentials_exception
+
     user_id_str = payload.get("sub") # Supondo que o SUB do access token é o ID do usuário
     if user_id_str is None:
         raise credentials_exception
@@ -103,13 +138,17 @@ async def get_current_user_from_token(
     except ValueError:
         raise credentials_exception # ID inválido
 
-    # ESTA ERA A LINHA QUE ESTAVA A FALHAR (L149 NO SEU TRACEBACK)
-    # user = await crud_user.get(db, id=user_id) 
-    # Agora, o 'crud_user' é a instância CRUD importada no topo.
+    # Cache em memória: na maioria dos pedidos não é preciso ir à BD para identificar o utilizador
+    user = principal_cache.load(db, user_id)
+    if user is not None:
+        return user
+
     user = await crud_user.get(db, id=user_id) 
     
     if user is None:
         raise credentials_exception
+    if store_principal:
+        principal_cache.store(user, token_exp=payload.get("exp"))
     return user
 
 
@@ -125,6 +164,12 @@ async def get_current_active_user(
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_current_active_user_read(
+    current_user: UserModel = Depends(get_current_user_from_token_read),
+) -> UserModel:
+    """get_current_active_user para endpoints só de leitura (réplica)."""
+    return await get_current_active_user(current_user)
+
 # Mude get_current_active_superuser para:
 async def get_current_active_superuser(
     current_user: UserModel = Depends(get_current_user_from_token),
@@ -136,6 +181,12 @@ async def get_current_active_superuser(
         )
     return current_user
 
+async def get_current_active_superuser_read(
+    current_user: UserModel = Depends(get_current_user_from_token_read),
+) -> UserModel:
+    """get_current_active_superuser para endpoints só de leitura (réplica)."""
+    return await get_current_active_superuser(current_user)
+
 async def get_current_admin_user(
     current_user: UserModel = Depends(get_current_active_user),
 ) -> UserModel:
@@ -1,30 +1,37 @@
 # auth_api/app/api/endpoints/auth.py
 from loguru import logger
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Union, List, Optional
+from typing import Any, Dict, Union, List, Optional, Literal
 
 # --- CORREÇÃO COMPLETA: Importar as instâncias diretamente dos ficheiros ---
 from app.crud.crud_refresh_token import crud_refresh_token 
 from app.crud.crud_mfa_recovery_code import crud_mfa_recovery_code
 from app.crud.crud_user import crud_user 
 from app.crud.crud_trusted_device import crud_trusted_device
+from app.crud.crud_access_token_revocation import crud_access_token_revocation
 # --- FIM CORREÇÃO ---
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Path, BackgroundTasks # Adicionado Request, Response, Path, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Path, Query, BackgroundTasks # Adicionado Request, Response, Path, Query, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # Imports de dependências, schemas, modelos e core
-from app.api.dependencies import get_current_active_user, get_db, oauth2_scheme # Adicionado oauth2_scheme (embora não usado diretamente nas rotas novas)
-from app.db.session import get_db
+from app.api.dependencies import get_current_active_user, get_current_active_user_read, get_db, get_api_key, oauth2_scheme # Adicionado oauth2_scheme (embora não usado diretamente nas rotas novas)
+from app.db.session import get_db, get_read_db
 from app.core import security
 from app.core.config import settings
-from app.core.exceptions import AccountLockedException
+from app.core.principal_cache import principal_cache
+from app.core.pagination import KeysetParams, set_next_cursor
+from app.core.exceptions import AccountLockedException, PasswordHashingBusyException, OAuthProviderException
+from app.core.rate_limit import limiter, check_account_limit, record_account_failure
+from app.core.metrics import record_security_event
 
 from app.schemas.token import (
     Token, RefreshTokenRequest, MFARequiredResponse,
     GoogleLoginUrlResponse, GoogleLoginRequest,
-    SessionInfo # Schema para listar sessões
+    SessionInfo, # Schema para listar sessões
+    TokenIntrospectionRequest, TokenIntrospectionResponse,
+    RevocationEntry, RevocationListResponse
 )
 from app.schemas.user import User as UserSchema
 from app.schemas.user import (
@@ -41,21 +48,16 @@ from app.models.user import User as UserModel
 from app.crud.crud_trusted_device import TrustedDeviceCreate # CRUD para dispositivos confiáveis
 # --- FIM CORREÇÃO ---
 
-from app.services.email_service import send_password_reset_email, send_verification_email # Serviços de email
+from app.services.email_outbox_service import enqueue_password_reset_email # Email via outbox persistente
+from app.services.introspection_service import introspect_tokens
+from app.services import google_oauth_service
 
 # Outros imports
 from jose import jwt, JWTError
-import httpx
 
 
 router = APIRouter()
 
-# --- Constantes do Google OAuth ---
-GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
-GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v3/userinfo"
-GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
-# ---------------------------------
-
 # --- Constantes e Helpers MFA ---
 MFA_CHALLENGE_SECRET_KEY = settings.SECRET_KEY + "-mfa-challenge"
 MFA_CHALLENGE_ALGORITHM = settings.ALGORITHM
@@ -107,18 +109,23 @@ def get_session_details(request: Request) -> Dict[str, Optional[str]]:
     response_model=Union[Token, MFARequiredResponse],
     responses={
         200: {"description": "Login bem-sucedido ou MFA necessário", "model": Union[Token, MFARequiredResponse]},
-        400: {"description": "Credenciais inválidas, conta bloqueada ou inativa"}
+        400: {"description": "Credenciais inválidas, conta bloqueada ou inativa"},
+        429: {"description": "Demasiadas tentativas (por IP ou por conta)"}
     }
 )
+@limiter.limit(settings.RATE_LIMIT_LOGIN_PER_IP)
 async def login_for_access_token(
     request: Request,
     response: Response, # Injetar Response para poder setar cookies
     db: AsyncSession = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
+    # Limite por conta (partilhado entre workers), além do limite por IP do decorator
+    check_account_limit("login", form_data.username, settings.RATE_LIMIT_LOGIN_PER_ACCOUNT)
     try:
         user = await crud_user.authenticate(db, email=form_data.username, password=form_data.password)
     except AccountLockedException as e:
+        record_security_event("login_rejected_locked")
         detail_msg = "Account locked due to too many failed login attempts."
         if e.locked_until:
             now = datetime.now(timezone.utc).replace(tzinfo=None)
@@ -128,6 +135,8 @@ async def login_for_access_token(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail_msg)
 
     if not user:
+        record_security_event("login_failure")
+        record_account_failure("login", form_data.username, settings.RATE_LIMIT_LOGIN_PER_ACCOUNT)
         user_check = await crud_user.get_by_email(db, email=form_data.username)
         if user_check and (not user_check.is_active or not user_check.is_verified):
              raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Conta inativa ou e-mail não verificado. Verifique seu e-mail.")
@@ -148,24 +157,21 @@ async def login_for_access_token(
     if user.is_mfa_enabled and not is_device_trusted:
         mfa_challenge_token = create_mfa_challenge_token(user_id=user.id)
         logger.info(f"Login para {user.email}: MFA necessário (dispositivo não confiável), challenge token emitido.")
+        record_security_event("mfa_challenge_issued")
         # Retorna 200 OK com o challenge (não é um erro)
         return MFARequiredResponse(mfa_challenge_token=mfa_challenge_token)
 
     # --- Login bem-sucedido (MFA não habilitado, ou dispositivo confiável) ---
     logger.info(f"Login para {user.email}: Sucesso. Emitindo tokens.")
+    record_security_event("login_success")
     requested_scopes = form_data.scopes
     # Se MFA está habilitado, significa que foi pulado pelo device trust, então mfa_passed=True
-    access_token = security.create_access_token(
-        user=user,
-        requested_scopes=requested_scopes,
-        mfa_passed=user.is_mfa_enabled # Se MFA está habilitado, foi 'passado' aqui
-    )
     refresh_token_str, expires_at = security.create_refresh_token(
         data={"sub": str(user.id)}
     )
 
     session_details = get_session_details(request)
-    await crud_refresh_token.create_refresh_token(
+    db_refresh_token = await crud_refresh_token.create_refresh_token(
         db,
         user=user,
         token=refresh_token_str,
@@ -173,6 +179,12 @@ async def login_for_access_token(
         ip_address=session_details.get("ip_address"),
         user_agent=session_details.get("user_agent")
     )
+    access_token = security.create_access_token(
+        user=user,
+        requested_scopes=requested_scopes,
+        mfa_passed=user.is_mfa_enabled, # Se MFA está habilitado, foi 'passado' aqui
+        session_id=db_refresh_token.family_id
+    )
 
     # Se MFA foi pulado por causa do dispositivo confiável, NÃO precisamos setar novo cookie.
     # Se MFA NUNCA foi habilitado, também não setamos o cookie (ainda).
@@ -195,15 +207,18 @@ async def get_google_login_url():
 
     params = {
         "client_id": settings.GOOGLE_CLIENT_ID,
-        "redirect_uri": settings.GOOGLE_REDIRECT_URI_FRONTEND,
+        "redirect_uri": str(settings.GOOGLE_REDIRECT_URI_FRONTEND),
         "response_type": "code",
         "scope": "openid email profile",
         "access_type": "offline",
         "prompt": "select_account",
     }
 
-    request_obj = httpx.Request("GET", GOOGLE_AUTH_URL, params=params)
-    return GoogleLoginUrlResponse(url=str(request_obj.url))
+    try:
+        url = await google_oauth_service.get_authorization_url(params)
+    except OAuthProviderException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    return GoogleLoginUrlResponse(url=url)
 
 @router.post("/google/callback", response_model=Token)
 async def google_callback(
@@ -219,43 +234,12 @@ async def google_callback(
         logger.error("Configurações OAuth da Google incompletas.")
         raise HTTPException(status_code=500, detail="Configuração OAuth está incompleta.")
 
-    # 1. Trocar o 'code' por um token de acesso da Google
-    token_data_payload = {
-        "code": code,
-        "client_id": settings.GOOGLE_CLIENT_ID,
-        "client_secret": settings.GOOGLE_CLIENT_SECRET,
-        "redirect_uri": settings.GOOGLE_REDIRECT_URI_FRONTEND,
-        "grant_type": "authorization_code",
-    }
-    async with httpx.AsyncClient() as client:
-        # ... (try/except para a chamada httpx.post) ...
-        try:
-            r = await client.post(GOOGLE_TOKEN_URL, data=token_data_payload)
-            r.raise_for_status()
-            token_data = r.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Erro ao trocar código da Google: {e.response.json()}")
-            raise HTTPException(status_code=400, detail="Código de autorização inválido ou expirado.")
-        except Exception as e:
-            logger.error(f"Erro de rede ao contactar Google Token URL: {e}")
-            raise HTTPException(status_code=500, detail="Erro ao contactar serviço de login.")
-
-
-    google_access_token = token_data.get("access_token")
-    if not google_access_token:
-         raise HTTPException(status_code=500, detail="Falha ao obter token da Google.")
-
-    # 2. Obter informações do utilizador da Google
-    headers = {"Authorization": f"Bearer {google_access_token}"}
-    async with httpx.AsyncClient() as client:
-        # ... (try/except para a chamada httpx.get userinfo) ...
-        try:
-            r = await client.get(GOOGLE_USERINFO_URL, headers=headers)
-            r.raise_for_status()
-            user_info = r.json()
-        except Exception as e:
-            logger.error(f"Erro ao obter userinfo da Google: {e}")
-            raise HTTPException(status_code=500, detail="Falha ao obter dados do utilizador.")
+    # 1. Trocar o 'code' pelos tokens da Google e validar o ID token localmente
+    # (cliente HTTP partilhado; descoberta e JWKS em cache; userinfo opcional)
+    try:
+        user_info = await google_oauth_service.authenticate_with_code(code)
+    except OAuthProviderException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
 
     email = user_info.get("email")
     full_name = user_info.get("name")
@@ -273,12 +257,12 @@ async def google_callback(
 
     # 4. Emitir os NOSSOS tokens JWT
     logger.info(f"Login OAuth bem-sucedido para {user.email}. Emitindo tokens.")
+    record_security_event("oauth_login_success")
     # Login social é considerado seguro (como passar MFA)
-    access_token = security.create_access_token(user=user, mfa_passed=True)
     refresh_token_str, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
 
     session_details = get_session_details(request)
-    await crud_refresh_token.create_refresh_token(
+    db_refresh_token = await crud_refresh_token.create_refresh_token(
         db,
         user=user,
         token=refresh_token_str,
@@ -286,6 +270,7 @@ async def google_callback(
         ip_address=session_details.get("ip_address"),
         user_agent=session_details.get("user_agent")
     )
+    access_token = security.create_access_token(user=user, mfa_passed=True, session_id=db_refresh_token.family_id)
 
     # --- CRIAR DISPOSITIVO CONFIÁVEL E SETAR COOKIE (após login OAuth) ---
     _, plain_device_token = await crud_trusted_device.create_trusted_device(
@@ -315,9 +300,9 @@ async def google_callback(
 @router.post("/mfa/enable", response_model=MFAEnableResponse)
 async def enable_mfa_start(
     current_user: UserModel = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    qr_format: Literal["png", "svg"] = Query("png", description="Formato do QR code: 'svg' é vetorial e mais barato de gerar"),
 ):
-    # (Sem alterações)
     if current_user.is_mfa_enabled: raise HTTPException(status_code=400, detail="MFA já está habilitado.")
     otp_secret = security.generate_otp_secret()
     try:
@@ -327,12 +312,13 @@ async def enable_mfa_start(
         logger.error(f"Erro ao salvar segredo OTP pendente para {current_user.email}: {e}")
         raise HTTPException(status_code=500, detail="Erro ao iniciar habilitação do MFA.")
     otp_uri = security.generate_otp_uri(secret=otp_secret, email=current_user.email, issuer_name=settings.EMAILS_FROM_NAME or "Verax Auth")
-    try: qr_code_base64 = security.generate_qr_code_base64(otp_uri)
+    # Renderização do QR code fora do event loop
+    try: qr_code_base64 = await security.generate_qr_code_base64_async(otp_uri, qr_format)
     except Exception as e:
         logger.error(f"Erro ao gerar QR code para {current_user.email}: {e}")
         qr_code_base64 = ""
     logger.info(f"Iniciada habilitação MFA para {current_user.email}. Segredo pendente salvo.")
-    return MFAEnableResponse(otp_uri=otp_uri, qr_code_base64=qr_code_base64)
+    return MFAEnableResponse(otp_uri=otp_uri, qr_code_base64=qr_code_base64, qr_code_format=qr_format)
 
 @router.post("/mfa/confirm", response_model=MFAConfirmResponse)
 async def enable_mfa_confirm(
@@ -362,6 +348,7 @@ async def disable_mfa(
     return updated_user
 
 @router.post("/mfa/verify", response_model=Token)
+@limiter.limit(settings.RATE_LIMIT_MFA_PER_IP)
 async def verify_mfa_login(
     request: Request,
     response: Response, # Para setar o cookie
@@ -375,23 +362,28 @@ async def verify_mfa_login(
     if not user_id_str: raise HTTPException(status_code=400, detail="Token de desafio MFA inválido (sem sub).")
     try: user_id = int(user_id_str)
     except ValueError: raise HTTPException(status_code=400, detail="Token de desafio MFA inválido (sub inválido).")
+    # OTP e recovery partilham o mesmo contador por utilizador
+    check_account_limit("mfa", user_id_str, settings.RATE_LIMIT_MFA_PER_ACCOUNT)
 
     user = await crud_user.get(db, id=user_id)
     if not user or not user.is_active or not user.is_mfa_enabled or not user.otp_secret:
         raise HTTPException(status_code=400, detail="Usuário inválido ou MFA não está (mais) habilitado.")
 
     if not security.verify_otp_code(secret=user.otp_secret, code=mfa_data.otp_code):
+        record_security_event("mfa_failure")
+        record_account_failure("mfa", user_id_str, settings.RATE_LIMIT_MFA_PER_ACCOUNT)
         raise HTTPException(status_code=400, detail="Código OTP inválido.")
 
     # --- Login MFA (OTP) bem-sucedido ---
     logger.info(f"Verificação MFA (OTP) bem-sucedida para {user.email}. Emitindo tokens.")
-    access_token = security.create_access_token(user=user, mfa_passed=True)
+    record_security_event("mfa_success")
     refresh_token_str, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
     session_details = get_session_details(request)
-    await crud_refresh_token.create_refresh_token(
+    db_refresh_token = await crud_refresh_token.create_refresh_token(
         db, user=user, token=refresh_token_str, expires_at=expires_at,
         ip_address=session_details.get("ip_address"), user_agent=session_details.get("user_agent")
     )
+    access_token = security.create_access_token(user=user, mfa_passed=True, session_id=db_refresh_token.family_id)
 
     # --- CRIAR DISPOSITIVO CONFIÁVEL E SETAR COOKIE ---
     _, plain_device_token = await crud_trusted_device.create_trusted_device(
@@ -414,6 +406,7 @@ async def verify_mfa_login(
     return Token(access_token=access_token, refresh_token=refresh_token_str, token_type="bearer")
 
 @router.post("/mfa/verify-recovery", response_model=Token)
+@limiter.limit(settings.RATE_LIMIT_MFA_PER_IP)
 async def verify_mfa_recovery_login(
     request: Request,
     response: Response, # Para setar o cookie
@@ -427,24 +420,29 @@ async def verify_mfa_recovery_login(
     if not user_id_str: raise HTTPException(status_code=400, detail="Token de desafio MFA inválido (sem sub).")
     try: user_id = int(user_id_str)
     except ValueError: raise HTTPException(status_code=400, detail="Token de desafio MFA inválido (sub inválido).")
+    # OTP e recovery partilham o mesmo contador por utilizador
+    check_account_limit("mfa", user_id_str, settings.RATE_LIMIT_MFA_PER_ACCOUNT)
 
     user = await crud_user.get(db, id=user_id)
     if not user or not user.is_active or not user.is_mfa_enabled:
         raise HTTPException(status_code=400, detail="Usuário inválido ou MFA não está habilitado.")
 
-    db_code = await crud_mfa_recovery_code.get_valid_recovery_code(db=db, user=user, plain_code=mfa_data.recovery_code)
-    if not db_code: raise HTTPException(status_code=400, detail="Código de recuperação inválido ou já utilizado.")
+    # Verificação e consumo atómicos: o mesmo código não serve para duas sessões
+    if not await crud_mfa_recovery_code.consume_recovery_code(db=db, user=user, plain_code=mfa_data.recovery_code):
+        record_security_event("recovery_code_failure")
+        record_account_failure("mfa", user_id_str, settings.RATE_LIMIT_MFA_PER_ACCOUNT)
+        raise HTTPException(status_code=400, detail="Código de recuperação inválido ou já utilizado.")
 
     # --- Login MFA (Recovery) bem-sucedido ---
-    await crud_mfa_recovery_code.mark_code_as_used(db=db, db_code=db_code)
     logger.info(f"Verificação MFA (RECOVERY CODE) bem-sucedida para {user.email}. Emitindo tokens.")
-    access_token = security.create_access_token(user=user, mfa_passed=True)
+    record_security_event("recovery_code_success")
     refresh_token_str, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
     session_details = get_session_details(request)
-    await crud_refresh_token.create_refresh_token(
+    db_refresh_token = await crud_refresh_token.create_refresh_token(
         db, user=user, token=refresh_token_str, expires_at=expires_at,
         ip_address=session_details.get("ip_address"), user_agent=session_details.get("user_agent")
     )
+    access_token = security.create_access_token(user=user, mfa_passed=True, session_id=db_refresh_token.family_id)
 
     # --- CRIAR DISPOSITIVO CONFIÁVEL E SETAR COOKIE ---
     _, plain_device_token = await crud_trusted_device.create_trusted_device(
@@ -484,31 +482,30 @@ async def refresh_access_token(
     try: user_id = int(user_id_str)
     except ValueError: raise credentials_exception
 
-    db_refresh_token = await crud_refresh_token.get_refresh_token(db, token=refresh_token_str)
-    if not db_refresh_token or db_refresh_token.user_id != user_id:
-        raise credentials_exception
-
-    # Revogar o token antigo
-    await crud_refresh_token.revoke_refresh_token(db, token=refresh_token_str)
-
-    user = await crud_user.get(db, id=user_id)
+    # Sem SQL quando o utilizador está no cache do principal
+    user = principal_cache.load(db, user_id) or await crud_user.get(db, id=user_id)
     if not user or not user.is_active: raise credentials_exception
 
-    # Criar novos tokens
-    # Ao refrescar, não garantimos que MFA foi passado recentemente, por isso mfa_passed=False
-    new_access_token = security.create_access_token(user=user, mfa_passed=False)
+    # Rotação atómica: revoga o token apresentado e cria o novo numa só transação.
+    # Falha se o token já não estiver ativo (e revoga a família se for reutilização).
     new_refresh_token_str, new_expires_at = security.create_refresh_token(data={"sub": str(user.id)})
-
-    # Criar o novo registro de refresh token com IP/UA atuais
     session_details = get_session_details(request)
-    await crud_refresh_token.create_refresh_token(
+    rotated = await crud_refresh_token.rotate_refresh_token(
         db,
-        user=user,
-        token=new_refresh_token_str,
-        expires_at=new_expires_at,
+        token=refresh_token_str,
+        user_id=user_id,
+        new_token=new_refresh_token_str,
+        new_expires_at=new_expires_at,
         ip_address=session_details.get("ip_address"),
         user_agent=session_details.get("user_agent")
     )
+    if rotated is None:
+        record_security_event("refresh_rejected")
+        raise credentials_exception
+    record_security_event("refresh_rotated")
+
+    # Ao refrescar, não garantimos que MFA foi passado recentemente, por isso mfa_passed=False
+    new_access_token = security.create_access_token(user=user, mfa_passed=False, session_id=rotated.family_id)
 
     return Token(access_token=new_access_token, refresh_token=new_refresh_token_str, token_type="bearer")
 
@@ -532,6 +529,7 @@ async def logout(
     revoked = await crud_refresh_token.revoke_refresh_token(db, token=refresh_request.refresh_token)
     if revoked:
          logger.info("Refresh token revogado com sucesso durante o logout.")
+         record_security_event("logout")
 
     # Apagar o cookie de dispositivo confiável ao fazer logout
     response.delete_cookie(
@@ -548,20 +546,24 @@ async def logout(
 
 
 @router.get("/me", response_model=UserSchema)
-async def read_users_me(current_user: UserModel = Depends(get_current_active_user)) -> Any:
+async def read_users_me(current_user: UserModel = Depends(get_current_active_user_read)) -> Any:
     # (Sem alterações)
     return current_user
 
 @router.post("/forgot-password", status_code=status.HTTP_202_ACCEPTED)
-async def forgot_password(*, db: AsyncSession = Depends(get_db), request_body: ForgotPasswordRequest, background_tasks: BackgroundTasks):
-    # (Sem alterações)
+async def forgot_password(*, db: AsyncSession = Depends(get_db), request_body: ForgotPasswordRequest):
+    # O email é apenas enfileirado (INSERT no outbox); o worker trata da entrega
     user = await crud_user.get_by_email(db, email=request_body.email)
     if user and user.is_active:
         try:
-            db_user, reset_token = await crud_user.generate_password_reset_token(db, user=user)
-            background_tasks.add_task(send_password_reset_email, email_to=db_user.email, reset_token=reset_token)
+            # Token e email na mesma transação: sem email perdido para um token já gravado
+            db_user, reset_token = await crud_user.generate_password_reset_token(db, user=user, commit=False)
+            await enqueue_password_reset_email(db, email_to=db_user.email, reset_token=reset_token, commit=False)
+            await db.commit()
             logger.info(f"Solicitação de reset de senha para: {user.email}")
-        except Exception as e: logger.error(f"Erro no fluxo /forgot-password para {request_body.email}: {e}")
+        except Exception as e:
+            logger.error(f"Erro no fluxo /forgot-password para {request_body.email}: {e}")
+            await db.rollback()
     else: logger.warning(f"Tentativa de /forgot-password para email não existente ou inativo: {request_body.email}")
     return {"msg": "Se um usuário com esse email existir e estiver ativo, um link de redefinição será enviado."}
 
@@ -578,22 +580,82 @@ async def reset_password(*, db: AsyncSession = Depends(get_db), request_body: Re
     try:
         updated_user = await crud_user.reset_password(db, user=user, new_password=new_password)
         logger.info(f"Senha redefinida com sucesso para o usuário: {user.email}")
+        record_security_event("password_reset")
         return updated_user
+    except PasswordHashingBusyException:
+        await db.rollback()
+        raise # Tratado pelo handler global (503)
     except Exception as e:
         logger.error(f"Erro ao tentar redefinir a senha para {user.email}: {e}")
         await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Ocorreu um erro ao atualizar sua senha.")
 
+# --- Introspeção de Tokens (serviços internos / gateway) ---
+@router.post("/introspect", response_model=TokenIntrospectionResponse, dependencies=[Depends(get_api_key)])
+@limiter.exempt # Protegido pela X-API-Key; o gateway chama-o em volume
+async def introspect(
+    request: Request,
+    introspection_request: TokenIntrospectionRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Valida vários tokens (access ou refresh) numa só chamada e retorna, pela mesma ordem,
+    o estado, o subject e as claims de cada um. Ao contrário da verificação local via JWKS,
+    reflete utilizadores desativados e refresh tokens revogados. Os resultados ficam em
+    cache por INTROSPECTION_CACHE_TTL_SECONDS.
+    """
+    if len(introspection_request.tokens) > settings.INTROSPECTION_MAX_TOKENS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Máximo de {settings.INTROSPECTION_MAX_TOKENS} tokens por pedido."
+        )
+    results = await introspect_tokens(db, introspection_request.tokens)
+    return TokenIntrospectionResponse(results=results)
+
+@router.get("/revocations", response_model=RevocationListResponse, dependencies=[Depends(get_api_key)])
+@limiter.exempt # Protegido pela X-API-Key; cada serviço consulta-o a cada poucos segundos
+async def read_revocations(
+    request: Request,
+    since: int = Query(0, ge=0, description="'version' da resposta anterior (0 = lista completa)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lista de revogação de access tokens, para os serviços que validam tokens localmente
+    (JWKS). Cada serviço guarda as entradas em memória, rejeita tokens cujo 'jti' ou 'sid'
+    lá estejam e atualiza a lista periodicamente passando a última `version` em `since`.
+    Entradas cujo `expires_at` já passou podem ser descartadas.
+    """
+    entries, version = await crud_access_token_revocation.list_since(
+        db, since=since, limit=settings.REVOCATION_LIST_PAGE_SIZE
+    )
+    return RevocationListResponse(
+        version=version,
+        has_more=len(entries) == settings.REVOCATION_LIST_PAGE_SIZE and version > since,
+        entries=[
+            RevocationEntry(
+                kind=e.kind, value=e.value,
+                expires_at=int(e.expires_at.replace(tzinfo=timezone.utc).timestamp())
+            )
+            for e in entries
+        ],
+    )
+
 # --- Endpoints de Gestão de Sessão ---
 @router.get("/sessions", response_model=List[SessionInfo])
 async def get_active_sessions(
-    db: AsyncSession = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    response: Response, # Para o header do cursor da página seguinte
+    page: KeysetParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserModel = Depends(get_current_active_user_read)
 ):
-    """Lista todas as sessões de login ativas (refresh tokens válidos) para o usuário autenticado."""
-    sessions = await crud_refresh_token.get_active_sessions_for_user(
-        db, user_id=current_user.id
+    """
+    Lista as sessões de login ativas (refresh tokens válidos) do usuário autenticado, paginadas.
+    Se houver mais páginas, o header X-Next-Cursor traz o valor a passar em `cursor`.
+    """
+    sessions, next_id = await crud_refresh_token.get_active_sessions_for_user(
+        db, user_id=current_user.id, limit=page.limit, before_id=page.before_id
     )
+    set_next_cursor(response, next_id)
     return sessions
 
 @router.delete("/sessions/all", status_code=status.HTTP_204_NO_CONTENT)
@@ -630,9 +692,9 @@ async def logout_all_except_current_session(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid refresh token format")
 
-    # Verifica se o token a excluir é válido e pertence ao usuário
-    sessions = await crud_refresh_token.get_active_sessions_for_user(db, user_id=current_user.id)
-    if not any(s.token_hash == token_hash_to_exclude for s in sessions):
+    # Verifica se o token a excluir é válido e pertence ao usuário (lookup único pelo hash)
+    current_token = await crud_refresh_token.get_refresh_token(db, token=refresh_request.refresh_token)
+    if not current_token or current_token.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Refresh token not found or invalid for this user")
 
     revoked_count = await crud_refresh_token.revoke_all_refresh_tokens_for_user(
@@ -679,13 +741,19 @@ async def logout_specific_session(
 # --- Endpoints de Gestão de Dispositivos Confiáveis ---
 @router.get("/devices", response_model=List[TrustedDeviceInfo])
 async def get_trusted_devices(
-    db: AsyncSession = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    response: Response, # Para o header do cursor da página seguinte
+    page: KeysetParams = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserModel = Depends(get_current_active_user_read)
 ):
-    """Lista todos os dispositivos marcados como confiáveis para o usuário autenticado."""
-    devices = await crud_trusted_device.get_trusted_devices_for_user(
-        db, user_id=current_user.id
+    """
+    Lista os dispositivos marcados como confiáveis para o usuário autenticado, paginados.
+    Se houver mais páginas, o header X-Next-Cursor traz o valor a passar em `cursor`.
+    """
+    devices, next_id = await crud_trusted_device.get_trusted_devices_for_user(
+        db, user_id=current_user.id, limit=page.limit, before_id=page.before_id
     )
+    set_next_cursor(response, next_id)
     return devices
 
 @router.delete("/devices/{device_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -1,13 +1,28 @@
-import httpx 
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 # CORREÇÃO: Importação de 'get_current_active_superuser' está CORRETA.
-from app.api.dependencies import get_current_active_superuser
+from app.api.dependencies import get_current_active_superuser, get_current_active_superuser_read
 from app.crud.crud_user import crud_user
 # CORREÇÃO: Importar 'get_db' do local correto (session.py)
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.schemas.user import User, UserCreate, UserUpdate
 from app.models.user import User as UserModel
+from app.schemas.maintenance import RetentionReport, EmailOutboxStats, UserSyncStats
+from app.services.retention_service import run_retention_cycle, get_last_retention_report
+from app.services.email_outbox_service import get_email_outbox_stats, drain_email_outbox
+from app.services.user_sync_service import (
+    enqueue_user_created, enqueue_user_updated, enqueue_user_deleted, get_user_sync_stats, drain_user_sync
+)
+from app.core.signing_keys import signing_keys
+from app.core.config import settings
+from app.core.security import benchmark_password_hash_async
+from app.crud.crud_access_token_revocation import crud_access_token_revocation
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.schemas.token import (
+    AccessTokenRevocationRequest, DeviceSessionRevocationRequest, AgedSessionRevocationRequest,
+    SessionRevocationResult
+)
 
 router = APIRouter()
 
@@ -29,51 +44,31 @@ async def admin_create_user(
             detail="The user with this email already exists in the system.",
         )
     
-    new_user = await crud_user.create(db, obj_in=user_in)
-
-    # --- INÍCIO DA SINCRONIZAÇÃO (FASE 4) ---
-    async with httpx.AsyncClient() as client:
-        # Prepara dados seguros para sincronização
-        user_data_safe = {
-            "email": user_in.email,
-            "full_name": user_in.full_name,
-            "is_active": user_in.is_active,
-            "is_superuser": user_in.is_superuser,
-            "password": user_in.password # Envia a senha para o outro sistema criar o hash
-        }
-        
-        # 1. Sincroniza com o 'fleet-api'
-        try:
-            await client.post(
-                "http://gateway/api/fleet/users/internal/sync_user",
-                json=user_data_safe,
-                timeout=5.0
-            )
-        except httpx.RequestError as e:
-            print(f"ALERTA: Falha ao sincronizar usuário com FLEET-API: {e}")
-            pass # Não falha a criação principal
-
-        # 2. Sincroniza com o 'sales-api'
-        try:
-            await client.post(
-                "http://gateway/api/sales/users/internal/sync_user",
-                json=user_data_safe,
-                timeout=5.0
-            )
-        except httpx.RequestError as e:
-            print(f"ALERTA: Falha ao sincronizar usuário com SALES-API: {e}")
-            pass # Não falha a criação principal
+    # crud_user.create retorna (utilizador, token de verificação)
+    new_user, _ = await crud_user.create(db, obj_in=user_in, commit=False)
+
+    # --- SINCRONIZAÇÃO (FASE 4) ---
+    # Só grava os eventos (fleet, sales...), na mesma transação que o utilizador;
+    # o user_sync_service entrega-os em paralelo e com retry, sem bloquear esta resposta.
+    await enqueue_user_created(db, user_id=new_user.id, data={
+        "email": user_in.email,
+        "full_name": user_in.full_name,
+        "is_active": user_in.is_active,
+        "is_superuser": user_in.is_superuser,
+        "password": user_in.password # O outro sistema cria o hash (guardada cifrada até à entrega)
+    }, commit=False)
+    await db.commit()
+    await db.refresh(new_user)
     # --- FIM DA SINCRONIZAÇÃO ---
 
     return new_user
 
 @router.get("/admin/users/", response_model=list[User])
 async def admin_read_users(
-    # CORREÇÃO: Alterado de get_session para get_db
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db), # Só leitura: réplica, se configurada
     skip: int = 0,
     limit: int = 100,
-    current_user: UserModel = Depends(get_current_active_superuser),
+    current_user: UserModel = Depends(get_current_active_superuser_read),
 ):
     """
     Admin lê todos os usuários.
@@ -84,9 +79,8 @@ async def admin_read_users(
 @router.get("/admin/users/{user_id}", response_model=User)
 async def admin_read_user(
     user_id: int,
-    # CORREÇÃO: Alterado de get_session para get_db
-    db: AsyncSession = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_superuser),
+    db: AsyncSession = Depends(get_read_db), # Só leitura: réplica, se configurada
+    current_user: UserModel = Depends(get_current_active_superuser_read),
 ):
     """
     Admin lê um usuário por ID.
@@ -111,9 +105,16 @@ async def admin_update_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user = await crud_user.update(db, db_obj=user, obj_in=user_in)
+    previous_email = user.email
+    user = await crud_user.update(db, db_obj=user, obj_in=user_in, commit=False)
     
-    # TODO: Sincronizar atualização de usuário com outros serviços
+    # Propaga só os campos alterados (custom_claims são locais ao auth-api);
+    # o evento é confirmado no mesmo commit que a alteração
+    changes = user_in.model_dump(exclude_unset=True, exclude={"custom_claims", "is_mfa_enabled"})
+    if changes:
+        await enqueue_user_updated(db, user_id=user.id, email=previous_email, changes=changes, commit=False)
+    await db.commit()
+    await db.refresh(user)
     
     return user
 
@@ -131,8 +132,117 @@ async def admin_delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    deleted_user = await crud_user.remove(db, id=user_id)
+    deleted_user = await crud_user.remove(db, id=user_id, commit=False)
     
-    # TODO: Sincronizar deleção de usuário com outros serviços
+    await enqueue_user_deleted(db, user_id=user_id, email=deleted_user.email, commit=False)
+    await db.commit()
     
-    return deleted_user
\ No newline at end of file
+    return deleted_user
+
+# --- MANUTENÇÃO: JOB DE RETENÇÃO ---
+@router.get("/maintenance/retention", response_model=RetentionReport)
+async def read_retention_report():
+    """
+    Retorna o relatório da última execução do job de retenção
+    (linhas apagadas, backlog restante e throughput).
+    """
+    report = get_last_retention_report()
+    if report is None:
+        raise HTTPException(status_code=404, detail="O job de retenção ainda não foi executado.")
+    return report
+
+@router.post("/maintenance/retention/run", response_model=RetentionReport)
+async def trigger_retention_run():
+    """Força uma execução imediata do job de retenção."""
+    return await run_retention_cycle()
+
+# --- MANUTENÇÃO: EMAIL OUTBOX ---
+@router.get("/maintenance/email-outbox", response_model=EmailOutboxStats)
+async def read_email_outbox_stats():
+    """Backlog da fila de emails, mensagens falhadas e o último lote entregue."""
+    return await get_email_outbox_stats()
+
+@router.post("/maintenance/email-outbox/drain", response_model=EmailOutboxStats)
+async def trigger_email_outbox_drain():
+    """Entrega imediatamente as mensagens prontas e retorna o estado da fila."""
+    await drain_email_outbox()
+    return await get_email_outbox_stats()
+
+# --- MANUTENÇÃO: SINCRONIZAÇÃO DE UTILIZADORES ---
+@router.get("/maintenance/user-sync", response_model=UserSyncStats)
+async def read_user_sync_stats():
+    """Eventos de sincronização pendentes/falhados e o último lote entregue."""
+    return await get_user_sync_stats()
+
+@router.post("/maintenance/user-sync/drain", response_model=UserSyncStats)
+async def trigger_user_sync_drain():
+    """Entrega imediatamente os eventos prontos e retorna o estado da fila."""
+    await drain_user_sync()
+    return await get_user_sync_stats()
+
+# --- MANUTENÇÃO: CHAVES DE ASSINATURA ---
+@router.post("/maintenance/signing-keys/reload")
+async def reload_signing_keys():
+    """
+    Relê as chaves de JWT_SIGNING_KEYS_DIR (rotação sem reiniciar o processo).
+    Só recarrega o worker que atende o pedido; os outros apanham as chaves novas
+    em até JWT_SIGNING_KEYS_RELOAD_SECONDS.
+    """
+    loaded = signing_keys.reload()
+    active = signing_keys.active_key()
+    return {"loaded": loaded, "active_kid": active[0] if active else None}
+
+# --- MANUTENÇÃO: CUSTO DO HASHING DE SENHAS ---
+@router.get("/maintenance/password-hash/benchmark")
+async def run_password_hash_benchmark(
+    rounds: Optional[int] = Query(None, ge=4, le=14, description="Custo candidato (default: PASSWORD_BCRYPT_ROUNDS)"),
+    samples: int = Query(3, ge=1, le=5),
+):
+    """
+    Mede a latência por hash bcrypt de um custo candidato neste servidor, na mesma pool
+    de threads que serve os logins. Usar para escolher PASSWORD_BCRYPT_ROUNDS.
+    Os limites (custo 14, 5 amostras: poucos segundos) evitam que a medição ocupe
+    uma thread da pool durante muito tempo e atrase os logins.
+    """
+    result = await benchmark_password_hash_async(rounds or settings.PASSWORD_BCRYPT_ROUNDS, samples)
+    return {
+        **result,
+        "configured_rounds": settings.PASSWORD_BCRYPT_ROUNDS,
+        "hash_workers": settings.PASSWORD_HASH_MAX_WORKERS,
+    }
+
+# --- REVOGAÇÃO DE ACCESS TOKENS ---
+@router.post("/access-tokens/revoke")
+async def revoke_access_tokens(
+    revocation: AccessTokenRevocationRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Acrescenta tokens (jti) e/ou sessões (sid) à lista de revogação publicada em /auth/revocations."""
+    revoked = await crud_access_token_revocation.revoke(db, kind="jti", values=revocation.jti, commit=False)
+    revoked += await crud_access_token_revocation.revoke(db, kind="sid", values=revocation.sid, commit=False)
+    await db.commit() # Ambas as listas entram em vigor (também localmente) neste commit
+    return {"revoked": revoked}
+
+# --- REVOGAÇÃO EM MASSA DE SESSÕES (um único UPDATE, sem carregar tokens) ---
+@router.post("/users/{user_id}/sessions/revoke-device", response_model=SessionRevocationResult)
+async def revoke_device_sessions(
+    user_id: int,
+    device: DeviceSessionRevocationRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Termina as sessões de um utilizador num dispositivo (p.ex. telemóvel perdido)."""
+    revoked = await crud_refresh_token.revoke_refresh_tokens_for_device(
+        db, user_id=user_id, user_agent=device.user_agent, ip_address=device.ip_address
+    )
+    return {"revoked": revoked}
+
+@router.post("/sessions/revoke-older-than", response_model=SessionRevocationResult)
+async def revoke_aged_sessions(
+    revocation: AgedSessionRevocationRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """Termina as sessões iniciadas antes de uma data (p.ex. após um incidente), de um utilizador ou de todos."""
+    revoked = await crud_refresh_token.revoke_refresh_tokens_older_than(
+        db, created_before=revocation.created_before, user_id=revocation.user_id
+    )
+    return {"revoked": revoked}
@@ -9,8 +9,7 @@ from app.db.session import get_db
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate, EmailRequest # Importado EmailRequest
 # Importar dependência de autenticação do módulo auth
 from app.models.user import User as UserModel
-from app.services.email_service import send_verification_email # Importar serviço de email
-from fastapi import BackgroundTasks # Importar BackgroundTasks~
+from app.services.email_outbox_service import enqueue_verification_email # Email via outbox persistente
 from loguru import logger
 
 router = APIRouter()
@@ -20,7 +19,6 @@ async def resend_verification_email(
     *,
     db: AsyncSession = Depends(get_db),
     request_body: EmailRequest,
-    background_tasks: BackgroundTasks
 ):
     user = await crud_user.get_by_email(db, email=request_body.email)
     
@@ -34,20 +32,20 @@ async def resend_verification_email(
     if user and user.is_active and not user.is_verified:
         try:
             # Esta função (generate_verification_token) agora deve funcionar (após a correção no crud_user.py)
-            db_user, verification_token = await crud_user.generate_verification_token(db, user=user)
-            
-            # Envia o e-mail em segundo plano
-            background_tasks.add_task(
-                send_verification_email, 
-                email_to=db_user.email, 
-                verification_token=verification_token
+            # Novo token e e-mail no outbox (entregue pelo worker) na mesma transação
+            db_user, verification_token = await crud_user.generate_verification_token(db, user=user, commit=False)
+            await enqueue_verification_email(
+                db,
+                email_to=db_user.email,
+                verification_token=verification_token,
+                commit=False
             )
-            logger.info(f"Background task added for email resend to: {user.email}")
+            await db.commit()
+            logger.info(f"Verification email queued for resend to: {user.email}")
             
         except Exception as e:
-            # Log de erro interno no background task.
-            logger.error(f"FATAL ERROR in background task during email resend for {user.email}: {e}")
-            pass 
+            logger.error(f"FATAL ERROR during email resend for {user.email}: {e}")
+            await db.rollback()
             
     return {"msg": "Se o e-mail existir e não estiver verificado, um novo link foi enviado."}
 
@@ -56,7 +54,6 @@ async def create_user(
     *,
     db: AsyncSession = Depends(get_db),
     user_in: UserCreate,
-    background_tasks: BackgroundTasks # Adicionar BackgroundTasks
 ) -> Any:
     """
     Cria um novo usuário (registro) e envia email de verificação.
@@ -69,14 +66,17 @@ async def create_user(
             detail="The user with this email already exists in the system.",
         )
     # create agora retorna o usuário E o token
-    db_user, verification_token = await crud_user.create(db, obj_in=user_in)
+    db_user, verification_token = await crud_user.create(db, obj_in=user_in, commit=False)
 
-    # --- Enviar email em background ---
-    background_tasks.add_task(
-        send_verification_email,
+    # --- Email de verificação no outbox, na mesma transação do utilizador ---
+    await enqueue_verification_email(
+        db,
         email_to=db_user.email,
-        verification_token=verification_token
+        verification_token=verification_token,
+        commit=False
     )
+    await db.commit()
+    await db.refresh(db_user)
     # --- Fim envio email ---
 
     # Retorna o usuário criado (sem o token)
@@ -0,0 +1,27 @@
+# auth_api/app/api/endpoints/well_known.py
+import hashlib
+import json
+
+from fastapi import APIRouter, Request, Response
+
+from app.core.config import settings
+from app.core.signing_keys import signing_keys
+
+router = APIRouter()
+
+@router.get("/.well-known/jwks.json")
+async def read_jwks(request: Request):
+    """
+    Publica as chaves públicas de assinatura dos access tokens (JWKS).
+    Os serviços consumidores guardam este documento em cache e verificam os
+    tokens localmente pelo 'kid' do header, sem segredo partilhado nem chamada à Auth API.
+    """
+    body = json.dumps(signing_keys.jwks(), separators=(",", ":"), sort_keys=True)
+    etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+    headers = {
+        "Cache-Control": f"public, max-age={settings.JWKS_CACHE_MAX_AGE_SECONDS}",
+        "ETag": etag,
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -2,7 +2,7 @@
 import os
 from pydantic_settings import BaseSettings
 from pydantic import AnyHttpUrl, EmailStr, validator
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 from loguru import logger
 import base64
 
@@ -13,12 +13,29 @@ class Settings(BaseSettings):
     
     # --- DATABASE ---
     DATABASE_URL: str
+    DATABASE_READ_URL: Optional[str] = None # Réplica de leitura (opcional); mesmo driver async que DATABASE_URL
+    DATABASE_READ_RETRY_SECONDS: float = 30.0 # Réplica indisponível: leituras vão ao primário durante este tempo
     
     # --- SECURITY & JWT ---
     SECRET_KEY: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     ALGORITHM: str = "HS256"
     
+    # --- ASSINATURA ASSIMÉTRICA (opcional) ---
+    # Se JWT_SIGNING_KEYS_DIR tiver chaves <kid>.pem, os access tokens passam a ser
+    # assinados com a chave ativa e publicados em /api/v1/.well-known/jwks.json.
+    JWT_SIGNING_KEYS_DIR: Optional[str] = None
+    JWT_ACTIVE_KID: Optional[str] = None
+    JWT_ASYMMETRIC_ALGORITHM: str = "RS256"
+    JWKS_CACHE_MAX_AGE_SECONDS: int = 300
+    # Cada worker relê JWT_SIGNING_KEYS_DIR a este ritmo (0 desliga: só no arranque ou
+    # por POST /mgmt/maintenance/signing-keys/reload, que só recarrega o worker que o atende)
+    JWT_SIGNING_KEYS_RELOAD_SECONDS: int = 60
+    # Access tokens sem 'kid' (HS256 com SECRET_KEY, o formato anterior às chaves assimétricas).
+    # Desligar quando as chaves estiverem ativas há mais de ACCESS_TOKEN_EXPIRE_MINUTES em
+    # todos os workers: a partir daí nenhum token HS256 válido pode existir.
+    ACCEPT_LEGACY_HS256_TOKENS: bool = True
+    
     # --- ADMIN USER ---
     FIRST_SUPERUSER_EMAIL: EmailStr
     FIRST_SUPERUSER_PASSWORD: str
@@ -48,11 +65,82 @@ class Settings(BaseSettings):
     EMAILS_FROM_NAME: Optional[str] = "Verax Auth"
     VERIFICATION_URL_BASE: Optional[AnyHttpUrl] = None
     RESET_PASSWORD_URL_BASE: Optional[AnyHttpUrl] = None
+    EMAIL_BACKEND: str = "brevo" # "brevo" ou "stub" (transporte local, sem rede)
+    EMAIL_MAX_CONCURRENCY: int = 10 # Envios simultâneos / conexões no pool
+    EMAIL_MAX_RETRIES: int = 3
+    EMAIL_RETRY_BACKOFF_SECONDS: float = 0.5
+    EMAIL_RETRY_MAX_DELAY: float = 30.0 # Teto para o Retry-After do provedor (segura um slot de envio)
+    EMAIL_HTTP_TIMEOUT_SECONDS: float = 10.0
+
+    # --- EMAIL OUTBOX (fila persistente + worker de entrega) ---
+    EMAIL_OUTBOX_ENABLED: bool = True # False: as mensagens ficam na fila (ex: outro processo entrega)
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50 # Mensagens reclamadas por lote
+    EMAIL_OUTBOX_POLL_INTERVAL_SECONDS: float = 5.0 # Espera máxima entre varrimentos da fila
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8 # Depois disto a mensagem fica 'failed'
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: int = 30 # Backoff exponencial entre tentativas (limitado a 1h)
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 120 # Tempo em que uma mensagem reclamada fica invisível a outros workers
+    EMAIL_OUTBOX_SENT_RETENTION_DAYS: int = 7 # Mensagens enviadas são apagadas pelo job de retenção
+
+    # --- SINCRONIZAÇÃO DE UTILIZADORES COM OS OUTROS SERVIÇOS ---
+    USER_SYNC_ENABLED: bool = True # False: os eventos ficam na fila (ex: outro processo entrega)
+    USER_SYNC_TARGETS: Dict[str, str] = {
+        "fleet": "http://gateway/api/fleet/users/internal/sync_user",
+        "sales": "http://gateway/api/sales/users/internal/sync_user",
+    }
+    USER_SYNC_TIMEOUT_SECONDS: float = 5.0
+    USER_SYNC_MAX_CONCURRENCY: int = 10 # Pedidos simultâneos / conexões no pool
+    USER_SYNC_BATCH_SIZE: int = 100
+    USER_SYNC_POLL_INTERVAL_SECONDS: float = 5.0
+    USER_SYNC_MAX_ATTEMPTS: int = 10 # Depois disto o evento fica 'failed'
+    USER_SYNC_RETRY_BASE_SECONDS: int = 5 # Backoff exponencial (limitado a 1h)
+    USER_SYNC_LEASE_SECONDS: int = 60
+    USER_SYNC_SENT_RETENTION_DAYS: int = 7 # Eventos entregues são apagados pelo job de retenção
+
+    # --- RATE LIMITING (slowapi/limits) ---
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORAGE_URI: str = "memory://" # Ex: "redis://redis:6379/0" para partilhar entre workers
+    RATE_LIMIT_STRATEGY: str = "sliding-window-counter" # fixed-window | sliding-window-counter | moving-window
+    RATE_LIMIT_TRUST_PROXY_HEADERS: bool = False # True atrás do nginx (usa X-Real-IP / X-Forwarded-For)
+    RATE_LIMIT_DEFAULT: str = "10/minute" # Por IP, em todas as rotas sem limite próprio
+    RATE_LIMIT_LOGIN_PER_IP: str = "10/minute" # /token
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: str = "5/minute" # Tentativas falhadas de /token por email
+    RATE_LIMIT_MFA_PER_IP: str = "10/minute" # /mfa/verify e /mfa/verify-recovery
+    RATE_LIMIT_MFA_PER_ACCOUNT: str = "5/5minutes" # Códigos MFA errados por utilizador
 
     # --- ACCOUNT LOCKOUT (do .env) ---
     LOGIN_MAX_FAILED_ATTEMPTS: int
     LOGIN_LOCKOUT_MINUTES: int
 
+    # --- PASSWORD HASHING (pool fora do event loop) ---
+    PASSWORD_BCRYPT_ROUNDS: int = 12 # Custo 2^rounds; hashes com outro custo são refeitos no login (ver benchmark)
+    PASSWORD_HASH_MAX_WORKERS: int = 4 # Threads dedicadas ao bcrypt
+    PASSWORD_HASH_MAX_QUEUE: int = 64 # Pedidos que podem aguardar por uma thread livre
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = 5.0 # Espera máxima por vaga antes de responder 503
+
+    # --- RETENÇÃO (limpeza periódica de credenciais expiradas) ---
+    RETENTION_ENABLED: bool = True
+    RETENTION_INTERVAL_SECONDS: int = 3600 # Intervalo entre execuções do job
+    RETENTION_BATCH_SIZE: int = 1000 # Linhas apagadas por transação
+    RETENTION_MAX_BATCHES_PER_RUN: int = 50 # Limite de lotes por tabela em cada execução
+    REFRESH_TOKEN_REVOKED_RETENTION_DAYS: int = 7 # Tokens revogados são mantidos este tempo (auditoria); os rodados de uma sessão ainda ativa, até expirarem
+
+    # --- CACHE DO UTILIZADOR AUTENTICADO (principal) ---
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60 # 0 desativa; limitado à duração do access token
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+
+    # --- INTROSPEÇÃO DE TOKENS (POST /auth/introspect, protegido por X-API-Key) ---
+    INTROSPECTION_MAX_TOKENS: int = 500 # Tokens por pedido
+    INTROSPECTION_CACHE_TTL_SECONDS: float = 5.0 # 0 desativa; atraso máximo para refletir uma revogação
+    INTROSPECTION_CACHE_MAX_ENTRIES: int = 50000
+
+    # --- LISTA DE REVOGAÇÃO DE ACCESS TOKENS (GET /auth/revocations) ---
+    REVOCATION_SYNC_INTERVAL_SECONDS: float = 2.0 # Cópia em memória atualizada no máximo a este ritmo
+    REVOCATION_SYNC_SETTLE_SECONDS: int = 5 # Entradas mais recentes são reenviadas (commits fora de ordem)
+    REVOCATION_LIST_PAGE_SIZE: int = 5000 # Entradas por resposta/consulta
+
+    # --- MÉTRICAS (GET /metrics, formato Prometheus) ---
+    METRICS_ENABLED: bool = True # Expor apenas na rede interna (ex: bloquear /metrics no proxy)
+
     # --- OIDC JWT Claims (do .env) ---
     JWT_ISSUER: str
     JWT_AUDIENCE: str
@@ -65,6 +153,12 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
     GOOGLE_REDIRECT_URI_FRONTEND: Optional[AnyHttpUrl] = None
+    # Endpoints (token, JWKS, userinfo) vêm do documento de descoberta; em testes/dev
+    # pode apontar para um provedor local
+    GOOGLE_DISCOVERY_URL: str = "https://accounts.google.com/.well-known/openid-configuration"
+    GOOGLE_HTTP_TIMEOUT_SECONDS: float = 5.0
+    GOOGLE_METADATA_CACHE_SECONDS: int = 3600 # Descoberta e JWKS (o Cache-Control do provedor prevalece se for menor)
+    GOOGLE_FETCH_USERINFO: bool = False # O ID token já traz email/nome; True força a chamada ao userinfo
 
     class Config:
         case_sensitive = True
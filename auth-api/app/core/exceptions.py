@@ -6,4 +6,17 @@ class AccountLockedException(Exception):
     def __init__(self, message="Account is locked", locked_until: datetime | None = None):
         self.message = message
         self.locked_until = locked_until
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class PasswordHashingBusyException(Exception):
+    """Exceção levantada quando a pool de hashing de senhas está saturada (fila cheia)."""
+    def __init__(self, message="Password hashing capacity exceeded"):
+        self.message = message
+        super().__init__(self.message)
+
+class OAuthProviderException(Exception):
+    """Falha no login social: código/ID token inválido (400) ou provedor indisponível (500)."""
+    def __init__(self, message="OAuth provider error", status_code: int = 500):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
@@ -0,0 +1,96 @@
+# auth_api/app/core/metrics.py
+import time
+from typing import Dict
+
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# --- MÉTRICAS PROMETHEUS (expostas em GET /metrics) ---
+# Cada worker do uvicorn tem os seus contadores: o Prometheus deve recolher cada
+# processo (ou agregar por instância). Os nomes seguem o prefixo "auth_".
+
+# Latência de pedidos de API vs. custo do bcrypt (PASSWORD_BCRYPT_ROUNDS=12 ~ 250ms)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "auth_http_request_duration_seconds",
+    "Duração dos pedidos HTTP, por rota (template, não o path real) e status.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "auth_password_hash_duration_seconds",
+    "Tempo do bcrypt numa thread da pool de hashing (hash/verify).",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "auth_password_hash_queue_wait_seconds",
+    "Espera por uma vaga na pool de hashing antes de executar o bcrypt.",
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "auth_db_query_duration_seconds",
+    "Duração de cada statement SQL executado pelo engine.",
+    buckets=DB_BUCKETS,
+)
+SECURITY_EVENTS = Counter(
+    "auth_security_events_total",
+    "Eventos de segurança (logins, bloqueios, MFA, rotação de refresh tokens, rate limiting).",
+    ["event"],
+)
+
+
+def record_security_event(name: str) -> None:
+    SECURITY_EVENTS.labels(event=name).inc()
+
+
+# --- ENGINE: tempo de SQL e estado da pool de ligações ---
+_instrumented_engines: Dict[str, AsyncEngine] = {} # 'primary' / 'replica' -> engine
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start_time")
+    if starts:
+        DB_QUERY_DURATION.observe(time.perf_counter() - starts.pop())
+
+
+def instrument_engine(engine: AsyncEngine, role: str = "primary") -> None:
+    """Mede os statements do engine e passa a publicar a sua pool (chamar ao criá-lo)."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _instrumented_engines[role] = engine
+
+
+class _PoolCollector:
+    """Lê a pool do engine em cada scrape (sem custo nos pedidos)."""
+
+    def collect(self):
+        gauges = {
+            "auth_db_pool_size": GaugeMetricFamily("auth_db_pool_size", "Ligações permanentes configuradas na pool.", labels=["engine"]),
+            "auth_db_pool_checked_out": GaugeMetricFamily("auth_db_pool_checked_out", "Ligações atualmente em uso.", labels=["engine"]),
+            "auth_db_pool_checked_in": GaugeMetricFamily("auth_db_pool_checked_in", "Ligações abertas e livres na pool.", labels=["engine"]),
+            "auth_db_pool_overflow": GaugeMetricFamily("auth_db_pool_overflow", "Ligações em uso para além de pool_size (max_overflow).", labels=["engine"]),
+        }
+        for role, engine in list(_instrumented_engines.items()):
+            pool = engine.sync_engine.pool
+            # NullPool/StaticPool (ex: alguns setups de sqlite) não têm estas contagens
+            if not hasattr(pool, "checkedout"):
+                continue
+            gauges["auth_db_pool_size"].add_metric([role], pool.size())
+            gauges["auth_db_pool_checked_out"].add_metric([role], pool.checkedout())
+            gauges["auth_db_pool_checked_in"].add_metric([role], pool.checkedin())
+            # overflow() é negativo enquanto a pool base não está cheia
+            gauges["auth_db_pool_overflow"].add_metric([role], max(pool.overflow(), 0))
+        yield from gauges.values()
+
+
+REGISTRY.register(_PoolCollector())
+# --- FIM MÉTRICAS ---
@@ -0,0 +1,45 @@
+# auth_api/app/core/pagination.py
+import base64
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response, status
+
+# Header com o cursor da página seguinte (ausente na última página)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(last_id: int) -> str:
+    """Cursor opaco a partir do ID da última linha devolvida."""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """ID a partir do qual continuar (exclusivo), ou None para a primeira página."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginação inválido.")
+
+
+class KeysetParams:
+    """Dependência com os parâmetros de paginação por cursor (keyset) das listagens."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+        cursor: Optional[str] = Query(None, description=f"Valor do header {NEXT_CURSOR_HEADER} da página anterior"),
+    ):
+        self.limit = limit
+        self.before_id = decode_cursor(cursor)
+
+
+def set_next_cursor(response: Response, next_id: Optional[int]) -> None:
+    """Publica o cursor da página seguinte no header da resposta (se houver mais linhas)."""
+    if next_id is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(next_id)
@@ -0,0 +1,98 @@
+# auth_api/app/core/principal_cache.py
+import copy
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, NamedTuple, Optional
+
+from cachetools import TLRUCache
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User as UserModel
+
+
+class _CachedPrincipal(NamedTuple):
+    values: Dict[str, Any] # Snapshot das colunas do utilizador
+    expires_at: float      # Instante (time.monotonic) em que a entrada expira
+
+
+class PrincipalCache:
+    """
+    Cache em memória (por processo) do utilizador autenticado, indexado pelo ID.
+
+    Guarda apenas um snapshot das colunas; em cada pedido é criada uma instância
+    NOVA do User, anexada à sessão do pedido sem ir à BD (make_transient_to_detached),
+    para que os CRUDs possam continuar a fazer db.add(current_user) normalmente.
+
+    A validade de cada entrada é o menor entre PRINCIPAL_CACHE_TTL_SECONDS, a duração
+    do access token e o 'exp' do token que a carregou. O crud_user invalida a entrada
+    sempre que altera estado ativo, MFA, roles/claims ou senha. Com vários workers a
+    invalidação é local, por isso o TTL é o limite de staleness entre processos.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._cache: TLRUCache = TLRUCache(
+            maxsize=maxsize,
+            ttu=lambda _key, entry, _now: entry.expires_at,
+            timer=time.monotonic,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _snapshot(self, user: UserModel) -> Dict[str, Any]:
+        return {
+            column.key: copy.deepcopy(getattr(user, column.key))
+            for column in UserModel.__table__.columns
+        }
+
+    def load(self, db: AsyncSession, user_id: int) -> Optional[UserModel]:
+        """Retorna o utilizador em cache já anexado à sessão `db`, ou None (miss)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._cache.get(user_id)
+        if entry is None:
+            return None
+        # Cópia profunda: custom_claims (JSON) é mutado in-place por alguns CRUDs
+        user = UserModel(**copy.deepcopy(entry.values))
+        make_transient_to_detached(user)
+        db.add(user) # Anexa como persistente, sem SQL
+        return user
+
+    def store(self, user: UserModel, *, token_exp: Optional[int] = None) -> None:
+        """Guarda o snapshot do utilizador, limitado pelo 'exp' do token (epoch) se fornecido."""
+        if not self.enabled:
+            return
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            remaining = token_exp - datetime.now(timezone.utc).timestamp()
+            if remaining <= 0:
+                return
+            ttl = min(ttl, remaining)
+        entry = _CachedPrincipal(self._snapshot(user), time.monotonic() + ttl)
+        with self._lock:
+            self._cache[user.id] = entry
+
+    def invalidate(self, user_id: Optional[int]) -> None:
+        """Remove o utilizador do cache (chamar após alterações relevantes)."""
+        if user_id is None:
+            return
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    # Nunca mais do que a duração de um access token
+    ttl_seconds=min(settings.PRINCIPAL_CACHE_TTL_SECONDS, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+)
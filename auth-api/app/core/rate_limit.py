@@ -0,0 +1,92 @@
+# auth_api/app/core/rate_limit.py
+import hashlib
+import math
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from limits import parse
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.core.config import settings
+from app.core.metrics import record_security_event
+
+# --- RATE LIMITING PARTILHADO ---
+# O backend vem de RATE_LIMIT_STORAGE_URI (formato da lib 'limits'):
+#   memory://                -> contadores no próprio processo (dev/testes, 1 worker)
+#   redis://host:6379/0      -> partilhado entre workers/réplicas (requer 'pip install redis')
+#   memcached://host:11211   -> idem (requer 'pymemcache')
+# A estratégia "sliding-window-counter" usa 2 contadores por chave (janela atual e
+# anterior): custo O(1) por verificação, sem os picos de fronteira da janela fixa.
+
+RATE_LIMIT_KEY_PREFIX = "auth-api"
+
+
+def client_ip_key(request: Request) -> str:
+    """IP do cliente. Atrás do nginx (RATE_LIMIT_TRUST_PROXY_HEADERS) usa X-Real-IP / X-Forwarded-For."""
+    if settings.RATE_LIMIT_TRUST_PROXY_HEADERS:
+        real_ip = request.headers.get("x-real-ip")
+        if real_ip:
+            return real_ip.strip()
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return get_remote_address(request)
+
+
+def build_limiter(storage_uri: Optional[str] = None) -> Limiter:
+    """Cria o Limiter da app (storage_uri permite injetar outro backend, ex: em testes)."""
+    return Limiter(
+        key_func=client_ip_key,
+        default_limits=[settings.RATE_LIMIT_DEFAULT],
+        storage_uri=storage_uri or settings.RATE_LIMIT_STORAGE_URI,
+        strategy=settings.RATE_LIMIT_STRATEGY,
+        key_prefix=RATE_LIMIT_KEY_PREFIX,
+        enabled=settings.RATE_LIMIT_ENABLED,
+        headers_enabled=False,
+        # Se o backend partilhado cair, cada processo continua a limitar em memória
+        in_memory_fallback_enabled=True,
+    )
+
+
+limiter = build_limiter()
+
+
+# --- Limites por conta (login / verificação MFA) ---
+# Complementam os limites por IP: travam ataques distribuídos contra UMA conta.
+# Só as tentativas FALHADAS contam, para que um atacante não consiga bloquear o
+# login legítimo de alguém com pedidos válidos... nem com muitos IPs diferentes.
+
+def _account_id(account: str) -> str:
+    # Hash para não guardar emails em claro no backend partilhado
+    return hashlib.sha256(account.strip().lower().encode("utf-8")).hexdigest()[:32]
+
+
+def check_account_limit(scope: str, account: str, limit: str) -> None:
+    """Levanta 429 se a conta já esgotou as tentativas falhadas permitidas em `scope`."""
+    if not limiter.enabled:
+        return
+    item = parse(limit)
+    identifiers = (RATE_LIMIT_KEY_PREFIX, scope, _account_id(account))
+    if not limiter.limiter.test(item, *identifiers):
+        reset_at = limiter.limiter.get_window_stats(item, *identifiers).reset_time
+        retry_after = max(1, math.ceil(reset_at - time.time()))
+        record_security_event("rate_limited_account")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiadas tentativas falhadas para esta conta. Tente novamente mais tarde.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+def record_account_failure(scope: str, account: str, limit: str) -> None:
+    """Conta uma tentativa falhada para a conta em `scope`."""
+    if not limiter.enabled:
+        return
+    limiter.limiter.hit(parse(limit), RATE_LIMIT_KEY_PREFIX, scope, _account_id(account))
+
+
+def reset_rate_limits() -> None:
+    """Limpa todos os contadores (útil em testes com o backend memory://)."""
+    limiter.reset()
@@ -0,0 +1,72 @@
+# auth_api/app/core/revocation.py
+import threading
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from app.core.config import settings
+
+
+class RevocationSet:
+    """
+    Lista de revogação de access tokens mantida em memória (por processo).
+
+    Cada entrada é (tipo, valor) -> instante (epoch) em que deixa de ser necessária:
+    'jti' revoga um token, 'sid' revoga todos os tokens de uma sessão. É o mesmo
+    formato publicado em GET /auth/revocations, para que os outros serviços mantenham
+    uma cópia local: a verificação por pedido é um lookup num dict, sem ir à BD, e a
+    cópia é atualizada de forma incremental a partir da última `version` conhecida.
+    """
+
+    def __init__(self, sync_interval_seconds: float):
+        self.sync_interval_seconds = sync_interval_seconds
+        self.version = 0
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], float] = {}
+        self._last_sync = 0.0 # Instante (time.monotonic) da última sincronização
+        self._syncing = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def apply(self, entries: Iterable[Tuple[str, str, float]], version: Optional[int] = None) -> None:
+        """Acrescenta entradas (tipo, valor, expira_em epoch) e descarta as já expiradas."""
+        now = time.time()
+        with self._lock:
+            for kind, value, expires_at in entries:
+                key = (kind, value)
+                self._entries[key] = max(expires_at, self._entries.get(key, 0.0))
+            self._entries = {key: exp for key, exp in self._entries.items() if exp > now}
+            if version is not None and version > self.version:
+                self.version = version
+
+    def is_revoked(self, payload: Mapping[str, Any]) -> bool:
+        """True se o 'jti' ou o 'sid' do access token estiverem na lista."""
+        now = time.time()
+        for kind in ("jti", "sid"):
+            value = payload.get(kind)
+            if value and self._entries.get((kind, value), 0.0) > now:
+                return True
+        return False
+
+    def begin_sync(self) -> bool:
+        """True se a cópia estiver desatualizada e ninguém a estiver a sincronizar (reserva a vez)."""
+        with self._lock:
+            if self._syncing or time.monotonic() - self._last_sync < self.sync_interval_seconds:
+                return False
+            self._syncing = True
+            return True
+
+    def end_sync(self, succeeded: bool) -> None:
+        with self._lock:
+            self._syncing = False
+            if succeeded:
+                self._last_sync = time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.version = 0
+            self._last_sync = 0.0
+
+
+revocation_set = RevocationSet(sync_interval_seconds=settings.REVOCATION_SYNC_INTERVAL_SECONDS)
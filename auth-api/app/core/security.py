@@ -1,9 +1,10 @@
 # auth_api/app/core/security.py
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from .config import settings
+from .signing_keys import signing_keys
 import secrets
 # Import UserModel QUALIFICADO para evitar conflito de nome 'User'
 from app.models.user import User as UserModel
@@ -16,8 +17,93 @@ import base64
 
 # Importar logger (removido na limpeza anterior, mas útil)
 from loguru import logger
+# --- IMPORTS HASHING FORA DO EVENT LOOP ---
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from app.core.exceptions import PasswordHashingBusyException
+from app.core.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_QUEUE_WAIT
+# --- FIM IMPORTS ---
+import hashlib
+import hmac
+import time
+from cryptography.fernet import Fernet, InvalidToken
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def build_pwd_context(rounds: int) -> CryptContext:
+    """
+    Contexto bcrypt com custo 2^rounds. Hashes com outro custo são considerados
+    desatualizados (needs_update) e refeitos no próximo login bem-sucedido.
+    """
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+pwd_context = build_pwd_context(settings.PASSWORD_BCRYPT_ROUNDS)
+
+# --- POOL DE HASHING (bcrypt fora do event loop) ---
+# O bcrypt é CPU-bound e liberta o GIL, por isso corre numa pool de threads dedicada
+# (separada da threadpool default do Starlette). O semáforo limita quantos pedidos
+# podem estar "em voo" (a executar + em fila); acima disso, o pedido espera no máximo
+# PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS antes de ser rejeitado com 503.
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    """Cria a pool de hashing se ainda não existir."""
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+            thread_name_prefix="pwd-hash"
+        )
+    return _hash_executor
+
+def _get_hash_slots() -> asyncio.Semaphore:
+    """Semáforo que limita trabalhos em execução + em fila na pool de hashing."""
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(
+            settings.PASSWORD_HASH_MAX_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE
+        )
+    return _hash_slots
+
+def _timed_hash(operation: str, func, *args):
+    # Corre na thread da pool: mede só o bcrypt, sem a espera pela vaga
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        PASSWORD_HASH_DURATION.labels(operation=operation).observe(time.perf_counter() - start)
+
+async def _run_in_hash_pool(func, *args, operation: Optional[str] = None):
+    slots = _get_hash_slots()
+    wait_start = time.perf_counter()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("Pool de hashing saturada: pedido rejeitado após espera na fila.")
+        raise PasswordHashingBusyException()
+    finally:
+        PASSWORD_HASH_QUEUE_WAIT.observe(time.perf_counter() - wait_start)
+    try:
+        loop = asyncio.get_running_loop()
+        if operation is not None:
+            return await loop.run_in_executor(_get_hash_executor(), _timed_hash, operation, func, *args)
+        return await loop.run_in_executor(_get_hash_executor(), func, *args)
+    finally:
+        slots.release()
+
+def shutdown_hash_executor() -> None:
+    """Encerra a pool de hashing (chamar no shutdown da aplicação)."""
+    global _hash_executor, _hash_slots
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=True)
+        _hash_executor = None
+    _hash_slots = None
+# --- FIM POOL DE HASHING ---
 
 # --- VERIFICAÇÃO E HASH (EXISTENTES) ---
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -29,30 +115,96 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         # Consider logging the exception here for debugging potential issues
         return False
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha e, se o hash guardado estiver desatualizado (custo diferente de
+    PASSWORD_BCRYPT_ROUNDS), retorna também o novo hash: (válida, novo_hash ou None).
+    """
+    try:
+        password_bytes = plain_password.encode('utf-8')[:72]
+        return pwd_context.verify_and_update(password_bytes, hashed_password)
+    except Exception:
+        return False, None
+
 def get_password_hash(password: str) -> str:
     # Limita o tamanho da senha ANTES de passar para o bcrypt
     password_bytes = password.encode('utf-8')[:72]
     return pwd_context.hash(password_bytes)
+
+# --- VERSÕES ASSÍNCRONAS (usar nos endpoints/CRUDs async) ---
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Igual a verify_password, mas executada na pool de hashing (não bloqueia o event loop)."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password, operation="verify")
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Igual a verify_and_update_password, mas executada na pool de hashing."""
+    return await _run_in_hash_pool(verify_and_update_password, plain_password, hashed_password, operation="verify")
+
+async def get_password_hash_async(password: str) -> str:
+    """Igual a get_password_hash, mas executada na pool de hashing (não bloqueia o event loop)."""
+    return await _run_in_hash_pool(get_password_hash, password, operation="hash")
+
+def benchmark_password_hash(rounds: int, samples: int = 5) -> Dict[str, float]:
+    """
+    Mede a latência de um hash bcrypt com o custo `rounds` no hardware atual
+    (mediana/mín/máx em ms) e a capacidade teórica de logins por segundo por thread.
+    """
+    context = build_pwd_context(rounds)
+    password = secrets.token_urlsafe(12).encode('utf-8')
+    timings = []
+    for _ in range(max(1, samples)):
+        start = time.perf_counter()
+        context.hash(password)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    median_ms = timings[len(timings) // 2]
+    return {
+        "rounds": rounds,
+        "samples": len(timings),
+        "median_ms": round(median_ms, 2),
+        "min_ms": round(timings[0], 2),
+        "max_ms": round(timings[-1], 2),
+        "hashes_per_second_per_thread": round(1000 / median_ms, 2) if median_ms else 0.0,
+    }
+
+async def benchmark_password_hash_async(rounds: int, samples: int = 5) -> Dict[str, float]:
+    """Benchmark na pool de hashing (mesmas threads que servem os logins)."""
+    return await _run_in_hash_pool(benchmark_password_hash, rounds, samples)
+# --- FIM VERSÕES ASSÍNCRONAS ---
     
-# --- NOVAS FUNÇÕES HELPER PARA RECOVERY CODES ---
-# Reutilizar as funções de senha para os códigos de recuperação
-def verify_recovery_code(plain_code: str, hashed_code: str) -> bool:
-    # Códigos de recuperação são mais curtos, não precisam do limite de 72 bytes
-    try:
-        return pwd_context.verify(plain_code, hashed_code)
-    except Exception:
-        return False
+# --- RECOVERY CODES (esquema único: HMAC-SHA256) ---
+# Os códigos têm 64 bits aleatórios, por isso não precisam de um hash lento como as
+# senhas: um HMAC com chave do servidor é determinístico (lookup direto pelo índice
+# de hashed_code) e, sem a chave, o tempo da pesquisa no índice não revela nada sobre
+# o código. Verificar custa sempre o mesmo, independentemente de quantos restam.
+def _recovery_code_key() -> bytes:
+    # Chave derivada do SECRET_KEY (como a de encrypt_secret)
+    return hashlib.sha256(f"mfa-recovery-code:{settings.SECRET_KEY}".encode("utf-8")).digest()
 
-def hash_recovery_code(plain_code: str) -> str:
-    return pwd_context.hash(plain_code)
-# --- FIM NOVAS FUNÇÕES ---
+def normalize_recovery_code(plain_code: str) -> str:
+    """Ignora maiúsculas e espaços introduzidos ao copiar/digitar o código."""
+    return "".join(plain_code.split()).lower()
+
+def hash_recovery_code(user_id: int, plain_code: str) -> str:
+    message = f"{user_id}:{normalize_recovery_code(plain_code)}".encode("utf-8")
+    return hmac.new(_recovery_code_key(), message, hashlib.sha256).hexdigest()
+
+def legacy_recovery_code_hash(plain_code: str) -> str:
+    """SHA-256 simples usado antes do HMAC; aceite até o utilizador gerar novos códigos."""
+    return hashlib.sha256(plain_code.strip().encode("utf-8")).hexdigest()
+
+def recovery_code_candidates(user_id: int, plain_code: str) -> Tuple[str, str]:
+    """Hashes a procurar (atual e legado) numa única consulta."""
+    return hash_recovery_code(user_id, plain_code), legacy_recovery_code_hash(plain_code)
+# --- FIM RECOVERY CODES ---
 
 
 # --- Funções JWT (com Claims OIDC) ---
 def create_access_token(
     user: UserModel,
     requested_scopes: Optional[list[str]] = None,
-    mfa_passed: bool = True # NOVO: Indica se o MFA foi verificado nesta sessão
+    mfa_passed: bool = True, # NOVO: Indica se o MFA foi verificado nesta sessão
+    session_id: Optional[str] = None # Família do refresh token: permite revogar a sessão inteira
 ) -> str:
     now = datetime.now(timezone.utc)
     expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -64,6 +216,8 @@ def create_access_token(
         "exp": expire,
         "sub": str(user.id),
         "token_type": "access",
+        "jti": secrets.token_urlsafe(12), # Chaves da lista de revogação (GET /auth/revocations)
+        **({"sid": session_id} if session_id else {}),
         "email": user.email,
         "email_verified": user.is_verified,
         "amr": ["pwd", "mfa"] if user.is_mfa_enabled and mfa_passed else ["pwd"],
@@ -73,6 +227,19 @@ def create_access_token(
         for scope in requested_scopes:
             if scope in user.custom_claims and scope not in to_encode:
                 to_encode[scope] = user.custom_claims.get(scope)
+    # Com chaves assimétricas configuradas, assina com a chave ativa (kid no header)
+    # para que os outros serviços verifiquem localmente via JWKS, sem segredo partilhado.
+    active_key = signing_keys.active_key()
+    if active_key:
+        kid, private_pem = active_key
+        return jwt.encode(
+            to_encode,
+            private_pem,
+            algorithm=settings.JWT_ASYMMETRIC_ALGORITHM,
+            headers={"kid": kid}
+        )
+    if not settings.ACCEPT_LEGACY_HS256_TOKENS:
+        logger.error("Sem chave de assinatura ativa: token HS256 emitido, mas ACCEPT_LEGACY_HS256_TOKENS=false o rejeita")
     encoded_jwt = jwt.encode(
         to_encode,
         settings.SECRET_KEY,
@@ -83,10 +250,26 @@ def create_access_token(
 # ... (decode_access_token, create_refresh_token, decode_refresh_token) ...
 def decode_access_token(token: str) -> Dict | None:
     try:
+        # Tokens com 'kid' são verificados com a chave pública correspondente;
+        # os restantes (emitidos antes da rotação para chaves assimétricas) com o segredo HS,
+        # enquanto ACCEPT_LEGACY_HS256_TOKENS estiver ligado.
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid:
+            key = signing_keys.verification_key(kid)
+            if key is None:
+                logger.warning(f"Access Token assinado com kid desconhecido: {kid}")
+                return None
+            algorithms = [settings.JWT_ASYMMETRIC_ALGORITHM]
+        else:
+            if not settings.ACCEPT_LEGACY_HS256_TOKENS:
+                logger.warning("Access Token HS256 (sem kid) rejeitado: ACCEPT_LEGACY_HS256_TOKENS=false")
+                return None
+            key = settings.SECRET_KEY
+            algorithms = [settings.ALGORITHM]
         payload = jwt.decode(
             token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
+            key,
+            algorithms=algorithms,
             audience=settings.JWT_AUDIENCE,
             issuer=settings.JWT_ISSUER, 
             options={"verify_iss": True, "verify_aud": True}
@@ -103,6 +286,7 @@ def create_refresh_token(data: Dict[str, Any]) -> tuple[str, datetime]:
     to_encode.update({
         "iss": settings.JWT_ISSUER,
         "exp": expire,
+        "jti": secrets.token_urlsafe(16), # Garante hashes distintos para tokens emitidos no mesmo segundo
         "token_type": "refresh"
     })
     encoded_jwt = jwt.encode(to_encode, settings.REFRESH_SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -158,6 +342,23 @@ def decode_password_reset_token(token: str) -> Dict | None:
         logger.warning(f"Falha ao decodificar Password Reset Token: {e}")
         return None
 
+# --- CIFRA SIMÉTRICA (segredos guardados temporariamente na BD) ---
+def _get_fernet() -> Fernet:
+    # Chave derivada do SECRET_KEY (Fernet exige 32 bytes em base64 url-safe)
+    digest = hashlib.sha256(f"data-encryption:{settings.SECRET_KEY}".encode("utf-8")).digest()
+    return Fernet(base64.urlsafe_b64encode(digest))
+
+def encrypt_secret(value: str) -> str:
+    """Cifra um valor sensível (ex: senha num evento de sincronização pendente)."""
+    return _get_fernet().encrypt(value.encode("utf-8")).decode("ascii")
+
+def decrypt_secret(token: str) -> Optional[str]:
+    """Decifra um valor de encrypt_secret. Retorna None se o token for inválido (ex: SECRET_KEY mudou)."""
+    try:
+        return _get_fernet().decrypt(token.encode("ascii")).decode("utf-8")
+    except InvalidToken:
+        return None
+
 # --- NOVAS FUNÇÕES MFA/OTP ---
 
 def generate_otp_secret() -> str:
@@ -184,8 +385,36 @@ def verify_otp_code(secret: str, code: str) -> bool:
     totp = pyotp.TOTP(secret)
     return totp.verify(code, valid_window=1)
 
-def generate_qr_code_base64(otp_uri: str) -> str:
-    """Gera um QR Code a partir da URI OTP e retorna como imagem base64."""
+QR_CODE_FORMATS = ("png", "svg")
+
+def _qr_matrix_to_svg(matrix: list) -> bytes:
+    """Desenha a matriz do QR como um único <path>: um traço horizontal por cada sequência de módulos escuros."""
+    size = len(matrix)
+    commands = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            commands.append(f"M{start} {y}.5h{x - start}")
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="{size}" height="{size}" fill="#fff"/>'
+        f'<path d="{"".join(commands)}" stroke="#000"/></svg>'
+    ).encode("utf-8")
+
+def generate_qr_code_base64(otp_uri: str, image_format: str = "png") -> str:
+    """
+    Gera um QR Code a partir da URI OTP e retorna como data URI base64.
+    'png' usa o Pillow; 'svg' gera um único <path> vetorial diretamente da matriz
+    (sem Pillow), mais barato de produzir e escalável sem perda.
+    """
+    if image_format not in QR_CODE_FORMATS:
+        raise ValueError(f"Formato de QR code inválido: {image_format}")
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -194,10 +423,37 @@ def generate_qr_code_base64(otp_uri: str) -> str:
     )
     qr.add_data(otp_uri)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return f"data:image/png;base64,{img_str}"
+    if image_format == "svg":
+        image_bytes = _qr_matrix_to_svg(qr.get_matrix())
+        mime_type = "image/svg+xml"
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+        buffered = io.BytesIO()
+        img.save(buffered, format="PNG")
+        image_bytes = buffered.getvalue()
+        mime_type = "image/png"
+    img_str = base64.b64encode(image_bytes).decode("utf-8")
+    return f"data:{mime_type};base64,{img_str}"
+
+async def generate_qr_code_base64_async(otp_uri: str, image_format: str = "png") -> str:
+    """Versão para endpoints async: a renderização (CPU-bound) corre numa thread, fora do event loop."""
+    return await asyncio.to_thread(generate_qr_code_base64, otp_uri, image_format)
+
+# --- FIM NOVAS FUNÇÕES ---
+
 
-# --- FIM NOVAS FUNÇÕES ---
\ No newline at end of file
+if __name__ == "__main__":
+    # Uso: python -m app.core.security --rounds 10 11 12 13 [--samples 5]
+    import argparse
+    parser = argparse.ArgumentParser(description="Mede a latência do bcrypt para cada custo candidato.")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[settings.PASSWORD_BCRYPT_ROUNDS])
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+    for candidate in args.rounds:
+        result = benchmark_password_hash(candidate, args.samples)
+        current = " (atual)" if candidate == settings.PASSWORD_BCRYPT_ROUNDS else ""
+        print(
+            f"rounds={candidate}{current}: mediana {result['median_ms']} ms "
+            f"(mín {result['min_ms']}, máx {result['max_ms']}) -> "
+            f"~{result['hashes_per_second_per_thread']} logins/s por thread"
+        )
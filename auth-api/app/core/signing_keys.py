@@ -0,0 +1,144 @@
+# auth_api/app/core/signing_keys.py
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwk
+from loguru import logger
+
+from .config import settings
+
+
+class SigningKeyRing:
+    """
+    Conjunto de chaves assimétricas usadas para assinar os access tokens.
+
+    Cada ficheiro `<kid>.pem` em JWT_SIGNING_KEYS_DIR contém uma chave privada.
+    A chave ativa (JWT_ACTIVE_KID, ou o último kid por ordem alfabética) assina
+    os novos tokens; TODAS as chaves do diretório são publicadas no JWKS, para que
+    tokens assinados com chaves anteriores continuem válidos durante a rotação.
+    Para rodar: adicionar o novo ficheiro, atualizar JWT_ACTIVE_KID e remover a
+    chave antiga só depois de expirarem os tokens que ela assinou.
+
+    Cada processo relê o diretório a cada `reload_seconds` (no acesso seguinte),
+    por isso todos os workers acompanham a rotação sem reinício.
+    """
+
+    def __init__(
+        self, keys_dir: Optional[str], active_kid: Optional[str], algorithm: str, reload_seconds: Optional[float] = None
+    ):
+        self.keys_dir = keys_dir
+        self.active_kid = active_kid
+        self.algorithm = algorithm
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._private_keys: Dict[str, str] = {}
+        self._public_jwks: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+        self._loaded_at = 0.0
+
+    def reload(self) -> int:
+        """(Re)lê as chaves do diretório. Retorna o número de chaves carregadas."""
+        private_keys: Dict[str, str] = {}
+        public_jwks: Dict[str, Dict[str, Any]] = {}
+        if self.keys_dir:
+            for path in sorted(Path(self.keys_dir).glob("*.pem")):
+                kid = path.stem
+                pem = path.read_text()
+                try:
+                    public = jwk.construct(pem, self.algorithm).public_key().to_dict()
+                except Exception as e:
+                    logger.error(f"Chave de assinatura inválida ignorada ({path.name}): {e}")
+                    continue
+                public.update({"kid": kid, "use": "sig", "alg": self.algorithm})
+                private_keys[kid] = pem
+                public_jwks[kid] = public
+        with self._lock:
+            changed = not self._loaded or list(private_keys) != list(self._private_keys)
+            self._private_keys = private_keys
+            self._public_jwks = public_jwks
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+        if private_keys and changed:
+            logger.info(f"Chaves de assinatura carregadas: {list(private_keys)} (ativa: {self._active_kid()})")
+        return len(private_keys)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded or (
+            self.reload_seconds is not None and time.monotonic() - self._loaded_at >= self.reload_seconds
+        ):
+            self.reload()
+
+    def _active_kid(self) -> Optional[str]:
+        if self.active_kid and self.active_kid in self._private_keys:
+            return self.active_kid
+        return max(self._private_keys) if self._private_keys else None
+
+    @property
+    def enabled(self) -> bool:
+        """True se houver pelo menos uma chave assimétrica configurada."""
+        self._ensure_loaded()
+        return bool(self._private_keys)
+
+    def active_key(self) -> Optional[Tuple[str, str]]:
+        """Retorna (kid, pem privado) da chave ativa, ou None se não houver chaves."""
+        self._ensure_loaded()
+        with self._lock:
+            kid = self._active_kid()
+            return (kid, self._private_keys[kid]) if kid else None
+
+    def verification_key(self, kid: str) -> Optional[Dict[str, Any]]:
+        """Retorna a chave pública (JWK) para o kid, ou None se for desconhecido."""
+        self._ensure_loaded()
+        with self._lock:
+            return self._public_jwks.get(kid)
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Key set público no formato JWKS (RFC 7517)."""
+        self._ensure_loaded()
+        with self._lock:
+            return {"keys": list(self._public_jwks.values())}
+
+
+def generate_signing_key(keys_dir: str, algorithm: str = "RS256", kid: Optional[str] = None) -> str:
+    """Gera uma nova chave privada PEM em `keys_dir` e retorna o seu kid."""
+    kid = kid or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    if algorithm.startswith("ES"):
+        curves = {"ES256": ec.SECP256R1(), "ES384": ec.SECP384R1(), "ES512": ec.SECP521R1()}
+        private_key = ec.generate_private_key(curves[algorithm])
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    os.makedirs(keys_dir, exist_ok=True)
+    path = Path(keys_dir) / f"{kid}.pem"
+    path.write_bytes(pem)
+    os.chmod(path, 0o600)
+    return kid
+
+
+signing_keys = SigningKeyRing(
+    keys_dir=settings.JWT_SIGNING_KEYS_DIR,
+    active_kid=settings.JWT_ACTIVE_KID,
+    algorithm=settings.JWT_ASYMMETRIC_ALGORITHM,
+    reload_seconds=settings.JWT_SIGNING_KEYS_RELOAD_SECONDS or None,
+)
+
+
+if __name__ == "__main__":
+    # Uso: python -m app.core.signing_keys --dir ./keys [--kid 2026-01]
+    parser = argparse.ArgumentParser(description="Gera uma nova chave de assinatura de access tokens.")
+    parser.add_argument("--dir", default=settings.JWT_SIGNING_KEYS_DIR or "keys")
+    parser.add_argument("--kid", default=None)
+    args = parser.parse_args()
+    new_kid = generate_signing_key(args.dir, settings.JWT_ASYMMETRIC_ALGORITHM, args.kid)
+    print(f"Nova chave criada: {args.dir}/{new_kid}.pem (defina JWT_ACTIVE_KID={new_kid} para ativá-la)")
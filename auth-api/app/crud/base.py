@@ -2,6 +2,8 @@ from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import delete, func, update
+from datetime import datetime, timedelta, timezone
 from fastapi.encoders import jsonable_encoder
 from app.db.base import Base # Importa a Base local
 
@@ -38,7 +40,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: AsyncSession,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        commit: bool = True
     ) -> ModelType:
         obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
@@ -51,14 +54,124 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 setattr(db_obj, field, update_data[field])
 
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        if commit:
+            await db.commit()
+            await db.refresh(db_obj)
+        else:
+            await db.flush() # Quem chama confirma a transação
         return db_obj
 
-    async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
+    async def remove(self, db: AsyncSession, *, id: int, commit: bool = True) -> Optional[ModelType]:
         obj = await self.get(db, id=id) # Simplificado
         if not obj:
             return None
         await db.delete(obj)
+        if commit:
+            await db.commit()
+        else:
+            await db.flush()
+        return obj
+
+    # --- HELPERS DE LIMPEZA EM LOTE (usados pelo job de retenção) ---
+    async def delete_batch(self, db: AsyncSession, *conditions, batch_size: int) -> int:
+        """
+        Apaga no máximo `batch_size` linhas que satisfazem as condições.
+        Faz SELECT dos IDs com LIMIT e depois DELETE por PK (portável entre dialetos),
+        mantendo cada transação curta.
+        """
+        ids_stmt = select(self.model.id).where(*conditions).limit(batch_size)
+        ids = (await db.execute(ids_stmt)).scalars().all()
+        if not ids:
+            return 0
+        result = await db.execute(delete(self.model).where(self.model.id.in_(ids)))
         await db.commit()
-        return obj
\ No newline at end of file
+        return result.rowcount
+
+    async def count_where(self, db: AsyncSession, *conditions) -> int:
+        """Conta as linhas que satisfazem as condições."""
+        stmt = select(func.count()).select_from(self.model).where(*conditions)
+        result = await db.execute(stmt)
+        return result.scalar_one()
+
+
+# Estados dos registos das tabelas "outbox" (email_outbox, user_sync_events)
+OUTBOX_PENDING = "pending"
+OUTBOX_SENT = "sent"
+OUTBOX_FAILED = "failed"
+
+
+class CRUDOutboxBase(CRUDBase[ModelType, CreateSchemaType, UpdateSchemaType]):
+    """
+    Operações comuns das tabelas de entrega assíncrona ("outbox"): o pedido HTTP só
+    insere; um worker reclama lotes, entrega e regista tentativas/falhas com backoff.
+    O modelo tem de ter: status, attempts, last_error, next_attempt_at, sent_at.
+    As subclasses definem `max_attempts` e `retry_base_seconds`.
+    """
+    max_attempts: int
+    retry_base_seconds: int
+
+    @staticmethod
+    def utcnow() -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None) # UTC naive (como o resto das tabelas)
+
+    async def claim_batch(
+        self, db: AsyncSession, *conditions, limit: int, lease_seconds: int
+    ) -> List[ModelType]:
+        """
+        Reclama até `limit` registos prontos: incrementa 'attempts' e adia 'next_attempt_at'
+        pelo lease, para que outros workers/processos não os apanhem. Em PostgreSQL o SELECT
+        usa FOR UPDATE SKIP LOCKED (ignorado em SQLite). Se o worker morrer a meio, os
+        registos voltam a ficar visíveis quando o lease expira.
+        """
+        now = self.utcnow()
+        stmt = (
+            select(self.model)
+            .where(self.model.status == OUTBOX_PENDING, self.model.next_attempt_at <= now, *conditions)
+            .order_by(self.model.next_attempt_at, self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        items = list((await db.execute(stmt)).scalars().all())
+        if not items:
+            await db.rollback() # Liberta o lock/transação
+            return []
+        lease_until = now + timedelta(seconds=lease_seconds)
+        for item in items:
+            item.attempts += 1
+            item.next_attempt_at = lease_until
+        await db.commit()
+        return items
+
+    async def mark_sent(self, db: AsyncSession, *, ids: List[int], **extra_values) -> int:
+        """Marca um conjunto de registos como entregues (um único UPDATE)."""
+        if not ids:
+            return 0
+        stmt = (
+            update(self.model)
+            .where(self.model.id.in_(ids))
+            .values(status=OUTBOX_SENT, sent_at=self.utcnow(), last_error=None, **extra_values)
+        )
+        result = await db.execute(stmt)
+        await db.commit()
+        return result.rowcount
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """Backoff exponencial por número de tentativas, limitado a uma hora."""
+        seconds = self.retry_base_seconds * (2 ** max(attempts - 1, 0))
+        return timedelta(seconds=min(seconds, 3600))
+
+    async def mark_failed(self, db: AsyncSession, *, item: ModelType, error: str, retryable: bool = True) -> str:
+        """
+        Regista a falha de uma tentativa. Reagenda com backoff ou, se as tentativas
+        se esgotaram (ou o erro é definitivo), marca como 'failed'. Retorna o novo estado.
+        """
+        if not retryable or item.attempts >= self.max_attempts:
+            values = {"status": OUTBOX_FAILED, "last_error": error}
+        else:
+            values = {"last_error": error, "next_attempt_at": self.utcnow() + self.retry_delay(item.attempts)}
+        await db.execute(update(self.model).where(self.model.id == item.id).values(**values))
+        await db.commit()
+        return values.get("status", OUTBOX_PENDING)
+
+    async def count_by_status(self, db: AsyncSession, *, status: str) -> int:
+        return await self.count_where(db, self.model.status == status)
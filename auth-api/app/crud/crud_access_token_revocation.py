@@ -0,0 +1,123 @@
+# auth_api/app/crud/crud_access_token_revocation.py
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Tuple
+
+from loguru import logger
+
+from pydantic import BaseModel
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.crud.base import CRUDBase
+from app.models.access_token_revocation import AccessTokenRevocation
+from app.core.config import settings
+from app.core.revocation import RevocationSet, revocation_set
+from app.db.session import run_after_commit
+
+REVOCATION_KINDS = ("jti", "sid")
+
+
+class CRUDAccessTokenRevocation(CRUDBase[AccessTokenRevocation, BaseModel, BaseModel]):
+
+    @staticmethod
+    def utcnow() -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    async def revoke(
+        self, db: AsyncSession, *, kind: str, values: Iterable[str], commit: bool = True
+    ) -> int:
+        """
+        Acrescenta entradas à lista (um único INSERT multi-linha). Cada uma expira quando
+        o último access token que ela pode afetar expirar. Retorna o número inserido.
+        Com commit=False a cópia local só é atualizada quando quem chama fizer commit.
+        """
+        if kind not in REVOCATION_KINDS:
+            raise ValueError(f"Tipo de revogação inválido: {kind}")
+        now = self.utcnow()
+        expires_at = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        rows = [
+            {"kind": kind, "value": value, "expires_at": expires_at, "created_at": now}
+            for value in dict.fromkeys(v for v in values if v)
+        ]
+        if not rows:
+            return 0
+        await db.execute(insert(AccessTokenRevocation), rows)
+        entries = [
+            (row["kind"], row["value"], row["expires_at"].replace(tzinfo=timezone.utc).timestamp())
+            for row in rows
+        ]
+        # Efeito imediato neste processo; os restantes veem-na na próxima sincronização
+        if commit:
+            await db.commit()
+            revocation_set.apply(entries)
+        else:
+            run_after_commit(db, lambda: revocation_set.apply(entries))
+        return len(rows)
+
+    async def list_since(
+        self, db: AsyncSession, *, since: int, limit: int
+    ) -> Tuple[List[AccessTokenRevocation], int]:
+        """
+        Entradas ainda em vigor com id > `since` e a versão a usar no pedido seguinte.
+
+        A versão só avança até entradas criadas há mais de REVOCATION_SYNC_SETTLE_SECONDS:
+        um id mais baixo pode ser confirmado depois de um mais alto (transações
+        concorrentes), por isso as entradas recentes voltam a ser enviadas no pedido
+        seguinte em vez de se arriscar perdê-las. Aplicá-las de novo é idempotente.
+        Entradas já apagadas pela retenção estavam expiradas, logo nada se perde.
+        """
+        now = self.utcnow()
+        stmt = (
+            select(AccessTokenRevocation)
+            .where(AccessTokenRevocation.id > since, AccessTokenRevocation.expires_at > now)
+            .order_by(AccessTokenRevocation.id)
+            .limit(limit)
+        )
+        entries = (await db.execute(stmt)).scalars().all()
+        settled_before = now - timedelta(seconds=settings.REVOCATION_SYNC_SETTLE_SECONDS)
+        version = since
+        for entry in entries:
+            if entry.created_at > settled_before:
+                break
+            version = entry.id
+        return entries, version
+
+    async def sync_revocation_set(self, db: AsyncSession, target: RevocationSet = revocation_set) -> None:
+        """
+        Atualiza a cópia em memória com as entradas novas desde a sua versão, no máximo
+        uma vez por REVOCATION_SYNC_INTERVAL_SECONDS (os outros pedidos não esperam).
+        """
+        if not target.begin_sync():
+            return
+        succeeded = False
+        try:
+            while True:
+                since = target.version
+                entries, version = await self.list_since(
+                    db, since=since, limit=settings.REVOCATION_LIST_PAGE_SIZE
+                )
+                target.apply(
+                    ((e.kind, e.value, e.expires_at.replace(tzinfo=timezone.utc).timestamp()) for e in entries),
+                    version
+                )
+                if len(entries) < settings.REVOCATION_LIST_PAGE_SIZE or version == since:
+                    break
+            succeeded = True
+        except Exception as e:
+            # Mantém a cópia atual; tenta de novo no próximo pedido
+            logger.error(f"Falha ao sincronizar a lista de revogação de access tokens: {e}")
+        finally:
+            target.end_sync(succeeded)
+
+    # --- RETENÇÃO ---
+    async def prune_expired(self, db: AsyncSession, *, batch_size: int) -> int:
+        """Apaga um lote de entradas expiradas. Retorna o número apagado."""
+        return await self.delete_batch(db, AccessTokenRevocation.expires_at <= self.utcnow(), batch_size=batch_size)
+
+    async def count_expired(self, db: AsyncSession) -> int:
+        return await self.count_where(db, AccessTokenRevocation.expires_at <= self.utcnow())
+    # --- FIM RETENÇÃO ---
+
+
+crud_access_token_revocation = CRUDAccessTokenRevocation(AccessTokenRevocation)
@@ -0,0 +1,82 @@
+# auth_api/app/crud/crud_email_outbox.py
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.base import CRUDOutboxBase, OUTBOX_PENDING, OUTBOX_SENT, OUTBOX_FAILED
+from app.models.email_outbox import EmailOutbox
+from app.core.config import settings
+
+# Estados possíveis de uma mensagem
+STATUS_PENDING = OUTBOX_PENDING
+STATUS_SENT = OUTBOX_SENT
+STATUS_FAILED = OUTBOX_FAILED
+
+
+class CRUDEmailOutbox(CRUDOutboxBase[EmailOutbox, BaseModel, BaseModel]):
+
+    @property
+    def max_attempts(self) -> int:
+        return settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+
+    @property
+    def retry_base_seconds(self) -> int:
+        return settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS
+
+    async def enqueue(
+        self,
+        db: AsyncSession,
+        *,
+        email_to: str,
+        subject: str,
+        html_content: Optional[str] = None,
+        template: Optional[str] = None,
+        template_params_encrypted: Optional[str] = None,
+        commit: bool = True,
+    ) -> EmailOutbox:
+        """Insere uma mensagem na fila. É o único trabalho feito no pedido HTTP."""
+        db_obj = EmailOutbox(
+            email_to=email_to,
+            subject=subject,
+            html_content=html_content,
+            template=template,
+            template_params_encrypted=template_params_encrypted,
+            status=STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=self.utcnow(),
+        )
+        db.add(db_obj)
+        if commit:
+            await db.commit()
+        return db_obj
+
+    async def mark_delivered(self, db: AsyncSession, *, ids: List[int]) -> int:
+        """Marca como enviadas e apaga o conteúdo (o link do email dá acesso à conta)."""
+        return await self.mark_sent(db, ids=ids, html_content=None, template_params_encrypted=None)
+
+    # --- Limpeza ---
+    def _prunable_conditions(self, now: Optional[datetime] = None) -> tuple:
+        now = now or self.utcnow()
+        cutoff = now - timedelta(days=settings.EMAIL_OUTBOX_SENT_RETENTION_DAYS)
+        # Falhadas são mantidas o mesmo tempo (a contar da criação) para diagnóstico
+        return (
+            or_(
+                and_(EmailOutbox.status == STATUS_SENT, EmailOutbox.sent_at < cutoff),
+                and_(EmailOutbox.status == STATUS_FAILED, EmailOutbox.created_at < cutoff),
+            ),
+        )
+
+    async def prune_delivered_messages(self, db: AsyncSession, *, batch_size: Optional[int] = None) -> int:
+        """Apaga um lote de mensagens enviadas/falhadas mais antigas que a retenção."""
+        return await self.delete_batch(
+            db, *self._prunable_conditions(), batch_size=batch_size or settings.RETENTION_BATCH_SIZE
+        )
+
+    async def count_prunable_messages(self, db: AsyncSession) -> int:
+        return await self.count_where(db, *self._prunable_conditions())
+
+
+crud_email_outbox = CRUDEmailOutbox(EmailOutbox)
@@ -1,8 +1,7 @@
 import secrets
 from typing import List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy import delete
+from sqlalchemy import delete, update
 from app.crud.base import CRUDBase # <-- Necessário para definir a classe
 from app.models.mfa_recovery_code import MFARecoveryCode
 # --- CORREÇÃO CRÍTICA ---
@@ -10,19 +9,13 @@ from app.models.mfa_recovery_code import MFARecoveryCode
 from app.schemas.mfa_recovery_code import MFARecoveryCodeCreate, MFARecoveryCodeUpdate 
 # --- FIM CORREÇÃO CRÍTICA ---
 from app.models.user import User
-import hashlib
-from datetime import datetime, timezone
+from app.core.security import hash_recovery_code, recovery_code_candidates
+import hmac
 
 # --- CORREÇÃO CRÍTICA: A classe CRUD está definida e herda corretamente ---
 class CRUDMFARecoveryCode(CRUDBase[MFARecoveryCode, MFARecoveryCodeCreate, MFARecoveryCodeUpdate]):
 # --- FIM CORREÇÃO CRÍTICA ---
 
-    def hash_code(self, code: str) -> str:
-        """Gera um hash SHA-256 para o código de recuperação."""
-        return hashlib.sha256(code.encode('utf-8')).hexdigest()
-
-    # ... (restante das funções do CRUD) ...
-
     def generate_plain_code(self) -> str:
         """Gera um código de recuperação simples (ex: 8-10 caracteres)."""
         # Ex: "abcd-1234"
@@ -39,7 +32,7 @@ class CRUDMFARecoveryCode(CRUDBase[MFARecoveryCode, MFARecoveryCodeCreate, MFARe
         db_codes = [
             MFARecoveryCode(
                 user_id=user.id,
-                hashed_code=self.hash_code(code),
+                hashed_code=hash_recovery_code(user.id, code),
                 is_used=False
             ) for code in plain_codes
         ]
@@ -49,26 +42,31 @@ class CRUDMFARecoveryCode(CRUDBase[MFARecoveryCode, MFARecoveryCodeCreate, MFARe
         
         return plain_codes
 
-    async def get_valid_recovery_code(self, db: AsyncSession, *, user: User, plain_code: str) -> MFARecoveryCode | None:
-        """Verifica se um código de recuperação é válido e não foi usado."""
-        hashed_code = self.hash_code(plain_code)
-        
-        stmt = select(MFARecoveryCode).where(
-            MFARecoveryCode.user_id == user.id,
-            MFARecoveryCode.hashed_code == hashed_code,
-            MFARecoveryCode.is_used == False
-        )
-        result = await db.execute(stmt)
-        return result.scalars().first()
+    async def consume_recovery_code(self, db: AsyncSession, *, user: User, plain_code: str) -> bool:
+        """
+        Verifica e consome um código de recuperação numa só operação.
 
-    async def mark_code_as_used(self, db: AsyncSession, *, db_code: MFARecoveryCode) -> MFARecoveryCode:
-        """Marca um código de recuperação como utilizado."""
-        db_code.is_used = True
-        db_code.used_at = datetime.now(timezone.utc).replace(tzinfo=None)
-        db.add(db_code)
+        Um único UPDATE condicional (is_used == False) encontra o código pelo índice de
+        hashed_code e marca-o como usado: dois pedidos com o mesmo código não podem
+        ambos ter sucesso. O custo é o mesmo com 1 ou 10 códigos por usar.
+        """
+        candidates = recovery_code_candidates(user.id, plain_code)
+        stmt = (
+            update(MFARecoveryCode)
+            .where(
+                MFARecoveryCode.user_id == user.id,
+                MFARecoveryCode.hashed_code.in_(candidates),
+                MFARecoveryCode.is_used == False
+            )
+            .values(is_used=True)
+            .returning(MFARecoveryCode.hashed_code)
+            .execution_options(synchronize_session=False)
+        )
+        consumed = (await db.execute(stmt)).scalars().first()
         await db.commit()
-        await db.refresh(db_code)
-        return db_code
+        # Comparação em tempo constante com cada candidato (sem curto-circuito)
+        matches = [hmac.compare_digest(consumed or "", candidate) for candidate in candidates]
+        return consumed is not None and any(matches)
 
     async def delete_all_codes_for_user(self, db: AsyncSession, *, user_id: int) -> int:
         """Apaga todos os códigos de recuperação de um usuário."""
@@ -77,5 +75,15 @@ class CRUDMFARecoveryCode(CRUDBase[MFARecoveryCode, MFARecoveryCodeCreate, MFARe
         await db.commit()
         return result.rowcount
 
+    # --- RETENÇÃO (limpeza de códigos já utilizados) ---
+    async def prune_used_codes(self, db: AsyncSession, *, batch_size: int) -> int:
+        """Apaga um lote de códigos de recuperação já utilizados."""
+        return await self.delete_batch(db, MFARecoveryCode.is_used == True, batch_size=batch_size)
+
+    async def count_used_codes(self, db: AsyncSession) -> int:
+        """Quantos códigos utilizados ainda aguardam limpeza (backlog)."""
+        return await self.count_where(db, MFARecoveryCode.is_used == True)
+    # --- FIM RETENÇÃO ---
+
 # Renomeado para a instância ser igual ao que é importado por outros ficheiros (crud_mfa_recovery_code)
 crud_mfa_recovery_code = CRUDMFARecoveryCode(MFARecoveryCode)
@@ -1,15 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import delete
+from sqlalchemy import delete, update, or_, and_, exists
+from sqlalchemy.orm import aliased
 from app.crud.base import CRUDBase # Importação da classe base
 from app.models.refresh_token import RefreshToken
+from app.crud.crud_access_token_revocation import crud_access_token_revocation
 # --- CORREÇÃO CRÍTICA ---
 # Estas classes são necessárias para a definição da classe CRUDRefreshToken
 from app.schemas.token import RefreshTokenCreate, RefreshTokenUpdate, SessionInfo
+from app.core.config import settings
+from app.core.metrics import record_security_event
 # --- FIM CORREÇÃO CRÍTICA ---
-from datetime import datetime, timezone
-from typing import Optional, List
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Tuple
 import hashlib
+from loguru import logger
 
 class CRUDRefreshToken(CRUDBase[RefreshToken, RefreshTokenCreate, RefreshTokenUpdate]):
     def hash_token(self, token: str) -> str:
@@ -56,86 +61,226 @@ class CRUDRefreshToken(CRUDBase[RefreshToken, RefreshTokenCreate, RefreshTokenUp
         return result.scalars().first()
 
     async def revoke_refresh_token(self, db: AsyncSession, *, token: str) -> bool:
+        """Revoga o refresh token e, na mesma transação, os access tokens da sua sessão."""
         token_hash = self.hash_token(token)
-        stmt = select(RefreshToken).where(RefreshToken.token_hash == token_hash)
-        result = await db.execute(stmt)
-        db_token = result.scalars().first()
-        if db_token and not db_token.is_revoked:
-            db_token.is_revoked = True
-            db.add(db_token)
-            await db.commit()
-            return True
-        return False
+        stmt = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.is_revoked == False
+            )
+            .values(is_revoked=True)
+            .returning(RefreshToken.family_id)
+        )
+        families = (await db.execute(stmt)).scalars().all()
+        await crud_access_token_revocation.revoke(db, kind="sid", values=families)
+        return len(families) > 0
     
     async def revoke_refresh_token_by_id(self, db: AsyncSession, *, db_token: RefreshToken) -> None:
-        """Revoga um refresh token específico (objeto do modelo)."""
+        """Revoga um refresh token específico (objeto do modelo) e os access tokens da sessão."""
         db_token.is_revoked = True
         db.add(db_token)
-        await db.commit()
+        await crud_access_token_revocation.revoke(db, kind="sid", values=[db_token.family_id])
         return
 
-    async def revoke_all_refresh_tokens_for_user(self, db: AsyncSession, *, user_id: int, exclude_token_hash: Optional[str] = None) -> int:
+    # --- ROTAÇÃO (/refresh) ---
+    async def rotate_refresh_token(
+        self, db: AsyncSession, *, token: str, user_id: int, new_token: str, new_expires_at: datetime,
+        ip_address: Optional[str] = None, user_agent: Optional[str] = None
+    ) -> Optional[RefreshToken]:
+        """
+        Troca `token` por `new_token` numa única transação.
+
+        O UPDATE ... RETURNING revoga o token apresentado apenas se ainda estiver ativo
+        (compare-and-set): de dois /refresh paralelos com o mesmo token só um vence.
+        O novo token herda a família do anterior e é inserido na mesma transação.
+        Se o token apresentado existir mas já estiver revogado (reutilização de um token
+        rodado, p.ex. roubado), a família inteira é revogada. Retorna None se falhar.
+        """
+        token_hash = self.hash_token(token)
         now = datetime.now(timezone.utc).replace(tzinfo=None)
-        query = (
-            select(RefreshToken)
+        stmt = (
+            update(RefreshToken)
             .where(
+                RefreshToken.token_hash == token_hash,
                 RefreshToken.user_id == user_id,
                 RefreshToken.is_revoked == False,
                 RefreshToken.expires_at > now
             )
+            .values(is_revoked=True)
+            .returning(RefreshToken.family_id)
+            .execution_options(synchronize_session=False)
         )
-        if exclude_token_hash:
-            query = query.where(RefreshToken.token_hash != exclude_token_hash)
-        
-        result = await db.execute(query)
-        tokens_to_revoke = result.scalars().all()
-        
-        if not tokens_to_revoke:
-            return 0
+        family_id = (await db.execute(stmt)).scalar_one_or_none()
+        if family_id is None:
+            await self._revoke_family_on_reuse(db, token_hash=token_hash, user_id=user_id)
+            return None
 
-        for token in tokens_to_revoke:
-            token.is_revoked = True
-            db.add(token)
-            
+        db_obj = RefreshToken(
+            user_id=user_id,
+            token_hash=self.hash_token(new_token),
+            expires_at=new_expires_at.replace(tzinfo=None),
+            ip_address=ip_address,
+            user_agent=user_agent,
+            family_id=family_id
+        )
+        db.add(db_obj)
         await db.commit()
-        return len(tokens_to_revoke)
+        return db_obj
+
+    async def _revoke_family_on_reuse(self, db: AsyncSession, *, token_hash: str, user_id: int) -> int:
+        """Se `token_hash` pertence a um token já revogado, revoga todos os tokens ativos da sua família."""
+        family = (
+            select(RefreshToken.family_id)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.user_id == user_id,
+                RefreshToken.is_revoked == True
+            )
+            .scalar_subquery()
+        )
+        revoked = await self._bulk_revoke(db, RefreshToken.family_id == family)
+        if revoked:
+            logger.warning(
+                f"Reutilização de refresh token detetada para usuário ID {user_id}: "
+                f"{revoked} token(s) da família revogados."
+            )
+            record_security_event("refresh_reuse_detected")
+        return revoked
+    # --- FIM ROTAÇÃO ---
+
+    # --- REVOGAÇÃO EM MASSA (UPDATE set-based, sem carregar linhas) ---
+    async def _bulk_revoke(self, db: AsyncSession, *conditions, commit: bool = True) -> int:
+        """
+        Executa um único UPDATE ... SET is_revoked = TRUE sobre os tokens ativos
+        que satisfazem as condições e retorna o número de linhas afetadas.
+        As sessões (famílias) afetadas entram na lista de revogação de access tokens.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        stmt = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.is_revoked == False,
+                RefreshToken.expires_at > now,
+                *conditions
+            )
+            .values(is_revoked=True)
+            .returning(RefreshToken.family_id)
+            .execution_options(synchronize_session=False)
+        )
+        families = (await db.execute(stmt)).scalars().all()
+        await crud_access_token_revocation.revoke(db, kind="sid", values=families, commit=commit)
+        return len(families)
+
+    async def revoke_all_refresh_tokens_for_user(
+        self, db: AsyncSession, *, user_id: int, exclude_token_hash: Optional[str] = None, commit: bool = True
+    ) -> int:
+        """Revoga todos os refresh tokens ativos de um usuário (opcionalmente exceto um)."""
+        conditions = [RefreshToken.user_id == user_id]
+        if exclude_token_hash:
+            conditions.append(RefreshToken.token_hash != exclude_token_hash)
+        return await self._bulk_revoke(db, *conditions, commit=commit)
 
-    async def get_active_sessions_for_user(self, db: AsyncSession, *, user_id: int) -> List[SessionInfo]:
-        """Retorna uma lista de sessões ativas (tokens não revogados/expirados) para o schema SessionInfo."""
+    async def revoke_refresh_tokens_for_device(
+        self, db: AsyncSession, *, user_id: int, user_agent: Optional[str],
+        ip_address: Optional[str] = None, commit: bool = True
+    ) -> int:
+        """
+        Revoga os refresh tokens ativos de um usuário emitidos para um dispositivo
+        (identificado pelo User-Agent e, opcionalmente, pelo IP registados na sessão).
+        """
+        conditions = [RefreshToken.user_id == user_id]
+        if user_agent is None:
+            conditions.append(RefreshToken.user_agent.is_(None))
+        else:
+            conditions.append(RefreshToken.user_agent == user_agent)
+        if ip_address is not None:
+            conditions.append(RefreshToken.ip_address == ip_address)
+        return await self._bulk_revoke(db, *conditions, commit=commit)
+
+    async def revoke_refresh_tokens_older_than(
+        self, db: AsyncSession, *, created_before: datetime,
+        user_id: Optional[int] = None, commit: bool = True
+    ) -> int:
+        """
+        Revoga os refresh tokens ativos criados antes de `created_before`
+        (de um usuário, ou de todos se user_id for None).
+        """
+        if created_before.tzinfo is not None:
+            created_before = created_before.astimezone(timezone.utc).replace(tzinfo=None)
+        conditions = [RefreshToken.created_at < created_before]
+        if user_id is not None:
+            conditions.append(RefreshToken.user_id == user_id)
+        return await self._bulk_revoke(db, *conditions, commit=commit)
+    # --- FIM REVOGAÇÃO EM MASSA ---
+
+    async def get_active_sessions_for_user(
+        self, db: AsyncSession, *, user_id: int, limit: int, before_id: Optional[int] = None
+    ) -> Tuple[List[SessionInfo], Optional[int]]:
+        """
+        Página de sessões ativas (tokens não revogados/expirados) para o schema SessionInfo,
+        da mais recente para a mais antiga. Paginação keyset por ID (índice
+        ix_refresh_tokens_user_active): o custo depende de `limit`, não do histórico.
+        Retorna (sessões, ID para continuar) - o segundo é None na última página.
+        """
         now = datetime.now(timezone.utc).replace(tzinfo=None)
+        conditions = [
+            RefreshToken.user_id == user_id,
+            RefreshToken.is_revoked == False,
+            RefreshToken.expires_at > now
+        ]
+        if before_id is not None:
+            conditions.append(RefreshToken.id < before_id)
         stmt = (
             select(
                 RefreshToken.id,
                 RefreshToken.user_agent,
                 RefreshToken.ip_address,
                 RefreshToken.created_at,
-                RefreshToken.expires_at,
-                RefreshToken.token_hash # Adicionado para debug ou lógica de 'sessão atual'
+                RefreshToken.expires_at
             )
-            .where(
-                RefreshToken.user_id == user_id,
-                RefreshToken.is_revoked == False,
-                RefreshToken.expires_at > now
-            )
-            .order_by(RefreshToken.created_at.desc())
+            .where(*conditions)
+            .order_by(RefreshToken.id.desc())
+            .limit(limit + 1) # Uma linha a mais indica que existe página seguinte
         )
         
         result = await db.execute(stmt)
+        rows = result.mappings().all()
         
         # Mapeia os resultados para o Pydantic model SessionInfo
-        sessions = [
-            SessionInfo(
-                id=row.id,
-                user_agent=row.user_agent,
-                ip_address=row.ip_address,
-                created_at=row.created_at,
-                expires_at=row.expires_at,
-                # Opcional: Adicionar o hash se o schema SessionInfo o incluir
-                # token_hash=row.token_hash 
-            )
-            for row in result.mappings()
-        ]
-        return sessions
+        sessions = [SessionInfo(**row) for row in rows[:limit]]
+        next_id = sessions[-1].id if len(rows) > limit else None
+        return sessions, next_id
+
+    # --- RETENÇÃO (limpeza de tokens expirados/revogados) ---
+    def _prunable_conditions(self):
+        """
+        Tokens expirados, ou revogados há mais de REFRESH_TOKEN_REVOKED_RETENTION_DAYS
+        cuja família já não tem nenhum token ativo. Os tokens rodados de uma família
+        viva ficam até expirar: é por eles que _revoke_family_on_reuse reconhece uma
+        reutilização (apagados, o replay seria só um token desconhecido).
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        revoked_cutoff = now - timedelta(days=settings.REFRESH_TOKEN_REVOKED_RETENTION_DAYS)
+        active = aliased(RefreshToken)
+        family_alive = exists().where(
+            active.family_id == RefreshToken.family_id,
+            active.is_revoked == False,
+            active.expires_at > now
+        )
+        return or_(
+            RefreshToken.expires_at <= now,
+            and_(RefreshToken.is_revoked == True, RefreshToken.created_at < revoked_cutoff, ~family_alive)
+        )
+
+    async def prune_expired_tokens(self, db: AsyncSession, *, batch_size: int) -> int:
+        """Apaga um lote de refresh tokens expirados/revogados. Retorna o número apagado."""
+        return await self.delete_batch(db, self._prunable_conditions(), batch_size=batch_size)
+
+    async def count_prunable_tokens(self, db: AsyncSession) -> int:
+        """Quantos refresh tokens ainda aguardam limpeza (backlog)."""
+        return await self.count_where(db, self._prunable_conditions())
+    # --- FIM RETENÇÃO ---
 
 # Instância do CRUD
 crud_refresh_token = CRUDRefreshToken(RefreshToken)
@@ -84,21 +84,35 @@ class CRUDTrustedDevice(CRUDBase[TrustedDevice, TrustedDeviceCreate, TrustedDevi
         return result.scalars().first()
 
     async def get_trusted_devices_for_user(
-        self, db: AsyncSession, *, user_id: int
-    ) -> List[TrustedDeviceInfo]:
-        """Lista todos os dispositivos confiáveis (não expirados) de um usuário."""
+        self, db: AsyncSession, *, user_id: int, limit: int, before_id: Optional[int] = None
+    ) -> Tuple[List[TrustedDeviceInfo], Optional[int]]:
+        """
+        Página de dispositivos confiáveis (não expirados) de um usuário, do mais recente
+        para o mais antigo, com paginação keyset por ID (índice ix_trusted_devices_user_active).
+        Retorna (dispositivos, ID para continuar) - o segundo é None na última página.
+        """
         now = datetime.now(timezone.utc).replace(tzinfo=None)
         
-        stmt = select(TrustedDevice).where(
+        conditions = [
             TrustedDevice.user_id == user_id,
             TrustedDevice.expires_at > now
-        ).order_by(TrustedDevice.created_at.desc())
+        ]
+        if before_id is not None:
+            conditions.append(TrustedDevice.id < before_id)
+        stmt = (
+            select(TrustedDevice)
+            .where(*conditions)
+            .order_by(TrustedDevice.id.desc())
+            .limit(limit + 1) # Uma linha a mais indica que existe página seguinte
+        )
         
         result = await db.execute(stmt)
         devices = result.scalars().all()
         
         # Mapeia para o schema Pydantic
-        return [TrustedDeviceInfo.from_orm(d) for d in devices]
+        page = [TrustedDeviceInfo.from_orm(d) for d in devices[:limit]]
+        next_id = page[-1].id if len(devices) > limit else None
+        return page, next_id
 
     async def delete_trusted_device(self, db: AsyncSession, *, db_device: TrustedDevice) -> None:
         """Deleta um dispositivo confiável específico."""
@@ -106,10 +120,15 @@ class CRUDTrustedDevice(CRUDBase[TrustedDevice, TrustedDeviceCreate, TrustedDevi
         await db.commit()
         return
 
-    async def prune_expired_devices(self, db: AsyncSession) -> int:
-        """Apaga todos os dispositivos expirados do banco de dados."""
+    async def prune_expired_devices(self, db: AsyncSession, *, batch_size: Optional[int] = None) -> int:
+        """
+        Apaga os dispositivos expirados do banco de dados.
+        Com `batch_size`, apaga no máximo esse número de linhas (usado pelo job de retenção).
+        """
         now = datetime.now(timezone.utc).replace(tzinfo=None)
-        
+        if batch_size is not None:
+            return await self.delete_batch(db, TrustedDevice.expires_at <= now, batch_size=batch_size)
+
         stmt = delete(TrustedDevice).where(
             TrustedDevice.expires_at <= now
         )
@@ -117,5 +136,10 @@ class CRUDTrustedDevice(CRUDBase[TrustedDevice, TrustedDeviceCreate, TrustedDevi
         await db.commit()
         return result.rowcount
 
+    async def count_expired_devices(self, db: AsyncSession) -> int:
+        """Quantos dispositivos expirados ainda aguardam limpeza (backlog)."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return await self.count_where(db, TrustedDevice.expires_at <= now)
+
 # Instância do CRUD
 crud_trusted_device = CRUDTrustedDevice(TrustedDevice)
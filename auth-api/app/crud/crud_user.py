@@ -1,6 +1,7 @@
 # auth_api/app/crud/crud_user.py
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import update, case, or_
 from typing import Optional, Dict, Any, List, Tuple 
 import hashlib
 import secrets
@@ -9,18 +10,37 @@ from app.models.user import User
 from datetime import datetime, timedelta, timezone
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import ( 
-    get_password_hash, verify_password, create_password_reset_token,
+    get_password_hash_async, verify_and_update_password_async, create_password_reset_token,
     verify_otp_code 
 )
-from app.crud import crud_refresh_token
-from app.crud import crud_mfa_recovery_code
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.crud.crud_mfa_recovery_code import crud_mfa_recovery_code
 from app.core.config import settings
 from loguru import logger
 from app.core.exceptions import AccountLockedException
-from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
+from app.core.principal_cache import principal_cache
+from app.core.metrics import record_security_event
+from app.db.session import run_after_commit
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    # --- commit=False: a escrita entra na transação de quem chama (p.ex. com o outbox) ---
+    async def _save(self, db: AsyncSession, user: User, *, commit: bool) -> None:
+        """Commit + refresh, ou só flush (gera o ID) quando quem chama confirma a transação."""
+        db.add(user)
+        if commit:
+            await db.commit()
+            await db.refresh(user)
+        else:
+            await db.flush()
+
+    def _invalidate_principal(self, db: AsyncSession, user_id: int, *, commit: bool) -> None:
+        principal_cache.invalidate(user_id)
+        if not commit:
+            # Até ao commit, um pedido concorrente pode voltar a guardar o estado antigo
+            run_after_commit(db, lambda: principal_cache.invalidate(user_id))
+
     # ... (get_by_email, create, verify_user_email, authenticate, update_custom_claims) ...
     async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
         stmt = select(User).filter(User.email == email)
@@ -46,6 +66,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
                 db.add(user)
                 await db.commit()
                 await db.refresh(user)
+                principal_cache.invalidate(user.id)
             return user
             
         # Se o utilizador não existe, criar um novo
@@ -64,7 +85,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return db_obj
     # --- FIM NOVA FUNÇÃO ---
 
-    async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> tuple[User, str]:
+    async def create(self, db: AsyncSession, *, obj_in: UserCreate, commit: bool = True) -> tuple[User, str]:
         # (Código existente - sem alterações)
         verification_token = secrets.token_urlsafe(32)
         token_hash = hashlib.sha256(verification_token.encode('utf-8')).hexdigest()
@@ -72,7 +93,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         expires_at = datetime.now(timezone.utc) + expires_delta
         db_obj = User(
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=await get_password_hash_async(obj_in.password),
             full_name=obj_in.full_name,
             is_active=False,
             is_verified=False,
@@ -80,12 +101,10 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             verification_token_expires=expires_at.replace(tzinfo=None),
             custom_claims={}
         )
-        db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        await self._save(db, db_obj, commit=commit)
         return db_obj, verification_token
 
-    async def generate_verification_token(self, db: AsyncSession, *, user: User) -> tuple[User, str]:
+    async def generate_verification_token(self, db: AsyncSession, *, user: User, commit: bool = True) -> tuple[User, str]:
         """
         Gera um novo token de verificação, atualiza o usuário no BD e retorna o token limpo.
         Usado para o reenvio de e-mail.
@@ -107,11 +126,9 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             # NÃO VAMOS MUDAR user.is_active = False AQUI. 
             # O usuário deve permanecer inativo até verificar o email.
             
-        db.add(user)
-        # CRUCIAL: Salvar as alterações no banco de dados para que o background task 
-        # use o token atualizado!
-        await db.commit() 
-        await db.refresh(user)
+        # CRUCIAL: o token só é válido depois do commit (aqui, ou junto com o email no outbox)
+        await self._save(db, user, commit=commit)
+        self._invalidate_principal(db, user.id, commit=commit)
 
         return user, verification_token
 
@@ -134,6 +151,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             db.add(user)
             await db.commit()
             await db.refresh(user)
+            principal_cache.invalidate(user.id)
             return user
         return None
 
@@ -153,29 +171,84 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             logger.warning(f"Tentativa de login para conta bloqueada: {email}")
             raise AccountLockedException(f"Account locked until {user.locked_until}", locked_until=user.locked_until)
         
-        if not verify_password(password, user.hashed_password):
-            user.failed_login_attempts += 1
-            if user.failed_login_attempts >= settings.LOGIN_MAX_FAILED_ATTEMPTS:
-                lock_duration = timedelta(minutes=settings.LOGIN_LOCKOUT_MINUTES)
-                user.locked_until = now + lock_duration
-                user.failed_login_attempts = 0
-                logger.warning(f"CONTA BLOQUEADA: {email} bloqueada por {lock_duration} devido a tentativas falhas.")
-            db.add(user)
-            await db.commit()
+        valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+        if not valid:
+            await self.record_failed_login(db, user=user)
             return None
+        if new_hash:
+            await self.upgrade_password_hash(db, user=user, new_hash=new_hash)
             
         if not user.is_active or not user.is_verified:
             logger.warning(f"Tentativa de login (senha correta) falhou para email não ativo/verificado: {email}")
             return None
             
         if user.failed_login_attempts > 0 or user.locked_until:
-            user.failed_login_attempts = 0
-            user.locked_until = None
-            db.add(user)
-            await db.commit()
+            await self.reset_failed_logins(db, user=user)
             
         return user
 
+    async def record_failed_login(self, db: AsyncSession, *, user: User) -> Optional[datetime]:
+        """
+        Conta uma tentativa falhada com um único UPDATE atómico (sem read-modify-write em Python).
+        Ao atingir LOGIN_MAX_FAILED_ATTEMPTS bloqueia a conta e zera o contador no mesmo statement.
+        Tentativas sobre uma conta já bloqueada (p.ex. por um pedido concorrente) não contam.
+        Retorna o locked_until se esta tentativa bloqueou a conta.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        lock_duration = timedelta(minutes=settings.LOGIN_LOCKOUT_MINUTES)
+        reaches_limit = User.failed_login_attempts + 1 >= settings.LOGIN_MAX_FAILED_ATTEMPTS
+        stmt = (
+            update(User)
+            .where(User.id == user.id, or_(User.locked_until.is_(None), User.locked_until <= now))
+            .values(
+                failed_login_attempts=case((reaches_limit, 0), else_=User.failed_login_attempts + 1),
+                locked_until=case((reaches_limit, now + lock_duration), else_=None),
+            )
+            .returning(User.failed_login_attempts, User.locked_until)
+            .execution_options(synchronize_session=False)
+        )
+        row = (await db.execute(stmt)).first()
+        await db.commit()
+        if row is None:
+            return None
+        # Reflete o estado persistido no objeto sem o marcar como alterado
+        set_committed_value(user, "failed_login_attempts", row.failed_login_attempts)
+        set_committed_value(user, "locked_until", row.locked_until)
+        if row.locked_until:
+            logger.warning(f"CONTA BLOQUEADA: {user.email} bloqueada por {lock_duration} devido a tentativas falhas.")
+            record_security_event("account_locked")
+        return row.locked_until
+
+    async def upgrade_password_hash(self, db: AsyncSession, *, user: User, new_hash: str) -> bool:
+        """
+        Substitui um hash desatualizado (custo bcrypt antigo) pelo novo, calculado no login.
+        Condicional ao hash antigo: não sobrepõe uma troca de senha concorrente.
+        """
+        result = await db.execute(
+            update(User)
+            .where(User.id == user.id, User.hashed_password == user.hashed_password)
+            .values(hashed_password=new_hash)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if result.rowcount:
+            set_committed_value(user, "hashed_password", new_hash)
+            principal_cache.invalidate(user.id)
+            logger.info(f"Hash de senha atualizado para o custo atual (usuário ID {user.id}).")
+        return result.rowcount > 0
+
+    async def reset_failed_logins(self, db: AsyncSession, *, user: User) -> None:
+        """Zera contador e bloqueio num único UPDATE condicional (não escreve se já estiverem limpos)."""
+        await db.execute(
+            update(User)
+            .where(User.id == user.id, or_(User.failed_login_attempts != 0, User.locked_until.is_not(None)))
+            .values(failed_login_attempts=0, locked_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        set_committed_value(user, "failed_login_attempts", 0)
+        set_committed_value(user, "locked_until", None)
+
     async def update_custom_claims(self, db: AsyncSession, *, user: User, claims: Dict[str, Any]) -> User:
         # (Código existente - sem alterações)
         if user.custom_claims:
@@ -186,6 +259,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        principal_cache.invalidate(user.id)
         return user
 
     # --- Funções CRUD MFA (EXISTENTES - sem alterações) ---
@@ -197,6 +271,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        principal_cache.invalidate(user.id)
         return user
 
     async def confirm_mfa_enable(
@@ -216,6 +291,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             )
             
             await db.refresh(user)
+            principal_cache.invalidate(user.id)
             logger.info(f"MFA habilitado e confirmado com sucesso para usuário ID: {user.id}")
             
             return user, plain_recovery_codes 
@@ -239,6 +315,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             logger.info(f"MFA desabilitado. Apagados {rows_deleted} códigos de recuperação para user ID {user.id}.")
             
             await db.refresh(user)
+            principal_cache.invalidate(user.id)
             return user
         else:
             logger.warning(f"Tentativa falha de desabilitar MFA para usuário ID: {user.id}. Código OTP inválido.")
@@ -247,14 +324,12 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
 
     # ... (generate_password_reset_token, get_user_by_reset_token, reset_password) ...
     # (Código existente - sem alterações)
-    async def generate_password_reset_token(self, db: AsyncSession, *, user: User) -> tuple[User, str]:
+    async def generate_password_reset_token(self, db: AsyncSession, *, user: User, commit: bool = True) -> tuple[User, str]:
         token, expires_at = create_password_reset_token(email=user.email)
         token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
         user.reset_password_token_hash = token_hash
         user.reset_password_token_expires = expires_at
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
+        await self._save(db, user, commit=commit)
         return user, token
 
     async def get_user_by_reset_token(self, db: AsyncSession, *, token: str) -> User | None:
@@ -269,17 +344,32 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         return result.scalars().first()
 
     async def reset_password(self, db: AsyncSession, *, user: User, new_password: str) -> User:
-        user.hashed_password = get_password_hash(new_password)
+        user.hashed_password = await get_password_hash_async(new_password)
         user.reset_password_token_hash = None
         user.reset_password_token_expires = None
         user.failed_login_attempts = 0
         user.locked_until = None
         user.is_active = True
         db.add(user)
-        revoked_count = await crud_refresh_token.revoke_all_refresh_tokens_for_user(db, user_id=user.id)
+        # UPDATE único na mesma transação do reset (commit abaixo)
+        revoked_count = await crud_refresh_token.revoke_all_refresh_tokens_for_user(db, user_id=user.id, commit=False)
         logger.info(f"Revogados {revoked_count} refresh tokens para usuário ID {user.id} após reset de senha.")
         await db.commit()
         await db.refresh(user)
+        principal_cache.invalidate(user.id)
         return user
 
+    # --- Overrides genéricos: invalidam o cache do principal ---
+    async def update(
+        self, db: AsyncSession, *, db_obj: User, obj_in: UserUpdate | Dict[str, Any], commit: bool = True
+    ) -> User:
+        updated = await super().update(db, db_obj=db_obj, obj_in=obj_in, commit=commit)
+        self._invalidate_principal(db, updated.id, commit=commit)
+        return updated
+
+    async def remove(self, db: AsyncSession, *, id: int, commit: bool = True) -> Optional[User]:
+        removed = await super().remove(db, id=id, commit=commit)
+        self._invalidate_principal(db, id, commit=commit)
+        return removed
+
 crud_user = CRUDUser(User)
\ No newline at end of file
@@ -0,0 +1,90 @@
+# auth_api/app/crud/crud_user_sync_event.py
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import and_, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.crud.base import CRUDOutboxBase, OUTBOX_PENDING, OUTBOX_SENT, OUTBOX_FAILED
+from app.models.user_sync_event import UserSyncEvent
+from app.core.config import settings
+
+SYNC_ACTIONS = ("create", "update", "delete")
+
+
+class CRUDUserSyncEvent(CRUDOutboxBase[UserSyncEvent, BaseModel, BaseModel]):
+
+    @property
+    def max_attempts(self) -> int:
+        return settings.USER_SYNC_MAX_ATTEMPTS
+
+    @property
+    def retry_base_seconds(self) -> int:
+        return settings.USER_SYNC_RETRY_BASE_SECONDS
+
+    async def enqueue_for_user(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        action: str,
+        payload: Dict[str, Any],
+        commit: bool = True,
+    ) -> List[UserSyncEvent]:
+        """Cria um evento por serviço em USER_SYNC_TARGETS (um único INSERT multi-linha)."""
+        if action not in SYNC_ACTIONS:
+            raise ValueError(f"Ação de sincronização inválida: {action}")
+        now = self.utcnow()
+        events = [
+            UserSyncEvent(
+                user_id=user_id,
+                action=action,
+                target=target,
+                payload=payload,
+                status=OUTBOX_PENDING,
+                attempts=0,
+                next_attempt_at=now,
+            )
+            for target in settings.USER_SYNC_TARGETS
+        ]
+        db.add_all(events)
+        if commit:
+            await db.commit()
+        return events
+
+    async def claim_ready_events(self, db: AsyncSession, *, limit: int, lease_seconds: int) -> List[UserSyncEvent]:
+        """
+        Reclama eventos prontos, mas apenas o mais antigo pendente de cada (utilizador, serviço):
+        um update nunca ultrapassa o create ainda por entregar, nem um delete o update.
+        """
+        earlier = aliased(UserSyncEvent)
+        no_earlier_pending = ~exists().where(and_(
+            earlier.user_id == UserSyncEvent.user_id,
+            earlier.target == UserSyncEvent.target,
+            earlier.status == OUTBOX_PENDING,
+            earlier.id < UserSyncEvent.id,
+        ))
+        return await self.claim_batch(db, no_earlier_pending, limit=limit, lease_seconds=lease_seconds)
+
+    async def mark_delivered(self, db: AsyncSession, *, ids: List[int]) -> int:
+        """Marca como entregues e apaga o payload (pode conter a senha cifrada)."""
+        return await self.mark_sent(db, ids=ids, payload=None)
+
+    # --- Limpeza ---
+    def _prunable_conditions(self) -> tuple:
+        cutoff = self.utcnow() - timedelta(days=settings.USER_SYNC_SENT_RETENTION_DAYS)
+        return (UserSyncEvent.status == OUTBOX_SENT, UserSyncEvent.sent_at < cutoff)
+
+    async def prune_delivered_events(self, db: AsyncSession, *, batch_size: Optional[int] = None) -> int:
+        """Apaga um lote de eventos entregues mais antigos que a retenção (os 'failed' ficam para análise)."""
+        return await self.delete_batch(
+            db, *self._prunable_conditions(), batch_size=batch_size or settings.RETENTION_BATCH_SIZE
+        )
+
+    async def count_prunable_events(self, db: AsyncSession) -> int:
+        return await self.count_where(db, *self._prunable_conditions())
+
+
+crud_user_sync_event = CRUDUserSyncEvent(UserSyncEvent)
@@ -1,9 +1,14 @@
 # auth_api/app/db/session.py
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings # Keep importing settings
-from typing import AsyncGenerator, Optional # Add Optional
+from typing import AsyncGenerator, Callable, Optional # Add Optional
 from sqlalchemy.ext.asyncio import AsyncEngine # For type hinting
+from sqlalchemy.exc import SQLAlchemyError
+from loguru import logger
+import time
+from app.core.metrics import instrument_engine
 
 # --- Delay Engine and Session Creation ---
 _async_engine: Optional[AsyncEngine] = None
@@ -27,6 +32,8 @@ def get_async_engine() -> AsyncEngine:
                 pool_pre_ping=True,
                 echo=False # Change to True to see SQL logs
             )
+            # Tempo de SQL e gauges da pool em GET /metrics
+            instrument_engine(_async_engine, role="primary")
         except AttributeError:
              raise RuntimeError("DATABASE_URL not loaded from settings. Check .env file and config.py")
         except Exception as e:
@@ -49,6 +56,31 @@ def get_session_local() -> sessionmaker:
 # --- End Delay ---
 
 
+# --- EFEITOS LOCAIS APÓS O COMMIT ---
+# Escritas com commit=False são confirmadas por quem chama, junto com outras (p.ex. o
+# utilizador e a mensagem do outbox). Efeitos em memória que dependem delas (acordar
+# um worker, invalidar um cache) ficam registados na sessão e só correm se a
+# transação for confirmada; um rollback descarta-os.
+_AFTER_COMMIT_KEY = "after_commit_callbacks"
+
+def run_after_commit(db: AsyncSession, callback: Callable[[], None]) -> None:
+    """Executa `callback` depois do próximo commit da sessão `db`."""
+    db.sync_session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit_callbacks(session: Session) -> None:
+    for callback in session.info.pop(_AFTER_COMMIT_KEY, []):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Erro num efeito pós-commit: {e}")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit_callbacks(session: Session) -> None:
+    session.info.pop(_AFTER_COMMIT_KEY, None)
+# --- FIM EFEITOS APÓS O COMMIT ---
+
+
 # Dependency function now ensures session factory is created before use
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     SessionLocal = get_session_local() # Get or create the session factory
@@ -58,9 +90,78 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await db.close()
 
+# --- RÉPLICA DE LEITURA (opcional) ---
+# Com DATABASE_READ_URL, as dependências só de leitura (get_read_db) usam um engine
+# próprio; a pool do primário fica para as escritas (login, rotação de tokens...).
+# Sem réplica configurada, ou se ela não responder, get_read_db entrega uma sessão
+# do primário. A réplica pode estar ligeiramente atrasada: não usar get_read_db onde
+# é preciso ler o que o próprio pedido (ou o anterior) acabou de escrever.
+_read_engine: Optional[AsyncEngine] = None
+_ReadSessionLocal: Optional[sessionmaker] = None
+_replica_retry_at = 0.0 # Instante (time.monotonic) a partir do qual se volta a tentar a réplica
+
+def get_read_engine() -> AsyncEngine:
+    """Engine da réplica (criado na primeira utilização), ou o do primário se não houver réplica."""
+    global _read_engine
+    if not settings.DATABASE_READ_URL:
+        return get_async_engine()
+    if _read_engine is None:
+        _read_engine = create_async_engine(settings.DATABASE_READ_URL, pool_pre_ping=True, echo=False)
+        instrument_engine(_read_engine, role="replica")
+    return _read_engine
+
+def get_read_session_local() -> sessionmaker:
+    global _ReadSessionLocal
+    if _ReadSessionLocal is None:
+        _ReadSessionLocal = sessionmaker(
+            bind=get_read_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+    return _ReadSessionLocal
+
+async def _open_replica_session() -> Optional[AsyncSession]:
+    """Sessão já ligada à réplica, ou None (sem réplica, ou indisponível -> primário)."""
+    global _replica_retry_at
+    if not settings.DATABASE_READ_URL or time.monotonic() < _replica_retry_at:
+        return None
+    session = get_read_session_local()()
+    try:
+        await session.connection() # Obtém a ligação já, para poder recorrer ao primário
+        return session
+    except (SQLAlchemyError, OSError) as e:
+        await session.close()
+        _replica_retry_at = time.monotonic() + settings.DATABASE_READ_RETRY_SECONDS
+        logger.warning(f"Réplica de leitura indisponível, a usar o primário durante {settings.DATABASE_READ_RETRY_SECONDS}s: {e}")
+        return None
+
+def is_replica_session(db: AsyncSession) -> bool:
+    """True se a sessão (de get_read_db) está ligada à réplica e não ao primário."""
+    return _read_engine is not None and db.bind is _read_engine
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependência para endpoints só de leitura (réplica com fallback para o primário)."""
+    session = await _open_replica_session()
+    if session is None:
+        session = get_session_local()()
+    async with session as db:
+        try:
+            yield db
+        finally:
+            await db.close()
+# --- FIM RÉPLICA ---
+
 # Optional: Function to dispose engine on shutdown (add to FastAPI shutdown event)
 async def dispose_engine():
-     global _async_engine
+     global _async_engine, _AsyncSessionLocal, _read_engine, _ReadSessionLocal, _replica_retry_at
      if _async_engine:
          await _async_engine.dispose()
-         _async_engine = None
\ No newline at end of file
+         _async_engine = None
+     _AsyncSessionLocal = None # A factory estava ligada ao engine descartado
+     if _read_engine:
+         await _read_engine.dispose()
+         _read_engine = None
+     _ReadSessionLocal = None
+     _replica_retry_at = 0.0
\ No newline at end of file
@@ -0,0 +1,27 @@
+# auth_api/app/models/access_token_revocation.py
+from sqlalchemy import String, DateTime, func, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+
+from app.db.base import Base
+
+
+class AccessTokenRevocation(Base):
+    """
+    Entrada da lista de revogação de access tokens: um token (claim 'jti') ou uma
+    sessão inteira (claim 'sid' = família de refresh tokens). Só precisa de existir
+    enquanto um access token afetado ainda puder ser válido (ACCESS_TOKEN_EXPIRE_MINUTES).
+    O id crescente serve de versão para a sincronização incremental dos consumidores.
+    """
+    __tablename__ = "access_token_revocations"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    kind: Mapped[str] = mapped_column(String(8), nullable=False) # jti | sid
+    value: Mapped[str] = mapped_column(String(64), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # Limpeza periódica das entradas que já não afetam nenhum token válido
+        Index("ix_access_token_revocations_expires_at", "expires_at"),
+    )
@@ -0,0 +1,41 @@
+# auth_api/app/models/email_outbox.py
+from sqlalchemy import String, DateTime, Text, Integer, func, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional
+
+from app.db.base import Base
+
+
+class EmailOutbox(Base):
+    """
+    Fila persistente de emails transacionais.
+    Os endpoints apenas inserem uma linha; o worker de entrega (email_outbox_service)
+    envia em lotes e regista tentativas/falhas, pelo que nada se perde num restart.
+    """
+    __tablename__ = "email_outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    email_to: Mapped[str] = mapped_column(String(255), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Emails sem segredos guardam o HTML; apagado quando a mensagem é enviada
+    html_content: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Emails com tokens (verificação, redefinição de senha) guardam só o modelo e os
+    # parâmetros, cifrados (security.encrypt_secret); o HTML é gerado no envio
+    template: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    template_params_encrypted: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # pending -> sent | failed (failed = esgotou EMAIL_OUTBOX_MAX_ATTEMPTS)
+    status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Próxima tentativa; também funciona como "lease" enquanto um worker envia a mensagem
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Índice para o worker encontrar rapidamente as mensagens prontas a enviar
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
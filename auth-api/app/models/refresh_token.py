@@ -1,6 +1,7 @@
 # auth_api/app/models/refresh_token.py
 from sqlalchemy import String, DateTime, func, ForeignKey, Integer, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+import uuid
 from datetime import datetime
 from typing import Optional # <-- ADICIONAR Optional
 
@@ -22,6 +23,17 @@ class RefreshToken(Base):
     user_agent: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     # --- FIM NOVAS COLUNAS ---
 
+    # Família de rotação: todos os tokens obtidos por /refresh a partir do mesmo login
+    family_id: Mapped[str] = mapped_column(String(36), nullable=False, default=lambda: str(uuid.uuid4()))
+
     user: Mapped["User"] = relationship()
 
-    __table_args__ = (Index("ix_refresh_tokens_user_hash", "user_id", "token_hash"),)
\ No newline at end of file
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_hash", "user_id", "token_hash"),
+        # Índice para a limpeza periódica de tokens expirados
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+        # Revogação da família inteira quando um token já rodado é reutilizado
+        Index("ix_refresh_tokens_family_id", "family_id"),
+        # Listagem paginada (keyset por id) das sessões ativas de um utilizador
+        Index("ix_refresh_tokens_user_active", "user_id", "is_revoked", "id", "expires_at"),
+    )
\ No newline at end of file
@@ -22,10 +22,14 @@ class TrustedDevice(Base):
     description: Mapped[Optional[str]] = mapped_column(String(255), nullable=True) # Ex: "Chrome no Windows (Login em 2025-10-24)"
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     last_used_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     user: Mapped["User"] = relationship(back_populates="trusted_devices") # type: ignore
 
     __table_args__ = (
-        Index("ix_trusted_devices_user_id", "user_id"),
+        # Listagem paginada (keyset por id) dos dispositivos de um utilizador
+        Index("ix_trusted_devices_user_active", "user_id", "id", "expires_at"),
+        # Índice para a limpeza periódica de dispositivos expirados
+        Index("ix_trusted_devices_expires_at", "expires_at"),
     )
\ No newline at end of file
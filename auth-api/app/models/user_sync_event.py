@@ -0,0 +1,38 @@
+# auth_api/app/models/user_sync_event.py
+from sqlalchemy import String, DateTime, Text, Integer, JSON, func, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from app.db.base import Base
+
+
+class UserSyncEvent(Base):
+    """
+    Propagação pendente de uma alteração de utilizador (create/update/delete) para um
+    serviço downstream (fleet, sales...). Uma linha por serviço; o user_sync_service
+    entrega-as em paralelo e com retry, pela ordem em que foram criadas por utilizador.
+    """
+    __tablename__ = "user_sync_events"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    # Sem FK: o evento de delete tem de sobreviver à remoção do utilizador
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    action: Mapped[str] = mapped_column(String(20), nullable=False) # create | update | delete
+    target: Mapped[str] = mapped_column(String(50), nullable=False) # Chave de USER_SYNC_TARGETS
+    # Corpo do pedido; a senha (se houver) vai cifrada e o payload é apagado após a entrega
+    payload: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
+
+    status: Mapped[str] = mapped_column(String(20), default="pending", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_user_sync_events_status_next_attempt", "status", "next_attempt_at"),
+        # Ordenação por utilizador/serviço (um evento só sai depois dos anteriores)
+        Index("ix_user_sync_events_user_target", "user_id", "target", "status"),
+    )
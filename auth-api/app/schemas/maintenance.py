@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+from datetime import datetime
+
+class RetentionTableStats(BaseModel):
+    """Resultado da limpeza de uma tabela."""
+    deleted: int
+    backlog: int # Linhas ainda elegíveis para limpeza (-1 se a tabela falhou)
+
+class RetentionReport(BaseModel):
+    """Relatório de uma execução do job de retenção."""
+    started_at: datetime
+    duration_seconds: float
+    total_deleted: int
+    rows_per_second: float
+    tables: Dict[str, RetentionTableStats]
+
+
+class OutboxBatch(BaseModel):
+    """Resultado do último lote entregue por um worker de outbox (emails, sincronização)."""
+    claimed: int
+    sent: int
+    retrying: int
+    failed: int
+    duration_seconds: float
+
+class EmailOutboxStats(BaseModel):
+    """Estado da fila de emails."""
+    pending: int # Mensagens por entregar (incluindo as que aguardam nova tentativa)
+    failed: int  # Mensagens desistidas (EMAIL_OUTBOX_MAX_ATTEMPTS esgotado)
+    last_batch: Optional[OutboxBatch] = None
+
+class UserSyncStats(BaseModel):
+    """Estado da propagação de utilizadores para os outros serviços."""
+    pending: int # Eventos por entregar (incluindo os que aguardam nova tentativa)
+    failed: int  # Eventos desistidos (erro definitivo ou USER_SYNC_MAX_ATTEMPTS esgotado)
+    last_batch: Optional[OutboxBatch] = None
@@ -1,6 +1,6 @@
 # auth_api/app/schemas/token.py
-from pydantic import BaseModel
-from typing import Literal, List, Optional
+from pydantic import BaseModel, Field
+from typing import Annotated, Any, Dict, Literal, List, Optional
 from datetime import datetime 
 
 class Token(BaseModel):
@@ -61,4 +61,58 @@ class SessionInfo(BaseModel):
     expires_at: datetime
 
     class Config:
-        from_attributes = True # Permite mapear diretamente do modelo SQLAlchemy
\ No newline at end of file
+        from_attributes = True # Permite mapear diretamente do modelo SQLAlchemy
+
+
+# --- INTROSPEÇÃO EM LOTE (serviços internos / gateway) ---
+class TokenIntrospectionRequest(BaseModel):
+    """Tokens (access ou refresh) a validar numa única chamada."""
+    tokens: List[str]
+
+class TokenIntrospectionResult(BaseModel):
+    """Estado de um token, inspirado no RFC 7662 ('active' + claims quando válido)."""
+    active: bool
+    status: Literal["active", "expired", "invalid", "revoked", "inactive_user"]
+    token_type: Optional[Literal["access", "refresh"]] = None
+    sub: Optional[str] = None
+    exp: Optional[int] = None
+    claims: Optional[Dict[str, Any]] = None # Só para tokens ativos
+
+class TokenIntrospectionResponse(BaseModel):
+    """Resultados pela mesma ordem dos tokens enviados."""
+    results: List[TokenIntrospectionResult]
+
+
+# --- LISTA DE REVOGAÇÃO DE ACCESS TOKENS ---
+class RevocationEntry(BaseModel):
+    """Um token ('jti') ou uma sessão inteira ('sid') revogados."""
+    kind: Literal["jti", "sid"]
+    value: str
+    expires_at: int # Epoch; depois disto a entrada pode ser descartada
+
+class RevocationListResponse(BaseModel):
+    """Entradas novas desde `since`; `version` é o `since` do pedido seguinte."""
+    version: int
+    has_more: bool
+    entries: List[RevocationEntry]
+
+class AccessTokenRevocationRequest(BaseModel):
+    """Revogação manual (resposta a incidentes) por jti e/ou sid."""
+    # A coluna access_token_revocations.value é String(64)
+    jti: List[Annotated[str, Field(max_length=64)]] = []
+    sid: List[Annotated[str, Field(max_length=64)]] = []
+
+
+# --- REVOGAÇÃO EM MASSA DE SESSÕES (mgmt) ---
+class DeviceSessionRevocationRequest(BaseModel):
+    """Sessões de um dispositivo: User-Agent (None = sessões sem User-Agent) e, opcionalmente, IP."""
+    user_agent: Optional[str] = Field(None, max_length=255)
+    ip_address: Optional[str] = Field(None, max_length=100)
+
+class AgedSessionRevocationRequest(BaseModel):
+    """Sessões iniciadas antes de `created_before`, de um utilizador ou de todos (user_id omitido)."""
+    created_before: datetime
+    user_id: Optional[int] = None
+
+class SessionRevocationResult(BaseModel):
+    revoked: int
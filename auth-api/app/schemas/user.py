@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Optional, Dict, Any, List 
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 import re
 
@@ -83,7 +83,8 @@ class ResetPasswordRequest(BaseModel):
 class MFAEnableResponse(BaseModel):
     """Resposta ao iniciar a habilitação do MFA."""
     otp_uri: str 
-    qr_code_base64: str 
+    qr_code_base64: str # Data URI (PNG ou SVG, conforme qr_format)
+    qr_code_format: Literal["png", "svg"] = "png"
 
 class MFAConfirmRequest(BaseModel):
     """Requisição para confirmar a habilitação do MFA."""
@@ -106,12 +107,8 @@ class MFAVerifyRequest(BaseModel):
 class MFARecoveryRequest(BaseModel):
     """Requisição para usar um código de recuperação durante o login."""
     mfa_challenge_token: str
-<<<<<<< HEAD
-    recovery_code: str = Field(..., description="Um dos códigos de recuperação de uso único (ex: abc-123)")
-=======
     recovery_code: str = Field(..., description="Um dos códigos de recuperação de uso único (ex: abc-123)")
 
 class EmailRequest(BaseModel):
     """Schema simples para receber apenas um e-mail no corpo da requisição."""
     email: EmailStr
->>>>>>> 226d4bb11378fe37d171a0e916945c18d6208a5a
@@ -0,0 +1,225 @@
+# auth_api/app/services/email_outbox_service.py
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import encrypt_secret, decrypt_secret
+from app.db.session import get_session_local, run_after_commit
+from app.crud.crud_email_outbox import crud_email_outbox, STATUS_PENDING, STATUS_FAILED
+from app.models.email_outbox import EmailOutbox
+from app.services.email_service import (
+    deliver_email, build_verification_email, build_password_reset_email
+)
+
+# Worker de entrega: drena a tabela email_outbox em lotes, reutilizando o cliente
+# HTTP partilhado do email_service (conexões keep-alive), e regista cada tentativa.
+_outbox_task: Optional[asyncio.Task] = None
+_outbox_wakeup: Optional[asyncio.Event] = None
+_last_batch: Optional[Dict[str, Any]] = None
+
+# Emails com tokens: a fila guarda o nome do modelo e os parâmetros cifrados, nunca o link
+EMAIL_TEMPLATES: Dict[str, Callable[..., Tuple[str, str]]] = {
+    "verification": build_verification_email,
+    "password_reset": build_password_reset_email,
+}
+
+
+def _get_wakeup() -> asyncio.Event:
+    global _outbox_wakeup
+    if _outbox_wakeup is None:
+        _outbox_wakeup = asyncio.Event()
+    return _outbox_wakeup
+
+
+def notify_email_outbox() -> None:
+    """Acorda o worker para entregar já (sem esperar pelo próximo varrimento)."""
+    if _outbox_wakeup is not None:
+        _outbox_wakeup.set()
+
+
+# --- Enfileiramento (chamado pelos endpoints: um único INSERT) ---
+# Com commit=False a mensagem entra na transação de quem chama, junto com a escrita
+# que a originou (utilizador, token): ou ficam as duas, ou nenhuma.
+def _notify(db: AsyncSession, *, commit: bool) -> None:
+    if commit:
+        notify_email_outbox()
+    else:
+        run_after_commit(db, notify_email_outbox)
+
+
+async def enqueue_email(
+    db: AsyncSession, *, email_to: str, subject: str, html_content: str, commit: bool = True
+) -> EmailOutbox:
+    message = await crud_email_outbox.enqueue(
+        db, email_to=email_to, subject=subject, html_content=html_content, commit=commit
+    )
+    _notify(db, commit=commit)
+    return message
+
+
+async def enqueue_template_email(
+    db: AsyncSession, *, email_to: str, template: str, params: Dict[str, str], commit: bool = True
+) -> EmailOutbox:
+    """Enfileira um email de EMAIL_TEMPLATES; os parâmetros (tokens) ficam cifrados."""
+    subject, _ = EMAIL_TEMPLATES[template](**params)
+    message = await crud_email_outbox.enqueue(
+        db,
+        email_to=email_to,
+        subject=subject,
+        template=template,
+        template_params_encrypted=encrypt_secret(json.dumps(params)),
+        commit=commit,
+    )
+    _notify(db, commit=commit)
+    return message
+
+
+async def enqueue_verification_email(
+    db: AsyncSession, *, email_to: str, verification_token: str, commit: bool = True
+) -> EmailOutbox:
+    return await enqueue_template_email(
+        db, email_to=email_to, template="verification",
+        params={"verification_token": verification_token}, commit=commit,
+    )
+
+
+async def enqueue_password_reset_email(
+    db: AsyncSession, *, email_to: str, reset_token: str, commit: bool = True
+) -> EmailOutbox:
+    return await enqueue_template_email(
+        db, email_to=email_to, template="password_reset", params={"reset_token": reset_token}, commit=commit,
+    )
+
+
+# --- Entrega ---
+def _render(message: EmailOutbox) -> Tuple[Optional[str], Optional[str]]:
+    """Retorna (html, erro). Um erro aqui é definitivo: a mensagem não é reenviada."""
+    if message.template is None:
+        return message.html_content, None
+    builder = EMAIL_TEMPLATES.get(message.template)
+    if builder is None:
+        return None, f"Modelo de email desconhecido: {message.template}"
+    params = decrypt_secret(message.template_params_encrypted or "")
+    if params is None:
+        return None, "Parâmetros cifrados ilegíveis (SECRET_KEY alterada?)"
+    _, html_content = builder(**json.loads(params))
+    return html_content, None
+
+
+async def deliver_outbox_batch() -> Dict[str, Any]:
+    """
+    Reclama um lote de mensagens, envia-as em paralelo (limitado por EMAIL_MAX_CONCURRENCY)
+    e grava o resultado: enviadas num único UPDATE, falhas com erro e backoff.
+    """
+    global _last_batch
+    SessionLocal = get_session_local()
+    start = time.perf_counter()
+
+    async with SessionLocal() as db:
+        messages = await crud_email_outbox.claim_batch(
+            db,
+            limit=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            lease_seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS,
+        )
+    if not messages:
+        return {"claimed": 0, "sent": 0, "retrying": 0, "failed": 0, "duration_seconds": 0.0}
+
+    rendered = [_render(m) for m in messages]
+
+    async def deliver(message: EmailOutbox, html_content: Optional[str], render_error: Optional[str]) -> Optional[str]:
+        if render_error is not None:
+            return render_error
+        # Uma única tentativa por mensagem; o backoff entre tentativas fica a cargo do outbox
+        return await deliver_email(message.email_to, message.subject, html_content, max_retries=0)
+
+    errors = await asyncio.gather(*(deliver(m, *r) for m, r in zip(messages, rendered)))
+
+    sent_ids = [m.id for m, error in zip(messages, errors) if error is None]
+    retrying = failed = 0
+    async with SessionLocal() as db:
+        await crud_email_outbox.mark_delivered(db, ids=sent_ids)
+        for message, (_, render_error), error in zip(messages, rendered, errors):
+            if error is None:
+                continue
+            status = await crud_email_outbox.mark_failed(
+                db, item=message, error=error, retryable=render_error is None
+            )
+            if status == STATUS_FAILED:
+                failed += 1
+                logger.error(f"Outbox: email {message.id} para {message.email_to} desistido após {message.attempts} tentativas: {error}")
+            else:
+                retrying += 1
+
+    _last_batch = {
+        "claimed": len(messages),
+        "sent": len(sent_ids),
+        "retrying": retrying,
+        "failed": failed,
+        "duration_seconds": round(time.perf_counter() - start, 3),
+    }
+    logger.info(f"Outbox: lote entregue {_last_batch}")
+    return _last_batch
+
+
+async def drain_email_outbox() -> int:
+    """Entrega lotes até a fila (pronta) esvaziar. Retorna o número de mensagens enviadas."""
+    total_sent = 0
+    while True:
+        report = await deliver_outbox_batch()
+        total_sent += report["sent"]
+        if report["claimed"] < settings.EMAIL_OUTBOX_BATCH_SIZE:
+            return total_sent
+        await asyncio.sleep(0) # Cede o event loop entre lotes
+
+
+async def get_email_outbox_stats() -> Dict[str, Any]:
+    """Backlog pendente, mensagens falhadas e o último lote (para monitorização)."""
+    async with get_session_local()() as db:
+        pending = await crud_email_outbox.count_by_status(db, status=STATUS_PENDING)
+        failed = await crud_email_outbox.count_by_status(db, status=STATUS_FAILED)
+    return {"pending": pending, "failed": failed, "last_batch": _last_batch}
+
+
+async def _outbox_loop() -> None:
+    wakeup = _get_wakeup()
+    while True:
+        wakeup.clear()
+        try:
+            await drain_email_outbox()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Outbox: erro inesperado ao entregar emails: {e}")
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=settings.EMAIL_OUTBOX_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_email_outbox_worker() -> None:
+    """Agenda o worker de entrega no event loop atual (chamar no startup)."""
+    global _outbox_task
+    if not settings.EMAIL_OUTBOX_ENABLED:
+        logger.info("Worker do email outbox desativado (EMAIL_OUTBOX_ENABLED=False).")
+        return
+    if _outbox_task is None or _outbox_task.done():
+        _outbox_task = asyncio.create_task(_outbox_loop(), name="auth-email-outbox")
+        logger.info(f"Worker do email outbox iniciado (lote: {settings.EMAIL_OUTBOX_BATCH_SIZE}).")
+
+
+async def stop_email_outbox_worker() -> None:
+    """Cancela o worker (chamar no shutdown). Mensagens por enviar ficam na tabela."""
+    global _outbox_task, _outbox_wakeup
+    if _outbox_task is not None:
+        _outbox_task.cancel()
+        try:
+            await _outbox_task
+        except asyncio.CancelledError:
+            pass
+        _outbox_task = None
+    _outbox_wakeup = None
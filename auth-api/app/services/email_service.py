@@ -1,7 +1,9 @@
 # auth_api/app/services/email_service.py
 import asyncio
+import json
+import random
 import traceback
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
 from app.core.config import settings
 # Importação CORRIGIDA: Agora datetime é acessível globalmente (ex: datetime.now().year)
@@ -12,18 +14,100 @@ import certifi
 # --- MUDANÇA 1: URL da API da Brevo ---
 BREVO_API_URL = "https://api.brevo.com/v3/smtp/email"
 
+# --- CLIENTE HTTP PARTILHADO (pool de conexões reutilizado entre envios) ---
+# Um único AsyncClient durante a vida da app: evita um handshake TLS por email.
+# O semáforo limita envios simultâneos ao provedor; erros transitórios (rede, 429, 5xx)
+# são repetidos com backoff exponencial.
+_email_client: Optional[httpx.AsyncClient] = None
+_email_transport_override: Optional[httpx.AsyncBaseTransport] = None
+_email_send_slots: Optional[asyncio.Semaphore] = None
+
+# Emails "enviados" pelo backend stub (EMAIL_BACKEND="stub"), úteis em testes/dev offline
+stub_outbox: List[Dict[str, Any]] = []
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _stub_handler(request: httpx.Request) -> httpx.Response:
+    """Transporte local: regista a mensagem em memória e responde como a Brevo."""
+    payload = json.loads(request.content or b"{}")
+    stub_outbox.append(payload)
+    logger.info(f"[EMAIL STUB] Para: {[t.get('email') for t in payload.get('to', [])]} | Assunto: {payload.get('subject')}")
+    return httpx.Response(201, json={"messageId": f"<stub-{len(stub_outbox)}@localhost>"})
+
+
+def _build_transport() -> httpx.AsyncBaseTransport:
+    if _email_transport_override is not None:
+        return _email_transport_override
+    if settings.EMAIL_BACKEND == "stub":
+        return httpx.MockTransport(_stub_handler)
+    return httpx.AsyncHTTPTransport(
+        verify=certifi.where(),
+        limits=httpx.Limits(
+            max_connections=settings.EMAIL_MAX_CONCURRENCY,
+            max_keepalive_connections=settings.EMAIL_MAX_CONCURRENCY,
+        ),
+    )
+
+
+def get_email_client() -> httpx.AsyncClient:
+    """Retorna o cliente HTTP partilhado, criando-o na primeira utilização."""
+    global _email_client
+    if _email_client is None or _email_client.is_closed:
+        _email_client = httpx.AsyncClient(
+            transport=_build_transport(),
+            timeout=httpx.Timeout(settings.EMAIL_HTTP_TIMEOUT_SECONDS),
+        )
+    return _email_client
+
+
+def _get_send_slots() -> asyncio.Semaphore:
+    global _email_send_slots
+    if _email_send_slots is None:
+        _email_send_slots = asyncio.Semaphore(settings.EMAIL_MAX_CONCURRENCY)
+    return _email_send_slots
+
+
+async def set_email_transport(transport: Optional[httpx.AsyncBaseTransport]) -> None:
+    """Substitui o transporte do cliente (ex: httpx.MockTransport em testes). None repõe o padrão."""
+    global _email_transport_override
+    _email_transport_override = transport
+    await close_email_client()
+
+
+async def close_email_client() -> None:
+    """Fecha o cliente partilhado (chamar no shutdown da aplicação)."""
+    global _email_client, _email_send_slots
+    if _email_client is not None:
+        await _email_client.aclose()
+        _email_client = None
+    _email_send_slots = None
+
+
+def _retry_delay(attempt: int) -> float:
+    """Backoff exponencial com jitter: base * 2^(tentativa-1) * [0.5, 1.5)."""
+    base = settings.EMAIL_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+    return base * (0.5 + random.random())
+# --- FIM CLIENTE HTTP PARTILHADO ---
+
+
 # Helper assíncrono REESCRITO para usar HTTpx para a Brevo
-async def send_email_http_api(
+async def deliver_email(
     email_to: str,
     subject: str,
-    html_content: str
-) -> bool:
+    html_content: str,
+    *,
+    max_retries: Optional[int] = None
+) -> Optional[str]:
     """
-    Envia um email usando HTTpx manualmente para a API da Brevo.
+    Envia um email usando o cliente HTTpx partilhado para a API da Brevo,
+    com concorrência limitada e retry com backoff em falhas transitórias.
+    Retorna None em caso de sucesso ou a descrição do erro (gravada pelo outbox).
+    `max_retries` substitui EMAIL_MAX_RETRIES (o outbox usa 0 e faz o seu próprio backoff).
     """
-    if not settings.BREVO_API_KEY:
+    if not settings.BREVO_API_KEY and settings.EMAIL_BACKEND != "stub":
         logger.error("BREVO_API_KEY não está configurada. Email não será enviado.")
-        return False
+        return "BREVO_API_KEY não configurada"
 
     message_payload = {
         "sender": {
@@ -40,42 +124,66 @@ async def send_email_http_api(
     }
 
     headers = {
-        "api-key": settings.BREVO_API_KEY,
+        "api-key": settings.BREVO_API_KEY or "",
         "Content-Type": "application/json",
         "Accept": "application/json"
     }
 
-    try:
-        transport = httpx.AsyncHTTPTransport(verify=certifi.where())
-        
-        async with httpx.AsyncClient(transport=transport) as client:
-            logger.info(f"Enviando email para {email_to} via Brevo (HTTpx)...")
-            response = await client.post(
-                BREVO_API_URL,
-                json=message_payload,
-                headers=headers
-            )
+    max_attempts = (settings.EMAIL_MAX_RETRIES if max_retries is None else max_retries) + 1
+    for attempt in range(1, max_attempts + 1):
+        try:
+            async with _get_send_slots():
+                logger.info(f"Enviando email para {email_to} via Brevo (HTTpx, tentativa {attempt}/{max_attempts})...")
+                response = await get_email_client().post(
+                    BREVO_API_URL,
+                    json=message_payload,
+                    headers=headers
+                )
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            logger.warning(f"Erro de rede ao enviar email (Brevo) para {email_to}: {e}")
+            if attempt < max_attempts:
+                await asyncio.sleep(_retry_delay(attempt))
+                continue
+            logger.error(f"Traceback completo: {traceback.format_exc()}")
+            return f"Erro de rede: {e!r}"
+        except Exception as e:
+            logger.error(f"Erro CRÍTICO ao enviar email (Brevo HTTpx) para {email_to}: {e}")
+            logger.error(f"Traceback completo: {traceback.format_exc()}")
+            return f"Erro inesperado: {e!r}"
 
         if 200 <= response.status_code < 300:
             logger.info(f"Email aceito para envio para {email_to} via Brevo. Status: {response.status_code}")
-            return True
-        else:
-            logger.error(f"Falha ao enviar email para {email_to} via Brevo (HTTpx).")
-            logger.error(f"Status: {response.status_code}")
-            logger.error(f"Body: {response.text}")
-            return False
-
-    except httpx.ConnectError as e:
-        logger.error(f"Erro de conexão SSL/TLS ao enviar email (Brevo) para {email_to}: {e}")
-        logger.error(f"Traceback completo: {traceback.format_exc()}")
-        return False
-    except Exception as e:
-        logger.error(f"Erro CRÍTICO ao enviar email (Brevo HTTpx) para {email_to}: {e}")
-        logger.error(f"Traceback completo: {traceback.format_exc()}")
-        return False
-
-# --- Função específica para email de verificação ---
-async def send_verification_email(email_to: str, verification_token: str) -> bool:
+            return None
+
+        if response.status_code in RETRYABLE_STATUS_CODES and attempt < max_attempts:
+            # Respeita o Retry-After do provedor quando presente (ex: 429), até EMAIL_RETRY_MAX_DELAY
+            retry_after = response.headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                delay = min(float(retry_after), settings.EMAIL_RETRY_MAX_DELAY)
+            else:
+                delay = _retry_delay(attempt)
+            logger.warning(f"Brevo respondeu {response.status_code} para {email_to}; nova tentativa em {delay:.1f}s.")
+            await asyncio.sleep(delay)
+            continue
+
+        logger.error(f"Falha ao enviar email para {email_to} via Brevo (HTTpx).")
+        logger.error(f"Status: {response.status_code}")
+        logger.error(f"Body: {response.text}")
+        return f"HTTP {response.status_code}: {response.text[:500]}"
+    return "Tentativas esgotadas"
+
+
+async def send_email_http_api(
+    email_to: str,
+    subject: str,
+    html_content: str
+) -> bool:
+    """Envio direto (sem outbox). Retorna True se a Brevo aceitou a mensagem."""
+    return await deliver_email(email_to, subject, html_content) is None
+
+# --- Email de verificação ---
+def build_verification_email(verification_token: str) -> Tuple[str, str]:
+    """Retorna (assunto, html) do email de verificação."""
     # CORREÇÃO: EMAILS_FROM_NAME
     project_name = settings.EMAILS_FROM_NAME or "Nossa Aplicação"
     subject = f"Bem-vindo(a) a {project_name}! Confirme seu e-mail"
@@ -182,15 +290,20 @@ async def send_verification_email(email_to: str, verification_token: str) -> boo
     </body>
     </html>
     """
+    return subject, html_content
+
 
+async def send_verification_email(email_to: str, verification_token: str) -> bool:
+    subject, html_content = build_verification_email(verification_token)
     return await send_email_http_api(
         email_to=email_to,
         subject=subject,
         html_content=html_content
     )
 
-# --- Função específica para email de reset de senha ---
-async def send_password_reset_email(email_to: str, reset_token: str) -> bool:
+# --- Email de reset de senha ---
+def build_password_reset_email(reset_token: str) -> Tuple[str, str]:
+    """Retorna (assunto, html) do email de redefinição de senha."""
     # CORREÇÃO: EMAILS_FROM_NAME
     project_name = settings.EMAILS_FROM_NAME or "Sua Aplicação"
     subject = f"{project_name} - Redefinição de Senha"
@@ -209,7 +322,11 @@ async def send_password_reset_email(email_to: str, reset_token: str) -> bool:
     </body>
     </html>
     """
+    return subject, html_content
 
+
+async def send_password_reset_email(email_to: str, reset_token: str) -> bool:
+    subject, html_content = build_password_reset_email(reset_token)
     return await send_email_http_api(
         email_to=email_to,
         subject=subject,
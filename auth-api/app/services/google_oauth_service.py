@@ -0,0 +1,219 @@
+# auth_api/app/services/google_oauth_service.py
+import asyncio
+import re
+import time
+from typing import Any, Dict, Optional
+
+import certifi
+import httpx
+from jose import JWTError, jwt
+from loguru import logger
+
+from app.core.config import settings
+from app.core.exceptions import OAuthProviderException
+
+# --- CLIENTE GOOGLE PARTILHADO (pool de conexões + metadados em cache) ---
+# O callback fazia um handshake TLS por chamada e, além da troca do código, ia buscar
+# o userinfo. Agora: um AsyncClient durante a vida da app, documento de descoberta e
+# JWKS em cache, e o ID token devolvido na troca é verificado localmente (assinatura,
+# aud, iss, exp, at_hash). Por defeito o callback faz UM pedido à Google.
+_google_client: Optional[httpx.AsyncClient] = None
+_google_transport_override: Optional[httpx.AsyncBaseTransport] = None
+_cache_lock: Optional[asyncio.Lock] = None
+
+_metadata: Optional[Dict[str, Any]] = None
+_metadata_expires_at = 0.0 # time.monotonic
+_jwks: Dict[str, Dict[str, Any]] = {} # kid -> JWK
+_jwks_expires_at = 0.0
+_jwks_fetched_at = 0.0
+
+# kid desconhecido força nova leitura do JWKS (rotação), mas no máximo a este ritmo
+JWKS_MIN_REFRESH_SECONDS = 60
+ID_TOKEN_LEEWAY_SECONDS = 60 # Tolerância de relógio no exp/iat
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def _build_transport() -> httpx.AsyncBaseTransport:
+    if _google_transport_override is not None:
+        return _google_transport_override
+    return httpx.AsyncHTTPTransport(verify=certifi.where())
+
+
+def get_google_client() -> httpx.AsyncClient:
+    """Retorna o cliente HTTP partilhado, criando-o na primeira utilização."""
+    global _google_client
+    if _google_client is None or _google_client.is_closed:
+        _google_client = httpx.AsyncClient(
+            transport=_build_transport(),
+            timeout=httpx.Timeout(settings.GOOGLE_HTTP_TIMEOUT_SECONDS),
+        )
+    return _google_client
+
+
+def _get_cache_lock() -> asyncio.Lock:
+    global _cache_lock
+    if _cache_lock is None:
+        _cache_lock = asyncio.Lock()
+    return _cache_lock
+
+
+def clear_google_cache() -> None:
+    global _metadata, _metadata_expires_at, _jwks, _jwks_expires_at, _jwks_fetched_at
+    _metadata, _metadata_expires_at = None, 0.0
+    _jwks, _jwks_expires_at, _jwks_fetched_at = {}, 0.0, 0.0
+
+
+async def set_google_transport(transport: Optional[httpx.AsyncBaseTransport]) -> None:
+    """Substitui o transporte do cliente (ex: provedor falso em testes). None repõe o padrão."""
+    global _google_transport_override
+    _google_transport_override = transport
+    await close_google_client()
+
+
+async def close_google_client() -> None:
+    """Fecha o cliente partilhado e esquece os metadados (chamar no shutdown da aplicação)."""
+    global _google_client, _cache_lock
+    if _google_client is not None:
+        await _google_client.aclose()
+        _google_client = None
+    _cache_lock = None
+    clear_google_cache()
+
+
+def _cache_ttl(response: httpx.Response) -> float:
+    """TTL da resposta: Cache-Control max-age do provedor, limitado por GOOGLE_METADATA_CACHE_SECONDS."""
+    match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+    ttl = settings.GOOGLE_METADATA_CACHE_SECONDS
+    return min(int(match.group(1)), ttl) if match else ttl
+
+
+async def _get_json(url: str) -> httpx.Response:
+    try:
+        response = await get_google_client().get(url)
+        response.raise_for_status()
+        return response
+    except httpx.HTTPError as e:
+        logger.error(f"Erro ao contactar a Google ({url}): {e}")
+        raise OAuthProviderException("Erro ao contactar serviço de login.")
+
+
+async def get_provider_metadata() -> Dict[str, Any]:
+    """Documento de descoberta OIDC (endpoints, issuer), em cache."""
+    global _metadata, _metadata_expires_at
+    if _metadata is not None and time.monotonic() < _metadata_expires_at:
+        return _metadata
+    async with _get_cache_lock():
+        # Outro pedido pode ter atualizado enquanto se esperava pelo lock
+        if _metadata is None or time.monotonic() >= _metadata_expires_at:
+            response = await _get_json(settings.GOOGLE_DISCOVERY_URL)
+            _metadata = response.json()
+            _metadata_expires_at = time.monotonic() + _cache_ttl(response)
+    return _metadata
+
+
+async def _get_signing_key(kid: Optional[str]) -> Optional[Dict[str, Any]]:
+    global _jwks, _jwks_expires_at, _jwks_fetched_at
+    now = time.monotonic()
+    if kid in _jwks and now < _jwks_expires_at:
+        return _jwks[kid]
+    metadata = await get_provider_metadata()
+    async with _get_cache_lock():
+        now = time.monotonic()
+        stale = now >= _jwks_expires_at
+        rotated = kid not in _jwks and now - _jwks_fetched_at >= JWKS_MIN_REFRESH_SECONDS
+        if stale or rotated:
+            response = await _get_json(metadata["jwks_uri"])
+            _jwks = {key.get("kid"): key for key in response.json().get("keys", [])}
+            _jwks_expires_at = now + _cache_ttl(response)
+            _jwks_fetched_at = now
+    return _jwks.get(kid)
+
+
+async def get_authorization_url(params: Dict[str, str]) -> str:
+    metadata = await get_provider_metadata()
+    return str(httpx.Request("GET", metadata["authorization_endpoint"], params=params).url)
+
+
+async def exchange_code(code: str) -> Dict[str, Any]:
+    """Troca o authorization code pelos tokens da Google (access_token, id_token)."""
+    metadata = await get_provider_metadata()
+    payload = {
+        "code": code,
+        "client_id": settings.GOOGLE_CLIENT_ID,
+        "client_secret": settings.GOOGLE_CLIENT_SECRET,
+        "redirect_uri": str(settings.GOOGLE_REDIRECT_URI_FRONTEND),
+        "grant_type": "authorization_code",
+    }
+    try:
+        response = await get_google_client().post(metadata["token_endpoint"], data=payload)
+    except httpx.HTTPError as e:
+        logger.error(f"Erro de rede ao contactar Google Token URL: {e}")
+        raise OAuthProviderException("Erro ao contactar serviço de login.")
+    if response.status_code >= 500:
+        logger.error(f"Google Token URL indisponível: {response.status_code}")
+        raise OAuthProviderException("Erro ao contactar serviço de login.")
+    if response.is_error:
+        logger.error(f"Erro ao trocar código da Google: {response.text}")
+        raise OAuthProviderException("Código de autorização inválido ou expirado.", status_code=400)
+    return response.json()
+
+
+async def verify_id_token(id_token: str, access_token: Optional[str] = None) -> Dict[str, Any]:
+    """Valida o ID token localmente com o JWKS em cache e retorna as claims."""
+    try:
+        header = jwt.get_unverified_header(id_token)
+    except JWTError:
+        raise OAuthProviderException("ID token da Google inválido.", status_code=400)
+    key = await _get_signing_key(header.get("kid"))
+    if key is None:
+        logger.warning(f"ID token da Google com kid desconhecido: {header.get('kid')}")
+        raise OAuthProviderException("ID token da Google inválido.", status_code=400)
+    issuer = (await get_provider_metadata())["issuer"]
+    try:
+        return jwt.decode(
+            id_token,
+            key,
+            algorithms=[key.get("alg", "RS256")],
+            audience=settings.GOOGLE_CLIENT_ID,
+            # A Google emite 'iss' com e sem esquema
+            issuer=[issuer, issuer.removeprefix("https://")],
+            access_token=access_token,
+            options={"leeway": ID_TOKEN_LEEWAY_SECONDS},
+        )
+    except JWTError as e:
+        logger.warning(f"ID token da Google rejeitado: {e}")
+        raise OAuthProviderException("ID token da Google inválido.", status_code=400)
+
+
+async def fetch_userinfo(access_token: str) -> Dict[str, Any]:
+    metadata = await get_provider_metadata()
+    try:
+        response = await get_google_client().get(
+            metadata["userinfo_endpoint"], headers={"Authorization": f"Bearer {access_token}"}
+        )
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPError as e:
+        logger.error(f"Erro ao obter userinfo da Google: {e}")
+        raise OAuthProviderException("Falha ao obter dados do utilizador.")
+
+
+async def authenticate_with_code(code: str) -> Dict[str, Any]:
+    """
+    Fluxo completo do callback: troca o código e devolve a identidade (email,
+    email_verified, name) a partir do ID token verificado. O userinfo só é chamado
+    se GOOGLE_FETCH_USERINFO estiver ativo ou o ID token não trouxer o email.
+    """
+    tokens = await exchange_code(code)
+    id_token = tokens.get("id_token")
+    access_token = tokens.get("access_token")
+    if not id_token:
+        raise OAuthProviderException("Falha ao obter token da Google.")
+    claims = await verify_id_token(id_token, access_token=access_token)
+    if (settings.GOOGLE_FETCH_USERINFO or not claims.get("email")) and access_token:
+        userinfo = await fetch_userinfo(access_token)
+        if userinfo.get("sub") != claims.get("sub"):
+            raise OAuthProviderException("Resposta de userinfo não corresponde ao ID token.", status_code=400)
+        claims = {**claims, **userinfo}
+    return claims
+# --- FIM CLIENTE GOOGLE ---
@@ -0,0 +1,154 @@
+# auth_api/app/services/introspection_service.py
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from cachetools import TLRUCache
+from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import security
+from app.core.config import settings
+from app.core.revocation import revocation_set
+from app.crud.crud_access_token_revocation import crud_access_token_revocation
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.schemas.token import TokenIntrospectionResult
+
+
+class _CachedResult(NamedTuple):
+    result: TokenIntrospectionResult
+    expires_at: float # Instante (time.monotonic) em que a entrada expira
+
+
+# Cache curto (por processo) dos resultados, indexado pelo SHA-256 do token.
+# O TTL é o atraso máximo até uma revogação ser visível; tokens ativos nunca ficam
+# em cache para além do seu 'exp'.
+_cache_lock = threading.Lock()
+_cache: TLRUCache = TLRUCache(
+    maxsize=settings.INTROSPECTION_CACHE_MAX_ENTRIES,
+    ttu=lambda _key, entry, _now: entry.expires_at,
+    timer=time.monotonic,
+)
+
+
+def clear_introspection_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def _cache_get(key: str) -> Optional[TokenIntrospectionResult]:
+    if settings.INTROSPECTION_CACHE_TTL_SECONDS <= 0:
+        return None
+    with _cache_lock:
+        entry = _cache.get(key)
+    return entry.result if entry else None
+
+
+def _cache_store(key: str, result: TokenIntrospectionResult) -> None:
+    ttl = settings.INTROSPECTION_CACHE_TTL_SECONDS
+    if ttl <= 0:
+        return
+    if result.active and result.exp is not None:
+        ttl = min(ttl, result.exp - datetime.now(timezone.utc).timestamp())
+        if ttl <= 0:
+            return
+    with _cache_lock:
+        _cache[key] = _CachedResult(result, time.monotonic() + ttl)
+
+
+def _inactive(status: str, token_type: Optional[str] = None) -> TokenIntrospectionResult:
+    return TokenIntrospectionResult(active=False, status=status, token_type=token_type)
+
+
+def _decode(token: str) -> tuple[Optional[Dict[str, Any]], Optional[TokenIntrospectionResult]]:
+    """Valida assinatura/claims localmente. Retorna (payload, None) ou (None, resultado inativo)."""
+    try:
+        unverified = jwt.get_unverified_claims(token)
+    except JWTError:
+        return None, _inactive("invalid")
+    token_type = unverified.get("token_type")
+    if token_type == "refresh":
+        payload = security.decode_refresh_token(token)
+    elif token_type == "access":
+        payload = security.decode_access_token(token)
+    else:
+        return None, _inactive("invalid")
+    if payload is None:
+        exp = unverified.get("exp")
+        expired = isinstance(exp, (int, float)) and exp <= datetime.now(timezone.utc).timestamp()
+        return None, _inactive("expired" if expired else "invalid", token_type)
+    return payload, None
+
+
+async def introspect_tokens(db: AsyncSession, tokens: Sequence[str]) -> List[TokenIntrospectionResult]:
+    """
+    Estado de cada token, pela ordem recebida.
+
+    Assinatura e expiração são verificadas localmente; o estado que só a BD conhece
+    (utilizador ativo, refresh token revogado) é lido com uma query por tipo para
+    todo o lote, e não uma por token; os access tokens são comparados com a lista
+    de revogação em memória.
+    """
+    keys = [crud_refresh_token.hash_token(token) for token in tokens]
+    resolved: Dict[str, TokenIntrospectionResult] = {}
+    payloads: Dict[str, Dict[str, Any]] = {}
+    for key, token in zip(keys, tokens):
+        if key in resolved or key in payloads:
+            continue
+        cached = _cache_get(key)
+        if cached is not None:
+            resolved[key] = cached
+            continue
+        payload, inactive = _decode(token)
+        if inactive is not None:
+            resolved[key] = inactive
+            _cache_store(key, inactive)
+        else:
+            payloads[key] = payload
+
+    if payloads:
+        await crud_access_token_revocation.sync_revocation_set(db)
+        user_ids = set()
+        for payload in payloads.values():
+            try:
+                user_ids.add(int(payload.get("sub")))
+            except (TypeError, ValueError):
+                pass
+        active_users = set()
+        if user_ids:
+            stmt = select(User.id).where(User.id.in_(user_ids), User.is_active == True)
+            active_users = set((await db.execute(stmt)).scalars().all())
+
+        refresh_keys = [key for key, payload in payloads.items() if payload.get("token_type") == "refresh"]
+        live_refresh = set()
+        if refresh_keys:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            stmt = select(RefreshToken.token_hash).where(
+                RefreshToken.token_hash.in_(refresh_keys),
+                RefreshToken.is_revoked == False,
+                RefreshToken.expires_at > now
+            )
+            live_refresh = set((await db.execute(stmt)).scalars().all())
+
+        for key, payload in payloads.items():
+            token_type = payload.get("token_type")
+            sub = payload.get("sub")
+            if not sub or not str(sub).isdigit() or int(sub) not in active_users:
+                result = _inactive("inactive_user", token_type)
+            elif token_type == "refresh" and key not in live_refresh:
+                result = _inactive("revoked", token_type)
+            elif token_type == "access" and revocation_set.is_revoked(payload):
+                result = _inactive("revoked", token_type)
+            else:
+                result = TokenIntrospectionResult(
+                    active=True, status="active", token_type=token_type,
+                    sub=str(sub), exp=payload.get("exp"), claims=payload,
+                )
+            resolved[key] = result
+            _cache_store(key, result)
+
+    return [resolved[key] for key in keys]
@@ -0,0 +1,130 @@
+# auth_api/app/services/retention_service.py
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import get_session_local
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.crud.crud_trusted_device import crud_trusted_device
+from app.crud.crud_mfa_recovery_code import crud_mfa_recovery_code
+from app.crud.crud_email_outbox import crud_email_outbox
+from app.crud.crud_user_sync_event import crud_user_sync_event
+from app.crud.crud_access_token_revocation import crud_access_token_revocation
+
+# (nome, função que apaga um lote, função que conta o backlog)
+RetentionTarget = Tuple[
+    str,
+    Callable[..., Awaitable[int]],
+    Callable[[AsyncSession], Awaitable[int]],
+]
+
+RETENTION_TARGETS: List[RetentionTarget] = [
+    ("refresh_tokens", crud_refresh_token.prune_expired_tokens, crud_refresh_token.count_prunable_tokens),
+    ("trusted_devices", crud_trusted_device.prune_expired_devices, crud_trusted_device.count_expired_devices),
+    ("mfa_recovery_codes", crud_mfa_recovery_code.prune_used_codes, crud_mfa_recovery_code.count_used_codes),
+    ("email_outbox", crud_email_outbox.prune_delivered_messages, crud_email_outbox.count_prunable_messages),
+    ("user_sync_events", crud_user_sync_event.prune_delivered_events, crud_user_sync_event.count_prunable_events),
+    ("access_token_revocations", crud_access_token_revocation.prune_expired, crud_access_token_revocation.count_expired),
+]
+
+# Último relatório (exposto em /mgmt/maintenance/retention)
+_last_report: Optional[Dict[str, Any]] = None
+_retention_task: Optional[asyncio.Task] = None
+
+
+async def _prune_target(prune: Callable[..., Awaitable[int]]) -> int:
+    """Apaga lotes de uma tabela até esvaziar o backlog ou atingir o limite de lotes."""
+    SessionLocal = get_session_local()
+    batch_size = settings.RETENTION_BATCH_SIZE
+    total_deleted = 0
+    for _ in range(settings.RETENTION_MAX_BATCHES_PER_RUN):
+        # Uma sessão/transação curta por lote para não segurar locks
+        async with SessionLocal() as db:
+            deleted = await prune(db, batch_size=batch_size)
+        total_deleted += deleted
+        if deleted < batch_size:
+            break
+        await asyncio.sleep(0) # Cede o event loop entre lotes
+    return total_deleted
+
+
+async def run_retention_cycle() -> Dict[str, Any]:
+    """
+    Executa uma passagem completa de limpeza sobre todas as tabelas de credenciais
+    e retorna (e guarda) um relatório com linhas apagadas, backlog restante e throughput.
+    """
+    global _last_report
+    SessionLocal = get_session_local()
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+    tables: Dict[str, Dict[str, int]] = {}
+
+    for name, prune, count_backlog in RETENTION_TARGETS:
+        try:
+            deleted = await _prune_target(prune)
+            async with SessionLocal() as db:
+                backlog = await count_backlog(db)
+        except Exception as e:
+            logger.error(f"Retenção: falha ao limpar '{name}': {e}")
+            tables[name] = {"deleted": 0, "backlog": -1}
+            continue
+        tables[name] = {"deleted": deleted, "backlog": backlog}
+
+    duration = time.perf_counter() - start
+    total_deleted = sum(t["deleted"] for t in tables.values())
+    _last_report = {
+        "started_at": started_at,
+        "duration_seconds": round(duration, 3),
+        "total_deleted": total_deleted,
+        "rows_per_second": round(total_deleted / duration, 1) if duration > 0 else 0.0,
+        "tables": tables,
+    }
+    logger.info(
+        f"Retenção concluída em {duration:.2f}s: {total_deleted} linhas apagadas "
+        f"({_last_report['rows_per_second']}/s). Detalhe: {tables}"
+    )
+    return _last_report
+
+
+def get_last_retention_report() -> Optional[Dict[str, Any]]:
+    """Retorna o relatório da última execução (ou None se ainda não correu)."""
+    return _last_report
+
+
+async def _retention_loop() -> None:
+    while True:
+        try:
+            await run_retention_cycle()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Retenção: erro inesperado no ciclo: {e}")
+        await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
+
+
+def start_retention_worker() -> None:
+    """Agenda o job de retenção no event loop atual (chamar no startup)."""
+    global _retention_task
+    if not settings.RETENTION_ENABLED:
+        logger.info("Retenção desativada (RETENTION_ENABLED=False).")
+        return
+    if _retention_task is None or _retention_task.done():
+        _retention_task = asyncio.create_task(_retention_loop(), name="auth-retention")
+        logger.info(f"Job de retenção iniciado (intervalo: {settings.RETENTION_INTERVAL_SECONDS}s).")
+
+
+async def stop_retention_worker() -> None:
+    """Cancela o job de retenção (chamar no shutdown)."""
+    global _retention_task
+    if _retention_task is not None:
+        _retention_task.cancel()
+        try:
+            await _retention_task
+        except asyncio.CancelledError:
+            pass
+        _retention_task = None
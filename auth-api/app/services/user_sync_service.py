@@ -0,0 +1,256 @@
+# auth_api/app/services/user_sync_service.py
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import encrypt_secret, decrypt_secret
+from app.db.session import get_session_local, run_after_commit
+from app.crud.base import OUTBOX_PENDING, OUTBOX_FAILED
+from app.crud.crud_user_sync_event import crud_user_sync_event
+from app.models.user_sync_event import UserSyncEvent
+
+# Propagação de utilizadores para os outros serviços (fleet, sales...) via gateway.
+# As rotas de admin só gravam eventos em user_sync_events (mesmo pedido, sem rede);
+# este worker entrega-os em paralelo, com um cliente HTTP partilhado (pool keep-alive)
+# e retry com backoff, até os serviços convergirem.
+SYNC_HTTP_METHODS = {"create": "POST", "update": "PUT", "delete": "DELETE"}
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+_sync_client: Optional[httpx.AsyncClient] = None
+_sync_transport_override: Optional[httpx.AsyncBaseTransport] = None
+_sync_slots: Optional[asyncio.Semaphore] = None
+_sync_task: Optional[asyncio.Task] = None
+_sync_wakeup: Optional[asyncio.Event] = None
+_last_batch: Optional[Dict[str, Any]] = None
+
+
+# --- CLIENTE HTTP PARTILHADO ---
+def get_user_sync_client() -> httpx.AsyncClient:
+    """Retorna o cliente HTTP partilhado, criando-o na primeira utilização."""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        transport = _sync_transport_override or httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.USER_SYNC_MAX_CONCURRENCY,
+                max_keepalive_connections=settings.USER_SYNC_MAX_CONCURRENCY,
+            ),
+        )
+        _sync_client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(settings.USER_SYNC_TIMEOUT_SECONDS),
+            headers={"X-API-Key": settings.INTERNAL_API_KEY},
+        )
+    return _sync_client
+
+
+def _get_sync_slots() -> asyncio.Semaphore:
+    global _sync_slots
+    if _sync_slots is None:
+        _sync_slots = asyncio.Semaphore(settings.USER_SYNC_MAX_CONCURRENCY)
+    return _sync_slots
+
+
+async def set_user_sync_transport(transport: Optional[httpx.AsyncBaseTransport]) -> None:
+    """Substitui o transporte do cliente (ex: httpx.MockTransport em testes). None repõe o padrão."""
+    global _sync_transport_override
+    _sync_transport_override = transport
+    await close_user_sync_client()
+
+
+async def close_user_sync_client() -> None:
+    """Fecha o cliente partilhado (chamar no shutdown da aplicação)."""
+    global _sync_client, _sync_slots
+    if _sync_client is not None:
+        await _sync_client.aclose()
+        _sync_client = None
+    _sync_slots = None
+# --- FIM CLIENTE HTTP PARTILHADO ---
+
+
+def notify_user_sync() -> None:
+    """Acorda o worker para entregar já (sem esperar pelo próximo varrimento)."""
+    if _sync_wakeup is not None:
+        _sync_wakeup.set()
+
+
+# --- Enfileiramento (chamado pelas rotas de admin) ---
+def _with_sealed_password(data: Dict[str, Any]) -> Dict[str, Any]:
+    """A senha em claro nunca é gravada: vai cifrada em 'password_encrypted'."""
+    payload = {k: v for k, v in data.items() if k != "password"}
+    if data.get("password"):
+        payload["password_encrypted"] = encrypt_secret(data["password"])
+    return payload
+
+
+def _notify(db: AsyncSession, *, commit: bool) -> None:
+    # Com commit=False os eventos só existem depois do commit de quem chama
+    if commit:
+        notify_user_sync()
+    else:
+        run_after_commit(db, notify_user_sync)
+
+
+async def enqueue_user_created(
+    db: AsyncSession, *, user_id: int, data: Dict[str, Any], commit: bool = True
+) -> None:
+    await crud_user_sync_event.enqueue_for_user(
+        db, user_id=user_id, action="create", payload=_with_sealed_password(data), commit=commit
+    )
+    _notify(db, commit=commit)
+
+
+async def enqueue_user_updated(
+    db: AsyncSession, *, user_id: int, email: str, changes: Dict[str, Any], commit: bool = True
+) -> None:
+    # 'email' identifica o utilizador no serviço downstream (valor antes da alteração)
+    payload = _with_sealed_password({**changes, "lookup_email": email})
+    await crud_user_sync_event.enqueue_for_user(
+        db, user_id=user_id, action="update", payload=payload, commit=commit
+    )
+    _notify(db, commit=commit)
+
+
+async def enqueue_user_deleted(db: AsyncSession, *, user_id: int, email: str, commit: bool = True) -> None:
+    await crud_user_sync_event.enqueue_for_user(
+        db, user_id=user_id, action="delete", payload={"email": email}, commit=commit
+    )
+    _notify(db, commit=commit)
+
+
+# --- Entrega ---
+def _request_body(event: UserSyncEvent) -> Dict[str, Any]:
+    body = dict(event.payload or {})
+    sealed = body.pop("password_encrypted", None)
+    if sealed:
+        password = decrypt_secret(sealed)
+        if password is None:
+            raise ValueError("Senha cifrada ilegível (SECRET_KEY alterada?)")
+        body["password"] = password
+    return body
+
+
+async def _deliver_event(event: UserSyncEvent) -> Tuple[Optional[str], bool]:
+    """Envia um evento. Retorna (erro ou None, erro é transitório)."""
+    url = settings.USER_SYNC_TARGETS.get(event.target)
+    if not url:
+        return f"Serviço '{event.target}' não está em USER_SYNC_TARGETS", False
+    try:
+        body = _request_body(event)
+    except ValueError as e:
+        return str(e), False
+    try:
+        async with _get_sync_slots():
+            response = await get_user_sync_client().request(
+                SYNC_HTTP_METHODS[event.action], url, json=body
+            )
+    except (httpx.TransportError, httpx.TimeoutException) as e:
+        return f"Erro de rede: {e!r}", True
+    if 200 <= response.status_code < 300:
+        return None, False
+    error = f"HTTP {response.status_code}: {response.text[:500]}"
+    return error, response.status_code in RETRYABLE_STATUS_CODES
+
+
+async def deliver_user_sync_batch() -> Dict[str, Any]:
+    """Reclama um lote de eventos, entrega-os em paralelo e grava o resultado."""
+    global _last_batch
+    SessionLocal = get_session_local()
+    start = time.perf_counter()
+
+    async with SessionLocal() as db:
+        events = await crud_user_sync_event.claim_ready_events(
+            db, limit=settings.USER_SYNC_BATCH_SIZE, lease_seconds=settings.USER_SYNC_LEASE_SECONDS
+        )
+    if not events:
+        return {"claimed": 0, "sent": 0, "retrying": 0, "failed": 0, "duration_seconds": 0.0}
+
+    results = await asyncio.gather(*(_deliver_event(event) for event in events))
+
+    sent_ids = [e.id for e, (error, _) in zip(events, results) if error is None]
+    retrying = failed = 0
+    async with SessionLocal() as db:
+        await crud_user_sync_event.mark_delivered(db, ids=sent_ids)
+        for event, (error, retryable) in zip(events, results):
+            if error is None:
+                continue
+            status = await crud_user_sync_event.mark_failed(db, item=event, error=error, retryable=retryable)
+            if status == OUTBOX_FAILED:
+                failed += 1
+                logger.error(f"Sync: {event.action} do user {event.user_id} para '{event.target}' desistido: {error}")
+            else:
+                retrying += 1
+                logger.warning(f"Sync: {event.action} do user {event.user_id} para '{event.target}' falhou (tentativa {event.attempts}): {error}")
+
+    _last_batch = {
+        "claimed": len(events),
+        "sent": len(sent_ids),
+        "retrying": retrying,
+        "failed": failed,
+        "duration_seconds": round(time.perf_counter() - start, 3),
+    }
+    return _last_batch
+
+
+async def drain_user_sync() -> int:
+    """Entrega lotes até não haver eventos prontos. Retorna o número de eventos entregues."""
+    total_sent = 0
+    while True:
+        report = await deliver_user_sync_batch()
+        total_sent += report["sent"]
+        if report["claimed"] == 0:
+            return total_sent
+        await asyncio.sleep(0) # Cede o event loop entre lotes
+
+
+async def get_user_sync_stats() -> Dict[str, Any]:
+    """Eventos pendentes, falhados e o último lote (para monitorização)."""
+    async with get_session_local()() as db:
+        pending = await crud_user_sync_event.count_by_status(db, status=OUTBOX_PENDING)
+        failed = await crud_user_sync_event.count_by_status(db, status=OUTBOX_FAILED)
+    return {"pending": pending, "failed": failed, "last_batch": _last_batch}
+
+
+async def _sync_loop() -> None:
+    global _sync_wakeup
+    _sync_wakeup = asyncio.Event()
+    while True:
+        _sync_wakeup.clear()
+        try:
+            await drain_user_sync()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Sync: erro inesperado ao propagar utilizadores: {e}")
+        try:
+            await asyncio.wait_for(_sync_wakeup.wait(), timeout=settings.USER_SYNC_POLL_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_user_sync_worker() -> None:
+    """Agenda o worker de sincronização no event loop atual (chamar no startup)."""
+    global _sync_task
+    if not settings.USER_SYNC_ENABLED:
+        logger.info("Worker de sincronização de utilizadores desativado (USER_SYNC_ENABLED=False).")
+        return
+    if _sync_task is None or _sync_task.done():
+        _sync_task = asyncio.create_task(_sync_loop(), name="auth-user-sync")
+        logger.info(f"Worker de sincronização de utilizadores iniciado (serviços: {list(settings.USER_SYNC_TARGETS)}).")
+
+
+async def stop_user_sync_worker() -> None:
+    """Cancela o worker (chamar no shutdown). Eventos por entregar ficam na tabela."""
+    global _sync_task, _sync_wakeup
+    if _sync_task is not None:
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
+        _sync_task = None
+    _sync_wakeup = None
@@ -1,27 +1,39 @@
 # auth_api/main.py
-from fastapi import FastAPI, Request, Depends
+import time
+from fastapi import FastAPI, Request, Depends, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 # --- Imports de Segurança ---
 # IMPORTAR HTTPBearer
 from fastapi.security import OAuth2PasswordBearer, APIKeyHeader, HTTPBearer
 # --- Fim Imports ---
 
 # --- Adicionar imports do slowapi ---
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
+from app.core.rate_limit import limiter # Limiter partilhado (backend: RATE_LIMIT_STORAGE_URI)
 # --- Fim imports slowapi ---
 from app.db.session import dispose_engine
+from app.core.config import settings
+from app.core.metrics import HTTP_REQUEST_DURATION, record_security_event
+from app.core.security import shutdown_hash_executor
+from app.core.exceptions import PasswordHashingBusyException
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.services.retention_service import start_retention_worker, stop_retention_worker
+from app.services.email_service import close_email_client
+from app.services.email_outbox_service import start_email_outbox_worker, stop_email_outbox_worker
+from app.services.user_sync_service import start_user_sync_worker, stop_user_sync_worker, close_user_sync_client
+from app.services.google_oauth_service import close_google_client
 # Importar routers
-from app.api.endpoints import auth, users, mgmt
+from app.api.endpoints import auth, users, mgmt, well_known
 # Importar dependência de chave de API E OS NOVOS ESQUEMAS
 from app.api.dependencies import get_api_key, oauth2_scheme, bearer_scheme, api_key_scheme
 
 # Importar modelos para Alembic/Base.metadata
 from app.db.base import Base # noqa
-from app.models import user, refresh_token # noqa
+from app.models import user, refresh_token, email_outbox, user_sync_event, access_token_revocation # noqa
 
 # --- REMOVER DEFINIÇÕES DE ESQUEMAS DAQUI ---
 # Elas agora são importadas de 'dependencies.py'
@@ -30,8 +42,6 @@ from app.models import user, refresh_token # noqa
 # --- FIM REMOÇÃO ---
 
 
-limiter = Limiter(key_func=get_remote_address, default_limits=["10/minute"])
-
 app = FastAPI(
     title="Auth API",
     description="API Centralizada de Autenticação",
@@ -52,7 +62,20 @@ app = FastAPI(
 )
 
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    record_security_event("rate_limited_ip")
+    return _rate_limit_exceeded_handler(request, exc)
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
+
+@app.exception_handler(PasswordHashingBusyException)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusyException):
+    # Pool de hashing saturada: pedir ao cliente para tentar novamente em breve
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Serviço de autenticação sobrecarregado. Tente novamente em instantes."},
+        headers={"Retry-After": "1"},
+    )
 app.add_middleware(SlowAPIMiddleware)
 
 origins = [
@@ -66,8 +89,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER], # Paginação por cursor das listagens
 )
 
+# Registado por último = middleware mais externo: a latência inclui CORS e rate limiting
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if not settings.METRICS_ENABLED:
+        return await call_next(request)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Template da rota (ex: /api/v1/auth/sessions/{session_id}) para não explodir a cardinalidade
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+        ).observe(time.perf_counter() - start)
+
 # Incluir routers da API
 api_prefix = "/api/v1"
 
@@ -96,6 +140,14 @@ app.include_router(
     # dependencies=[Depends(oauth2_scheme)] # <-- REMOVA ESTA LINHA
 )
 
+# --- Router de Descoberta (JWKS) ---
+# Público e cacheável: chaves públicas para verificação local dos access tokens
+app.include_router(
+    well_known.router,
+    prefix=api_prefix,
+    tags=["Discovery"],
+)
+
 # --- Router de Gerenciamento ---
 # Protegido APENAS pela chave de API
 app.include_router(
@@ -108,12 +160,40 @@ app.include_router(
 )
 
 
+@app.on_event("startup")
+async def startup_event():
+    # Job periódico que apaga refresh tokens/dispositivos expirados e códigos usados
+    start_retention_worker()
+    # Worker que entrega os emails enfileirados no outbox
+    start_email_outbox_worker()
+    # Worker que propaga criações/alterações/remoções de utilizadores (fleet, sales...)
+    start_user_sync_worker()
+
 @app.on_event("shutdown")
 async def shutdown_event():
+    await stop_retention_worker()
+    await stop_email_outbox_worker()
+    await stop_user_sync_worker()
     print("Shutting down: Disposing database engine...")
     await dispose_engine()
     print("Database engine disposed.")
+    shutdown_hash_executor()
+    print("Password hashing pool shut down.")
+    await close_email_client()
+    print("Email HTTP client closed.")
+    await close_user_sync_client()
+    print("User sync HTTP client closed.")
+    await close_google_client()
+    print("Google OAuth HTTP client closed.")
 
 @app.get("/")
 def read_root():
-    return {"message": "Auth API is running!"}
\ No newline at end of file
+    return {"message": "Auth API is running!"}
+
+@app.get("/metrics", include_in_schema=False)
+@limiter.exempt
+async def metrics(request: Request):
+    """Exposição Prometheus (latência por rota, pool da BD, bcrypt, eventos de segurança)."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
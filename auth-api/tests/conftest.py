@@ -0,0 +1,60 @@
+# auth-api/tests/conftest.py
+import os
+
+# --- Variáveis mínimas para carregar as Settings sem um .env real ---
+# (definidas antes de qualquer import de 'app', que lê as configurações no import)
+_TEST_ENV = {
+    "DATABASE_URL": "sqlite+aiosqlite:///./test_auth.db",
+    "SECRET_KEY": "test-secret",
+    "REFRESH_SECRET_KEY": "test-refresh-secret",
+    "RESET_PASSWORD_SECRET_KEY": "test-reset-secret",
+    "MFA_CHALLENGE_SECRET_KEY": "test-mfa-secret",
+    "INTERNAL_API_KEY": "test-internal-key",
+    "FIRST_SUPERUSER_EMAIL": "admin@test.com",
+    "FIRST_SUPERUSER_PASSWORD": "Admin123!",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7",
+    "EMAIL_VERIFICATION_TOKEN_EXPIRE_MINUTES": "60",
+    "RESET_PASSWORD_TOKEN_EXPIRE_MINUTES": "30",
+    "MFA_CHALLENGE_EXPIRE_MINUTES": "5",
+    "LOGIN_MAX_FAILED_ATTEMPTS": "5",
+    "LOGIN_LOCKOUT_MINUTES": "15",
+    "JWT_ISSUER": "http://test",
+    "JWT_AUDIENCE": "test-api",
+    "TRUSTED_DEVICE_COOKIE_NAME": "trusted_device",
+    "TRUSTED_DEVICE_COOKIE_MAX_AGE_DAYS": "30",
+    "EMAIL_BACKEND": "stub",
+    "RETENTION_ENABLED": "false",
+    "EMAIL_OUTBOX_ENABLED": "false",
+    "USER_SYNC_ENABLED": "false",
+}
+for _key, _value in _TEST_ENV.items():
+    os.environ.setdefault(_key, _value)
+
+
+import pytest  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import dispose_engine, get_async_engine, get_session_local  # noqa: E402
+from app.models import (  # noqa: E402,F401 (registam as tabelas no metadata)
+    access_token_revocation, email_outbox, mfa_recovery_code, refresh_token, trusted_device, user, user_sync_event,
+)
+
+_schema_created = False
+
+
+@pytest.fixture
+async def db():
+    """
+    Factory de sessões da base de testes (sqlite em ./test_auth.db). O ficheiro fica
+    entre execuções: o esquema é recriado (drop_all + create_all) na primeira
+    utilização de cada execução, para acompanhar os modelos. O engine é descartado
+    no fim de cada teste.
+    """
+    global _schema_created
+    if not _schema_created:
+        async with get_async_engine().begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        _schema_created = True
+    yield get_session_local()
+    await dispose_engine()
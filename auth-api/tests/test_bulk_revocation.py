@@ -0,0 +1,97 @@
+# auth-api/tests/test_bulk_revocation.py
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.core import security
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+API_KEY = {"X-API-Key": "test-internal-key"}
+
+
+@pytest.fixture
+async def sessions_db(db):
+    async with db() as session:
+        existing = (await session.execute(select(User.id).where(User.email == "bulk@test.com"))).scalar()
+        if existing:
+            await session.execute(delete(RefreshToken).where(RefreshToken.user_id == existing))
+            await session.execute(delete(User).where(User.id == existing))
+        user = User(email="bulk@test.com", hashed_password="x", is_active=True, is_verified=True)
+        session.add(user)
+        await session.commit()
+        # Dois logins no telemóvel (um deles há 40 dias), um no portátil e um sem User-Agent
+        for user_agent, ip_address in (("phone", "10.0.0.1"), ("phone", "10.0.0.2"), ("laptop", "10.0.0.1"), (None, None)):
+            token, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
+            await crud_refresh_token.create_refresh_token(
+                session, user=user, token=token, expires_at=expires_at, ip_address=ip_address, user_agent=user_agent
+            )
+        await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user.id, RefreshToken.ip_address == "10.0.0.2")
+            .values(created_at=datetime.utcnow() - timedelta(days=40))
+        )
+        await session.commit()
+        user_id = user.id
+    yield db, user_id
+
+
+async def _active(SessionLocal, user_id: int):
+    async with SessionLocal() as db:
+        stmt = select(RefreshToken.user_agent, RefreshToken.ip_address).where(
+            RefreshToken.user_id == user_id, RefreshToken.is_revoked == False
+        )
+        return sorted((await db.execute(stmt)).all(), key=str)
+
+
+async def _post(path: str, body: dict) -> httpx.Response:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(f"/api/v1/mgmt{path}", json=body, headers=API_KEY)
+
+
+async def test_revoke_by_device_matches_user_agent_and_optional_ip(sessions_db):
+    SessionLocal, user_id = sessions_db
+
+    response = await _post(f"/users/{user_id}/sessions/revoke-device", {"user_agent": "phone", "ip_address": "10.0.0.1"})
+    assert response.json() == {"revoked": 1}
+
+    response = await _post(f"/users/{user_id}/sessions/revoke-device", {"user_agent": "phone"})
+    assert response.json() == {"revoked": 1}
+    assert await _active(SessionLocal, user_id) == sorted([(None, None), ("laptop", "10.0.0.1")], key=str)
+
+    # Sem User-Agent: só as sessões que também não o registaram
+    response = await _post(f"/users/{user_id}/sessions/revoke-device", {})
+    assert response.json() == {"revoked": 1}
+    assert await _active(SessionLocal, user_id) == [("laptop", "10.0.0.1")]
+
+
+async def test_revoke_older_than_only_touches_old_sessions(sessions_db):
+    SessionLocal, user_id = sessions_db
+    cutoff = (datetime.utcnow() - timedelta(days=30)).isoformat()
+
+    response = await _post("/sessions/revoke-older-than", {"created_before": cutoff, "user_id": user_id})
+    assert response.json() == {"revoked": 1}
+    assert ("phone", "10.0.0.2") not in await _active(SessionLocal, user_id)
+    assert len(await _active(SessionLocal, user_id)) == 3
+
+    # Já revogadas não contam de novo
+    response = await _post("/sessions/revoke-older-than", {"created_before": cutoff, "user_id": user_id})
+    assert response.json() == {"revoked": 0}
+
+
+async def test_bulk_revocation_puts_sessions_on_the_access_token_revocation_list(sessions_db):
+    SessionLocal, user_id = sessions_db
+    async with SessionLocal() as db:
+        stmt = select(RefreshToken.family_id).where(RefreshToken.user_id == user_id, RefreshToken.user_agent == "laptop")
+        family_id = (await db.execute(stmt)).scalar_one()
+
+    await _post(f"/users/{user_id}/sessions/revoke-device", {"user_agent": "laptop"})
+
+    from app.core.revocation import revocation_set
+    assert revocation_set.is_revoked({"sid": family_id})
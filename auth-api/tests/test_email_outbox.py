@@ -0,0 +1,158 @@
+# auth-api/tests/test_email_outbox.py
+import httpx
+import pytest
+from sqlalchemy import select, delete
+
+from app.models.email_outbox import EmailOutbox
+from app.models.user import User
+from app.crud.crud_email_outbox import crud_email_outbox
+from app.services import email_service, email_outbox_service
+
+
+@pytest.fixture
+async def outbox_db(db, monkeypatch):
+    monkeypatch.setattr(email_service.settings, "EMAIL_OUTBOX_BATCH_SIZE", 2)
+    async with db() as session:
+        await session.execute(delete(EmailOutbox))
+        await session.commit()
+    yield db
+    await email_service.set_email_transport(None)
+
+
+async def _messages(SessionLocal):
+    async with SessionLocal() as db:
+        return (await db.execute(select(EmailOutbox).order_by(EmailOutbox.id))).scalars().all()
+
+
+async def test_enqueue_is_a_single_insert_and_worker_drains_in_batches(outbox_db):
+    email_service.stub_outbox.clear()
+    async with outbox_db() as db:
+        for i in range(5):
+            await email_outbox_service.enqueue_password_reset_email(db, email_to=f"u{i}@test.com", reset_token="tok")
+
+    # Nada é enviado até o worker correr
+    assert email_service.stub_outbox == []
+
+    sent = await email_outbox_service.drain_email_outbox()
+
+    assert sent == 5
+    assert len(email_service.stub_outbox) == 5
+    messages = await _messages(outbox_db)
+    assert {m.status for m in messages} == {"sent"}
+    assert all(m.attempts == 1 and m.sent_at is not None for m in messages)
+
+
+async def test_tokens_are_sealed_in_the_queue_and_cleared_once_sent(outbox_db):
+    email_service.stub_outbox.clear()
+    async with outbox_db() as db:
+        await email_outbox_service.enqueue_verification_email(db, email_to="v@test.com", verification_token="tok-verify")
+        await email_outbox_service.enqueue_password_reset_email(db, email_to="r@test.com", reset_token="tok-reset")
+
+    queued = await _messages(outbox_db)
+    assert [m.template for m in queued] == ["verification", "password_reset"]
+    for message in queued:
+        assert message.html_content is None
+        assert "tok-" not in message.template_params_encrypted
+
+    assert await email_outbox_service.drain_email_outbox() == 2
+    # O link chega ao destinatário, mas não fica na tabela depois do envio
+    assert "tok-verify" in email_service.stub_outbox[0]["htmlContent"]
+    assert "tok-reset" in email_service.stub_outbox[1]["htmlContent"]
+    for message in await _messages(outbox_db):
+        assert message.status == "sent"
+        assert message.html_content is None and message.template_params_encrypted is None
+
+
+async def test_unreadable_sealed_params_fail_without_retry(outbox_db):
+    async with outbox_db() as db:
+        message = await email_outbox_service.enqueue_password_reset_email(db, email_to="r@test.com", reset_token="t")
+        message.template_params_encrypted = "token-invalido"
+        await db.commit()
+
+    report = await email_outbox_service.deliver_outbox_batch()
+    assert report == {**report, "claimed": 1, "sent": 0, "failed": 1}
+    [message] = await _messages(outbox_db)
+    assert message.status == "failed" and "ilegíveis" in message.last_error
+
+
+async def test_failures_are_recorded_and_rescheduled_then_given_up(outbox_db, monkeypatch):
+    monkeypatch.setattr(email_service.settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(email_service.settings, "EMAIL_OUTBOX_RETRY_BASE_SECONDS", 0)
+    await email_service.set_email_transport(httpx.MockTransport(lambda request: httpx.Response(503, text="indisponível")))
+
+    async with outbox_db() as db:
+        await email_outbox_service.enqueue_email(db, email_to="a@test.com", subject="s", html_content="h")
+
+    report = await email_outbox_service.deliver_outbox_batch()
+    assert report == {**report, "claimed": 1, "sent": 0, "retrying": 1, "failed": 0}
+    [message] = await _messages(outbox_db)
+    assert message.status == "pending" and message.attempts == 1
+    assert message.last_error.startswith("HTTP 503")
+
+    report = await email_outbox_service.deliver_outbox_batch()
+    assert report["failed"] == 1
+    [message] = await _messages(outbox_db)
+    assert message.status == "failed" and message.attempts == 2
+
+    # Mensagens falhadas não voltam a ser reclamadas
+    assert (await email_outbox_service.deliver_outbox_batch())["claimed"] == 0
+
+
+async def _post(path: str, body: dict) -> httpx.Response:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(f"/api/v1{path}", json=body)
+
+
+async def _user(SessionLocal, email: str):
+    async with SessionLocal() as db:
+        return (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
+
+
+@pytest.fixture
+async def signup_email(outbox_db):
+    async with outbox_db() as db:
+        await db.execute(delete(User).where(User.email == "signup@test.com"))
+        await db.commit()
+    return "signup@test.com"
+
+
+async def test_signup_commits_user_and_verification_email_together(outbox_db, signup_email):
+    response = await _post("/users/", {"email": signup_email, "password": "Secret123!"})
+
+    assert response.status_code == 201
+    assert await _user(outbox_db, signup_email) is not None
+    [message] = await _messages(outbox_db)
+    assert message.email_to == signup_email and message.status == "pending"
+
+
+async def test_signup_is_rolled_back_when_the_email_cannot_be_queued(outbox_db, signup_email, monkeypatch):
+    async def broken_enqueue(*args, **kwargs):
+        raise RuntimeError("outbox indisponível")
+    monkeypatch.setattr(crud_email_outbox, "enqueue", broken_enqueue)
+
+    response = await _post("/users/", {"email": signup_email, "password": "Secret123!"})
+
+    assert response.status_code == 500
+    # Sem email de verificação não fica uma conta por verificar para sempre
+    assert await _user(outbox_db, signup_email) is None
+
+
+async def test_reset_token_is_not_stored_without_its_email(outbox_db, signup_email, monkeypatch):
+    async with outbox_db() as db:
+        db.add(User(email=signup_email, hashed_password="x", is_active=True, is_verified=True))
+        await db.commit()
+
+    async def broken_enqueue(*args, **kwargs):
+        raise RuntimeError("outbox indisponível")
+    monkeypatch.setattr(crud_email_outbox, "enqueue", broken_enqueue)
+    response = await _post("/auth/forgot-password", {"email": signup_email})
+    assert response.status_code == 202
+    assert (await _user(outbox_db, signup_email)).reset_password_token_hash is None
+
+    monkeypatch.delattr(crud_email_outbox, "enqueue") # Volta ao método da classe
+    await _post("/auth/forgot-password", {"email": signup_email})
+    assert (await _user(outbox_db, signup_email)).reset_password_token_hash is not None
+    assert [m.email_to for m in await _messages(outbox_db)] == [signup_email]
@@ -0,0 +1,74 @@
+# auth-api/tests/test_email_service.py
+import httpx
+
+from app.services import email_service
+
+
+async def test_stub_backend_records_messages_offline():
+    email_service.stub_outbox.clear()
+    await email_service.set_email_transport(None)
+
+    sent = await email_service.send_email_http_api("user@test.com", "Assunto", "<p>Olá</p>")
+
+    assert sent is True
+    assert email_service.stub_outbox[-1]["to"] == [{"email": "user@test.com"}]
+    await email_service.close_email_client()
+
+
+async def test_client_is_reused_and_transient_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(email_service.settings, "EMAIL_RETRY_BACKOFF_SECONDS", 0.0)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        # Primeira tentativa falha com 503, a segunda é aceite
+        return httpx.Response(503 if len(calls) == 1 else 201, json={})
+
+    await email_service.set_email_transport(httpx.MockTransport(handler))
+    client = email_service.get_email_client()
+
+    assert await email_service.send_email_http_api("a@test.com", "s", "h") is True
+    assert await email_service.send_email_http_api("b@test.com", "s", "h") is True
+    assert len(calls) == 3
+    assert email_service.get_email_client() is client
+
+    await email_service.set_email_transport(None)
+
+
+async def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(email_service.settings, "EMAIL_RETRY_BACKOFF_SECONDS", 0.0)
+    monkeypatch.setattr(email_service.settings, "EMAIL_MAX_RETRIES", 2)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        raise httpx.ConnectError("offline", request=request)
+
+    await email_service.set_email_transport(httpx.MockTransport(handler))
+
+    assert await email_service.send_email_http_api("a@test.com", "s", "h") is False
+    assert len(calls) == 3
+
+    await email_service.set_email_transport(None)
+
+
+async def test_retry_after_is_capped(monkeypatch):
+    monkeypatch.setattr(email_service.settings, "EMAIL_RETRY_MAX_DELAY", 0.01)
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(email_service.asyncio, "sleep", sleep)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "3600"}) if len(calls) == 1 else httpx.Response(201, json={})
+
+    await email_service.set_email_transport(httpx.MockTransport(handler))
+
+    assert await email_service.send_email_http_api("a@test.com", "s", "h") is True
+    assert delays == [0.01]
+
+    await email_service.set_email_transport(None)
@@ -0,0 +1,128 @@
+# auth-api/tests/test_google_oauth.py
+import time
+from collections import Counter
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.models.refresh_token import RefreshToken
+from app.models.trusted_device import TrustedDevice
+from app.models.user import User
+from app.services import google_oauth_service
+
+ISSUER = "https://accounts.fake-google.test"
+CLIENT_ID = "client-123.apps.googleusercontent.com"
+
+
+class FakeGoogleProvider:
+    """Provedor OIDC local: descoberta, JWKS, token e userinfo, com contagem de pedidos."""
+
+    def __init__(self):
+        self.hits = Counter()
+        self.audience = CLIENT_ID
+        self.rotate_key()
+
+    def rotate_key(self):
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.pem = private.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        self.kid = f"key-{time.monotonic_ns()}"
+        self.jwk = {**jwk.construct(self.pem, "RS256").public_key().to_dict(), "kid": self.kid, "alg": "RS256"}
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.hits[path] += 1
+        if path == "/.well-known/openid-configuration":
+            return httpx.Response(200, json={
+                "issuer": ISSUER,
+                "authorization_endpoint": f"{ISSUER}/auth",
+                "token_endpoint": f"{ISSUER}/token",
+                "userinfo_endpoint": f"{ISSUER}/userinfo",
+                "jwks_uri": f"{ISSUER}/certs",
+            }, headers={"Cache-Control": "public, max-age=3600"})
+        if path == "/certs":
+            return httpx.Response(200, json={"keys": [self.jwk]}, headers={"Cache-Control": "public, max-age=3600"})
+        if path == "/token":
+            code = dict(httpx.QueryParams(request.content.decode()))["code"]
+            if code == "expired":
+                return httpx.Response(400, json={"error": "invalid_grant"})
+            now = int(time.time())
+            claims = {
+                "iss": ISSUER, "aud": self.audience, "sub": "g-42", "iat": now, "exp": now + 3600,
+                "email": "sso@test.com", "email_verified": True, "name": "SSO User",
+            }
+            id_token = jwt.encode(claims, self.pem, algorithm="RS256", headers={"kid": self.kid}, access_token="at-1")
+            return httpx.Response(200, json={"access_token": "at-1", "id_token": id_token})
+        if path == "/userinfo":
+            assert request.headers["Authorization"] == "Bearer at-1"
+            return httpx.Response(200, json={"sub": "g-42", "email": "sso@test.com", "email_verified": True, "name": "SSO User"})
+        return httpx.Response(404)
+
+
+@pytest.fixture
+async def google(db, monkeypatch):
+    monkeypatch.setattr(settings, "GOOGLE_CLIENT_ID", CLIENT_ID)
+    monkeypatch.setattr(settings, "GOOGLE_CLIENT_SECRET", "secret")
+    monkeypatch.setattr(settings, "GOOGLE_REDIRECT_URI_FRONTEND", "http://localhost:5173/auth/google")
+    monkeypatch.setattr(settings, "GOOGLE_DISCOVERY_URL", f"{ISSUER}/.well-known/openid-configuration")
+    provider = FakeGoogleProvider()
+    await google_oauth_service.set_google_transport(httpx.MockTransport(provider.handler))
+    async with db() as session:
+        existing = (await session.execute(select(User.id).where(User.email == "sso@test.com"))).scalar()
+        if existing:
+            for model in (RefreshToken, TrustedDevice):
+                await session.execute(delete(model).where(model.user_id == existing))
+            await session.execute(delete(User).where(User.id == existing))
+            await session.commit()
+    yield provider
+    await google_oauth_service.set_google_transport(None)
+
+
+async def _callback(code: str) -> httpx.Response:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/api/v1/auth/google/callback", json={"code": code})
+
+
+async def test_callback_verifies_id_token_locally_with_cached_keys(google):
+    client = google_oauth_service.get_google_client()
+
+    first, second = await _callback("code-1"), await _callback("code-2")
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json()["access_token"]
+    # Um pedido à Google por login; descoberta e JWKS só na primeira vez; sem userinfo
+    assert google.hits == Counter({"/.well-known/openid-configuration": 1, "/certs": 1, "/token": 2})
+    assert google_oauth_service.get_google_client() is client
+
+    from main import app
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as api:
+        login_url = (await api.get("/api/v1/auth/google/login-url")).json()["url"]
+    assert login_url.startswith(f"{ISSUER}/auth?client_id={CLIENT_ID}")
+
+
+async def test_callback_rejects_bad_codes_and_tokens_and_follows_key_rotation(google, monkeypatch):
+    assert (await _callback("expired")).status_code == 400
+
+    google.audience = "someone-else"
+    assert (await _callback("code-1")).status_code == 400
+
+    # Chave nova (kid desconhecido): o JWKS é relido em vez de rejeitar o login
+    google.audience = CLIENT_ID
+    monkeypatch.setattr(google_oauth_service, "JWKS_MIN_REFRESH_SECONDS", 0)
+    google.rotate_key()
+    assert (await _callback("code-2")).status_code == 200
+    assert google.hits["/certs"] == 2
+
+    monkeypatch.setattr(settings, "GOOGLE_FETCH_USERINFO", True)
+    assert (await _callback("code-3")).status_code == 200
+    assert google.hits["/userinfo"] == 1
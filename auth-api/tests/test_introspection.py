@@ -0,0 +1,76 @@
+# auth-api/tests/test_introspection.py
+import httpx
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.core import security
+from app.core.config import settings
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.services import introspection_service
+
+API_KEY_HEADERS = {"X-API-Key": "test-internal-key"}
+
+
+@pytest.fixture
+async def introspection_user(db):
+    async with db() as session:
+        existing = (await session.execute(select(User.id).where(User.email == "gateway@test.com"))).scalar()
+        if existing:
+            await session.execute(delete(RefreshToken).where(RefreshToken.user_id == existing))
+            await session.execute(delete(User).where(User.id == existing))
+        user = User(email="gateway@test.com", hashed_password="x", is_active=True, is_verified=True)
+        session.add(user)
+        await session.commit()
+    introspection_service.clear_introspection_cache()
+    yield db, user
+    introspection_service.clear_introspection_cache()
+
+
+async def _introspect(tokens, headers=API_KEY_HEADERS):
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post("/api/v1/auth/introspect", json={"tokens": tokens}, headers=headers)
+
+
+async def test_batch_introspection_reports_status_per_token(introspection_user):
+    SessionLocal, user = introspection_user
+    access = security.create_access_token(user=user, mfa_passed=False)
+    async with SessionLocal() as db:
+        live, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
+        await crud_refresh_token.create_refresh_token(db, user=user, token=live, expires_at=expires_at)
+        revoked, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
+        await crud_refresh_token.create_refresh_token(db, user=user, token=revoked, expires_at=expires_at)
+        await crud_refresh_token.revoke_refresh_token(db, token=revoked)
+
+    response = await _introspect([access, live, revoked, "not-a-jwt", access])
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["active", "active", "revoked", "invalid", "active"]
+    assert results[0]["sub"] == str(user.id)
+    assert results[0]["token_type"] == "access"
+    assert results[0]["claims"]["email"] == "gateway@test.com"
+    assert results[2]["claims"] is None
+
+
+async def test_introspection_requires_api_key_and_caches_results(introspection_user, monkeypatch):
+    SessionLocal, user = introspection_user
+    access = security.create_access_token(user=user, mfa_passed=False)
+
+    assert (await _introspect([access], headers={"X-API-Key": "wrong"})).status_code == 401
+    monkeypatch.setattr(settings, "INTROSPECTION_MAX_TOKENS", 2)
+    assert (await _introspect([access] * 3)).status_code == 413
+
+    assert (await _introspect([access])).json()["results"][0]["active"] is True
+    async with SessionLocal() as db:
+        await db.execute(update(User).where(User.id == user.id).values(is_active=False))
+        await db.commit()
+
+    # Dentro do TTL o resultado vem do cache; depois reflete o utilizador desativado
+    assert (await _introspect([access])).json()["results"][0]["active"] is True
+    introspection_service.clear_introspection_cache()
+    assert (await _introspect([access])).json()["results"][0]["status"] == "inactive_user"
@@ -0,0 +1,67 @@
+# auth-api/tests/test_login_lockout.py
+import asyncio
+
+import pytest
+from sqlalchemy import delete
+
+from app.core.config import settings
+from app.crud.crud_user import crud_user
+from app.models.user import User
+
+
+@pytest.fixture
+async def lockout_db(db):
+    async with db() as session:
+        await session.execute(delete(User).where(User.email == "lockout@test.com"))
+        user = User(email="lockout@test.com", hashed_password="x", is_active=True, is_verified=True)
+        session.add(user)
+        await session.commit()
+        user_id = user.id
+    yield db, user_id
+
+
+async def _concurrent_failures(SessionLocal, user_id: int, count: int):
+    async def attempt():
+        # Cada tentativa na sua própria sessão/ligação, como pedidos concorrentes
+        async with SessionLocal() as db:
+            user = await db.get(User, user_id)
+            return await crud_user.record_failed_login(db, user=user)
+
+    return await asyncio.gather(*(attempt() for _ in range(count)))
+
+
+async def _reload(SessionLocal, user_id: int) -> User:
+    async with SessionLocal() as db:
+        return await db.get(User, user_id)
+
+
+async def test_concurrent_failures_do_not_lose_increments(lockout_db, monkeypatch):
+    SessionLocal, user_id = lockout_db
+    monkeypatch.setattr(settings, "LOGIN_MAX_FAILED_ATTEMPTS", 1000)
+
+    await _concurrent_failures(SessionLocal, user_id, 25)
+
+    user = await _reload(SessionLocal, user_id)
+    assert user.failed_login_attempts == 25
+    assert user.locked_until is None
+
+
+async def test_concurrent_failures_lock_the_account_exactly_once(lockout_db, monkeypatch):
+    SessionLocal, user_id = lockout_db
+    monkeypatch.setattr(settings, "LOGIN_MAX_FAILED_ATTEMPTS", 5)
+
+    results = await _concurrent_failures(SessionLocal, user_id, 12)
+
+    # Só a 5ª tentativa bloqueia; as seguintes já encontram a conta bloqueada e não contam
+    assert len([locked_until for locked_until in results if locked_until]) == 1
+    user = await _reload(SessionLocal, user_id)
+    assert user.locked_until is not None
+    assert user.failed_login_attempts == 0
+
+    async with SessionLocal() as db:
+        user = await db.get(User, user_id)
+        await crud_user.reset_failed_logins(db, user=user)
+    user = await _reload(SessionLocal, user_id)
+    assert user.locked_until is None
+    assert user.failed_login_attempts == 0
+
@@ -0,0 +1,65 @@
+# auth-api/tests/test_metrics.py
+import httpx
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+from sqlalchemy import delete
+
+from app.core import security
+from app.core.rate_limit import reset_rate_limits
+from app.models.user import User
+
+
+@pytest.fixture
+async def metrics_user(db):
+    async with db() as session:
+        await session.execute(delete(User).where(User.email == "metrics@test.com"))
+        hashed = await security.get_password_hash_async("Secret123!")
+        session.add(User(email="metrics@test.com", hashed_password=hashed, is_active=True, is_verified=True))
+        await session.commit()
+    reset_rate_limits()
+    yield
+    reset_rate_limits()
+
+
+def _samples(text: str) -> dict:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+def _value(samples: dict, name: str, **labels) -> float:
+    return samples.get((name, tuple(sorted(labels.items()))), 0.0)
+
+
+async def test_metrics_expose_route_latency_hashing_pool_and_security_events(metrics_user):
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        before = _samples((await client.get("/metrics")).text)
+        assert (await client.post("/api/v1/auth/token", data={"username": "metrics@test.com", "password": "wrong"})).status_code == 400
+        assert (await client.post("/api/v1/auth/token", data={"username": "metrics@test.com", "password": "Secret123!"})).status_code == 200
+        unauthorized = (await client.delete("/api/v1/auth/sessions/123")).status_code
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    after = _samples(response.text)
+
+    def delta(name, **labels):
+        return _value(after, name, **labels) - _value(before, name, **labels)
+
+    token_route = {"method": "POST", "route": "/api/v1/auth/token"}
+    assert delta("auth_http_request_duration_seconds_count", status="400", **token_route) == 1
+    assert delta("auth_http_request_duration_seconds_count", status="200", **token_route) == 1
+    # Label com o template da rota, não o id do path
+    assert delta("auth_http_request_duration_seconds_count", method="DELETE", route="/api/v1/auth/sessions/{session_id}", status=str(unauthorized)) == 1
+
+    assert delta("auth_security_events_total", event="login_failure") == 1
+    assert delta("auth_security_events_total", event="login_success") == 1
+    assert delta("auth_password_hash_duration_seconds_count", operation="verify") == 2
+    assert delta("auth_db_query_duration_seconds_count") > 0
+    assert ("auth_db_pool_checked_out", (("engine", "primary"),)) in after
+    assert ("auth_db_pool_overflow", (("engine", "primary"),)) in after
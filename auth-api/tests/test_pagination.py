@@ -0,0 +1,63 @@
+# auth-api/tests/test_pagination.py
+import httpx
+import pytest
+from sqlalchemy import delete, select
+
+from app.core import security
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.principal_cache import principal_cache
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.crud.crud_trusted_device import crud_trusted_device
+from app.models.refresh_token import RefreshToken
+from app.models.trusted_device import TrustedDevice
+from app.models.user import User
+
+
+@pytest.fixture
+async def listing_user(db):
+    async with db() as session:
+        existing = (await session.execute(select(User.id).where(User.email == "kiosk@test.com"))).scalar()
+        if existing:
+            await session.execute(delete(RefreshToken).where(RefreshToken.user_id == existing))
+            await session.execute(delete(TrustedDevice).where(TrustedDevice.user_id == existing))
+            await session.execute(delete(User).where(User.id == existing))
+            principal_cache.invalidate(existing)
+        user = User(email="kiosk@test.com", hashed_password="x", is_active=True, is_verified=True)
+        session.add(user)
+        await session.commit()
+        for i in range(5):
+            token, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
+            await crud_refresh_token.create_refresh_token(session, user=user, token=token, expires_at=expires_at, user_agent=f"kiosk-{i}")
+            await crud_trusted_device.create_trusted_device(session, user=user, user_agent=f"kiosk-{i}")
+        # Uma sessão revogada não aparece na listagem
+        await crud_refresh_token.revoke_refresh_token(session, token=token)
+    yield db, user
+
+
+async def _walk(client, path: str, headers: dict, limit: int):
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(path, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append([item["user_agent"] for item in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+
+
+async def test_sessions_and_devices_are_paginated_by_cursor(listing_user):
+    from main import app
+
+    _, user = listing_user
+    headers = {"Authorization": f"Bearer {security.create_access_token(user=user, mfa_passed=False)}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        sessions = await _walk(client, "/api/v1/auth/sessions", headers, limit=2)
+        devices = await _walk(client, "/api/v1/auth/devices", headers, limit=2)
+        invalid = await client.get("/api/v1/auth/sessions", params={"cursor": "%%%"}, headers=headers)
+
+    # Mais recentes primeiro, sem repetições nem falhas entre páginas
+    assert sessions == [["kiosk-3", "kiosk-2"], ["kiosk-1", "kiosk-0"]]
+    assert devices == [["kiosk-4", "kiosk-3"], ["kiosk-2", "kiosk-1"], ["kiosk-0"]]
+    assert invalid.status_code == 400
@@ -0,0 +1,127 @@
+# auth-api/tests/test_password_hashing.py
+import asyncio
+import threading
+
+import httpx
+import pytest
+from sqlalchemy import delete, select
+
+from app.core import security
+from app.core.config import settings
+from app.core.exceptions import PasswordHashingBusyException
+from app.crud.crud_user import crud_user
+from app.models.user import User
+
+
+@pytest.fixture
+async def legacy_hash_user(db, monkeypatch):
+    # Hash guardado com custo 4; a configuração atual pede 5
+    legacy_hash = security.build_pwd_context(4).hash(b"Secret123!")
+    monkeypatch.setattr(security, "pwd_context", security.build_pwd_context(5))
+    async with db() as session:
+        await session.execute(delete(User).where(User.email == "rehash@test.com"))
+        session.add(User(email="rehash@test.com", hashed_password=legacy_hash, is_active=True, is_verified=True))
+        await session.commit()
+    yield db
+
+
+async def _stored_hash(SessionLocal) -> str:
+    async with SessionLocal() as db:
+        return (await db.execute(select(User.hashed_password).where(User.email == "rehash@test.com"))).scalar_one()
+
+
+async def test_outdated_hash_is_upgraded_on_successful_login(legacy_hash_user):
+    SessionLocal = legacy_hash_user
+
+    async with SessionLocal() as db:
+        assert await crud_user.authenticate(db, email="rehash@test.com", password="wrong") is None
+    assert (await _stored_hash(SessionLocal)).startswith("$2b$04$") # Senha errada não reescreve
+
+    async with SessionLocal() as db:
+        user = await crud_user.authenticate(db, email="rehash@test.com", password="Secret123!")
+    assert user is not None
+    upgraded = await _stored_hash(SessionLocal)
+    assert upgraded.startswith("$2b$05$")
+    assert security.verify_password("Secret123!", upgraded)
+
+    # Já atualizado: o login seguinte não volta a escrever
+    async with SessionLocal() as db:
+        await crud_user.authenticate(db, email="rehash@test.com", password="Secret123!")
+    assert await _stored_hash(SessionLocal) == upgraded
+
+
+async def test_benchmark_reports_latency_for_candidate_cost():
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(
+            "/api/v1/mgmt/maintenance/password-hash/benchmark",
+            params={"rounds": 4, "samples": 3},
+            headers={"X-API-Key": "test-internal-key"},
+        )
+    security.shutdown_hash_executor()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["rounds"] == 4 and body["samples"] == 3
+    assert 0 < body["min_ms"] <= body["median_ms"] <= body["max_ms"]
+
+
+async def test_benchmark_rejects_costs_that_would_hold_the_login_pool():
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for params in ({"rounds": 15}, {"rounds": 4, "samples": 6}):
+            response = await client.get(
+                "/api/v1/mgmt/maintenance/password-hash/benchmark",
+                params=params,
+                headers={"X-API-Key": "test-internal-key"},
+            )
+            assert response.status_code == 422
+
+
+@pytest.fixture
+def saturated_pool(monkeypatch):
+    # Uma thread e nenhuma vaga na fila: enquanto o trabalho abaixo corre, não cabe mais nenhum
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_WORKERS", 1)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_QUEUE", 0)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", 0.05)
+    security.shutdown_hash_executor()
+    release = threading.Event()
+    yield release
+    release.set()
+    security.shutdown_hash_executor()
+
+
+async def test_saturated_pool_rejects_instead_of_queueing(saturated_pool):
+    blocker = asyncio.create_task(security._run_in_hash_pool(saturated_pool.wait, 5))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(PasswordHashingBusyException):
+        await security.get_password_hash_async("Secret123!")
+
+    # Liberta a vaga: o pedido seguinte é atendido normalmente
+    saturated_pool.set()
+    await blocker
+    hashed = await security.get_password_hash_async("Secret123!")
+    assert await security.verify_password_async("Secret123!", hashed)
+
+
+async def test_login_answers_503_with_retry_after_when_pool_is_saturated(legacy_hash_user, saturated_pool):
+    from main import app
+
+    blocker = asyncio.create_task(security._run_in_hash_pool(saturated_pool.wait, 5))
+    await asyncio.sleep(0.05)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/api/v1/auth/token",
+            data={"username": "rehash@test.com", "password": "Secret123!"},
+        )
+    saturated_pool.set()
+    await blocker
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,61 @@
+# auth-api/tests/test_principal_cache.py
+import httpx
+import pytest
+from sqlalchemy import delete, update
+
+from app.core import security
+from app.core.principal_cache import principal_cache
+from app.crud.crud_user import crud_user
+from app.models.user import User
+
+
+@pytest.fixture
+async def cached_user(db):
+    async with db() as session:
+        await session.execute(delete(User).where(User.email == "principal@test.com"))
+        user = User(email="principal@test.com", full_name="Original", hashed_password="x", is_active=True, is_verified=True)
+        session.add(user)
+        await session.commit()
+        token = security.create_access_token(user)
+        user_id = user.id
+    principal_cache.clear()
+    yield db, user_id, token
+    principal_cache.clear()
+
+
+async def _me(token: str) -> httpx.Response:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+
+async def test_update_through_crud_invalidates_the_cached_principal(cached_user):
+    SessionLocal, user_id, token = cached_user
+    assert (await _me(token)).json()["full_name"] == "Original"
+
+    # Escrita fora do crud_user: o pedido seguinte ainda vem do cache
+    async with SessionLocal() as db:
+        await db.execute(update(User).where(User.id == user_id).values(full_name="Bypassed"))
+        await db.commit()
+    assert (await _me(token)).json()["full_name"] == "Original"
+
+    async with SessionLocal() as db:
+        user = await crud_user.get(db, id=user_id)
+        await crud_user.update(db, db_obj=user, obj_in={"full_name": "Updated"})
+    assert (await _me(token)).json()["full_name"] == "Updated"
+
+    async with SessionLocal() as db:
+        user = await crud_user.get(db, id=user_id)
+        await crud_user.update(db, db_obj=user, obj_in={"is_active": False})
+    assert (await _me(token)).status_code == 400
+
+
+async def test_remove_through_crud_invalidates_the_cached_principal(cached_user):
+    SessionLocal, user_id, token = cached_user
+    assert (await _me(token)).status_code == 200
+
+    async with SessionLocal() as db:
+        await crud_user.remove(db, id=user_id)
+    assert (await _me(token)).status_code == 401
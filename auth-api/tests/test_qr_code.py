@@ -0,0 +1,42 @@
+# auth-api/tests/test_qr_code.py
+import base64
+import threading
+
+from app.core import security
+
+OTP_URI = "otpauth://totp/Verax:user@test.com?secret=JBSWY3DPEHPK3PXP&issuer=Verax"
+
+
+def _decode(data_uri: str) -> bytes:
+    return base64.b64decode(data_uri.split(",", 1)[1])
+
+
+def test_png_and_svg_outputs():
+    png = security.generate_qr_code_base64(OTP_URI)
+    svg = security.generate_qr_code_base64(OTP_URI, "svg")
+
+    assert png.startswith("data:image/png;base64,")
+    assert _decode(png).startswith(b"\x89PNG")
+    assert svg.startswith("data:image/svg+xml;base64,")
+    svg_document = _decode(svg)
+    assert svg_document.startswith(b"<svg")
+    # Vetorial puro: um único <path>, sem raster embutido
+    assert svg_document.count(b"<path") == 1
+    assert b"<image" not in svg_document
+
+
+async def test_async_rendering_runs_off_the_event_loop(monkeypatch):
+    loop_thread = threading.get_ident()
+    render_threads = []
+    original = security.generate_qr_code_base64
+
+    def spy(otp_uri, image_format="png"):
+        render_threads.append(threading.get_ident())
+        return original(otp_uri, image_format)
+
+    monkeypatch.setattr(security, "generate_qr_code_base64", spy)
+
+    result = await security.generate_qr_code_base64_async(OTP_URI, "svg")
+
+    assert result.startswith("data:image/svg+xml;base64,")
+    assert render_threads and render_threads[0] != loop_thread
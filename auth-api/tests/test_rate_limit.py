@@ -0,0 +1,72 @@
+# auth-api/tests/test_rate_limit.py
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.core import rate_limit
+
+
+@pytest.fixture(autouse=True)
+def clean_limits():
+    # Backend memory:// (conftest): contadores no próprio processo
+    rate_limit.reset_rate_limits()
+    yield
+    rate_limit.reset_rate_limits()
+
+
+def test_account_limit_counts_failures_per_account():
+    for _ in range(3):
+        rate_limit.check_account_limit("login", "Victim@Test.com", "3/minute")
+        rate_limit.record_account_failure("login", "Victim@Test.com", "3/minute")
+
+    # Normalizado (maiúsculas/espaços) para a mesma chave
+    with pytest.raises(HTTPException) as exc:
+        rate_limit.check_account_limit("login", " victim@test.com", "3/minute")
+    assert exc.value.status_code == 429
+    assert int(exc.value.headers["Retry-After"]) >= 1
+
+    # Outras contas e outros scopes não são afetados
+    rate_limit.check_account_limit("login", "other@test.com", "3/minute")
+    rate_limit.check_account_limit("mfa", "victim@test.com", "3/minute")
+
+
+@pytest.mark.usefixtures("db")
+async def test_login_is_limited_per_account_across_ips(monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_TRUST_PROXY_HEADERS", True)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        statuses = []
+        for i in range(7):
+            # Cada tentativa vem de um IP diferente: só o limite por conta trava
+            response = await client.post(
+                "/api/v1/auth/token",
+                data={"username": "nobody@test.com", "password": "wrong"},
+                headers={"X-Real-IP": f"10.0.0.{i}"},
+            )
+            statuses.append(response.status_code)
+
+    assert statuses[:5] == [400] * 5
+    assert statuses[5:] == [429, 429]
+
+
+@pytest.mark.usefixtures("db")
+async def test_login_is_limited_per_ip_across_accounts(monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_TRUST_PROXY_HEADERS", True)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        statuses = [
+            (await client.post(
+                "/api/v1/auth/token",
+                data={"username": f"user{i}@test.com", "password": "wrong"},
+                headers={"X-Real-IP": "10.0.1.1"},
+            )).status_code
+            for i in range(11)
+        ]
+
+    # RATE_LIMIT_LOGIN_PER_IP = 10/minute
+    assert statuses[:10] == [400] * 10
+    assert statuses[10] == 429
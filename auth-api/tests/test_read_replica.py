@@ -0,0 +1,85 @@
+# auth-api/tests/test_read_replica.py
+import time
+
+import httpx
+import pytest
+from sqlalchemy import delete, select
+
+from app.core import security
+from app.core.config import settings
+from app.core.principal_cache import principal_cache
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.db import session as db_session
+from app.db.base import Base
+from app.db.session import get_read_engine, get_session_local, get_read_session_local, dispose_engine
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+REPLICA_URL = "sqlite+aiosqlite:///./test_auth_replica.db"
+
+
+async def _seed(SessionLocal, user_id: int, full_name: str) -> User:
+    async with SessionLocal() as db:
+        await db.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id))
+        await db.execute(delete(User).where(User.email == "replica@test.com"))
+        user = User(id=user_id, email="replica@test.com", full_name=full_name, hashed_password="x", is_active=True, is_verified=True)
+        db.add(user)
+        await db.commit()
+        return user
+
+
+@pytest.fixture
+async def replica_user(db, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_READ_URL", REPLICA_URL)
+    # O ficheiro da réplica não passa pela fixture db: o esquema é recriado aqui
+    async with get_read_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # Mesmo utilizador nos dois ficheiros, com nomes diferentes para se ver de onde veio a leitura
+    user = await _seed(db, 9001, "Primary")
+    await _seed(get_read_session_local(), 9001, "Replica")
+    principal_cache.invalidate(user.id)
+    yield user
+    principal_cache.invalidate(user.id)
+
+
+async def _get(path: str, user: User) -> httpx.Response:
+    from main import app
+
+    headers = {"Authorization": f"Bearer {security.create_access_token(user=user, mfa_passed=False)}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers=headers)
+
+
+async def test_read_only_endpoints_use_the_replica_and_writes_the_primary(replica_user):
+    user = replica_user
+    async with get_session_local()() as db:
+        token, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
+        await crud_refresh_token.create_refresh_token(db, user=user, token=token, expires_at=expires_at)
+
+    assert (await _get("/api/v1/auth/me", user)).json()["full_name"] == "Replica"
+    # O que veio da réplica não fica no cache do principal
+    async with get_session_local()() as db:
+        assert principal_cache.load(db, user.id) is None
+    # A sessão criada no primário ainda não "replicou"
+    assert (await _get("/api/v1/auth/sessions", user)).json() == []
+
+    async with get_session_local()() as primary, get_read_session_local()() as replica:
+        assert (await primary.execute(select(RefreshToken.id).where(RefreshToken.user_id == user.id))).scalars().all()
+        assert not (await replica.execute(select(RefreshToken.id).where(RefreshToken.user_id == user.id))).scalars().all()
+
+
+async def test_unreachable_replica_falls_back_to_the_primary(replica_user, monkeypatch):
+    user = replica_user
+    await dispose_engine()
+    monkeypatch.setattr(settings, "DATABASE_READ_URL", "sqlite+aiosqlite:////nonexistent-dir/replica.db")
+
+    response = await _get("/api/v1/auth/me", user)
+
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Primary"
+    async with get_session_local()() as db:
+        assert principal_cache.load(db, user.id).full_name == "Primary"
+    # Durante DATABASE_READ_RETRY_SECONDS não se volta a tentar a réplica
+    assert db_session._replica_retry_at > time.monotonic()
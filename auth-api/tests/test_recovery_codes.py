@@ -0,0 +1,71 @@
+# auth-api/tests/test_recovery_codes.py
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import delete, select
+
+from app.core import security
+from app.crud.crud_mfa_recovery_code import crud_mfa_recovery_code
+from app.models.mfa_recovery_code import MFARecoveryCode
+from app.models.refresh_token import RefreshToken
+from app.models.trusted_device import TrustedDevice
+from app.models.user import User
+
+
+@pytest.fixture
+async def mfa_user(db):
+    async with db() as session:
+        existing = (await session.execute(select(User.id).where(User.email == "recovery@test.com"))).scalar()
+        if existing:
+            for model in (MFARecoveryCode, RefreshToken, TrustedDevice):
+                await session.execute(delete(model).where(model.user_id == existing))
+            await session.execute(delete(User).where(User.id == existing))
+        user = User(email="recovery@test.com", hashed_password="x", is_active=True, is_verified=True, is_mfa_enabled=True)
+        session.add(user)
+        await session.commit()
+        plain_codes = await crud_mfa_recovery_code.create_recovery_codes(db=session, user=user)
+    yield db, user, plain_codes
+
+
+async def test_recovery_code_login_consumes_the_code_once(mfa_user):
+    from main import app
+    from app.api.endpoints.auth import create_mfa_challenge_token
+
+    SessionLocal, user, plain_codes = mfa_user
+    async with SessionLocal() as db:
+        stored = (await db.execute(select(MFARecoveryCode.hashed_code).where(MFARecoveryCode.user_id == user.id))).scalars().all()
+    assert set(stored) == {security.hash_recovery_code(user.id, code) for code in plain_codes}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def verify(code: str) -> int:
+            body = {"mfa_challenge_token": create_mfa_challenge_token(user.id), "recovery_code": code}
+            return (await client.post("/api/v1/auth/mfa/verify-recovery", json=body)).status_code
+
+        # Maiúsculas/espaços de quem copia o código não importam
+        assert await verify(f"  {plain_codes[0].upper()} ") == 200
+        assert await verify(plain_codes[0]) == 400
+        assert await verify("0000-0000") == 400
+
+
+async def test_concurrent_use_of_the_same_code_succeeds_once(mfa_user):
+    SessionLocal, user, plain_codes = mfa_user
+
+    async def consume() -> bool:
+        async with SessionLocal() as db:
+            return await crud_mfa_recovery_code.consume_recovery_code(db=db, user=user, plain_code=plain_codes[1])
+
+    assert sorted(await asyncio.gather(*(consume() for _ in range(5)))) == [False] * 4 + [True]
+
+
+async def test_legacy_sha256_codes_remain_valid(mfa_user):
+    SessionLocal, user, _ = mfa_user
+    async with SessionLocal() as db:
+        db.add(MFARecoveryCode(user_id=user.id, hashed_code=security.legacy_recovery_code_hash("abcd-1234"), is_used=False))
+        await db.commit()
+        # Um código de outro utilizador não serve, mesmo com o mesmo valor
+        other = User(id=user.id + 1000, email="x")
+        assert not await crud_mfa_recovery_code.consume_recovery_code(db=db, user=other, plain_code="abcd-1234")
+        assert await crud_mfa_recovery_code.consume_recovery_code(db=db, user=user, plain_code="abcd-1234")
+        assert not await crud_mfa_recovery_code.consume_recovery_code(db=db, user=user, plain_code="abcd-1234")
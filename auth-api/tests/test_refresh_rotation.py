@@ -0,0 +1,117 @@
+# auth-api/tests/test_refresh_rotation.py
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.core import security
+from app.core.config import settings
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+
+@pytest.fixture
+async def rotation_db(db):
+    async with db() as session:
+        existing = (await session.execute(select(User.id).where(User.email == "rotation@test.com"))).scalar()
+        if existing:
+            await session.execute(delete(RefreshToken).where(RefreshToken.user_id == existing))
+            await session.execute(delete(User).where(User.id == existing))
+        user = User(email="rotation@test.com", hashed_password="x", is_active=True, is_verified=True)
+        session.add(user)
+        await session.commit()
+        token, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
+        await crud_refresh_token.create_refresh_token(session, user=user, token=token, expires_at=expires_at)
+        user_id = user.id
+    yield db, user_id, token
+
+
+async def _rotate(SessionLocal, user_id: int, token: str):
+    new_token, expires_at = security.create_refresh_token(data={"sub": str(user_id)})
+    async with SessionLocal() as db:
+        rotated = await crud_refresh_token.rotate_refresh_token(
+            db, token=token, user_id=user_id, new_token=new_token, new_expires_at=expires_at
+        )
+    return new_token if rotated else None
+
+
+async def _active_tokens(SessionLocal, user_id: int):
+    async with SessionLocal() as db:
+        stmt = select(RefreshToken).where(RefreshToken.user_id == user_id, RefreshToken.is_revoked == False)
+        return (await db.execute(stmt)).scalars().all()
+
+
+async def _all_tokens(SessionLocal, user_id: int):
+    async with SessionLocal() as db:
+        return (await db.execute(select(RefreshToken).where(RefreshToken.user_id == user_id))).scalars().all()
+
+
+async def test_parallel_refreshes_only_one_wins(rotation_db):
+    SessionLocal, user_id, token = rotation_db
+
+    results = await asyncio.gather(*(_rotate(SessionLocal, user_id, token) for _ in range(5)))
+
+    winners = [new_token for new_token in results if new_token]
+    assert len(winners) == 1
+    active = await _active_tokens(SessionLocal, user_id)
+    # Um perdedor apresentou um token já rodado: a família (incluindo o vencedor) é revogada
+    assert active == []
+
+
+async def test_reusing_a_rotated_token_revokes_the_family(rotation_db):
+    SessionLocal, user_id, token = rotation_db
+
+    second = await _rotate(SessionLocal, user_id, token)
+    third = await _rotate(SessionLocal, user_id, second)
+    assert third is not None
+    active = await _active_tokens(SessionLocal, user_id)
+    assert [t.token_hash for t in active] == [crud_refresh_token.hash_token(third)]
+    assert len({t.family_id for t in await _all_tokens(SessionLocal, user_id)}) == 1
+
+    # Reutilização do primeiro token: falha e revoga também o token mais recente
+    assert await _rotate(SessionLocal, user_id, token) is None
+    assert await _active_tokens(SessionLocal, user_id) == []
+    assert await _rotate(SessionLocal, user_id, third) is None
+
+
+async def test_refresh_endpoint_rotates_once(rotation_db):
+    from main import app
+
+    SessionLocal, user_id, token = rotation_db
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+        replay = await client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+
+    assert first.status_code == 200
+    assert first.json()["refresh_token"] != token
+    assert replay.status_code == 401
+    assert await _active_tokens(SessionLocal, user_id) == []
+
+
+async def test_retention_keeps_rotated_tokens_while_the_family_is_alive(rotation_db):
+    SessionLocal, user_id, token = rotation_db
+    second = await _rotate(SessionLocal, user_id, token)
+    third = await _rotate(SessionLocal, user_id, second)
+    # Sessão longa: todos os tokens criados antes da retenção de tokens revogados
+    async with SessionLocal() as db:
+        await db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id)
+            .values(created_at=datetime.utcnow() - timedelta(days=settings.REFRESH_TOKEN_REVOKED_RETENTION_DAYS + 1))
+        )
+        await db.commit()
+        await crud_refresh_token.prune_expired_tokens(db, batch_size=100)
+    assert len(await _all_tokens(SessionLocal, user_id)) == 3
+
+    # O replay do primeiro token continua a ser reconhecido como reutilização
+    assert await _rotate(SessionLocal, user_id, token) is None
+    assert await _active_tokens(SessionLocal, user_id) == []
+
+    # Família morta: os tokens revogados já podem ser apagados
+    async with SessionLocal() as db:
+        assert await crud_refresh_token.prune_expired_tokens(db, batch_size=100) == 3
+    assert third and await _all_tokens(SessionLocal, user_id) == []
@@ -0,0 +1,124 @@
+# auth-api/tests/test_retention.py
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from app.core.config import settings
+from app.crud.crud_email_outbox import STATUS_FAILED, STATUS_PENDING, STATUS_SENT
+from app.models.access_token_revocation import AccessTokenRevocation
+from app.models.email_outbox import EmailOutbox
+from app.models.mfa_recovery_code import MFARecoveryCode
+from app.models.trusted_device import TrustedDevice
+from app.models.user import User
+from app.services import retention_service
+
+TABLES = {
+    "trusted_devices": TrustedDevice,
+    "mfa_recovery_codes": MFARecoveryCode,
+    "email_outbox": EmailOutbox,
+    "access_token_revocations": AccessTokenRevocation,
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@pytest.fixture
+async def retention_db(db, monkeypatch):
+    """Tabelas vazias e lotes pequenos: 2 linhas por lote, no máximo 2 lotes por execução."""
+    monkeypatch.setattr(settings, "RETENTION_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "RETENTION_MAX_BATCHES_PER_RUN", 2)
+    async with db() as session:
+        for model in TABLES.values():
+            await session.execute(delete(model))
+        await session.commit()
+    yield db
+
+
+async def _seed(SessionLocal) -> None:
+    """Para cada tabela, linhas de ambos os lados do corte de retenção."""
+    now = _now()
+    old = now - timedelta(days=settings.EMAIL_OUTBOX_SENT_RETENTION_DAYS + 1)
+    recent = now - timedelta(days=1)
+    async with SessionLocal() as db:
+        user = User(email=f"retention-{uuid.uuid4().hex[:8]}@test.com", hashed_password="x", is_active=True)
+        db.add(user)
+        await db.flush()
+        # 5 para apagar e 2 para manter em cada tabela
+        db.add_all(
+            TrustedDevice(user_id=user.id, device_token_hash=uuid.uuid4().hex, expires_at=expires_at)
+            for expires_at in [now - timedelta(hours=1)] * 5 + [now + timedelta(days=1)] * 2
+        )
+        db.add_all(
+            MFARecoveryCode(user_id=user.id, hashed_code=uuid.uuid4().hex, is_used=is_used)
+            for is_used in [True] * 5 + [False] * 2
+        )
+        db.add_all([
+            *(EmailOutbox(email_to="a@test.com", subject="s", status=STATUS_SENT, created_at=old, sent_at=old) for _ in range(4)),
+            EmailOutbox(email_to="a@test.com", subject="s", status=STATUS_FAILED, created_at=old),
+            EmailOutbox(email_to="a@test.com", subject="s", status=STATUS_SENT, created_at=recent, sent_at=recent),
+            EmailOutbox(email_to="a@test.com", subject="s", status=STATUS_PENDING, created_at=old, next_attempt_at=old),
+        ])
+        db.add_all(
+            AccessTokenRevocation(kind="jti", value=uuid.uuid4().hex, expires_at=expires_at)
+            for expires_at in [now - timedelta(minutes=1)] * 5 + [now + timedelta(minutes=30)] * 2
+        )
+        await db.commit()
+
+
+async def _count(SessionLocal, model) -> int:
+    async with SessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+async def test_cycle_prunes_in_batches_and_reports_the_backlog(retention_db):
+    await _seed(retention_db)
+
+    report = await retention_service.run_retention_cycle()
+
+    # 2 lotes de 2 por execução: das 5 linhas expiradas fica 1 para a próxima
+    for name in TABLES:
+        assert report["tables"][name] == {"deleted": 4, "backlog": 1}, name
+    assert report["total_deleted"] == sum(table["deleted"] for table in report["tables"].values())
+    assert retention_service.get_last_retention_report() is report
+
+    report = await retention_service.run_retention_cycle()
+    for name, model in TABLES.items():
+        assert report["tables"][name] == {"deleted": 1, "backlog": 0}, name
+        # As linhas do lado de cá do corte ficam
+        assert await _count(retention_db, model) == 2, name
+
+
+async def test_prune_target_stops_at_the_first_partial_batch(retention_db, monkeypatch):
+    batches = iter([2, 2, 1, 2])
+    calls = []
+
+    async def prune(db, *, batch_size):
+        calls.append(batch_size)
+        return next(batches)
+
+    monkeypatch.setattr(settings, "RETENTION_MAX_BATCHES_PER_RUN", 10)
+    assert await retention_service._prune_target(prune) == 5
+    assert calls == [2, 2, 2]
+
+
+async def test_a_failing_table_is_reported_without_stopping_the_cycle(retention_db, monkeypatch):
+    await _seed(retention_db)
+
+    async def broken(db, **kwargs):
+        raise RuntimeError("tabela indisponível")
+
+    targets = [("broken", broken, broken)] + [
+        target for target in retention_service.RETENTION_TARGETS if target[0] == "trusted_devices"
+    ]
+    monkeypatch.setattr(retention_service, "RETENTION_TARGETS", targets)
+
+    report = await retention_service.run_retention_cycle()
+
+    assert report["tables"] == {
+        "broken": {"deleted": 0, "backlog": -1},
+        "trusted_devices": {"deleted": 4, "backlog": 1},
+    }
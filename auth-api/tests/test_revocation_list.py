@@ -0,0 +1,105 @@
+# auth-api/tests/test_revocation_list.py
+import time
+
+import httpx
+import pytest
+from sqlalchemy import delete, select
+
+from app.core import security
+from app.core.config import settings
+from app.core.revocation import RevocationSet, revocation_set
+from app.crud.crud_access_token_revocation import crud_access_token_revocation
+from app.crud.crud_refresh_token import crud_refresh_token
+from app.models.access_token_revocation import AccessTokenRevocation
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+
+API_KEY_HEADERS = {"X-API-Key": "test-internal-key"}
+
+
+@pytest.fixture
+async def session_user(db):
+    async with db() as session:
+        await session.execute(delete(AccessTokenRevocation))
+        existing = (await session.execute(select(User.id).where(User.email == "revoked@test.com"))).scalar()
+        if existing:
+            await session.execute(delete(RefreshToken).where(RefreshToken.user_id == existing))
+            await session.execute(delete(User).where(User.id == existing))
+        user = User(email="revoked@test.com", hashed_password="x", is_active=True, is_verified=True)
+        session.add(user)
+        await session.commit()
+        refresh, expires_at = security.create_refresh_token(data={"sub": str(user.id)})
+        db_refresh = await crud_refresh_token.create_refresh_token(session, user=user, token=refresh, expires_at=expires_at)
+    revocation_set.clear()
+    access = security.create_access_token(user=user, mfa_passed=False, session_id=db_refresh.family_id)
+    yield db, access, refresh, db_refresh.family_id
+    revocation_set.clear()
+
+
+async def test_logout_revokes_the_sessions_access_tokens(session_user, monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(settings, "REVOCATION_SYNC_SETTLE_SECONDS", 0)
+    _, access, refresh, family_id = session_user
+    headers = {"Authorization": f"Bearer {access}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/api/v1/auth/sessions", headers=headers)).status_code == 200
+        assert (await client.post("/api/v1/auth/logout", json={"refresh_token": refresh})).status_code == 204
+        # Efeito imediato, sem esperar pela sincronização
+        assert (await client.get("/api/v1/auth/sessions", headers=headers)).status_code == 401
+
+        published = (await client.get("/api/v1/auth/revocations", headers=API_KEY_HEADERS)).json()
+        assert [(e["kind"], e["value"]) for e in published["entries"]] == [("sid", family_id)]
+        assert published["entries"][0]["expires_at"] > time.time()
+        # Incremental: a partir da versão recebida não há nada de novo
+        delta = await client.get(
+            "/api/v1/auth/revocations", params={"since": published["version"]}, headers=API_KEY_HEADERS
+        )
+        assert delta.json()["entries"] == []
+        assert (await client.get("/api/v1/auth/revocations")).status_code in (401, 403)
+
+        introspection = await client.post("/api/v1/auth/introspect", json={"tokens": [access]}, headers=API_KEY_HEADERS)
+        assert introspection.json()["results"][0]["status"] == "revoked"
+
+
+async def test_other_processes_pick_up_revocations_incrementally(session_user):
+    SessionLocal, access, _, family_id = session_user
+    payload = security.decode_access_token(access)
+    replica = RevocationSet(sync_interval_seconds=0) # Cópia de "outro processo"
+
+    async with SessionLocal() as db:
+        await crud_access_token_revocation.sync_revocation_set(db, replica)
+        assert not replica.is_revoked(payload)
+
+        # Como no reset de senha: revogação na transação de quem chama (aplicada localmente no commit)
+        await crud_refresh_token.revoke_all_refresh_tokens_for_user(db, user_id=int(payload["sub"]), commit=False)
+        await db.commit()
+
+        await crud_access_token_revocation.sync_revocation_set(db, replica)
+    assert replica.is_revoked(payload)
+    assert replica.is_revoked({"sid": family_id, "jti": "other"})
+    assert not replica.is_revoked({"jti": payload["jti"] + "x"})
+
+    # Entradas expiradas são descartadas da cópia
+    replica.apply([("jti", "old", time.time() - 1)])
+    assert not replica.is_revoked({"jti": "old"})
+
+
+async def test_manual_revocation_applies_jti_and_sid_locally(session_user):
+    from main import app
+
+    _, access, _, family_id = session_user
+    payload = security.decode_access_token(access)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=API_KEY_HEADERS) as client:
+        too_long = await client.post("/api/v1/mgmt/access-tokens/revoke", json={"jti": ["x" * 65]})
+        assert too_long.status_code == 422
+
+        response = await client.post(
+            "/api/v1/mgmt/access-tokens/revoke", json={"jti": ["manual-jti"], "sid": [family_id]}
+        )
+    assert response.json() == {"revoked": 2}
+    # As duas listas valem já neste processo, sem esperar pela sincronização
+    assert revocation_set.is_revoked({"jti": "manual-jti"})
+    assert revocation_set.is_revoked({"sid": family_id, "jti": payload["jti"]})
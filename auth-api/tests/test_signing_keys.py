@@ -0,0 +1,52 @@
+# auth-api/tests/test_signing_keys.py
+import pytest
+
+from app.core import security
+from app.core.config import settings
+from app.core.signing_keys import SigningKeyRing, generate_signing_key
+from app.models.user import User
+
+
+def _user() -> User:
+    return User(id=1, email="keys@test.com", is_verified=True, is_mfa_enabled=False)
+
+
+@pytest.fixture
+def asymmetric_keys(tmp_path, monkeypatch):
+    kid = generate_signing_key(str(tmp_path))
+    ring = SigningKeyRing(keys_dir=str(tmp_path), active_kid=kid, algorithm="RS256")
+    monkeypatch.setattr(security, "signing_keys", ring)
+    return kid
+
+
+def test_legacy_hs256_tokens_are_accepted_by_default():
+    token = security.create_access_token(_user())
+
+    payload = security.decode_access_token(token)
+    assert payload is not None and payload["sub"] == "1"
+
+
+def test_legacy_hs256_tokens_are_rejected_once_switched_off(monkeypatch):
+    token = security.create_access_token(_user()) # Sem chaves configuradas: HS256
+    monkeypatch.setattr(settings, "ACCEPT_LEGACY_HS256_TOKENS", False)
+
+    assert security.decode_access_token(token) is None
+
+
+def test_tokens_signed_with_a_key_are_unaffected_by_the_legacy_switch(asymmetric_keys, monkeypatch):
+    monkeypatch.setattr(settings, "ACCEPT_LEGACY_HS256_TOKENS", False)
+    token = security.create_access_token(_user())
+
+    payload = security.decode_access_token(token)
+    assert payload is not None and payload["sub"] == "1"
+
+
+def test_every_worker_picks_up_a_new_key_without_an_explicit_reload(tmp_path):
+    first = generate_signing_key(str(tmp_path), kid="20260101000000")
+    ring = SigningKeyRing(keys_dir=str(tmp_path), active_kid=None, algorithm="RS256", reload_seconds=0)
+    assert ring.active_key()[0] == first
+
+    # Chave nova no diretório partilhado: sem reload() neste processo
+    second = generate_signing_key(str(tmp_path), kid="20260201000000")
+    assert ring.active_key()[0] == second
+    assert ring.verification_key(first) is not None
@@ -0,0 +1,122 @@
+# auth-api/tests/test_user_sync.py
+import json
+
+import httpx
+import pytest
+from sqlalchemy import select, delete
+
+from app.models.user_sync_event import UserSyncEvent
+from app.services import user_sync_service
+
+
+@pytest.fixture
+async def sync_db(db, monkeypatch):
+    monkeypatch.setattr(user_sync_service.settings, "USER_SYNC_TARGETS", {
+        "fleet": "http://fleet.test/users/internal/sync_user",
+        "sales": "http://sales.test/users/internal/sync_user",
+    })
+    monkeypatch.setattr(user_sync_service.settings, "USER_SYNC_RETRY_BASE_SECONDS", 0)
+    async with db() as session:
+        await session.execute(delete(UserSyncEvent))
+        await session.commit()
+    yield db
+    await user_sync_service.set_user_sync_transport(None)
+
+
+async def _events(SessionLocal):
+    async with SessionLocal() as db:
+        return (await db.execute(select(UserSyncEvent).order_by(UserSyncEvent.id))).scalars().all()
+
+
+async def test_events_are_delivered_in_order_per_service_with_retries(sync_db):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.url.host, request.method, json.loads(request.content)))
+        # A primeira tentativa no fleet falha com 503
+        if request.url.host == "fleet.test" and len([c for c in calls if c[0] == "fleet.test"]) == 1:
+            return httpx.Response(503)
+        return httpx.Response(201, json={})
+
+    await user_sync_service.set_user_sync_transport(httpx.MockTransport(handler))
+    async with sync_db() as db:
+        await user_sync_service.enqueue_user_created(db, user_id=1, data={"email": "a@test.com", "password": "Secret123!"})
+        await user_sync_service.enqueue_user_updated(db, user_id=1, email="a@test.com", changes={"full_name": "A"})
+
+    # A senha nunca fica em claro na tabela
+    assert all("password" not in (e.payload or {}) for e in await _events(sync_db))
+
+    await user_sync_service.drain_user_sync() # sales: create+update; fleet: create falha (backoff 0)
+    await user_sync_service.drain_user_sync() # fleet: create e depois update
+
+    fleet = [(method, body) for host, method, body in calls if host == "fleet.test"]
+    assert [method for method, _ in fleet] == ["POST", "POST", "PUT"]
+    assert fleet[0][1]["password"] == "Secret123!"
+    events = await _events(sync_db)
+    assert {e.status for e in events} == {"sent"}
+    assert all(e.payload is None for e in events)
+
+
+async def test_non_retryable_errors_fail_immediately(sync_db):
+    await user_sync_service.set_user_sync_transport(httpx.MockTransport(lambda request: httpx.Response(404)))
+    async with sync_db() as db:
+        await user_sync_service.enqueue_user_deleted(db, user_id=2, email="b@test.com")
+
+    report = await user_sync_service.deliver_user_sync_batch()
+
+    assert report["failed"] == 2
+    assert {(e.status, e.attempts) for e in await _events(sync_db)} == {("failed", 1)}
+
+
+# --- Rotas de admin: utilizador e eventos no mesmo commit ---
+@pytest.fixture
+async def admin_client(sync_db):
+    from main import app
+    from app.api.dependencies import get_current_active_superuser
+    from app.models.user import User
+
+    async with sync_db() as db:
+        await db.execute(delete(User).where(User.email.in_(["sync-admin@test.com", "sync-renamed@test.com"])))
+        user = User(email="sync-admin@test.com", full_name="Antes", hashed_password="x", is_active=True, is_verified=True)
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+
+    app.dependency_overrides[get_current_active_superuser] = lambda: user
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", headers={"X-API-Key": "test-internal-key"}
+    ) as client:
+        yield client, user_id
+    app.dependency_overrides.pop(get_current_active_superuser, None)
+
+
+async def test_admin_update_commits_user_and_events_together(sync_db, admin_client):
+    from app.models.user import User
+    client, user_id = admin_client
+
+    response = await client.put(f"/api/v1/mgmt/admin/users/{user_id}", json={"email": "sync-renamed@test.com"})
+    assert response.status_code == 200
+
+    events = await _events(sync_db)
+    assert {(e.action, e.target) for e in events} == {("update", "fleet"), ("update", "sales")}
+    assert all(e.payload["lookup_email"] == "sync-admin@test.com" for e in events)
+    async with sync_db() as db:
+        assert (await db.get(User, user_id)).email == "sync-renamed@test.com"
+
+
+async def test_admin_update_is_rolled_back_when_events_cannot_be_queued(sync_db, admin_client, monkeypatch):
+    from app.crud.crud_user_sync_event import crud_user_sync_event
+    from app.models.user import User
+    client, user_id = admin_client
+
+    async def broken_enqueue(*args, **kwargs):
+        raise RuntimeError("fila indisponível")
+    monkeypatch.setattr(crud_user_sync_event, "enqueue_for_user", broken_enqueue)
+
+    with pytest.raises(RuntimeError):
+        await client.put(f"/api/v1/mgmt/admin/users/{user_id}", json={"full_name": "Depois"})
+
+    assert await _events(sync_db) == []
+    async with sync_db() as db:
+        assert (await db.get(User, user_id)).full_name == "Antes"
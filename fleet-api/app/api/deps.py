@@ -1,12 +1,13 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from app import crud
 from app.db.session import get_db
 from app.core.config import settings
+from app.core.jwks import decode_access_token
 from app.models.user_model import User
-from app.crud.crud_user import User as crud_user
 from app.schemas.token_schema import TokenPayload # Garantido que TokenPayload existe
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.crud.crud_demo_usage import demo_usage as crud_demo_usage
@@ -34,8 +35,8 @@ DEMO_MONTHLY_LIMITS = {
 # --- FIM DAS CONSTANTES ---
 
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+async def get_current_user(
+    db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -43,20 +44,26 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
+        # Tokens do auth-api pelo JWKS (kid); sem kid, HS256 com SECRET_KEY
+        payload = await decode_access_token(token)
+        subject = payload.get("sub")
+        if subject is None:
             raise credentials_exception
         
-        token_data = TokenPayload(sub=email)
+        token_data = TokenPayload(sub=subject)
 
     except (JWTError, ValidationError):
         raise credentials_exception
     
-    # Busca o usuário no banco de dados LOCAL do fleet-api
-    user = crud_user.get_by_email(db, email=token_data.sub)
+    # Busca o usuário no banco de dados LOCAL do fleet-api. Os tokens do auth-api trazem o
+    # email (o sub é o ID no auth-api); os do login deste serviço trazem o ID local no sub.
+    email = payload.get("email")
+    if email:
+        user = await crud.user.get_user_by_email(db, email=email, load_organization=True)
+    elif token_data.sub.isdigit():
+        user = await crud.user.get(db, id=int(token_data.sub))
+    else:
+        user = await crud.user.get_user_by_email(db, email=token_data.sub, load_organization=True)
     
     if user is None:
         raise HTTPException(
@@ -104,6 +111,38 @@ def get_current_active_manager_or_superuser(
         )
     return current_user
 
+def verify_internal_api_key(x_api_key: str | None = Header(None)) -> None:
+    """
+    Dependência das rotas internas (/users/internal/sync_user): só o auth-api,
+    que envia INTERNAL_API_KEY em X-API-Key, pode criar ou alterar perfis.
+    """
+    if not x_api_key or not settings.INTERNAL_API_KEY or not hmac.compare_digest(
+        x_api_key.encode(), settings.INTERNAL_API_KEY.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Chave interna inválida ou ausente.",
+        )
+
+def verify_device_key(x_device_key: str | None = Header(None)) -> int:
+    """
+    Dependência das rotas de ingestão (GPS, telemetria): os rastreadores ou o gateway
+    que os agrega enviam uma das chaves de DEVICE_INGEST_API_KEYS em X-Device-Key.
+    Retorna a organização da chave; os workers descartam leituras de veículos de outras.
+    """
+    organization_id = None
+    if x_device_key:
+        # Compara com todas as chaves, sem parar na primeira que coincide
+        for key, key_organization_id in settings.DEVICE_INGEST_API_KEYS.items():
+            if hmac.compare_digest(x_device_key.encode(), key.encode()):
+                organization_id = key_organization_id
+    if organization_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credencial de dispositivo inválida ou ausente.",
+        )
+    return organization_id
+
 def check_demo_limit(resource_type: str):
     """
     Cria uma dependência para verificar se uma organização DEMO excedeu 
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Dict
@@ -7,6 +10,8 @@ from app.api.deps import DEMO_TOTAL_LIMITS, DEMO_MONTHLY_LIMITS
 from app import crud
 from app.api import deps
 from app.models.user_model import User, UserRole
+from app.core.config import settings
+from app.services.live_positions import live_position_hub
 # --- NOVOS IMPORTS DOS SCHEMAS CENTRALIZADOS ---
 from app.schemas.dashboard_schema import (
     ManagerDashboardResponse,
@@ -137,19 +142,68 @@ async def read_vehicle_positions(
     current_user: User = Depends(deps.get_current_active_user),
 ):
     """
-    Endpoint leve, projetado para ser chamado frequentemente (polling)
-    pelo frontend para atualizar o mapa em tempo real.
+    Posições atuais, numa só leitura. Para o mapa em tempo real use
+    /dashboard/vehicles/positions/stream em vez de polling.
     """
     if current_user.role not in [UserRole.CLIENTE_ATIVO, UserRole.CLIENTE_DEMO]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Acesso não autorizado.",
         )
-    
-    positions = await crud.report.get_vehicle_positions(db, organization_id=current_user.organization_id)
+
+    # Se alguém já acompanha o mapa neste processo, as posições estão em memória
+    positions = live_position_hub.get_snapshot(current_user.organization_id)
+    if positions is None:
+        positions = await crud.report.get_vehicle_positions(db, organization_id=current_user.organization_id)
     return positions
 
 
+@router.get(
+    "/vehicles/positions/stream",
+    summary="Acompanha a geolocalização dos veículos da organização (Server-Sent Events)",
+)
+async def stream_vehicle_positions(
+    *,
+    request: Request,
+    current_user: User = Depends(deps.get_current_active_user),
+):
+    """
+    Stream SSE para o mapa: primeiro um evento `snapshot` com todas as posições
+    (lista de VehiclePosition), depois eventos `positions` só com os veículos que
+    se moveram ({id, latitude, longitude}). Um novo `snapshot` substitui o estado
+    anterior (veículo novo no mapa, ou cliente que ficou para trás).
+    """
+    if current_user.role not in [UserRole.CLIENTE_ATIVO, UserRole.CLIENTE_DEMO]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso não autorizado.",
+        )
+    organization_id = current_user.organization_id
+
+    async def events():
+        # Subscrito dentro do gerador: o finally corre sempre que o stream termina
+        subscriber = await live_position_hub.subscribe(organization_id)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.LIVE_POSITIONS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    message = ": ping\n\n"
+                yield message
+        finally:
+            live_position_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --- Rota de estatísticas da conta demo (MANTIDA) ---
 class DemoStatsResponse(BaseModel):
     vehicles: DemoResourceLimit
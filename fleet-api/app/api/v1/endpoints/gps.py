@@ -1,28 +1,36 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
-from app import crud, models
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from app.api import deps
-from app.schemas.gps_schema import LocationCreate
+from app.schemas.gps_schema import LocationCreate, LocationBatch, LocationBatchAccepted
+from app.tasks.gps_tasks import enqueue_locations
 
+# Autenticação por chave de dispositivo (X-Device-Key), não de usuário: a chave
+# define a organização cujos veículos podem ser atualizados
 router = APIRouter()
 
-@router.post("/ping", status_code=204)
-async def receive_gps_ping(
-    *,
-    db: AsyncSession = Depends(deps.get_db),
-    location_in: LocationCreate,
-    # Em produção, a autenticação seria feita por um token de dispositivo, não de usuário
-    # current_user: models.user_model.User = Depends(deps.get_current_active_user)
-):
+def _buffer_full() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Ingestão de GPS sobrecarregada. Tente novamente em instantes.",
+        headers={"Retry-After": "1"},
+    )
+
+@router.post("/ping", status_code=status.HTTP_204_NO_CONTENT)
+async def receive_gps_ping(*, location_in: LocationCreate, organization_id: int = Depends(deps.verify_device_key)):
     """
-    Recebe um 'ping' de localização e atualiza o estado do veículo.
-    Este será nosso endpoint de teste e, futuramente, o usado pelo OBD-II.
+    Recebe um 'ping' de localização. O ponto vai para o buffer de ingestão e é
+    gravado em lote (histórico + última posição do veículo) pelo worker de GPS.
     """
-    await crud.vehicle.update_location(
-        db=db,
-        vehicle_id=location_in.vehicle_id,
-        lat=location_in.latitude,
-        lon=location_in.longitude
-    )
+    if not enqueue_locations([location_in], organization_id=organization_id):
+        raise _buffer_full()
     # Não retornamos conteúdo para máxima performance
-    return
\ No newline at end of file
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/pings", status_code=status.HTTP_202_ACCEPTED, response_model=LocationBatchAccepted)
+async def receive_gps_batch(*, batch_in: LocationBatch, organization_id: int = Depends(deps.verify_device_key)):
+    """
+    Recebe um lote de pings de vários veículos sem tocar na base de dados.
+    O lote é aceite por inteiro ou recusado com 503 se o buffer estiver cheio.
+    """
+    if not enqueue_locations(batch_in.points, organization_id=organization_id):
+        raise _buffer_full()
+    return LocationBatchAccepted(accepted=len(batch_in.points))
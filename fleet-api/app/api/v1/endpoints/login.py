@@ -96,11 +96,14 @@ async def request_password_recovery(
     
     if user:
         user_with_token = await crud.user.set_password_reset_token(db=db, user=user)
-        email_utils.send_password_reset_email(
-            to_email=user.email,
+        # Apenas enfileira; o worker da fila de e-mails faz a entrega
+        subject, message_html = email_utils.build_password_reset_email(
             user_name=user.full_name,
             token=user_with_token.reset_password_token
         )
+        await crud.email_outbox.enqueue_email(
+            db, to_emails=[user.email], subject=subject, message_html=message_html
+        )
 
     return {"msg": "Se um usuário com este e-mail existir, um link para redefinição de senha será enviado."}
 
@@ -4,7 +4,6 @@ from typing import List
 from datetime import datetime
 import uuid
 import shutil
-from app.core.email_utils import send_email
 
 from app import crud
 from app.api import deps
@@ -20,9 +19,10 @@ router = APIRouter()
 
 
 
-def send_new_request_email_background(manager_emails: List[str], request: MaintenanceRequestPublic):
+async def enqueue_new_request_email(db: AsyncSession, manager_emails: List[str], request: MaintenanceRequestPublic):
     """
-    Função síncrona que será executada em segundo plano para enviar os e-mails.
+    Coloca o e-mail de novo chamado na fila (email_outbox) sem commit: é confirmado
+    junto com o chamado. A entrega é feita pelo worker.
     """
     if not manager_emails:
         print("Nenhum gestor encontrado para enviar notificação por e-mail.")
@@ -76,7 +76,9 @@ def send_new_request_email_background(manager_emails: List[str], request: Mainte
     </body>
     </html>
     """
-    send_email(to_emails=manager_emails, subject=subject, message_html=message_html)
+    await crud.email_outbox.enqueue_email(
+        db, to_emails=manager_emails, subject=subject, message_html=message_html, commit=False
+    )
 
 @router.post("/", response_model=MaintenanceRequestPublic, status_code=status.HTTP_201_CREATED,
             dependencies=[Depends(deps.check_demo_limit("maintenances"))])
@@ -87,20 +89,28 @@ async def create_maintenance_request(
     request_in: MaintenanceRequestCreate,
     current_user: User = Depends(deps.get_current_active_user)
 ):
+    organization_id, is_demo = current_user.organization_id, current_user.role == UserRole.CLIENTE_DEMO
     try:
         request = await crud.maintenance.create_request(
-            db=db, request_in=request_in, reporter_id=current_user.id, organization_id=current_user.organization_id
+            db=db, request_in=request_in, reporter_id=current_user.id, organization_id=organization_id,
+            commit=False
         )
-        
-        if current_user.role == UserRole.CLIENTE_DEMO:
-            await crud.demo_usage.increment_usage(db, organization_id=current_user.organization_id, resource_type="maintenances")
-        
         message = f"Nova solicitação de manutenção para {request.vehicle.brand} {request.vehicle.model} aberta por {current_user.full_name}."
+        # O chamado e o e-mail aos gestores são gravados na mesma transação
+        manager_emails = await crud.user.get_manager_emails(db, organization_id=organization_id)
+        await enqueue_new_request_email(db, manager_emails, request)
+        request_id = request.id
+        await db.commit()
+        request = await crud.maintenance.get_request(db=db, request_id=request_id, organization_id=organization_id)
+
+        if is_demo:
+            await crud.demo_usage.increment_usage(db, organization_id=organization_id, resource_type="maintenances")
+        
         background_tasks.add_task(
             crud.notification.create_notification,
             db=db, message=message, notification_type=NotificationType.MAINTENANCE_REQUEST_NEW,
-            organization_id=current_user.organization_id, send_to_managers=True,
-            related_entity_type="maintenance_request", related_entity_id=request.id,
+            organization_id=organization_id, send_to_managers=True,
+            related_entity_type="maintenance_request", related_entity_id=request_id,
             related_vehicle_id=request.vehicle_id
         )
         return request
@@ -1,21 +1,32 @@
 # backend/app/api/v1/endpoints/telemetry.py
 from fastapi import APIRouter, Depends, HTTPException, Response, status
-# ... (imports)
-from app.schemas.telemetry_schema import TelemetryPayload
 from app.api import deps
-from sqlalchemy.ext.asyncio import AsyncSession
-from app import crud # <-- CAMINHO CORRETO
+from app.schemas.telemetry_schema import TelemetryPayload, TelemetryBatch, TelemetryBatchAccepted
+from app.tasks.telemetry_tasks import enqueue_telemetry
 
 
+# Autenticação por chave de dispositivo (X-Device-Key), não de usuário: a chave
+# define a organização cujos dispositivos podem reportar
 router = APIRouter()
 
+def _buffer_full() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Ingestão de telemetria sobrecarregada. Tente novamente em instantes.",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/report", status_code=status.HTTP_204_NO_CONTENT)
-async def report_telemetry(
-    *,
-    db: AsyncSession = Depends(deps.get_db),
-    payload: TelemetryPayload
-):
-    """Recebe e processa um pacote de dados de telemetria."""
-    await crud.vehicle.update_vehicle_from_telemetry(db=db, payload=payload)
+async def report_telemetry(*, payload: TelemetryPayload, organization_id: int = Depends(deps.verify_device_key)):
+    """Recebe um pacote de telemetria; é gravado em lote pelo worker de telemetria."""
+    if not enqueue_telemetry([payload], organization_id=organization_id):
+        raise _buffer_full()
     # Retornamos 204 No Content para ser rápido, o dispositivo não precisa de uma resposta.
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/reports", status_code=status.HTTP_202_ACCEPTED, response_model=TelemetryBatchAccepted)
+async def report_telemetry_batch(*, batch_in: TelemetryBatch, organization_id: int = Depends(deps.verify_device_key)):
+    """Recebe um lote de pacotes de vários dispositivos, aceite por inteiro ou recusado com 503."""
+    if not enqueue_telemetry(batch_in.reports, organization_id=organization_id):
+        raise _buffer_full()
+    return TelemetryBatchAccepted(accepted=len(batch_in.reports))
@@ -1,33 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, UploadFile, File, Form, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Any, List, Optional
+from app import crud
 from app.api import deps
 from app.crud.crud_user import User as crud_user
 # CORREÇÃO: Importa UserPublic e o apelida de UserSchema
-from app.schemas.user_schema import UserPublic as UserSchema, UserCreate, UserUpdate
-from app.models.user_model import User as UserModel
+from app.schemas.user_schema import UserPublic as UserSchema, UserCreate, UserUpdate, UserSyncUpdate, UserSyncDelete
+from app.models.user_model import User as UserModel, UserRole
 from app.services.file_service import save_upload_file
 
 router = APIRouter()
 
 # --- NOVO ENDPOINT DE SINCRONIZAÇÃO (FASE 4) ---
-@router.post("/internal/sync_user", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
-def sync_user_profile(
+@router.post("/internal/sync_user", response_model=UserSchema, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(deps.verify_internal_api_key)])
+async def sync_user_profile(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     user_in: UserCreate,
 ):
     """
     Endpoint interno para o auth-api criar um perfil de usuário local.
     """
-    user = crud_user.get_by_email(db, email=user_in.email)
+    user = await crud.user.get_user_by_email(db, email=user_in.email)
     if user:
         return user
-    
+    if user_in.organization_id is None:
+        raise HTTPException(status_code=422, detail="organization_id é obrigatório para criar o perfil.")
+
     # Cria um usuário básico no sistema de frota
-    # O crud_user.create já lida com o hash da senha
-    user = crud_user.create(db, obj_in=user_in)
-    return user
+    # O crud.user.create já lida com o hash da senha
+    return await crud.user.create(
+        db, user_in=user_in, organization_id=user_in.organization_id, role=user_in.role or UserRole.DRIVER
+    )
+
+@router.put("/internal/sync_user", response_model=UserSchema,
+             dependencies=[Depends(deps.verify_internal_api_key)])
+async def sync_user_update(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    user_in: UserSyncUpdate,
+):
+    """
+    Endpoint interno para o auth-api propagar alterações de um usuário.
+    O usuário é identificado pelo e-mail anterior à alteração (lookup_email).
+    """
+    user = await crud.user.get_user_by_email(db, email=user_in.lookup_email)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    changes = UserUpdate(**user_in.model_dump(exclude_unset=True, exclude={"lookup_email"}))
+    return await crud.user.update(db, db_user=user, user_in=changes)
+
+@router.delete("/internal/sync_user", status_code=status.HTTP_204_NO_CONTENT,
+             dependencies=[Depends(deps.verify_internal_api_key)])
+async def sync_user_delete(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    user_in: UserSyncDelete = Body(...),
+):
+    """
+    Endpoint interno para o auth-api propagar a remoção de um usuário.
+    O perfil local é desativado, não apagado: viagens, manutenções e custos
+    continuam a referenciá-lo. Repetir o pedido não tem efeito.
+    """
+    user = await crud.user.get_user_by_email(db, email=user_in.email)
+    if user and user.is_active:
+        await crud.user.update(db, db_user=user, user_in=UserUpdate(is_active=False))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 # --- FIM DO NOVO ENDPOINT ---
 
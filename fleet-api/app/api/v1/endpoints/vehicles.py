@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+import json
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from pydantic import BaseModel  # Importa BaseModel
 
 from app import crud
 from app.api import deps
+from app.core.config import settings
+from app.services import track_service
 from app.models.user_model import User, UserRole
 from sqlalchemy.exc import IntegrityError
 
@@ -15,6 +20,7 @@ from app.schemas.vehicle_schema import (
     VehicleListResponse
 )
 from app.schemas.inventory_transaction_schema import TransactionPublic
+from app.schemas.track_schema import TrackResponse
 
 router = APIRouter()
 
@@ -87,6 +93,71 @@ async def read_vehicle_inventory_history(
     return history
 
 
+@router.get(
+    "/{vehicle_id}/track",
+    response_class=StreamingResponse,
+    responses={200: {"model": TrackResponse, "description": "Percurso simplificado, enviado em stream."}},
+)
+async def read_vehicle_track(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    vehicle_id: int,
+    start: datetime,
+    end: datetime,
+    tolerance_m: float = Query(10.0, gt=0, le=5_000, description="Desvio máximo do traçado simplificado, em metros."),
+    max_points: int = Query(5_000, ge=2, le=settings.TRACK_MAX_POINTS),
+    min_stop_minutes: float = Query(5.0, ge=1, le=24 * 60),
+    current_user: User = Depends(deps.get_current_active_user)
+):
+    """
+    Percurso do veículo entre dois instantes, simplificado até `tolerance_m` ou
+    `max_points` (o que chegar primeiro), com distância, velocidades e paragens
+    calculadas sobre os pontos brutos. Janelas mais antigas que a retenção dos
+    pontos brutos usam o histórico por minuto.
+    """
+    start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+    end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="O fim da janela deve ser posterior ao início.")
+    if end - start > timedelta(days=settings.TRACK_MAX_WINDOW_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A janela não pode exceder {settings.TRACK_MAX_WINDOW_DAYS} dias.",
+        )
+    vehicle = await crud.vehicle.get(db, vehicle_id=vehicle_id, organization_id=current_user.organization_id)
+    if not vehicle:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Veículo não encontrado.")
+
+    # Todo o acesso à base de dados acontece aqui; o stream só serializa
+    summary, stops, points = await track_service.build_track(
+        db,
+        vehicle_id=vehicle_id,
+        start=start,
+        end=end,
+        tolerance_m=tolerance_m,
+        max_points=max_points,
+        min_stop_minutes=min_stop_minutes,
+    )
+
+    def body():
+        head = {
+            "vehicle_id": vehicle_id,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "summary": summary.model_dump(),
+            "stops": [stop.model_dump(mode="json") for stop in stops],
+        }
+        yield json.dumps(head)[:-1] + ', "points": ['
+        for index in range(0, len(points), 1_000):
+            chunk = points[index:index + 1_000]
+            yield ("," if index else "") + ",".join(
+                json.dumps([timestamp.isoformat(), latitude, longitude]) for timestamp, latitude, longitude in chunk
+            )
+        yield "]}"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
 @router.post("/", response_model=VehiclePublic, status_code=status.HTTP_201_CREATED,
             dependencies=[Depends(deps.check_demo_limit("vehicles"))])
 async def create_vehicle(
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional, Set
+from typing import Dict, Optional, Set
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding='utf-8', extra="ignore")
@@ -14,6 +14,58 @@ class Settings(BaseSettings):
     SMTP_USER: str
     SMTP_PASSWORD: str
     EMAILS_FROM_EMAIL: str
+
+    # --- FILA DE E-MAILS (outbox) ---
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_INTERVAL_SECONDS: float = 5.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS: int = 30
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 120
+    SMTP_TIMEOUT_SECONDS: float = 30.0
+
+    # --- SINCRONIZAÇÃO DE UTILIZADORES (cabeçalho X-API-Key do auth-api em /users/internal) ---
+    # O mesmo valor que o INTERNAL_API_KEY do auth-api. Vazio: as rotas internas recusam tudo (401).
+    INTERNAL_API_KEY: str = ""
+
+    # --- CREDENCIAIS DOS DISPOSITIVOS (cabeçalho X-Device-Key em /gps e /telemetry) ---
+    # Chave -> organization_id: cada chave só grava veículos da sua organização.
+    # Várias chaves por organização permitem a rotação. Sem nenhuma, a ingestão é recusada (401).
+    DEVICE_INGEST_API_KEYS: Dict[str, int] = {}
+
+    # --- INGESTÃO DE GPS (buffer em memória, gravação em lote) ---
+    GPS_BUFFER_MAX_POINTS: int = 200_000 # Acima disto os pings são recusados (503)
+    GPS_FLUSH_BATCH_SIZE: int = 5_000 # Pontos por transação
+    GPS_FLUSH_INTERVAL_SECONDS: float = 1.0
+    GPS_MAX_POINTS_PER_REQUEST: int = 10_000
+    GPS_FLUSH_MAX_ATTEMPTS: int = 5 # Falhas de um lote antes de o dividir (um ponto sozinho é descartado)
+
+    # --- INGESTÃO DE TELEMETRIA (mesmo mecanismo do GPS) ---
+    TELEMETRY_BUFFER_MAX_REPORTS: int = 100_000
+    TELEMETRY_FLUSH_BATCH_SIZE: int = 2_000
+    TELEMETRY_FLUSH_INTERVAL_SECONDS: float = 1.0
+    TELEMETRY_MAX_REPORTS_PER_REQUEST: int = 5_000
+    TELEMETRY_FLUSH_MAX_ATTEMPTS: int = 5
+    # Cache dispositivo -> veículo (invalidado pelo crud de veículos; TTL para outros processos)
+    TELEMETRY_DEVICE_CACHE_SECONDS: int = 300
+    TELEMETRY_UNKNOWN_DEVICE_CACHE_SECONDS: int = 30
+    TELEMETRY_RETENTION_DAYS: int = 90 # Amostras brutas; apagadas pela manutenção do histórico
+    TELEMETRY_RETENTION_BATCH_SIZE: int = 10_000 # Amostras por DELETE (uma transação cada)
+
+    # --- HISTÓRICO DE LOCALIZAÇÃO (partições diárias, retenção e histórico por minuto) ---
+    LOCATION_RAW_RETENTION_DAYS: int = 30 # Pontos brutos; depois só o histórico por minuto
+    LOCATION_DOWNSAMPLED_RETENTION_DAYS: int = 730
+    LOCATION_PARTITIONS_AHEAD_DAYS: int = 3
+    # Espera por pontos atrasados antes de agregar um minuto; pontos mais atrasados ficam só
+    # nos dados brutos (ver app/tasks/location_history_tasks.py)
+    LOCATION_ROLLUP_LAG_MINUTES: int = 10
+    LOCATION_MAINTENANCE_INTERVAL_SECONDS: int = 3600
+    TRACK_MAX_POINTS: int = 20_000 # Teto do orçamento de pontos de GET /vehicles/{id}/track
+    TRACK_MAX_WINDOW_DAYS: int = 92
+
+    # --- POSIÇÕES EM TEMPO REAL (SSE em /dashboard/vehicles/positions/stream) ---
+    LIVE_POSITIONS_SUBSCRIBER_QUEUE: int = 100 # Mensagens por cliente; um cliente lento recebe um snapshot novo
+    LIVE_POSITIONS_HEARTBEAT_SECONDS: float = 15.0 # Comentário SSE para proxies não fecharem a ligação
+
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_SERVER: str
@@ -35,6 +87,18 @@ class Settings(BaseSettings):
 
     ALGORITHM: str = "HS256"
 
+    # --- TOKENS DO AUTH-API (verificação local pelo JWKS, ver app/core/jwks.py) ---
+    # Tokens com 'kid' são verificados com as chaves públicas do auth-api. Sem URL, só os
+    # tokens HS256 (SECRET_KEY) são aceites.
+    AUTH_JWKS_URL: Optional[str] = None # p.ex. http://auth-api:8001/api/v1/.well-known/jwks.json
+    AUTH_JWT_ISSUER: Optional[str] = None # JWT_ISSUER do auth-api
+    AUTH_JWT_AUDIENCE: Optional[str] = None # JWT_AUDIENCE do auth-api
+    AUTH_JWKS_CACHE_SECONDS: int = 300
+    AUTH_JWKS_MIN_REFRESH_SECONDS: int = 60 # Releitura por kid desconhecido (rotação), no máximo a este ritmo
+    AUTH_JWKS_TIMEOUT_SECONDS: float = 5.0
+    # Tokens sem 'kid' (HS256 com SECRET_KEY): os do login deste serviço e os antigos do auth-api
+    ACCEPT_LEGACY_HS256_TOKENS: bool = True
+
     # --- CHAVE DE CRIPTOGRAFIA ADICIONADA AQUI ---
     # Esta linha faz com que a sua aplicação leia a variável FERNET_KEY do arquivo .env
     FERNET_KEY: str
@@ -3,26 +3,65 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.core.config import settings
-from typing import List
+from typing import List, Optional, Tuple
 
-def send_email(to_emails: List[str], subject: str, message_html: str):
+
+def build_message(to_emails: List[str], subject: str, message_html: str) -> MIMEMultipart:
     msg = MIMEMultipart()
     msg['From'] = settings.EMAILS_FROM_EMAIL
     msg['To'] = ", ".join(to_emails)
     msg['Subject'] = subject
     msg.attach(MIMEText(message_html, 'html'))
+    return msg
+
+
+class SMTPConnection:
+    """
+    Conexão SMTP reutilizável: starttls + login uma única vez e várias mensagens
+    pela mesma sessão. Se o servidor fechar a conexão, reconecta uma vez.
+    Usada pelo worker da fila de e-mails (app/tasks/email_tasks.py).
+    """
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        server.starttls()
+        server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        return server
+
+    def send(self, msg: MIMEMultipart) -> None:
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._server = self._connect()
+            self._server.send_message(msg)
 
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+def send_email(to_emails: List[str], subject: str, message_html: str):
+    """Envio direto (síncrono). Nas rotas prefira crud.email_outbox.enqueue_email."""
+    connection = SMTPConnection()
     try:
-        with smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-            server.starttls()
-            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(msg)
-            print(f"E-mail de notificação enviado com sucesso para: {to_emails}")
+        connection.send(build_message(to_emails, subject, message_html))
+        print(f"E-mail de notificação enviado com sucesso para: {to_emails}")
     except Exception as e:
         print(f"Erro ao enviar e-mail: {e}")
+    finally:
+        connection.close()
 
-def send_password_reset_email(to_email: str, user_name: str, token: str):
-    """Envia o e-mail de recuperação de senha com o link e o token."""
+def build_password_reset_email(user_name: str, token: str) -> Tuple[str, str]:
+    """Retorna (assunto, html) do e-mail de recuperação de senha com o link e o token."""
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Redefinição de Senha"
     
@@ -59,6 +98,10 @@ def send_password_reset_email(to_email: str, user_name: str, token: str):
     </body>
     </html>
     """
-    
+    return subject, message_html
+
+def send_password_reset_email(to_email: str, user_name: str, token: str):
+    """Envia o e-mail de recuperação de senha com o link e o token."""
+    subject, message_html = build_password_reset_email(user_name, token)
     send_email(to_emails=[to_email], subject=subject, message_html=message_html)
 # --- FIM DA MODIFICAÇÃO ---
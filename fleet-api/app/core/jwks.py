@@ -0,0 +1,73 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from jose import JWTError, jwt
+
+from app.core.config import settings
+
+# Verificação local dos access tokens. Tokens com 'kid' no header são do auth-api e
+# são verificados com a chave pública desse kid no JWKS do auth-api (AUTH_JWKS_URL),
+# em cache por AUTH_JWKS_CACHE_SECONDS; um kid desconhecido força nova leitura (chave
+# nova após uma rotação), no máximo a cada AUTH_JWKS_MIN_REFRESH_SECONDS.
+# Tokens sem 'kid' são HS256 com SECRET_KEY (o login deste serviço e os tokens do
+# auth-api anteriores às chaves assimétricas), enquanto ACCEPT_LEGACY_HS256_TOKENS.
+
+# O algoritmo vem do JWK, nunca do header do token
+_ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"}
+
+_keys: Dict[str, Dict[str, Any]] = {} # kid -> JWK
+_expires_at = 0.0
+_fetched_at = 0.0
+_lock = asyncio.Lock()
+
+
+async def _get_signing_key(kid: str) -> Optional[Dict[str, Any]]:
+    global _keys, _expires_at, _fetched_at
+    now = time.monotonic()
+    if kid in _keys and now < _expires_at:
+        return _keys[kid]
+    if not settings.AUTH_JWKS_URL:
+        return None
+    async with _lock:
+        now = time.monotonic()
+        stale = now >= _expires_at
+        rotated = kid not in _keys and now - _fetched_at >= settings.AUTH_JWKS_MIN_REFRESH_SECONDS
+        if stale or rotated:
+            _fetched_at = now
+            try:
+                async with httpx.AsyncClient(timeout=settings.AUTH_JWKS_TIMEOUT_SECONDS) as client:
+                    response = await client.get(settings.AUTH_JWKS_URL)
+                    response.raise_for_status()
+                _keys = {key.get("kid"): key for key in response.json().get("keys", [])}
+                _expires_at = now + settings.AUTH_JWKS_CACHE_SECONDS
+            except (httpx.HTTPError, ValueError) as e:
+                # Mantém as chaves que já tinha; nova tentativa após o intervalo mínimo
+                print(f"Erro ao ler o JWKS do auth-api: {e}")
+                _expires_at = now + settings.AUTH_JWKS_MIN_REFRESH_SECONDS
+    return _keys.get(kid)
+
+
+async def decode_access_token(token: str) -> Dict[str, Any]:
+    """Verifica assinatura e validade do token e retorna as claims. Levanta JWTError."""
+    kid = jwt.get_unverified_header(token).get("kid")
+    if not kid:
+        if not settings.ACCEPT_LEGACY_HS256_TOKENS:
+            raise JWTError("Token HS256 (sem kid) rejeitado: ACCEPT_LEGACY_HS256_TOKENS=false")
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM], options={"verify_aud": False})
+
+    key = await _get_signing_key(kid)
+    if key is None:
+        raise JWTError(f"Token assinado com kid desconhecido: {kid}")
+    algorithm = key.get("alg")
+    if algorithm not in _ASYMMETRIC_ALGORITHMS:
+        raise JWTError(f"Algoritmo não suportado no JWKS: {algorithm}")
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=settings.AUTH_JWT_AUDIENCE,
+        issuer=settings.AUTH_JWT_ISSUER,
+        options={"verify_aud": bool(settings.AUTH_JWT_AUDIENCE)},
+    )
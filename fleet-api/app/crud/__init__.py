@@ -19,4 +19,7 @@ from . import crud_notification as notification
 from . import crud_report as report
 from . import crud_tire as tire #
 from . import crud_fine as fine # <-- ADICIONE ESTA LINHA
-from . import crud_demo_usage as demo_usage
\ No newline at end of file
+from . import crud_demo_usage as demo_usage
+from . import crud_email_outbox as email_outbox
+from . import crud_location_history as location_history
+from . import crud_telemetry as telemetry
@@ -0,0 +1,91 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from datetime import datetime, timedelta, timezone
+from typing import List, Sequence
+
+from app.core.config import settings
+from app.models.email_outbox_model import EmailOutbox, EmailOutboxStatus
+
+
+async def enqueue_email(
+    db: AsyncSession, *, to_emails: List[str], subject: str, message_html: str, commit: bool = True
+) -> EmailOutbox:
+    """
+    Coloca um e-mail na fila (um único INSERT). A entrega é feita pelo worker,
+    por isso a latência do servidor SMTP não afeta a requisição.
+    """
+    db_obj = EmailOutbox(
+        to_emails=list(to_emails),
+        subject=subject,
+        message_html=message_html,
+        status=EmailOutboxStatus.PENDING,
+        attempts=0,
+        next_attempt_at=datetime.now(timezone.utc),
+    )
+    db.add(db_obj)
+    if commit:
+        await db.commit()
+    return db_obj
+
+
+async def claim_batch(db: AsyncSession, *, limit: int, lease_seconds: int) -> List[EmailOutbox]:
+    """
+    Reclama até `limit` e-mails prontos: incrementa as tentativas e adia
+    `next_attempt_at` pelo lease, para que outro worker não os apanhe.
+    No PostgreSQL usa FOR UPDATE SKIP LOCKED. Se o worker cair a meio,
+    os e-mails voltam à fila quando o lease expira.
+    """
+    now = datetime.now(timezone.utc)
+    stmt = (
+        select(EmailOutbox)
+        .where(EmailOutbox.status == EmailOutboxStatus.PENDING, EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    messages = list((await db.execute(stmt)).scalars().all())
+    if not messages:
+        await db.rollback()
+        return []
+    lease_until = now + timedelta(seconds=lease_seconds)
+    for message in messages:
+        message.attempts += 1
+        message.next_attempt_at = lease_until
+    await db.flush()
+    # Desliga as mensagens da sessão antes do commit: o worker usa-as depois de a
+    # sessão fechar, e o commit (expire_on_commit) deixá-las-ia por carregar
+    for message in messages:
+        db.expunge(message)
+    await db.commit()
+    return messages
+
+
+async def mark_sent(db: AsyncSession, *, ids: Sequence[int]) -> int:
+    """Marca um lote de e-mails como enviados num único UPDATE."""
+    if not ids:
+        return 0
+    stmt = (
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids))
+        .values(status=EmailOutboxStatus.SENT, sent_at=datetime.now(timezone.utc), last_error=None)
+    )
+    result = await db.execute(stmt)
+    await db.commit()
+    return result.rowcount
+
+
+async def mark_failed(db: AsyncSession, *, message: EmailOutbox, error: str) -> EmailOutboxStatus:
+    """
+    Registra a falha de uma tentativa: reagenda com backoff exponencial
+    (máx. 1h) ou, se as tentativas acabaram, marca como FAILED.
+    """
+    if message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        new_status = EmailOutboxStatus.FAILED
+        values = {"status": new_status, "last_error": error}
+    else:
+        new_status = EmailOutboxStatus.PENDING
+        delay = min(settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * 2 ** (message.attempts - 1), 3600)
+        values = {"last_error": error, "next_attempt_at": datetime.now(timezone.utc) + timedelta(seconds=delay)}
+    await db.execute(update(EmailOutbox).where(EmailOutbox.id == message.id).values(**values))
+    await db.commit()
+    return new_status
@@ -0,0 +1,155 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import DateTime, delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.location_history_model import LocationHistory, LocationHistoryMinute
+
+# Pontos com data mais à frente do que isto (relógio do dispositivo errado) são
+# descartados: não há partição para eles.
+MAX_FUTURE_SKEW = timedelta(days=1)
+
+TrackPoint = Tuple[datetime, float, float] # (timestamp, latitude, longitude)
+
+
+class minute_bucket(FunctionElement):
+    """Trunca um timestamp ao minuto, no dialeto do banco."""
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(minute_bucket)
+def _minute_bucket_default(element, compiler, **kw):
+    return f"date_trunc('minute', {compiler.process(element.clauses, **kw)})"
+
+
+@compiles(minute_bucket, "sqlite")
+def _minute_bucket_sqlite(element, compiler, **kw):
+    return f"strftime('%Y-%m-%d %H:%M:00.000000', {compiler.process(element.clauses, **kw)})"
+
+
+def raw_cutoff(now: datetime) -> datetime:
+    """Início do dia (UTC) mais antigo mantido em location_history."""
+    oldest = (now - timedelta(days=settings.LOCATION_RAW_RETENTION_DAYS)).astimezone(timezone.utc)
+    return oldest.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def bulk_create(db: AsyncSession, *, rows: List[Dict[str, Any]]) -> int:
+    """
+    Insere vários pontos de histórico num único INSERT em executemany
+    (vehicle_id, organization_id, latitude, longitude, timestamp).
+    Pontos fora da janela com partição (mais antigos que a retenção ou no futuro)
+    são descartados. Não faz commit: quem chama agrupa com a atualização da última posição.
+    """
+    now = datetime.now(timezone.utc)
+    oldest, newest = raw_cutoff(now), now + MAX_FUTURE_SKEW
+    accepted = [row for row in rows if oldest <= row["timestamp"] < newest]
+    if len(accepted) < len(rows):
+        print(f"AVISO: {len(rows) - len(accepted)} pontos de histórico fora da janela de retenção descartados.")
+    if not accepted:
+        return 0
+    await db.execute(insert(LocationHistory), accepted)
+    return len(accepted)
+
+
+async def get_oldest_raw_timestamp(db: AsyncSession, *, vehicle_id: Optional[int] = None) -> Optional[datetime]:
+    stmt = select(func.min(LocationHistory.timestamp))
+    if vehicle_id is not None:
+        stmt = stmt.where(LocationHistory.vehicle_id == vehicle_id)
+    return (await db.execute(stmt)).scalar()
+
+
+async def get_rollup_watermark(db: AsyncSession) -> Optional[datetime]:
+    """Último minuto já agregado (qualquer veículo)."""
+    return (await db.execute(select(func.max(LocationHistoryMinute.bucket)))).scalar()
+
+
+async def rollup_minutes(db: AsyncSession, *, start: datetime, end: datetime) -> int:
+    """
+    Agrega os pontos brutos de [start, end) em LocationHistoryMinute, guardando o
+    último ponto de cada veículo em cada minuto. Minutos já agregados são ignorados,
+    por isso pode ser repetido sobre a mesma janela. Não faz commit.
+    """
+    bucket = minute_bucket(LocationHistory.timestamp)
+    ranked = (
+        select(
+            LocationHistory.vehicle_id,
+            bucket.label("bucket"),
+            LocationHistory.latitude,
+            LocationHistory.longitude,
+            LocationHistory.organization_id,
+            func.row_number().over(
+                partition_by=(LocationHistory.vehicle_id, bucket),
+                order_by=LocationHistory.timestamp.desc(),
+            ).label("position"),
+        )
+        .where(LocationHistory.timestamp >= start, LocationHistory.timestamp < end)
+        .subquery()
+    )
+    columns = ["vehicle_id", "bucket", "latitude", "longitude", "organization_id"]
+    source = select(*(ranked.c[name] for name in columns)).where(ranked.c.position == 1)
+    dialect_insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(LocationHistoryMinute).from_select(columns, source).on_conflict_do_nothing()
+    result = await db.execute(stmt)
+    return result.rowcount
+
+
+async def delete_raw_before(db: AsyncSession, *, cutoff: datetime) -> int:
+    """Retenção para tabelas sem partições (sqlite, instalações antigas). Não faz commit."""
+    result = await db.execute(delete(LocationHistory).where(LocationHistory.timestamp < cutoff))
+    return result.rowcount
+
+
+async def delete_downsampled_before(db: AsyncSession, *, cutoff: datetime) -> int:
+    result = await db.execute(delete(LocationHistoryMinute).where(LocationHistoryMinute.bucket < cutoff))
+    return result.rowcount
+
+
+async def iter_track_points(
+    db: AsyncSession, *, vehicle_id: int, start: datetime, end: datetime
+) -> AsyncIterator[TrackPoint]:
+    """
+    Percorre os pontos do veículo em [start, end), por ordem cronológica, sem os
+    carregar todos em memória. A parte da janela anterior ao ponto bruto mais
+    antigo do veículo vem do histórico por minuto; o resto, da tabela bruta.
+    """
+    raw_start = await get_oldest_raw_timestamp(db, vehicle_id=vehicle_id)
+    if raw_start is not None and raw_start.tzinfo is None:
+        # sqlite não guarda o fuso; os timestamps gravados são UTC
+        raw_start = raw_start.replace(tzinfo=timezone.utc)
+    split = end if raw_start is None else min(max(raw_start, start), end)
+    # O minuto agregado que contém o primeiro ponto bruto sobrepor-se-ia aos pontos brutos
+    tier_end = split if split == end else split.replace(second=0, microsecond=0)
+
+    if start < tier_end:
+        stmt = (
+            select(LocationHistoryMinute.bucket, LocationHistoryMinute.latitude, LocationHistoryMinute.longitude)
+            .where(
+                LocationHistoryMinute.vehicle_id == vehicle_id,
+                LocationHistoryMinute.bucket >= start,
+                LocationHistoryMinute.bucket < tier_end,
+            )
+            .order_by(LocationHistoryMinute.bucket)
+            .execution_options(yield_per=2_000)
+        )
+        async for row in await db.stream(stmt):
+            yield row.bucket, row.latitude, row.longitude
+
+    if split < end:
+        stmt = (
+            select(LocationHistory.timestamp, LocationHistory.latitude, LocationHistory.longitude)
+            .where(
+                LocationHistory.vehicle_id == vehicle_id,
+                LocationHistory.timestamp >= split,
+                LocationHistory.timestamp < end,
+            )
+            .order_by(LocationHistory.timestamp)
+            .execution_options(yield_per=2_000)
+        )
+        async for row in await db.stream(stmt):
+            yield row.timestamp, row.latitude, row.longitude
@@ -11,16 +11,23 @@ from app.schemas.maintenance_schema import MaintenanceRequestCreate, Maintenance
 # --- CRUD para Solicitações de Manutenção ---
 
 async def create_request(
-    db: AsyncSession, *, request_in: MaintenanceRequestCreate, reporter_id: int, organization_id: int
+    db: AsyncSession, *, request_in: MaintenanceRequestCreate, reporter_id: int, organization_id: int,
+    commit: bool = True
 ) -> MaintenanceRequest:
-    """Cria uma nova solicitação de manutenção e retorna o objeto completo."""
+    """
+    Cria uma nova solicitação de manutenção e retorna o objeto completo.
+    Com commit=False só faz flush: quem chama confirma a transação (p.ex. junto com o e-mail).
+    """
     vehicle = await db.get(Vehicle, request_in.vehicle_id)
     if not vehicle or vehicle.organization_id != organization_id:
         raise ValueError("Veículo não encontrado nesta organização.")
 
     db_obj = MaintenanceRequest(**request_in.model_dump(), reported_by_id=reporter_id, organization_id=organization_id)
     db.add(db_obj)
-    await db.commit()
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
     await db.refresh(db_obj, ["reporter", "vehicle", "comments", "approver"])
     return db_obj
 
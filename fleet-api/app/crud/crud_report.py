@@ -333,15 +333,31 @@ async def get_active_goal_with_progress(db: AsyncSession, *, organization_id: in
 
 
 async def get_vehicle_positions(db: AsyncSession, *, organization_id: int) -> List[VehiclePosition]:
-    """Retorna a posição de todos os veículos para o mapa."""
-    stmt = select(Vehicle).where(
+    """Retorna a posição de todos os veículos para o mapa (só as colunas do mapa)."""
+    stmt = select(
+        Vehicle.id,
+        Vehicle.license_plate,
+        Vehicle.identifier,
+        Vehicle.last_latitude,
+        Vehicle.last_longitude,
+        Vehicle.status,
+    ).where(
         Vehicle.organization_id == organization_id,
         Vehicle.last_latitude.is_not(None),
         Vehicle.last_longitude.is_not(None),
     )
     result = await db.execute(stmt)
-    vehicles = result.scalars().all()
-    return [VehiclePosition.from_orm(v) for v in vehicles]
+    return [
+        VehiclePosition(
+            id=row.id,
+            license_plate=row.license_plate,
+            identifier=row.identifier,
+            latitude=row.last_latitude,
+            longitude=row.last_longitude,
+            status=getattr(row.status, "value", row.status),
+        )
+        for row in result
+    ]
     
 async def get_vehicle_consolidated_data(
     db: AsyncSession, *, vehicle_id: int, start_date: date, end_date: date, organization_id: int
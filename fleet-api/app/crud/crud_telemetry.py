@@ -0,0 +1,31 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, insert, select
+from datetime import datetime
+from typing import Any, Dict, List
+
+from app.models.telemetry_sample_model import TelemetrySample
+
+
+async def bulk_create_samples(db: AsyncSession, *, rows: List[Dict[str, Any]]) -> int:
+    """
+    Insere várias amostras de telemetria num único INSERT em executemany.
+    Não faz commit: quem chama agrupa com o histórico e o estado do veículo.
+    """
+    if not rows:
+        return 0
+    await db.execute(insert(TelemetrySample), rows)
+    return len(rows)
+
+
+async def delete_samples_before(db: AsyncSession, *, cutoff: datetime, batch_size: int) -> int:
+    """
+    Retenção das amostras brutas (TELEMETRY_RETENTION_DAYS): apaga no máximo
+    `batch_size` amostras anteriores ao corte (SELECT dos IDs com LIMIT e DELETE por
+    PK). Não faz commit: quem chama repete com um commit por lote.
+    """
+    ids_stmt = select(TelemetrySample.id).where(TelemetrySample.timestamp < cutoff).limit(batch_size)
+    ids = (await db.execute(ids_stmt)).scalars().all()
+    if not ids:
+        return 0
+    result = await db.execute(delete(TelemetrySample).where(TelemetrySample.id.in_(ids)))
+    return result.rowcount
@@ -86,6 +86,17 @@ async def get_users_by_role(
     return result.scalars().all()
 
 
+async def get_manager_emails(db: AsyncSession, *, organization_id: int) -> List[str]:
+    """E-mails dos gestores ativos da organização (os mesmos que recebem as notificações)."""
+    stmt = select(User.email).where(
+        User.organization_id == organization_id,
+        User.role.in_([UserRole.CLIENTE_ATIVO, UserRole.CLIENTE_DEMO]),
+        User.is_active == True
+    )
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
 async def create(db: AsyncSession, *, user_in: "UserCreate", organization_id: int, role: UserRole) -> User:
     from app.schemas.user_schema import UserCreate
     hashed_password = get_password_hash(user_in.password)
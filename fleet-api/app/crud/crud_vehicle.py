@@ -1,10 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_, func
-from typing import List
+from sqlalchemy import or_, func, case, bindparam, update as sql_update
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Sequence, Tuple
 
 from app.models.vehicle_model import Vehicle
-from app.schemas.telemetry_schema import TelemetryPayload
+from app.services.device_registry import device_registry
 from app.schemas.vehicle_schema import VehicleCreate, VehicleUpdate
 
 
@@ -57,26 +58,6 @@ async def count_by_org(db: AsyncSession, *, organization_id: int, search: str |
     result = await db.execute(stmt)
     return result.scalar_one()
 
-async def update_vehicle_from_telemetry(db: AsyncSession, *, payload: TelemetryPayload) -> Vehicle | None:
-    """Encontra um veículo pelo seu telemetry_device_id e atualiza seus dados."""
-    stmt = select(Vehicle).where(Vehicle.telemetry_device_id == payload.device_id)
-    result = await db.execute(stmt)
-    vehicle_obj = result.scalar_one_or_none()
-
-    if not vehicle_obj:
-        print(f"AVISO: Recebida telemetria de um dispositivo não registrado: {payload.device_id}")
-        return None
-
-    vehicle_obj.last_latitude = payload.latitude
-    vehicle_obj.last_longitude = payload.longitude
-    if payload.engine_hours > (vehicle_obj.current_engine_hours or 0):
-        vehicle_obj.current_engine_hours = payload.engine_hours
-    
-    db.add(vehicle_obj)
-    await db.commit()
-    await db.refresh(vehicle_obj)
-    return vehicle_obj
-
 async def create_with_owner(db: AsyncSession, *, obj_in: VehicleCreate, organization_id: int) -> Vehicle:
     """Cria um novo veículo associado a uma organização."""
     db_obj = Vehicle(**obj_in.model_dump())
@@ -85,20 +66,118 @@ async def create_with_owner(db: AsyncSession, *, obj_in: VehicleCreate, organiza
     db.add(db_obj)
     await db.commit()
     await db.refresh(db_obj)
+    # O dispositivo pode estar em cache como desconhecido
+    device_registry.invalidate(db_obj.telemetry_device_id)
     return db_obj
     
 async def update(db: AsyncSession, *, db_vehicle: Vehicle, vehicle_in: VehicleUpdate) -> Vehicle:
     """Atualiza os dados de um veículo."""
     update_data = vehicle_in.model_dump(exclude_unset=True)
+    previous_device_id = db_vehicle.telemetry_device_id
     for field, value in update_data.items():
         setattr(db_vehicle, field, value)
     db.add(db_vehicle)
     await db.commit()
     await db.refresh(db_vehicle)
+    device_registry.invalidate(previous_device_id, db_vehicle.telemetry_device_id)
     return db_vehicle
 
 async def remove(db: AsyncSession, *, db_vehicle: Vehicle) -> Vehicle:
     """Deleta um veículo do banco de dados."""
+    device_id = db_vehicle.telemetry_device_id
     await db.delete(db_vehicle)
     await db.commit()
-    return db_vehicle
\ No newline at end of file
+    device_registry.invalidate(device_id)
+    return db_vehicle
+
+async def get_organization_ids(db: AsyncSession, *, vehicle_ids: Sequence[int]) -> Dict[int, int]:
+    """Mapa vehicle_id -> organization_id dos veículos existentes, numa única consulta."""
+    if not vehicle_ids:
+        return {}
+    stmt = select(Vehicle.id, Vehicle.organization_id).where(Vehicle.id.in_(set(vehicle_ids)))
+    result = await db.execute(stmt)
+    return {vehicle_id: organization_id for vehicle_id, organization_id in result.all()}
+
+def _is_newer(position_at):
+    """Condição do UPDATE: a leitura é mais recente do que a última posição gravada."""
+    stored = Vehicle.__table__.c.last_position_at
+    return or_(stored.is_(None), stored < position_at)
+
+async def _position_owners(db: AsyncSession, *, readings: Dict[int, datetime]) -> List[int]:
+    """
+    Veículos cuja última posição gravada é a leitura dada (vehicle_id -> timestamp).
+    Depois do UPDATE condicional, identifica as linhas que este lote de facto atualizou.
+    """
+    if not readings:
+        return []
+    stmt = select(Vehicle.id, Vehicle.last_position_at).where(Vehicle.id.in_(readings))
+    result = await db.execute(stmt)
+    # sqlite devolve os timestamps sem fuso
+    return [
+        vehicle_id for vehicle_id, stored in result.all()
+        if stored is not None and (stored if stored.tzinfo else stored.replace(tzinfo=timezone.utc)) == readings[vehicle_id]
+    ]
+
+async def bulk_update_last_position(
+    db: AsyncSession, *, positions: Dict[int, Tuple[float, float, datetime]]
+) -> List[int]:
+    """
+    Atualiza a última posição de vários veículos (UPDATE por chave primária em
+    executemany), só onde a leitura é mais recente do que a gravada: um ping atrasado
+    ou reenviado noutro lote não faz a posição recuar. Retorna os veículos
+    atualizados. Não faz commit: corre na mesma transação do histórico.
+    """
+    if not positions:
+        return []
+    vehicles = Vehicle.__table__
+    position_at = bindparam("b_position_at")
+    stmt = (
+        sql_update(vehicles)
+        .where(vehicles.c.id == bindparam("b_vehicle_id"), _is_newer(position_at))
+        .values(last_latitude=bindparam("b_latitude"), last_longitude=bindparam("b_longitude"), last_position_at=position_at)
+    )
+    params = [
+        {"b_vehicle_id": vehicle_id, "b_latitude": lat, "b_longitude": lon, "b_position_at": at}
+        for vehicle_id, (lat, lon, at) in positions.items()
+    ]
+    await db.execute(stmt, params)
+    return await _position_owners(db, readings={vehicle_id: at for vehicle_id, (_, _, at) in positions.items()})
+
+async def bulk_update_from_telemetry(db: AsyncSession, *, states: List[Dict[str, Any]]) -> List[int]:
+    """
+    Atualiza última posição e horímetro de vários veículos num UPDATE em executemany.
+    Cada estado: vehicle_id, latitude, longitude, timestamp, engine_hours. Nem a
+    posição (last_position_at) nem o horímetro andam para trás. Retorna os veículos
+    cuja posição foi atualizada. Não faz commit: corre na mesma transação das amostras.
+    """
+    if not states:
+        return []
+    vehicles = Vehicle.__table__
+    engine_hours = bindparam("b_engine_hours")
+    position_at = bindparam("b_position_at")
+    newer = _is_newer(position_at)
+    stmt = (
+        sql_update(vehicles)
+        .where(vehicles.c.id == bindparam("b_vehicle_id"))
+        .values(
+            last_latitude=case((newer, bindparam("b_latitude")), else_=vehicles.c.last_latitude),
+            last_longitude=case((newer, bindparam("b_longitude")), else_=vehicles.c.last_longitude),
+            last_position_at=case((newer, position_at), else_=vehicles.c.last_position_at),
+            current_engine_hours=case(
+                (func.coalesce(vehicles.c.current_engine_hours, 0) < engine_hours, engine_hours),
+                else_=vehicles.c.current_engine_hours,
+            ),
+        )
+    )
+    params = [
+        {
+            "b_vehicle_id": state["vehicle_id"],
+            "b_latitude": state["latitude"],
+            "b_longitude": state["longitude"],
+            "b_position_at": state["timestamp"],
+            "b_engine_hours": state["engine_hours"],
+        }
+        for state in states
+    ]
+    await db.execute(stmt, params)
+    return await _position_owners(db, readings={state["vehicle_id"]: state["timestamp"] for state in states})
@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.base_class import Base
+from app.models.location_history_model import LocationHistory
+
+# Particionamento diário de location_history (só PostgreSQL; noutros bancos, como o
+# sqlite dos testes, a tabela é normal). A retenção passa a ser um DROP TABLE da
+# partição do dia em vez de DELETEs sobre milhões de linhas.
+#
+# Instalações que já têm a tabela sem partições continuam a funcionar: é detetado
+# em is_partitioned() e a retenção recorre a DELETE até a tabela ser migrada, uma vez,
+# com `python -m app.db.partitioning --convert` (ver convert_to_partitioned).
+
+PARTITION_PREFIX = "location_history_p"
+_LEGACY_TABLE = "location_history_legacy"
+_PARTITION_RE = re.compile(rf"^{PARTITION_PREFIX}(\d{{8}})$")
+
+# A chave primária tem de incluir a coluna de partição; id continua único pela identity
+_CREATE_PARTITIONED_TABLE = """
+CREATE TABLE IF NOT EXISTS location_history (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+    latitude DOUBLE PRECISION NOT NULL,
+    longitude DOUBLE PRECISION NOT NULL,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    vehicle_id INTEGER NOT NULL REFERENCES vehicles (id) ON DELETE CASCADE,
+    organization_id INTEGER NOT NULL REFERENCES organizations (id),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp)
+"""
+_CREATE_PARTITIONED_INDEX = (
+    "CREATE INDEX IF NOT EXISTS ix_location_history_vehicle_timestamp "
+    "ON location_history (vehicle_id, timestamp)"
+)
+
+# Colunas acrescentadas a tabelas que já existem (create_all não altera tabelas)
+_ADD_COLUMNS = (
+    "ALTER TABLE vehicles ADD COLUMN IF NOT EXISTS last_position_at TIMESTAMP WITH TIME ZONE",
+)
+
+
+def create_tables(connection: Connection) -> None:
+    """
+    Substitui Base.metadata.create_all no startup: no PostgreSQL cria
+    location_history como tabela particionada (se ainda não existir) e
+    acrescenta as colunas novas às tabelas existentes.
+    """
+    if connection.dialect.name != "postgresql":
+        Base.metadata.create_all(connection)
+        return
+    history = LocationHistory.__table__
+    Base.metadata.create_all(connection, tables=[t for t in Base.metadata.sorted_tables if t is not history])
+    connection.execute(text(_CREATE_PARTITIONED_TABLE))
+    connection.execute(text(_CREATE_PARTITIONED_INDEX))
+    for statement in _ADD_COLUMNS:
+        connection.execute(text(statement))
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return False
+    stmt = text("SELECT relkind FROM pg_class WHERE oid = to_regclass('location_history')")
+    return (await db.execute(stmt)).scalar() == "p"
+
+
+async def list_partitions(db: AsyncSession) -> Dict[str, date]:
+    """Partições diárias existentes: nome -> dia."""
+    stmt = text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('location_history')"
+    )
+    partitions = {}
+    for (name,) in (await db.execute(stmt)).all():
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions[name] = datetime.strptime(match.group(1), "%Y%m%d").date()
+    return partitions
+
+
+async def ensure_partitions(db: AsyncSession, *, first_day: date, last_day: date) -> List[str]:
+    """Cria as partições em falta de first_day a last_day (inclusive). Retorna as criadas."""
+    existing = await list_partitions(db)
+    created = []
+    day = first_day
+    while day <= last_day:
+        name = partition_name(day)
+        if name not in existing:
+            await db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF location_history "
+                f"FOR VALUES FROM ('{day_start(day).isoformat()}') TO ('{day_start(day + timedelta(days=1)).isoformat()}')"
+            ))
+            created.append(name)
+        day += timedelta(days=1)
+    return created
+
+
+async def drop_partitions_before(db: AsyncSession, *, day: date) -> List[str]:
+    """Descarta as partições de dias anteriores a `day`. Retorna as descartadas."""
+    dropped = []
+    for name, partition_day in sorted((await list_partitions(db)).items()):
+        if partition_day < day:
+            await db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    return dropped
+
+
+async def convert_to_partitioned(db: AsyncSession, *, first_day: date, last_day: date) -> Tuple[int, int]:
+    """
+    Converte uma location_history sem partições, numa só transação: renomeia a tabela
+    (e os seus índices e sequência), cria a tabela particionada com as partições de
+    first_day a last_day, copia os pontos dessa janela e apaga a tabela antiga. Os
+    pontos fora da janela seriam apagados pela retenção e não são copiados. Retorna
+    (copiados, descartados). Não faz commit.
+    """
+    if await is_partitioned(db):
+        return 0, 0
+    # A ingestão espera pelo fim (os pings ficam no buffer e o lote é repetido)
+    await db.execute(text("LOCK TABLE location_history IN ACCESS EXCLUSIVE MODE"))
+    await db.execute(text(f"ALTER TABLE location_history RENAME TO {_LEGACY_TABLE}"))
+    # Os nomes dos índices (incluindo o da chave primária) e da sequência ficariam ocupados
+    indexes = await db.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": _LEGACY_TABLE})
+    for (name,) in indexes.all():
+        await db.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name[:56]}_legacy"'))
+    sequence = (await db.execute(text(f"SELECT pg_get_serial_sequence('{_LEGACY_TABLE}', 'id')"))).scalar()
+    if sequence:
+        await db.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {_LEGACY_TABLE}_id_seq"))
+
+    await db.execute(text(_CREATE_PARTITIONED_TABLE))
+    await db.execute(text(_CREATE_PARTITIONED_INDEX))
+    await ensure_partitions(db, first_day=first_day, last_day=last_day)
+    window = {"start": day_start(first_day), "end": day_start(last_day + timedelta(days=1))}
+    copied = (await db.execute(text(
+        "INSERT INTO location_history (id, latitude, longitude, timestamp, vehicle_id, organization_id) "
+        "OVERRIDING SYSTEM VALUE "
+        "SELECT id, latitude, longitude, timestamp, vehicle_id, organization_id "
+        f"FROM {_LEGACY_TABLE} WHERE timestamp >= :start AND timestamp < :end"
+    ), window)).rowcount
+    total = (await db.execute(text(f"SELECT count(*) FROM {_LEGACY_TABLE}"))).scalar()
+    # Novos ids continuam depois dos copiados
+    await db.execute(text(
+        "SELECT setval(pg_get_serial_sequence('location_history', 'id'), "
+        "(SELECT COALESCE(MAX(id), 0) + 1 FROM location_history), false)"
+    ))
+    await db.execute(text(f"DROP TABLE {_LEGACY_TABLE}"))
+    return copied, total - copied
+
+
+async def _convert() -> None:
+    from app.core.config import settings
+    from app.db.session import SessionLocal
+
+    now = datetime.now(timezone.utc)
+    first_day = (now - timedelta(days=settings.LOCATION_RAW_RETENTION_DAYS)).date()
+    last_day = (now + timedelta(days=settings.LOCATION_PARTITIONS_AHEAD_DAYS)).date()
+    async with SessionLocal() as db:
+        if db.bind.dialect.name != "postgresql":
+            print("O particionamento só existe no PostgreSQL.")
+            return
+        if await is_partitioned(db):
+            print("location_history já é particionada.")
+            return
+        copied, skipped = await convert_to_partitioned(db, first_day=first_day, last_day=last_day)
+        await db.commit()
+    print(f"location_history convertida: {copied} pontos copiados, {skipped} fora da retenção descartados.")
+
+
+if __name__ == "__main__":
+    # Uso (uma vez, de preferência com pouca ingestão): python -m app.db.partitioning --convert
+    parser = argparse.ArgumentParser(description="Particionamento diário de location_history.")
+    parser.add_argument("--convert", action="store_true", help="Converte a tabela existente sem partições.")
+    args = parser.parse_args()
+    if args.convert:
+        asyncio.run(_convert())
+    else:
+        parser.print_help()
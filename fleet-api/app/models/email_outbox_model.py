@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index, func, Enum as SAEnum
+import enum
+
+from app.db.base_class import Base
+
+
+class EmailOutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed" # Esgotou EMAIL_OUTBOX_MAX_ATTEMPTS
+
+
+class EmailOutbox(Base):
+    """
+    Fila persistente de e-mails. As rotas apenas inserem uma linha; o worker
+    em app/tasks/email_tasks.py entrega em lotes por uma conexão SMTP reutilizada.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_emails = Column(JSON, nullable=False) # Lista de destinatários
+    subject = Column(String(255), nullable=False)
+    message_html = Column(Text, nullable=False)
+
+    status = Column(SAEnum(EmailOutboxStatus), nullable=False, default=EmailOutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    # Próxima tentativa; enquanto um worker envia, funciona como "lease"
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
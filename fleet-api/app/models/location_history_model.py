@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, func, Float
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, func, Float, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
 
 class LocationHistory(Base):
+    """
+    Pontos brutos de GPS/telemetria. No PostgreSQL a tabela é particionada por dia
+    (ver app/db/partitioning.py) e as partições antigas são descartadas inteiras;
+    antes disso os pontos são agregados em LocationHistoryMinute.
+    """
     __tablename__ = "location_history"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -14,4 +19,22 @@ class LocationHistory(Base):
     vehicle_id = Column(Integer, ForeignKey("vehicles.id", ondelete="CASCADE"), nullable=False)
     vehicle = relationship("Vehicle")
     organization_id = Column(Integer, ForeignKey("organizations.id",), nullable=False)
-    organization = relationship("Organization")
\ No newline at end of file
+    organization = relationship("Organization")
+
+    __table_args__ = (
+        Index("ix_location_history_vehicle_timestamp", "vehicle_id", "timestamp"),
+    )
+
+class LocationHistoryMinute(Base):
+    """Histórico de longo prazo: um ponto por veículo e minuto (o último do minuto)."""
+    __tablename__ = "location_history_minute"
+
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True) # Início do minuto (UTC)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+
+    __table_args__ = (
+        Index("ix_location_history_minute_bucket", "bucket"),
+    )
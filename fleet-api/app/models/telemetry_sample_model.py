@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, JSON, Index
+from sqlalchemy.orm import relationship
+
+from app.db.base_class import Base
+
+class TelemetrySample(Base):
+    """
+    Amostra bruta recebida de um rastreador (/telemetry/report). O estado atual
+    (última posição, horímetro) continua no veículo; aqui fica o histórico completo.
+    """
+    __tablename__ = "telemetry_samples"
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(String(100), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    engine_hours = Column(Float, nullable=False)
+    fuel_level = Column(Float, nullable=True)
+    error_codes = Column(JSON(none_as_null=True), nullable=True) # Lista de códigos de erro do motor
+
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id", ondelete="CASCADE"), nullable=False)
+    vehicle = relationship("Vehicle")
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    organization = relationship("Organization")
+
+    __table_args__ = (
+        Index("ix_telemetry_samples_vehicle_timestamp", "vehicle_id", "timestamp"),
+        Index("ix_telemetry_samples_timestamp", "timestamp"), # Retenção
+    )
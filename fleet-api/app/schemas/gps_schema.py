@@ -1,6 +1,20 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
 
 class LocationCreate(BaseModel):
     vehicle_id: int
-    latitude: float
-    longitude: float
\ No newline at end of file
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    # Momento da leitura no dispositivo; se omitido, usa-se o momento da receção
+    timestamp: Optional[datetime] = None
+
+class LocationBatch(BaseModel):
+    """Lote de pings de vários veículos, enviado por um gateway ou pelo próprio rastreador."""
+    points: List[LocationCreate] = Field(..., min_length=1, max_length=settings.GPS_MAX_POINTS_PER_REQUEST)
+
+class LocationBatchAccepted(BaseModel):
+    accepted: int
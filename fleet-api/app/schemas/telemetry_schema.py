@@ -1,14 +1,23 @@
 # backend/app/schemas/telemetry_schema.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List
 
+from app.core.config import settings
+
 class TelemetryPayload(BaseModel):
     device_id: str
     timestamp: datetime
-    latitude: float
-    longitude: float
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
     engine_hours: float
     fuel_level: Optional[float] = None
     # Códigos de erro do motor, se houver
-    error_codes: Optional[List[str]] = None
\ No newline at end of file
+    error_codes: Optional[List[str]] = None
+
+class TelemetryBatch(BaseModel):
+    """Lote de pacotes de telemetria (vários dispositivos), enviado por um gateway."""
+    reports: List[TelemetryPayload] = Field(..., min_length=1, max_length=settings.TELEMETRY_MAX_REPORTS_PER_REQUEST)
+
+class TelemetryBatchAccepted(BaseModel):
+    accepted: int
@@ -0,0 +1,32 @@
+# backend/app/schemas/track_schema.py
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Tuple
+
+class TrackStop(BaseModel):
+    start: datetime
+    end: datetime
+    latitude: float
+    longitude: float
+    duration_minutes: float
+
+class TrackSummary(BaseModel):
+    raw_points: int # Pontos lidos do histórico na janela
+    discarded_points: int # Saltos impossíveis (ruído do GPS)
+    returned_points: int
+    distance_km: float
+    moving_minutes: float
+    stopped_minutes: float
+    max_speed_kmh: float
+    avg_moving_speed_kmh: float
+    stop_count: int
+
+class TrackResponse(BaseModel):
+    """Formato da resposta de GET /vehicles/{id}/track (enviada em stream)."""
+    vehicle_id: int
+    start: datetime
+    end: datetime
+    summary: TrackSummary
+    stops: List[TrackStop]
+    # [timestamp, latitude, longitude], por ordem cronológica
+    points: List[Tuple[datetime, float, float]]
@@ -35,6 +35,13 @@ class UserUpdate(BaseModel):
     notification_email: Optional[str] = None
     employee_id: Optional[str] = None # Permite a edição do ID se necessário
 
+class UserSyncUpdate(UserUpdate):
+    # E-mail atual do utilizador (antes da alteração), enviado pelo auth-api
+    lookup_email: str
+
+class UserSyncDelete(BaseModel):
+    email: str
+
 class UserPasswordUpdate(BaseModel):
     current_password: str
     new_password: str
@@ -0,0 +1,70 @@
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.vehicle_model import Vehicle
+
+# Mapa em memória telemetry_device_id -> (vehicle_id, organization_id), usado pela
+# ingestão de telemetria para não consultar a tabela de veículos a cada pacote.
+# O crud de veículos invalida as entradas quando um dispositivo é associado, trocado
+# ou o veículo removido; noutros processos a entrada expira após
+# TELEMETRY_DEVICE_CACHE_SECONDS. Dispositivos desconhecidos também ficam em cache
+# (TELEMETRY_UNKNOWN_DEVICE_CACHE_SECONDS) para não gerarem uma consulta por pacote.
+
+DeviceTarget = Tuple[int, int] # (vehicle_id, organization_id)
+
+# Acima deste número de entradas, as expiradas são descartadas
+_MAX_ENTRIES = 100_000
+
+
+class DeviceRegistry:
+    def __init__(self):
+        # device_id -> (destino ou None se desconhecido, expira em [time.monotonic])
+        self._entries: Dict[str, Tuple[Optional[DeviceTarget], float]] = {}
+
+    async def resolve_many(self, db: AsyncSession, device_ids: Iterable[str]) -> Dict[str, DeviceTarget]:
+        """Resolve os dispositivos; só os que não estão em cache custam uma consulta (única)."""
+        now = time.monotonic()
+        resolved: Dict[str, DeviceTarget] = {}
+        missing = set()
+        for device_id in set(device_ids):
+            entry = self._entries.get(device_id)
+            if entry is not None and now < entry[1]:
+                if entry[0] is not None:
+                    resolved[device_id] = entry[0]
+            else:
+                missing.add(device_id)
+        if not missing:
+            return resolved
+
+        stmt = (
+            select(Vehicle.telemetry_device_id, Vehicle.id, Vehicle.organization_id)
+            .where(Vehicle.telemetry_device_id.in_(missing))
+        )
+        found = {device_id: (vehicle_id, organization_id) for device_id, vehicle_id, organization_id in (await db.execute(stmt)).all()}
+        if len(self._entries) + len(missing) > _MAX_ENTRIES:
+            self._prune(now)
+        for device_id in missing:
+            target = found.get(device_id)
+            ttl = settings.TELEMETRY_DEVICE_CACHE_SECONDS if target else settings.TELEMETRY_UNKNOWN_DEVICE_CACHE_SECONDS
+            self._entries[device_id] = (target, now + ttl)
+        resolved.update(found)
+        return resolved
+
+    def invalidate(self, *device_ids: Optional[str]) -> None:
+        """Esquece os dispositivos indicados (None é ignorado); sem argumentos, esquece todos."""
+        if not device_ids:
+            self._entries.clear()
+            return
+        for device_id in device_ids:
+            if device_id is not None:
+                self._entries.pop(device_id, None)
+
+    def _prune(self, now: float) -> None:
+        self._entries = {k: v for k, v in self._entries.items() if now < v[1]}
+
+
+device_registry = DeviceRegistry()
@@ -0,0 +1,306 @@
+import asyncio
+import json
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.models.vehicle_model import Vehicle
+
+# Posições em tempo real, por organização, enviadas por SSE
+# (GET /dashboard/vehicles/positions/stream).
+#
+# A ingestão (gps_tasks / telemetry_tasks) publica as novas posições na mesma
+# transação em que as grava: no PostgreSQL com NOTIFY, entregue a todos os processos
+# no commit; noutros bancos (sqlite dos testes) diretamente neste processo. Cada
+# processo mantém um snapshot por organização com subscritores e envia a cada um só
+# os deltas. A mensagem SSE é serializada uma vez e partilhada por todos os
+# subscritores, por isso mais um ecrã a ver o mapa custa uma entrada numa fila.
+#
+# Os deltas só trazem posições. Alterações de matrícula, identificador ou estado e
+# veículos removidos (por qualquer crud, via ORM) pedem que os snapshots da
+# organização sejam relidos, pelo mesmo caminho: NOTIFY no PostgreSQL, local noutros.
+
+CHANNEL = "vehicle_positions"
+RELOAD_CHANNEL = "vehicle_positions_reload"
+_NOTIFY_MAX_UPDATES = 100 # O payload do NOTIFY é limitado a 8000 bytes
+_LISTENER_KEEPALIVE_SECONDS = 30
+
+PositionUpdate = Tuple[int, int, float, float] # (organization_id, vehicle_id, latitude, longitude)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    def __init__(self, organization_id: int):
+        self.organization_id = organization_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.LIVE_POSITIONS_SUBSCRIBER_QUEUE)
+
+
+class LivePositionHub:
+    def __init__(self):
+        # organization_id -> {vehicle_id -> VehiclePosition em dict}
+        self._snapshots: Dict[int, Dict[int, dict]] = {}
+        self._snapshot_events: Dict[int, str] = {} # Snapshot já serializado, até à próxima alteração
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._load_locks: Dict[int, asyncio.Lock] = {}
+        # Posições recebidas enquanto o snapshot é lido; aplicadas a seguir à leitura
+        self._loading: Dict[int, List[PositionUpdate]] = {}
+        self._reloading: Set[int] = set()
+        self._reload_again: Set[int] = set() # Pedidos durante uma leitura em curso
+
+    async def _load(self, organization_id: int) -> None:
+        lock = self._load_locks.setdefault(organization_id, asyncio.Lock())
+        async with lock:
+            if organization_id in self._snapshots:
+                return
+            self._loading[organization_id] = []
+            try:
+                async with SessionLocal() as db:
+                    positions = await crud.report.get_vehicle_positions(db, organization_id=organization_id)
+            except BaseException:
+                self._loading.pop(organization_id, None)
+                raise
+            pending = self._loading.pop(organization_id)
+            self._snapshots[organization_id] = {p.id: p.model_dump() for p in positions}
+            self._snapshot_events.pop(organization_id, None)
+            # A leitura pode não incluir o que foi notificado entretanto
+            self.apply(pending)
+            if organization_id in self._reload_again:
+                self._reload_again.discard(organization_id)
+                self.request_reload(organization_id)
+
+    def get_snapshot(self, organization_id: int) -> Optional[List[dict]]:
+        """Posições em memória, se a organização tem subscritores neste processo."""
+        snapshot = self._snapshots.get(organization_id)
+        return list(snapshot.values()) if snapshot is not None else None
+
+    def _snapshot_event(self, organization_id: int) -> str:
+        event = self._snapshot_events.get(organization_id)
+        if event is None:
+            event = _sse("snapshot", list(self._snapshots[organization_id].values()))
+            self._snapshot_events[organization_id] = event
+        return event
+
+    async def subscribe(self, organization_id: int) -> Subscriber:
+        """Regista um subscritor; a primeira mensagem na fila é o snapshot atual."""
+        while organization_id not in self._snapshots:
+            await self._load(organization_id)
+        # Sem await daqui em diante: nenhum delta fica entre o snapshot e a fila
+        subscriber = Subscriber(organization_id)
+        subscriber.queue.put_nowait(self._snapshot_event(organization_id))
+        self._subscribers.setdefault(organization_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        organization_id = subscriber.organization_id
+        subscribers = self._subscribers.get(organization_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            # Sem subscritores, o snapshot deixaria de ser mantido por este processo
+            del self._subscribers[organization_id]
+            self._snapshots.pop(organization_id, None)
+            self._snapshot_events.pop(organization_id, None)
+
+    def _send(self, subscriber: Subscriber, message: str) -> None:
+        try:
+            subscriber.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Cliente lento: em vez de acumular deltas, recebe um snapshot novo
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(self._snapshot_event(subscriber.organization_id))
+
+    def _broadcast(self, organization_id: int, message: str) -> None:
+        for subscriber in list(self._subscribers.get(organization_id, ())):
+            self._send(subscriber, message)
+
+    def apply(self, updates: List[PositionUpdate]) -> None:
+        """Aplica posições novas aos snapshots carregados e envia os deltas."""
+        by_organization: Dict[int, List[PositionUpdate]] = {}
+        for update in updates:
+            if update[0] in self._snapshots:
+                by_organization.setdefault(update[0], []).append(update)
+            elif update[0] in self._loading:
+                self._loading[update[0]].append(update)
+        for organization_id, items in by_organization.items():
+            snapshot = self._snapshots[organization_id]
+            delta, unknown = [], False
+            for _, vehicle_id, latitude, longitude in items:
+                entry = snapshot.get(vehicle_id)
+                if entry is None:
+                    unknown = True
+                    continue
+                entry["latitude"], entry["longitude"] = latitude, longitude
+                delta.append({"id": vehicle_id, "latitude": latitude, "longitude": longitude})
+            self._snapshot_events.pop(organization_id, None)
+            if delta:
+                self._broadcast(organization_id, _sse("positions", delta))
+            if unknown:
+                # Primeira posição de um veículo: o snapshot precisa da matrícula e estado
+                self.request_reload(organization_id)
+
+    def request_reload(self, organization_id: int) -> None:
+        """Agenda a releitura do snapshot, se a organização tem subscritores neste processo."""
+        if organization_id in self._loading or organization_id in self._reloading:
+            # A leitura em curso pode já não ver a alteração: repete no fim
+            self._reload_again.add(organization_id)
+        elif organization_id in self._snapshots:
+            self._reloading.add(organization_id)
+            asyncio.create_task(self.reload(organization_id))
+
+    async def reload(self, organization_id: int) -> None:
+        """Relê o snapshot da organização e envia-o a todos os subscritores."""
+        try:
+            async with SessionLocal() as db:
+                positions = await crud.report.get_vehicle_positions(db, organization_id=organization_id)
+            if organization_id not in self._subscribers:
+                return
+            self._snapshots[organization_id] = {p.id: p.model_dump() for p in positions}
+            self._snapshot_events.pop(organization_id, None)
+            self._broadcast(organization_id, self._snapshot_event(organization_id))
+        except Exception as e:
+            print(f"Erro ao recarregar posições da organização {organization_id}: {e}")
+        finally:
+            self._reloading.discard(organization_id)
+            if organization_id in self._reload_again:
+                self._reload_again.discard(organization_id)
+                self.request_reload(organization_id)
+
+    async def reload_all(self) -> None:
+        for organization_id in list(self._subscribers):
+            if organization_id in self._reloading:
+                self._reload_again.add(organization_id)
+                continue
+            self._reloading.add(organization_id)
+            await self.reload(organization_id)
+
+
+live_position_hub = LivePositionHub()
+
+
+async def publish_positions(db: AsyncSession, updates: List[PositionUpdate]) -> None:
+    """
+    Chamar antes do commit da ingestão. No PostgreSQL o NOTIFY só é entregue se a
+    transação for confirmada; noutros bancos a entrega é imediata e local.
+    """
+    if not updates:
+        return
+    if db.bind.dialect.name != "postgresql":
+        live_position_hub.apply(updates)
+        return
+    for index in range(0, len(updates), _NOTIFY_MAX_UPDATES):
+        payload = json.dumps(updates[index:index + _NOTIFY_MAX_UPDATES], separators=(",", ":"))
+        await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+
+# --- ALTERAÇÕES DE VEÍCULOS (ORM) ---
+# Colunas do snapshot que não chegam pelos deltas de posição
+_SNAPSHOT_FIELDS = ("license_plate", "identifier", "status")
+_CHANGED_ORGANIZATIONS_KEY = "live_positions_changed_organizations"
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_vehicle_changes(session: Session, flush_context, instances) -> None:
+    organization_ids = {vehicle.organization_id for vehicle in session.deleted if isinstance(vehicle, Vehicle)}
+    for vehicle in session.dirty:
+        if isinstance(vehicle, Vehicle):
+            state = inspect(vehicle)
+            if any(state.attrs[field].history.has_changes() for field in _SNAPSHOT_FIELDS):
+                organization_ids.add(vehicle.organization_id)
+    if not organization_ids:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        # Entregue a todos os processos (incluindo este) só se a transação for confirmada
+        session.connection().execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": RELOAD_CHANNEL, "payload": json.dumps(sorted(organization_ids))},
+        )
+    else:
+        session.info.setdefault(_CHANGED_ORGANIZATIONS_KEY, set()).update(organization_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _reload_changed_organizations(session: Session) -> None:
+    for organization_id in session.info.pop(_CHANGED_ORGANIZATIONS_KEY, ()):
+        live_position_hub.request_reload(organization_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_organizations(session: Session) -> None:
+    session.info.pop(_CHANGED_ORGANIZATIONS_KEY, None)
+# --- FIM ALTERAÇÕES DE VEÍCULOS ---
+
+
+# --- LISTENER (PostgreSQL): uma ligação por processo em LISTEN ---
+_listener_task: Optional[asyncio.Task] = None
+
+
+def _on_notification(connection, pid, channel, payload) -> None:
+    try:
+        live_position_hub.apply([tuple(update) for update in json.loads(payload)])
+    except Exception as e:
+        print(f"Notificação de posições inválida: {e}")
+
+
+def _on_reload_notification(connection, pid, channel, payload) -> None:
+    try:
+        for organization_id in json.loads(payload):
+            live_position_hub.request_reload(organization_id)
+    except Exception as e:
+        print(f"Notificação de veículos alterados inválida: {e}")
+
+
+async def run_live_positions_listener() -> None:
+    while True:
+        try:
+            async with engine.connect() as conn:
+                driver_connection = (await conn.get_raw_connection()).driver_connection
+                await driver_connection.add_listener(CHANNEL, _on_notification)
+                await driver_connection.add_listener(RELOAD_CHANNEL, _on_reload_notification)
+                try:
+                    # Notificações perdidas enquanto não havia LISTEN: reenvia snapshots
+                    await live_position_hub.reload_all()
+                    while True:
+                        await asyncio.sleep(_LISTENER_KEEPALIVE_SECONDS)
+                        # Deteta ligações mortas (sem tráfego o socket não dá erro)
+                        await driver_connection.execute("SELECT 1")
+                finally:
+                    if not driver_connection.is_closed():
+                        await driver_connection.remove_listener(CHANNEL, _on_notification)
+                        await driver_connection.remove_listener(RELOAD_CHANNEL, _on_reload_notification)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Erro no listener de posições: {e}")
+            await asyncio.sleep(5)
+
+
+def start_live_positions_listener() -> None:
+    """Agenda o listener no event loop (chamar no startup). Só no PostgreSQL."""
+    global _listener_task
+    if engine.dialect.name != "postgresql":
+        return
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(run_live_positions_listener())
+
+
+async def stop_live_positions_listener() -> None:
+    """Cancela o listener (chamar no shutdown)."""
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+# --- FIM LISTENER ---
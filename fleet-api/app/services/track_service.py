@@ -0,0 +1,217 @@
+import asyncio
+import heapq
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.schemas.track_schema import TrackStop, TrackSummary
+
+# Percurso de um veículo para reprodução no mapa. Os pontos são lidos em stream
+# (crud.location_history.iter_track_points) e processados numa só passagem:
+# descarta saltos impossíveis, acumula distância, velocidades e paragens sobre os
+# pontos brutos, e guarda só o necessário para simplificar (Douglas-Peucker até à
+# tolerância pedida ou ao orçamento de pontos). Distâncias com haversine: o geodesic
+# do geopy é exato demais para o custo em centenas de milhares de pontos.
+# O cálculo corre numa thread (asyncio.to_thread), um bloco de pontos de cada vez,
+# para uma janela longa não bloquear o event loop enquanto os pontos chegam.
+
+EARTH_RADIUS_M = 6_371_000
+MAX_PLAUSIBLE_SPEED_KMH = 250 # Acima disto o ponto é ruído do GPS
+JITTER_M = 10 # Deslocações menores não contam para a distância (GPS parado "anda")
+STOP_RADIUS_M = 50
+MAX_CONSECUTIVE_DISCARDS = 3
+CHUNK_POINTS = 2_000 # Pontos processados por cada ida à thread (o yield_per da leitura)
+
+TrackPoint = Tuple[datetime, float, float] # (timestamp, latitude, longitude)
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _as_utc(timestamp: datetime) -> datetime:
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def simplify(points: List[TrackPoint], *, tolerance_m: float, max_points: int) -> List[TrackPoint]:
+    """
+    Douglas-Peucker por prioridade: divide sempre o troço com o maior desvio, até
+    nenhum desvio passar de `tolerance_m` ou atingir `max_points`. Assim a mesma
+    rotina serve a tolerância e o orçamento de pontos (o que chegar primeiro).
+    """
+    n = len(points)
+    if n <= 2 or max_points <= 2:
+        return points[:1] + points[-1:] if n > 1 else points
+    # Projeção equiretangular local (metros), suficiente para desvios de poucos km
+    lat0 = math.radians(points[0][1])
+    k = EARTH_RADIUS_M * math.pi / 180
+    xs = [p[2] * k * math.cos(lat0) for p in points]
+    ys = [p[1] * k for p in points]
+
+    def farthest(first: int, last: int) -> Tuple[float, int]:
+        x1, y1, x2, y2 = xs[first], ys[first], xs[last], ys[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        best, best_index = -1.0, first
+        for i in range(first + 1, last):
+            if length == 0:
+                d = math.hypot(xs[i] - x1, ys[i] - y1)
+            else:
+                d = abs(dy * xs[i] - dx * ys[i] + x2 * y1 - y2 * x1) / length
+            if d > best:
+                best, best_index = d, i
+        return best, best_index
+
+    heap: List[Tuple[float, int, int, int]] = []
+
+    def push(first: int, last: int) -> None:
+        if last - first >= 2:
+            distance, index = farthest(first, last)
+            if distance > tolerance_m:
+                heapq.heappush(heap, (-distance, first, last, index))
+
+    keep = {0, n - 1}
+    push(0, n - 1)
+    while heap and len(keep) < max_points:
+        _, first, last, index = heapq.heappop(heap)
+        keep.add(index)
+        push(first, index)
+        push(index, last)
+    return [points[i] for i in sorted(keep)]
+
+
+@dataclass
+class _TrackBuilder:
+    """Consome os pontos por ordem cronológica e acumula os resumos."""
+    min_stop: timedelta
+    prefilter_m: float
+    points: List[TrackPoint] = field(default_factory=list)
+    stops: List[TrackStop] = field(default_factory=list)
+    raw_points: int = 0
+    discarded_points: int = 0
+    distance_m: float = 0.0
+    max_speed_kmh: float = 0.0
+    _last: Optional[TrackPoint] = None
+    _consecutive_discards: int = 0
+    _odometer_anchor: Optional[TrackPoint] = None
+    _stop_anchor: Optional[TrackPoint] = None
+    _stop_last_seen: Optional[datetime] = None
+
+    def add_many(self, points: List[TrackPoint]) -> None:
+        for point in points:
+            self.add(point)
+
+    def add(self, point: TrackPoint) -> None:
+        self.raw_points += 1
+        point = (_as_utc(point[0]), point[1], point[2])
+        if self._last is not None:
+            seconds = (point[0] - self._last[0]).total_seconds()
+            step = haversine_m(self._last[1], self._last[2], point[1], point[2])
+            impossible = seconds <= 0 and step > 0 or seconds > 0 and step / seconds * 3.6 > MAX_PLAUSIBLE_SPEED_KMH
+            # Vários saltos seguidos: o ruído era o ponto anterior, não estes
+            if impossible and self._consecutive_discards < MAX_CONSECUTIVE_DISCARDS:
+                self.discarded_points += 1
+                self._consecutive_discards += 1
+                return
+            if seconds >= 1:
+                self.max_speed_kmh = max(self.max_speed_kmh, step / seconds * 3.6)
+        self._consecutive_discards = 0
+        self._last = point
+        self._measure(point)
+        self._detect_stop(point)
+        # Pré-filtro radial: pontos a menos da tolerância do último guardado não mudam o traçado
+        kept = self.points[-1] if self.points else None
+        if kept is None or haversine_m(kept[1], kept[2], point[1], point[2]) >= self.prefilter_m:
+            self.points.append(point)
+
+    def _measure(self, point: TrackPoint) -> None:
+        anchor = self._odometer_anchor
+        if anchor is None:
+            self._odometer_anchor = point
+            return
+        step = haversine_m(anchor[1], anchor[2], point[1], point[2])
+        if step >= JITTER_M:
+            self.distance_m += step
+            self._odometer_anchor = point
+
+    def _detect_stop(self, point: TrackPoint) -> None:
+        anchor = self._stop_anchor
+        if anchor is not None and haversine_m(anchor[1], anchor[2], point[1], point[2]) <= STOP_RADIUS_M:
+            self._stop_last_seen = point[0]
+            return
+        self._close_stop()
+        self._stop_anchor, self._stop_last_seen = point, point[0]
+
+    def _close_stop(self) -> None:
+        anchor = self._stop_anchor
+        if anchor is None or self._stop_last_seen - anchor[0] < self.min_stop:
+            return
+        self.stops.append(TrackStop(
+            start=anchor[0],
+            end=self._stop_last_seen,
+            latitude=anchor[1],
+            longitude=anchor[2],
+            duration_minutes=round((self._stop_last_seen - anchor[0]).total_seconds() / 60, 1),
+        ))
+
+    def finish(self) -> None:
+        self._close_stop()
+        self._stop_anchor = None
+        # O último ponto entra sempre, para o traçado terminar onde o veículo está
+        if self._last is not None and (not self.points or self.points[-1] is not self._last):
+            self.points.append(self._last)
+
+
+async def build_track(
+    db: AsyncSession,
+    *,
+    vehicle_id: int,
+    start: datetime,
+    end: datetime,
+    tolerance_m: float,
+    max_points: int,
+    min_stop_minutes: float,
+) -> Tuple[TrackSummary, List[TrackStop], List[TrackPoint]]:
+    """Lê a janela em stream e devolve (resumo, paragens, pontos simplificados)."""
+    builder = _TrackBuilder(min_stop=timedelta(minutes=min_stop_minutes), prefilter_m=tolerance_m)
+    chunk: List[TrackPoint] = []
+    async for point in crud.location_history.iter_track_points(db, vehicle_id=vehicle_id, start=start, end=end):
+        chunk.append(point)
+        if len(chunk) >= CHUNK_POINTS:
+            await asyncio.to_thread(builder.add_many, chunk)
+            chunk = []
+    return await asyncio.to_thread(_summarize, builder, chunk, tolerance_m=tolerance_m, max_points=max_points)
+
+
+def _summarize(
+    builder: _TrackBuilder, remaining: List[TrackPoint], *, tolerance_m: float, max_points: int
+) -> Tuple[TrackSummary, List[TrackStop], List[TrackPoint]]:
+    builder.add_many(remaining)
+    builder.finish()
+    points = simplify(builder.points, tolerance_m=tolerance_m, max_points=max_points)
+    if builder.points:
+        total_seconds = (builder.points[-1][0] - builder.points[0][0]).total_seconds()
+    else:
+        total_seconds = 0.0
+    stopped_seconds = sum((stop.end - stop.start).total_seconds() for stop in builder.stops)
+    moving_seconds = max(total_seconds - stopped_seconds, 0.0)
+    summary = TrackSummary(
+        raw_points=builder.raw_points,
+        discarded_points=builder.discarded_points,
+        returned_points=len(points),
+        distance_km=round(builder.distance_m / 1000, 3),
+        moving_minutes=round(moving_seconds / 60, 1),
+        stopped_minutes=round(stopped_seconds / 60, 1),
+        max_speed_kmh=round(builder.max_speed_kmh, 1),
+        avg_moving_speed_kmh=round(builder.distance_m / moving_seconds * 3.6, 1) if moving_seconds else 0.0,
+        stop_count=len(builder.stops),
+    )
+    return summary, builder.stops, points
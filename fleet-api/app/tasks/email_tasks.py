@@ -0,0 +1,92 @@
+import asyncio
+from typing import List, Optional
+
+from app import crud
+from app.core.config import settings
+from app.core.email_utils import SMTPConnection, build_message
+from app.db.session import SessionLocal
+from app.models.email_outbox_model import EmailOutbox, EmailOutboxStatus
+
+# Worker da fila de e-mails: reclama lotes da tabela email_outbox e entrega-os
+# por uma única conexão SMTP, mantida aberta enquanto houver e-mails na fila.
+_worker_task: Optional[asyncio.Task] = None
+
+
+def _send_batch(connection: SMTPConnection, messages: List[EmailOutbox]) -> List[Optional[str]]:
+    """Envia o lote pela conexão (bloqueante, corre numa thread). Retorna o erro de cada e-mail ou None."""
+    errors: List[Optional[str]] = []
+    for message in messages:
+        try:
+            connection.send(build_message(message.to_emails, message.subject, message.message_html))
+            errors.append(None)
+        except Exception as e:
+            # Descarta a conexão: o próximo envio abre uma nova
+            connection.close()
+            errors.append(f"{type(e).__name__}: {e}")
+    return errors
+
+
+async def deliver_outbox_batch(connection: SMTPConnection) -> int:
+    """Entrega um lote e grava o resultado. Retorna quantos e-mails foram reclamados."""
+    async with SessionLocal() as db:
+        messages = await crud.email_outbox.claim_batch(
+            db, limit=settings.EMAIL_OUTBOX_BATCH_SIZE, lease_seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS
+        )
+    if not messages:
+        return 0
+
+    errors = await asyncio.to_thread(_send_batch, connection, messages)
+
+    async with SessionLocal() as db:
+        sent_ids = [m.id for m, error in zip(messages, errors) if error is None]
+        await crud.email_outbox.mark_sent(db, ids=sent_ids)
+        for message, error in zip(messages, errors):
+            if error is None:
+                continue
+            new_status = await crud.email_outbox.mark_failed(db, message=message, error=error)
+            if new_status == EmailOutboxStatus.FAILED:
+                print(f"E-mail {message.id} para {message.to_emails} descartado após {message.attempts} tentativas: {error}")
+    print(f"Fila de e-mails: {len(sent_ids)}/{len(messages)} enviados.")
+    return len(messages)
+
+
+async def drain_email_outbox(connection: SMTPConnection) -> None:
+    """Entrega lotes até a fila ficar vazia."""
+    while await deliver_outbox_batch(connection) >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+        await asyncio.sleep(0)
+
+
+async def run_email_outbox_worker() -> None:
+    connection = SMTPConnection()
+    try:
+        while True:
+            try:
+                await drain_email_outbox(connection)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro no worker da fila de e-mails: {e}")
+            # Fila vazia: fecha a conexão em vez de a deixar expirar no servidor
+            await asyncio.to_thread(connection.close)
+            await asyncio.sleep(settings.EMAIL_OUTBOX_POLL_INTERVAL_SECONDS)
+    finally:
+        connection.close()
+
+
+def start_email_outbox_worker() -> None:
+    """Agenda o worker no event loop (chamar no startup)."""
+    global _worker_task
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(run_email_outbox_worker())
+
+
+async def stop_email_outbox_worker() -> None:
+    """Cancela o worker (chamar no shutdown). E-mails não entregues ficam na tabela."""
+    global _worker_task
+    if _worker_task is not None:
+        _worker_task.cancel()
+        try:
+            await _worker_task
+        except asyncio.CancelledError:
+            pass
+        _worker_task = None
@@ -0,0 +1,105 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence, Tuple
+
+from app import crud
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.schemas.gps_schema import LocationCreate
+from app.services.live_positions import publish_positions
+from app.tasks.write_behind import WriteBehindBuffer
+
+# Ingestão de GPS com write-behind: os pings ficam num buffer em memória e o worker
+# grava-os em lotes de GPS_FLUSH_BATCH_SIZE (um INSERT em location_history e um
+# UPDATE da última posição por veículo, na mesma transação). As novas posições
+# seguem para o mapa em tempo real (app/services/live_positions.py). Limites e
+# shutdown em app/tasks/write_behind.py.
+
+# (vehicle_id, latitude, longitude, timestamp, organization_id da chave do dispositivo)
+GpsPoint = Tuple[int, float, float, datetime, int]
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """Leituras sem fuso são tratadas como UTC."""
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def enqueue_locations(points: Sequence[LocationCreate], *, organization_id: int) -> bool:
+    """
+    Coloca os pings no buffer (sem tocar na base de dados). Retorna False, sem
+    aceitar nenhum, se o lote não couber: o dispositivo deve reenviar mais tarde.
+    organization_id é a organização da chave que enviou os pings.
+    """
+    received_at = datetime.now(timezone.utc)
+    return _gps_buffer.offer([
+        (point.vehicle_id, point.latitude, point.longitude, as_utc(point.timestamp or received_at), organization_id)
+        for point in points
+    ])
+
+
+async def _write_batch(batch: List[GpsPoint]) -> int:
+    """
+    Grava o lote numa transação. Pings de veículos inexistentes ou de outra
+    organização que não a da chave do dispositivo são descartados.
+    """
+    async with SessionLocal() as db:
+        organization_ids = await crud.vehicle.get_organization_ids(db, vehicle_ids=[p[0] for p in batch])
+        rows = []
+        latest: Dict[int, GpsPoint] = {}
+        for point in batch:
+            vehicle_id, latitude, longitude, timestamp, key_organization_id = point
+            organization_id = organization_ids.get(vehicle_id)
+            if organization_id is None or organization_id != key_organization_id:
+                continue
+            rows.append({
+                "vehicle_id": vehicle_id,
+                "organization_id": organization_id,
+                "latitude": latitude,
+                "longitude": longitude,
+                "timestamp": timestamp,
+            })
+            # A última posição é a leitura mais recente, não a última a chegar
+            current = latest.get(vehicle_id)
+            if current is None or timestamp >= current[3]:
+                latest[vehicle_id] = point
+
+        await crud.location_history.bulk_create(db, rows=rows)
+        updated = await crud.vehicle.bulk_update_last_position(
+            db, positions={vehicle_id: (p[1], p[2], p[3]) for vehicle_id, p in latest.items()}
+        )
+        # Só vão para o mapa as posições que ficaram gravadas
+        await publish_positions(db, [
+            (organization_ids[vehicle_id], vehicle_id, latest[vehicle_id][1], latest[vehicle_id][2]) for vehicle_id in updated
+        ])
+        await db.commit()
+
+    if len(rows) < len(batch):
+        print(f"AVISO: {len(batch) - len(rows)} pings de GPS de veículos não registrados ou de outra organização descartados.")
+    return len(rows)
+
+
+_gps_buffer: WriteBehindBuffer[GpsPoint] = WriteBehindBuffer(
+    "pings de GPS",
+    _write_batch,
+    max_items=settings.GPS_BUFFER_MAX_POINTS,
+    batch_size=settings.GPS_FLUSH_BATCH_SIZE,
+    interval_seconds=settings.GPS_FLUSH_INTERVAL_SECONDS,
+    max_attempts=settings.GPS_FLUSH_MAX_ATTEMPTS,
+)
+
+
+def buffered_points() -> int:
+    return len(_gps_buffer)
+
+
+async def flush_gps_buffer() -> int:
+    return await _gps_buffer.flush()
+
+
+def start_gps_flush_worker() -> None:
+    """Agenda o worker no event loop (chamar no startup)."""
+    _gps_buffer.start()
+
+
+async def stop_gps_flush_worker() -> None:
+    """Para o worker e grava o que ainda estiver no buffer (chamar no shutdown)."""
+    await _gps_buffer.stop()
@@ -0,0 +1,182 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.core.config import settings
+from app.db import partitioning
+from app.db.session import engine
+
+# Manutenção do histórico de localização, a cada LOCATION_MAINTENANCE_INTERVAL_SECONDS:
+# 1. cria as partições diárias da janela de retenção e dos próximos dias;
+# 2. agrega os minutos fechados em location_history_minute;
+# 3. descarta as partições mais antigas que LOCATION_RAW_RETENTION_DAYS (DELETE se a
+#    tabela não for particionada) e o histórico por minuto fora da sua retenção;
+# 4. apaga as amostras de telemetria mais antigas que TELEMETRY_RETENTION_DAYS, em lotes
+#    de TELEMETRY_RETENTION_BATCH_SIZE.
+# Com vários processos, um advisory lock do PostgreSQL garante que só um a executa
+# (e que as partições do startup não são criadas por dois processos ao mesmo tempo).
+#
+# Limite conhecido: a agregação recomeça no último minuto agregado menos
+# LOCATION_ROLLUP_LAG_MINUTES. Um ponto que chegue mais atrasado do que isso (p.ex. um
+# rastreador que esteve offline) fica só na tabela bruta: o seu minuto não é agregado,
+# ou mantém o ponto que já tinha. O trajeto usa os pontos brutos enquanto existirem
+# (LOCATION_RAW_RETENTION_DAYS); só depois desse prazo esses pontos faltam.
+_worker_task: Optional[asyncio.Task] = None
+
+_MAINTENANCE_LOCK_KEY = 0x4C4F4348 # Constante arbitrária do advisory lock
+_ROLLUP_CHUNK = timedelta(hours=6) # Janela agregada por transação
+
+
+async def _lock(db: AsyncSession, *, wait: bool) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return True
+    function = "pg_advisory_lock" if wait else "pg_try_advisory_lock"
+    result = (await db.execute(text(f"SELECT {function}(:key)"), {"key": _MAINTENANCE_LOCK_KEY})).scalar()
+    return wait or bool(result)
+
+
+async def _unlock(db: AsyncSession) -> None:
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MAINTENANCE_LOCK_KEY})
+
+
+@asynccontextmanager
+async def _maintenance_session(*, wait: bool) -> AsyncIterator[Optional[AsyncSession]]:
+    """
+    Sessão com o advisory lock da manutenção, ou None se outro processo o tem (wait=False).
+    O lock é da ligação, por isso a sessão fica presa a uma só ligação: os commits
+    intermédios não a devolvem à pool e o unlock corre na mesma ligação que fez o lock.
+    """
+    async with engine.connect() as connection:
+        async with AsyncSession(bind=connection, autoflush=False) as db:
+            if not await _lock(db, wait=wait):
+                yield None
+                return
+            try:
+                yield db
+            finally:
+                # O lock sobrevive ao rollback de um passo que falhou
+                await db.rollback()
+                await _unlock(db)
+                await db.commit()
+
+
+async def ensure_location_history_partitions(db: AsyncSession, now: datetime) -> None:
+    """Cria as partições da janela de retenção até LOCATION_PARTITIONS_AHEAD_DAYS à frente."""
+    if not await partitioning.is_partitioned(db):
+        return
+    created = await partitioning.ensure_partitions(
+        db,
+        first_day=crud.location_history.raw_cutoff(now).date(),
+        last_day=(now + timedelta(days=settings.LOCATION_PARTITIONS_AHEAD_DAYS)).date(),
+    )
+    await db.commit()
+    if created:
+        print(f"Histórico de localização: partições criadas {created}")
+
+
+async def _rollup(db: AsyncSession, now: datetime) -> int:
+    lag = timedelta(minutes=settings.LOCATION_ROLLUP_LAG_MINUTES)
+    end = (now - lag).replace(second=0, microsecond=0)
+    watermark = await crud.location_history.get_rollup_watermark(db)
+    # Reprocessa o último `lag` para apanhar minutos que ainda não tinham pontos
+    start = watermark - lag if watermark else await crud.location_history.get_oldest_raw_timestamp(db)
+    if start is None:
+        return 0
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    start = start.replace(second=0, microsecond=0)
+    total = 0
+    while start < end:
+        chunk_end = min(start + _ROLLUP_CHUNK, end)
+        total += await crud.location_history.rollup_minutes(db, start=start, end=chunk_end)
+        await db.commit()
+        start = chunk_end
+    return total
+
+
+async def _prune_telemetry(db: AsyncSession, *, cutoff: datetime) -> int:
+    """Apaga as amostras de telemetria antigas em lotes, com um commit por lote."""
+    total = 0
+    while True:
+        removed = await crud.telemetry.delete_samples_before(
+            db, cutoff=cutoff, batch_size=settings.TELEMETRY_RETENTION_BATCH_SIZE
+        )
+        await db.commit()
+        total += removed
+        if removed < settings.TELEMETRY_RETENTION_BATCH_SIZE:
+            return total
+
+
+async def run_location_history_maintenance(now: Optional[datetime] = None) -> None:
+    now = now or datetime.now(timezone.utc)
+    async with _maintenance_session(wait=False) as db:
+        if db is None:
+            return
+        await ensure_location_history_partitions(db, now)
+        # A agregação corre antes da retenção: nenhum minuto é descartado por agregar
+        rolled_up = await _rollup(db, now)
+
+        cutoff = crud.location_history.raw_cutoff(now)
+        if await partitioning.is_partitioned(db):
+            dropped = await partitioning.drop_partitions_before(db, day=cutoff.date())
+            removed = f"partições descartadas: {dropped}" if dropped else "nenhuma partição descartada"
+        else:
+            removed = f"{await crud.location_history.delete_raw_before(db, cutoff=cutoff)} pontos brutos removidos"
+        downsampled_cutoff = now - timedelta(days=settings.LOCATION_DOWNSAMPLED_RETENTION_DAYS)
+        await crud.location_history.delete_downsampled_before(db, cutoff=downsampled_cutoff)
+        await db.commit()
+        telemetry_removed = await _prune_telemetry(db, cutoff=now - timedelta(days=settings.TELEMETRY_RETENTION_DAYS))
+        print(
+            f"Histórico de localização: {rolled_up} minutos agregados, {removed}, "
+            f"{telemetry_removed} amostras de telemetria removidas."
+        )
+
+
+async def prepare_location_history() -> None:
+    """
+    Garante as partições antes de a ingestão começar (chamar no startup). Com vários
+    workers a arrancar, cada um espera pelo lock em vez de criar as mesmas partições.
+    """
+    async with _maintenance_session(wait=True) as db:
+        if db.bind.dialect.name == "postgresql" and not await partitioning.is_partitioned(db):
+            print(
+                "AVISO: location_history não é particionada; a retenção usa DELETE. "
+                "Converter com: python -m app.db.partitioning --convert"
+            )
+        await ensure_location_history_partitions(db, datetime.now(timezone.utc))
+
+
+async def run_location_history_worker() -> None:
+    while True:
+        try:
+            await run_location_history_maintenance()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Erro na manutenção do histórico de localização: {e}")
+        await asyncio.sleep(settings.LOCATION_MAINTENANCE_INTERVAL_SECONDS)
+
+
+def start_location_history_worker() -> None:
+    """Agenda o worker no event loop (chamar no startup)."""
+    global _worker_task
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(run_location_history_worker())
+
+
+async def stop_location_history_worker() -> None:
+    """Cancela o worker (chamar no shutdown)."""
+    global _worker_task
+    if _worker_task is not None:
+        _worker_task.cancel()
+        try:
+            await _worker_task
+        except asyncio.CancelledError:
+            pass
+        _worker_task = None
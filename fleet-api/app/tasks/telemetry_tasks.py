@@ -0,0 +1,120 @@
+from typing import Dict, List, Sequence, Tuple
+
+from app import crud
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.schemas.telemetry_schema import TelemetryPayload
+from app.services.device_registry import device_registry
+from app.services.live_positions import publish_positions
+from app.tasks.gps_tasks import as_utc
+from app.tasks.write_behind import WriteBehindBuffer
+
+# Ingestão de telemetria com write-behind: os pacotes ficam num buffer em memória e
+# cada lote é gravado numa transação: amostras completas em telemetry_samples, a
+# posição em location_history e o estado atual de cada veículo (última posição e
+# horímetro) num único UPDATE em executemany. Os dispositivos são resolvidos pelo
+# device_registry, por isso um lote de dispositivos conhecidos não consulta veículos.
+
+# (pacote, organization_id da chave do dispositivo)
+TelemetryReport = Tuple[TelemetryPayload, int]
+
+
+async def _write_batch(batch: List[TelemetryReport]) -> int:
+    """
+    Grava o lote. Pacotes de dispositivos não registrados ou de veículos de outra
+    organização que não a da chave do dispositivo são descartados.
+    """
+    async with SessionLocal() as db:
+        devices = await device_registry.resolve_many(db, [p.device_id for p, _ in batch])
+        samples, locations = [], []
+        latest: Dict[int, Tuple] = {} # vehicle_id -> (timestamp, latitude, longitude)
+        organization_ids: Dict[int, int] = {}
+        engine_hours: Dict[int, float] = {}
+        unknown, foreign = set(), set()
+        for payload, key_organization_id in batch:
+            target = devices.get(payload.device_id)
+            if target is None:
+                unknown.add(payload.device_id)
+                continue
+            vehicle_id, organization_id = target
+            if organization_id != key_organization_id:
+                foreign.add(payload.device_id)
+                continue
+            organization_ids[vehicle_id] = organization_id
+            timestamp = as_utc(payload.timestamp)
+            samples.append({
+                "device_id": payload.device_id,
+                "vehicle_id": vehicle_id,
+                "organization_id": organization_id,
+                "timestamp": timestamp,
+                "latitude": payload.latitude,
+                "longitude": payload.longitude,
+                "engine_hours": payload.engine_hours,
+                "fuel_level": payload.fuel_level,
+                "error_codes": payload.error_codes,
+            })
+            locations.append({
+                "vehicle_id": vehicle_id,
+                "organization_id": organization_id,
+                "latitude": payload.latitude,
+                "longitude": payload.longitude,
+                "timestamp": timestamp,
+            })
+            current = latest.get(vehicle_id)
+            if current is None or timestamp >= current[0]:
+                latest[vehicle_id] = (timestamp, payload.latitude, payload.longitude)
+            engine_hours[vehicle_id] = max(engine_hours.get(vehicle_id, 0), payload.engine_hours)
+
+        await crud.telemetry.bulk_create_samples(db, rows=samples)
+        await crud.location_history.bulk_create(db, rows=locations)
+        updated = await crud.vehicle.bulk_update_from_telemetry(db, states=[
+            {
+                "vehicle_id": vehicle_id, "latitude": lat, "longitude": lon,
+                "timestamp": timestamp, "engine_hours": engine_hours[vehicle_id],
+            }
+            for vehicle_id, (timestamp, lat, lon) in latest.items()
+        ])
+        # Só vão para o mapa as posições que ficaram gravadas
+        await publish_positions(db, [
+            (organization_ids[vehicle_id], vehicle_id, latest[vehicle_id][1], latest[vehicle_id][2])
+            for vehicle_id in updated
+        ])
+        await db.commit()
+
+    if unknown:
+        print(f"AVISO: Recebida telemetria de {len(unknown)} dispositivo(s) não registrado(s): {sorted(unknown)[:10]}")
+    if foreign:
+        print(f"AVISO: Telemetria de {len(foreign)} dispositivo(s) de outra organização descartada: {sorted(foreign)[:10]}")
+    return len(samples)
+
+
+_telemetry_buffer: WriteBehindBuffer[TelemetryReport] = WriteBehindBuffer(
+    "telemetria",
+    _write_batch,
+    max_items=settings.TELEMETRY_BUFFER_MAX_REPORTS,
+    batch_size=settings.TELEMETRY_FLUSH_BATCH_SIZE,
+    interval_seconds=settings.TELEMETRY_FLUSH_INTERVAL_SECONDS,
+    max_attempts=settings.TELEMETRY_FLUSH_MAX_ATTEMPTS,
+)
+
+
+def enqueue_telemetry(reports: Sequence[TelemetryPayload], *, organization_id: int) -> bool:
+    """
+    Coloca os pacotes no buffer. Retorna False, sem aceitar nenhum, se não couberem.
+    organization_id é a organização da chave que enviou os pacotes.
+    """
+    return _telemetry_buffer.offer([(report, organization_id) for report in reports])
+
+
+async def flush_telemetry_buffer() -> int:
+    return await _telemetry_buffer.flush()
+
+
+def start_telemetry_flush_worker() -> None:
+    """Agenda o worker no event loop (chamar no startup)."""
+    _telemetry_buffer.start()
+
+
+async def stop_telemetry_flush_worker() -> None:
+    """Para o worker e grava o que ainda estiver no buffer (chamar no shutdown)."""
+    await _telemetry_buffer.stop()
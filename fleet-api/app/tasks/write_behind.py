@@ -0,0 +1,143 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Buffer em memória com gravação diferida (write-behind), partilhado pela ingestão
+# de GPS e de telemetria. As rotas só acrescentam itens; um worker grava-os em lotes
+# de `batch_size` a cada `interval_seconds` ou assim que há um lote completo.
+# O buffer é por processo e limitado a `max_items`: cheio, `offer` recusa em vez de
+# a memória crescer sem limite. No shutdown o buffer é esvaziado; se o processo morrer
+# sem shutdown, perdem-se no máximo os itens ainda em memória.
+# Um lote que falha é tentado de novo (antes dos itens novos). Ao fim de `max_attempts`
+# falhas é dividido em dois, para que um item inválido não bloqueie os restantes;
+# um item sozinho que esgota as tentativas é descartado (com aviso).
+
+
+class WriteBehindBuffer(Generic[T]):
+    def __init__(
+        self,
+        name: str,
+        write_batch: Callable[[List[T]], Awaitable[Any]],
+        *,
+        max_items: int,
+        batch_size: int,
+        interval_seconds: float,
+        max_attempts: int,
+    ):
+        self.name = name
+        self.write_batch = write_batch
+        self.max_items = max_items
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.max_attempts = max_attempts
+        self._items: List[T] = []
+        self._retries: List[Tuple[List[T], int]] = [] # Lotes que falharam e nº de tentativas
+        self._retry_count = 0 # Itens em _retries
+        self._flush_wanted: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._worker_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._items) + self._retry_count
+
+    def _get_flush_wanted(self) -> asyncio.Event:
+        if self._flush_wanted is None:
+            self._flush_wanted = asyncio.Event()
+        return self._flush_wanted
+
+    def _get_flush_lock(self) -> asyncio.Lock:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        return self._flush_lock
+
+    def offer(self, items: List[T]) -> bool:
+        """Acrescenta os itens. Retorna False, sem aceitar nenhum, se não couberem todos."""
+        if len(self) + len(items) > self.max_items:
+            return False
+        self._items.extend(items)
+        if len(self._items) >= self.batch_size:
+            self._get_flush_wanted().set()
+        return True
+
+    async def flush(self) -> int:
+        """Grava um lote (até batch_size itens). Retorna quantos itens saíram do buffer."""
+        async with self._get_flush_lock():
+            if self._retries:
+                batch, attempts = self._retries.pop(0)
+                self._retry_count -= len(batch)
+            else:
+                batch, attempts = self._items[:self.batch_size], 0
+                if not batch:
+                    return 0
+                del self._items[:len(batch)]
+            try:
+                await self.write_batch(batch)
+            except Exception as e:
+                self._retry_later(batch, attempts + 1, e)
+                raise
+            return len(batch)
+
+    def _retry_later(self, batch: List[T], attempts: int, error: Exception) -> None:
+        """Devolve o lote que falhou ao início da fila (dividido ou descartado se esgotou as tentativas)."""
+        room = max(self.max_items - len(self), 0)
+        if room < len(batch):
+            print(f"AVISO: buffer de {self.name} cheio, {len(batch) - room} itens perdidos.")
+            batch = batch[:room]
+            if not batch:
+                return
+        if attempts < self.max_attempts:
+            retries = [(batch, attempts)]
+        elif len(batch) > 1:
+            middle = len(batch) // 2
+            retries = [(batch[:middle], 0), (batch[middle:], 0)]
+            print(f"AVISO: lote de {self.name} com {len(batch)} itens falhou {attempts} vezes; dividido em dois. Último erro: {error}")
+        else:
+            print(f"AVISO: item de {self.name} descartado após {attempts} tentativas: {error}")
+            return
+        self._retries[:0] = retries
+        self._retry_count += len(batch)
+
+    async def run(self) -> None:
+        flush_wanted = self._get_flush_wanted()
+        while True:
+            # Acorda a cada intervalo ou assim que há um lote completo
+            try:
+                await asyncio.wait_for(flush_wanted.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            flush_wanted.clear()
+            try:
+                # Continua enquanto houver lotes completos ou metades de um lote dividido
+                while await self.flush() >= self.batch_size or self._retries:
+                    await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro ao gravar lote de {self.name}: {e}")
+
+    def start(self) -> None:
+        """Agenda o worker no event loop (chamar no startup)."""
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Para o worker e grava o que ainda estiver no buffer (chamar no shutdown)."""
+        if self._worker_task is not None:
+            # Com o lock, o worker nunca é cancelado a meio de uma gravação
+            async with self._get_flush_lock():
+                self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+        while len(self):
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Erro ao gravar {self.name} no shutdown, {len(self)} itens perdidos: {e}")
+                self._items.clear()
+                self._retries.clear()
+                self._retry_count = 0
+        self._flush_wanted, self._flush_lock = None, None
@@ -13,6 +13,7 @@ from app.api.api import api_router
 from app.core.config import settings
 from app.core.logging_config import setup_logging
 from app.db.session import engine
+from app.db.partitioning import create_tables
 
 # ======================= BLOCO DE IMPORTAÇÃO DOS MODELOS =======================
 # Este bloco garante que a Base do SQLAlchemy conheça todas as suas tabelas
@@ -31,7 +32,7 @@ from app.models.journey_model import Journey
 from app.models.maintenance_model import MaintenanceRequest, MaintenanceComment
 from app.models.fuel_log_model import FuelLog
 from app.models.notification_model import Notification
-from app.models.location_history_model import LocationHistory
+from app.models.location_history_model import LocationHistory, LocationHistoryMinute
 from app.models.achievement_model import Achievement, UserAchievement
 from app.models.inventory_transaction_model import InventoryTransaction
 from app.models.document_model import Document
@@ -45,6 +46,15 @@ from app.models.fine_model import Fine
 # --- ESTA É A CORREÇÃO DEFINITIVA ---
 # Adiciona o nosso novo modelo à lista de modelos conhecidos.
 from app.models.demo_usage_model import DemoUsage
+from app.models.email_outbox_model import EmailOutbox
+from app.models.telemetry_sample_model import TelemetrySample
+from app.tasks.email_tasks import start_email_outbox_worker, stop_email_outbox_worker
+from app.tasks.gps_tasks import start_gps_flush_worker, stop_gps_flush_worker
+from app.tasks.telemetry_tasks import start_telemetry_flush_worker, stop_telemetry_flush_worker
+from app.services.live_positions import start_live_positions_listener, stop_live_positions_listener
+from app.tasks.location_history_tasks import (
+    prepare_location_history, start_location_history_worker, stop_location_history_worker
+)
 # ==============================================================================
 
 
@@ -88,7 +98,32 @@ async def on_startup():
     async with engine.begin() as conn:
         # Agora, Base.metadata.create_all conhece a tabela 'organization'
         # e a 'demousage', e as criará na ordem correta.
-        await conn.run_sync(Base.metadata.create_all)
+        # (No PostgreSQL, location_history é criada particionada por dia.)
+        await conn.run_sync(create_tables)
+    if not settings.DEVICE_INGEST_API_KEYS:
+        print("AVISO: DEVICE_INGEST_API_KEYS vazio; /gps e /telemetry vão recusar todos os dispositivos.")
+    if not settings.INTERNAL_API_KEY:
+        print("AVISO: INTERNAL_API_KEY vazio; /users/internal/sync_user vai recusar o auth-api.")
+    # Partições do histórico antes de a ingestão de GPS começar a gravar
+    await prepare_location_history()
+    # Worker que entrega os e-mails enfileirados (tabela email_outbox)
+    start_email_outbox_worker()
+    # Worker que grava em lote os pings de GPS recebidos (buffer em memória)
+    start_gps_flush_worker()
+    start_telemetry_flush_worker()
+    # Partições, agregação por minuto e retenção do histórico de localização
+    start_location_history_worker()
+    # LISTEN das posições publicadas pela ingestão (todos os processos), para o mapa
+    start_live_positions_listener()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_email_outbox_worker()
+    # Grava os pings que ainda estão no buffer antes de sair
+    await stop_gps_flush_worker()
+    await stop_telemetry_flush_worker()
+    await stop_location_history_worker()
+    await stop_live_positions_listener()
 
 # 7. Adicionar Handlers de Exceção
 @app.exception_handler(RequestValidationError)
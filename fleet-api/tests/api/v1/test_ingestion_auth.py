@@ -0,0 +1,52 @@
+# backend/tests/api/v1/test_ingestion_auth.py
+
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+
+from app.core.config import settings
+
+DEVICE_KEY = "test-device-key"
+
+INGESTION_ROUTES = [
+    ("/gps/ping", {"vehicle_id": 1, "latitude": -23.5, "longitude": -46.6}),
+    ("/gps/pings", {"points": [{"vehicle_id": 1, "latitude": -23.5, "longitude": -46.6}]}),
+    ("/telemetry/report", {
+        "device_id": "dev-1", "timestamp": "2026-01-01T00:00:00Z",
+        "latitude": -23.5, "longitude": -46.6, "engine_hours": 1.0,
+    }),
+    ("/telemetry/reports", {"reports": [{
+        "device_id": "dev-1", "timestamp": "2026-01-01T00:00:00Z",
+        "latitude": -23.5, "longitude": -46.6, "engine_hours": 1.0,
+    }]}),
+]
+
+
+@pytest.fixture(autouse=True)
+def device_keys(monkeypatch):
+    monkeypatch.setattr(settings, "DEVICE_INGEST_API_KEYS", {DEVICE_KEY: 1})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path,body", INGESTION_ROUTES)
+async def test_ingestion_requires_a_device_key(client: AsyncClient, path: str, body: dict):
+    response = await client.post(path, json=body)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    response = await client.post(path, json=body, headers={"X-Device-Key": "wrong"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path,body", INGESTION_ROUTES)
+async def test_ingestion_accepts_a_configured_device_key(client: AsyncClient, path: str, body: dict):
+    response = await client.post(path, json=body, headers={"X-Device-Key": DEVICE_KEY})
+    assert response.status_code in (status.HTTP_202_ACCEPTED, status.HTTP_204_NO_CONTENT)
+
+
+@pytest.mark.asyncio
+async def test_ingestion_is_closed_without_configured_keys(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(settings, "DEVICE_INGEST_API_KEYS", {})
+    path, body = INGESTION_ROUTES[0]
+    response = await client.post(path, json=body, headers={"X-Device-Key": ""})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
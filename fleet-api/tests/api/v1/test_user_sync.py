@@ -0,0 +1,81 @@
+# backend/tests/api/v1/test_user_sync.py
+
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.api import deps
+from app.core.config import settings
+from app.core.security import verify_password
+from app.models.user_model import User, UserRole
+from main import app
+
+EMAIL = "sync@test.com"
+INTERNAL_KEY = "test-internal-key"
+HEADERS = {"X-API-Key": INTERNAL_KEY}
+
+
+@pytest.fixture(autouse=True)
+def internal_key(monkeypatch):
+    monkeypatch.setattr(settings, "INTERNAL_API_KEY", INTERNAL_KEY)
+
+
+@pytest.fixture
+async def sync_session(db_session: AsyncSession):
+    await db_session.execute(delete(User).where(User.email.in_([EMAIL, "renamed@test.com"])))
+    await db_session.commit()
+    local_session = sessionmaker(bind=db_session.bind, class_=AsyncSession)
+
+    async def override_get_db():
+        async with local_session() as session:
+            yield session
+
+    app.dependency_overrides[deps.get_db] = override_get_db
+    yield db_session
+    app.dependency_overrides.pop(deps.get_db, None)
+
+
+async def test_sync_user_create_update_and_delete(client: AsyncClient, sync_session: AsyncSession):
+    body = {"email": EMAIL, "full_name": "Sync", "password": "old-password", "organization_id": 1}
+    response = await client.post("/users/internal/sync_user", json=body, headers=HEADERS)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json()["role"] == UserRole.DRIVER.value
+
+    response = await client.put("/users/internal/sync_user", json={
+        "lookup_email": EMAIL, "email": "renamed@test.com", "full_name": "Renamed", "password": "new-password",
+    }, headers=HEADERS)
+    assert response.status_code == status.HTTP_200_OK
+    user = await crud.user.get_user_by_email(sync_session, email="renamed@test.com")
+    assert user.full_name == "Renamed"
+    assert verify_password("new-password", user.hashed_password)
+
+    # A remoção desativa o perfil; repetir não tem efeito
+    for _ in range(2):
+        response = await client.request(
+            "DELETE", "/users/internal/sync_user", json={"email": "renamed@test.com"}, headers=HEADERS
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+    sync_session.expire_all()
+    user = await crud.user.get_user_by_email(sync_session, email="renamed@test.com")
+    assert user.is_active is False
+
+
+async def test_sync_user_update_of_unknown_user_is_404(client: AsyncClient, sync_session: AsyncSession):
+    response = await client.put("/users/internal/sync_user", json={"lookup_email": EMAIL, "full_name": "X"}, headers=HEADERS)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize("method,body", [
+    ("POST", {"email": EMAIL, "full_name": "X", "password": "x", "organization_id": 1}),
+    ("PUT", {"lookup_email": EMAIL, "password": "x", "role": "cliente_ativo"}),
+    ("DELETE", {"email": EMAIL}),
+])
+async def test_sync_user_requires_the_internal_key(client: AsyncClient, sync_session: AsyncSession, method, body):
+    for headers in ({}, {"X-API-Key": "wrong"}):
+        response = await client.request(method, "/users/internal/sync_user", json=body, headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert await crud.user.get_user_by_email(sync_session, email=EMAIL) is None
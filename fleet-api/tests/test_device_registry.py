@@ -0,0 +1,74 @@
+# backend/tests/test_device_registry.py
+
+import uuid
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.core.config import settings
+from app.models.vehicle_model import Vehicle
+from app.schemas.vehicle_schema import VehicleCreate, VehicleUpdate
+from app.services.device_registry import device_registry
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    device_registry.invalidate()
+    yield
+    device_registry.invalidate()
+
+
+def _device_id() -> str:
+    return f"dev-{uuid.uuid4().hex[:8]}"
+
+
+async def _add_vehicle(db: AsyncSession, device_id: str) -> Vehicle:
+    """Associa o dispositivo sem passar pelo crud (como outro processo faria)."""
+    vehicle = Vehicle(brand="VW", model="Gol", year=2020, organization_id=1, telemetry_device_id=device_id)
+    db.add(vehicle)
+    await db.commit()
+    await db.refresh(vehicle)
+    return vehicle
+
+
+async def test_unknown_device_is_cached_until_invalidated(db_session: AsyncSession):
+    device_id = _device_id()
+    assert await device_registry.resolve_many(db_session, [device_id]) == {}
+
+    # A entrada "desconhecido" continua em cache
+    vehicle = await _add_vehicle(db_session, device_id)
+    assert await device_registry.resolve_many(db_session, [device_id]) == {}
+
+    device_registry.invalidate(device_id)
+    assert await device_registry.resolve_many(db_session, [device_id]) == {device_id: (vehicle.id, 1)}
+    await crud.vehicle.remove(db_session, db_vehicle=vehicle)
+
+
+async def test_vehicle_crud_invalidates_the_devices_it_touches(db_session: AsyncSession):
+    first, second = _device_id(), _device_id()
+    assert await device_registry.resolve_many(db_session, [first, second]) == {}
+
+    vehicle = await crud.vehicle.create_with_owner(
+        db_session, obj_in=VehicleCreate(brand="VW", model="Gol", year=2020, telemetry_device_id=first), organization_id=1
+    )
+    vehicle_id = vehicle.id
+    assert await device_registry.resolve_many(db_session, [first]) == {first: (vehicle_id, 1)}
+
+    # Troca de dispositivo: o antigo deixa de resolver, o novo passa a resolver
+    vehicle = await crud.vehicle.update(db_session, db_vehicle=vehicle, vehicle_in=VehicleUpdate(telemetry_device_id=second))
+    assert await device_registry.resolve_many(db_session, [first, second]) == {second: (vehicle_id, 1)}
+
+    await crud.vehicle.remove(db_session, db_vehicle=vehicle)
+    assert await device_registry.resolve_many(db_session, [second]) == {}
+
+
+async def test_entries_expire_for_other_processes(db_session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(settings, "TELEMETRY_UNKNOWN_DEVICE_CACHE_SECONDS", 0)
+    device_id = _device_id()
+    assert await device_registry.resolve_many(db_session, [device_id]) == {}
+
+    # Sem invalidação, a entrada expira
+    vehicle = await _add_vehicle(db_session, device_id)
+    assert await device_registry.resolve_many(db_session, [device_id]) == {device_id: (vehicle.id, 1)}
+    await crud.vehicle.remove(db_session, db_vehicle=vehicle)
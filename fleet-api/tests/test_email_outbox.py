@@ -0,0 +1,100 @@
+# backend/tests/test_email_outbox.py
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.core.config import settings
+from app.models.email_outbox_model import EmailOutbox, EmailOutboxStatus
+from app.tasks import email_tasks
+
+
+class FakeSMTPConnection:
+    """Substitui a SMTPConnection: regista os envios e falha para os destinatários indicados."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+        self.closed = 0
+
+    def send(self, msg) -> None:
+        if msg["To"] in self.failing:
+            raise ConnectionError("recusado")
+        self.sent.append(msg["To"])
+
+    def close(self) -> None:
+        self.closed += 1
+
+
+@pytest.fixture
+async def outbox_session(db_session: AsyncSession) -> AsyncSession:
+    await db_session.execute(delete(EmailOutbox))
+    await db_session.commit()
+    return db_session
+
+
+async def _statuses(db: AsyncSession) -> dict:
+    rows = (await db.execute(select(EmailOutbox.to_emails, EmailOutbox.status))).all()
+    return {tuple(to_emails): status for to_emails, status in rows}
+
+
+async def test_claim_batch_leases_messages(outbox_session: AsyncSession):
+    await crud.email_outbox.enqueue_email(outbox_session, to_emails=["a@test.com"], subject="A", message_html="<p>A</p>")
+
+    claimed = await crud.email_outbox.claim_batch(outbox_session, limit=10, lease_seconds=60)
+    assert [m.to_emails for m in claimed] == [["a@test.com"]]
+    assert claimed[0].attempts == 1
+
+    # Enquanto o lease não expira, outro worker não apanha a mensagem
+    assert await crud.email_outbox.claim_batch(outbox_session, limit=10, lease_seconds=60) == []
+
+    assert await crud.email_outbox.mark_sent(outbox_session, ids=[claimed[0].id]) == 1
+    assert await _statuses(outbox_session) == {("a@test.com",): EmailOutboxStatus.SENT}
+
+
+async def test_enqueue_without_commit_follows_the_transaction(outbox_session: AsyncSession):
+    await crud.email_outbox.enqueue_email(
+        outbox_session, to_emails=["b@test.com"], subject="B", message_html="<p>B</p>", commit=False
+    )
+    await outbox_session.rollback()
+    assert await _statuses(outbox_session) == {}
+
+
+async def test_mark_failed_retries_then_gives_up(outbox_session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+    await crud.email_outbox.enqueue_email(outbox_session, to_emails=["c@test.com"], subject="C", message_html="<p>C</p>")
+
+    (message,) = await crud.email_outbox.claim_batch(outbox_session, limit=10, lease_seconds=0)
+    assert await crud.email_outbox.mark_failed(outbox_session, message=message, error="x") == EmailOutboxStatus.PENDING
+    # Reagendada com backoff: ainda não está pronta
+    assert await crud.email_outbox.claim_batch(outbox_session, limit=10, lease_seconds=0) == []
+
+    message.attempts = 2 # Última tentativa permitida
+    assert await crud.email_outbox.mark_failed(outbox_session, message=message, error="y") == EmailOutboxStatus.FAILED
+    assert await _statuses(outbox_session) == {("c@test.com",): EmailOutboxStatus.FAILED}
+
+
+async def test_worker_delivers_batch_over_one_connection(outbox_session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(email_tasks, "SessionLocal", sessionmaker(bind=outbox_session.bind, class_=AsyncSession))
+    for address in ("ok1@test.com", "bad@test.com", "ok2@test.com"):
+        await crud.email_outbox.enqueue_email(outbox_session, to_emails=[address], subject="S", message_html="<p>S</p>")
+
+    connection = FakeSMTPConnection(failing={"bad@test.com"})
+    assert await email_tasks.deliver_outbox_batch(connection) == 3
+    assert connection.sent == ["ok1@test.com", "ok2@test.com"]
+    # A falha descarta a conexão; as restantes mensagens seguem por uma nova
+    assert connection.closed == 1
+
+    outbox_session.expire_all()
+    assert await _statuses(outbox_session) == {
+        ("ok1@test.com",): EmailOutboxStatus.SENT,
+        ("bad@test.com",): EmailOutboxStatus.PENDING,
+        ("ok2@test.com",): EmailOutboxStatus.SENT,
+    }
+    failed = (await outbox_session.execute(
+        select(EmailOutbox).where(EmailOutbox.status == EmailOutboxStatus.PENDING)
+    )).scalar_one()
+    assert failed.attempts == 1
+    assert "recusado" in failed.last_error
@@ -0,0 +1,64 @@
+# backend/tests/test_gps_tasks.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.models.vehicle_model import Vehicle
+from app.tasks import gps_tasks
+
+START = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+async def vehicle(db_session: AsyncSession):
+    vehicle = Vehicle(brand="VW", model="Gol", year=2020, organization_id=1)
+    db_session.add(vehicle)
+    await db_session.commit()
+    await db_session.refresh(vehicle)
+    yield vehicle
+    await crud.vehicle.remove(db_session, db_vehicle=vehicle)
+
+
+@pytest.fixture
+def published(db_session: AsyncSession, monkeypatch):
+    """Lotes gravados na base de testes; as posições publicadas ficam na lista."""
+    monkeypatch.setattr(gps_tasks, "SessionLocal", sessionmaker(bind=db_session.bind, class_=AsyncSession))
+    positions = []
+
+    async def publish(db, batch):
+        positions.extend(batch)
+
+    monkeypatch.setattr(gps_tasks, "publish_positions", publish)
+    return positions
+
+
+async def test_late_ping_does_not_move_the_vehicle_back(db_session: AsyncSession, vehicle: Vehicle, published):
+    await gps_tasks._write_batch([
+        (vehicle.id, -23.0, -46.0, START, 1),
+        (vehicle.id, -23.2, -46.2, START + timedelta(minutes=2), 1),
+        (vehicle.id, -23.1, -46.1, START + timedelta(minutes=1), 1),
+    ])
+    # Noutro lote chega uma leitura mais antiga do que a já gravada
+    assert await gps_tasks._write_batch([(vehicle.id, -23.05, -46.05, START + timedelta(minutes=1, seconds=30), 1)]) == 1
+
+    await db_session.refresh(vehicle)
+    assert (vehicle.last_latitude, vehicle.last_longitude) == (-23.2, -46.2)
+    assert published == [(1, vehicle.id, -23.2, -46.2)]
+
+    await gps_tasks._write_batch([(vehicle.id, -23.3, -46.3, START + timedelta(minutes=3), 1)])
+    await db_session.refresh(vehicle)
+    assert vehicle.last_latitude == -23.3
+    assert published[-1] == (1, vehicle.id, -23.3, -46.3)
+
+
+async def test_pings_from_another_organization_key_are_dropped(db_session: AsyncSession, vehicle: Vehicle, published):
+    # A chave do dispositivo é da organização 2; o veículo é da organização 1
+    assert await gps_tasks._write_batch([(vehicle.id, -10.0, -40.0, START, 2)]) == 0
+
+    await db_session.refresh(vehicle)
+    assert vehicle.last_latitude is None
+    assert published == []
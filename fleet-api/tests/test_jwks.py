@@ -0,0 +1,66 @@
+# backend/tests/test_jwks.py
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import JWTError, jwk, jwt
+
+from app.core import jwks
+from app.core.config import settings
+
+KID = "20260101000000"
+ISSUER, AUDIENCE = "http://auth.test", "fleet-test"
+
+
+@pytest.fixture(scope="module")
+def private_pem() -> str:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+
+@pytest.fixture(autouse=True)
+def auth_jwks(private_pem: str, monkeypatch):
+    """JWKS do auth-api já em cache (sem AUTH_JWKS_URL não há leituras)."""
+    public = jwk.construct(private_pem, "RS256").public_key().to_dict()
+    public.update({"kid": KID, "use": "sig", "alg": "RS256"})
+    monkeypatch.setattr(jwks, "_keys", {KID: public})
+    monkeypatch.setattr(jwks, "_expires_at", time.monotonic() + 60)
+    monkeypatch.setattr(settings, "AUTH_JWKS_URL", None)
+    monkeypatch.setattr(settings, "AUTH_JWT_ISSUER", ISSUER)
+    monkeypatch.setattr(settings, "AUTH_JWT_AUDIENCE", AUDIENCE)
+
+
+def _auth_token(private_pem: str, kid: str = KID, **claims) -> str:
+    now = datetime.now(timezone.utc)
+    payload = {"iss": ISSUER, "aud": AUDIENCE, "exp": now + timedelta(minutes=5), "sub": "42", "email": "a@b.com"}
+    payload.update(claims)
+    return jwt.encode(payload, private_pem, algorithm="RS256", headers={"kid": kid})
+
+
+async def test_auth_api_tokens_are_verified_by_kid(private_pem: str):
+    payload = await jwks.decode_access_token(_auth_token(private_pem))
+    assert payload["email"] == "a@b.com"
+
+    with pytest.raises(JWTError):
+        await jwks.decode_access_token(_auth_token(private_pem, aud="outra-api"))
+    with pytest.raises(JWTError):
+        await jwks.decode_access_token(_auth_token(private_pem, kid="desconhecido"))
+
+
+async def test_tokens_without_kid_fall_back_to_hs256(monkeypatch):
+    token = jwt.encode({"sub": "7"}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    assert (await jwks.decode_access_token(token))["sub"] == "7"
+
+    # Um token HS256 não pode passar por um do auth-api com o mesmo kid
+    forged = jwt.encode({"sub": "7"}, settings.SECRET_KEY, algorithm="HS256", headers={"kid": KID})
+    with pytest.raises(JWTError):
+        await jwks.decode_access_token(forged)
+
+    monkeypatch.setattr(settings, "ACCEPT_LEGACY_HS256_TOKENS", False)
+    with pytest.raises(JWTError):
+        await jwks.decode_access_token(token)
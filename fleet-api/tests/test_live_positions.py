@@ -0,0 +1,133 @@
+# backend/tests/test_live_positions.py
+
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.core.config import settings
+from app.models.vehicle_model import Vehicle, VehicleStatus
+from app.schemas.dashboard_schema import VehiclePosition
+from app.schemas.vehicle_schema import VehicleUpdate
+from app.services import live_positions
+from app.services.live_positions import LivePositionHub, live_position_hub
+
+ORGANIZATION_ID = 1
+
+
+@pytest.fixture
+def hub() -> LivePositionHub:
+    # Snapshot já carregado: subscribe não consulta o banco
+    hub = LivePositionHub()
+    hub._snapshots[ORGANIZATION_ID] = {
+        1: {"id": 1, "license_plate": "ABC1D23", "latitude": -23.0, "longitude": -46.0},
+        2: {"id": 2, "license_plate": "XYZ9K87", "latitude": -22.0, "longitude": -45.0},
+    }
+    return hub
+
+
+def _messages(subscriber):
+    """Esvazia a fila do subscritor em [(evento, dados)]."""
+    messages = []
+    while not subscriber.queue.empty():
+        event, data = subscriber.queue.get_nowait().strip().split("\n")
+        messages.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return messages
+
+
+async def test_subscriber_gets_the_snapshot_then_deltas(hub: LivePositionHub):
+    subscriber = await hub.subscribe(ORGANIZATION_ID)
+    hub.apply([
+        (ORGANIZATION_ID, 1, -23.5, -46.5),
+        (ORGANIZATION_ID + 1, 7, 0.0, 0.0), # Organização sem subscritores neste processo
+    ])
+
+    (snapshot_event, snapshot), (delta_event, delta) = _messages(subscriber)
+    assert snapshot_event == "snapshot"
+    assert [vehicle["id"] for vehicle in snapshot] == [1, 2]
+    assert (delta_event, delta) == ("positions", [{"id": 1, "latitude": -23.5, "longitude": -46.5}])
+    assert hub.get_snapshot(ORGANIZATION_ID)[0]["latitude"] == -23.5
+    assert hub.get_snapshot(ORGANIZATION_ID + 1) is None
+
+
+async def test_slow_subscriber_gets_a_fresh_snapshot(hub: LivePositionHub, monkeypatch):
+    monkeypatch.setattr(settings, "LIVE_POSITIONS_SUBSCRIBER_QUEUE", 2)
+    slow = await hub.subscribe(ORGANIZATION_ID)
+    # Snapshot inicial + um delta enchem a fila; o delta seguinte já não cabe
+    for latitude in (-23.1, -23.2):
+        hub.apply([(ORGANIZATION_ID, 1, latitude, -46.0)])
+
+    # Em vez de deltas acumulados, um snapshot com a última posição
+    ((event, snapshot),) = _messages(slow)
+    assert event == "snapshot"
+    assert snapshot[0]["latitude"] == -23.2
+
+    hub.apply([(ORGANIZATION_ID, 1, -23.3, -46.0)])
+    assert _messages(slow) == [("positions", [{"id": 1, "latitude": -23.3, "longitude": -46.0}])]
+
+
+async def test_last_unsubscribe_drops_the_snapshot(hub: LivePositionHub):
+    first = await hub.subscribe(ORGANIZATION_ID)
+    second = await hub.subscribe(ORGANIZATION_ID)
+
+    hub.unsubscribe(first)
+    assert hub.get_snapshot(ORGANIZATION_ID) is not None
+    hub.unsubscribe(second)
+    # Sem subscritores o snapshot deixaria de ser atualizado
+    assert hub.get_snapshot(ORGANIZATION_ID) is None
+    hub.apply([(ORGANIZATION_ID, 1, -23.5, -46.5)])
+    assert second.queue.qsize() == 1 # Só o snapshot inicial
+
+
+async def test_positions_notified_during_the_load_are_not_lost(monkeypatch):
+    hub = LivePositionHub()
+
+    async def get_vehicle_positions(db, *, organization_id):
+        # NOTIFY entregue enquanto a consulta corre: a leitura já não o inclui
+        hub.apply([(organization_id, 1, -23.9, -46.9)])
+        return [VehiclePosition(id=1, license_plate="ABC1D23", latitude=-23.0, longitude=-46.0, status="Disponível")]
+
+    monkeypatch.setattr(crud.report, "get_vehicle_positions", get_vehicle_positions)
+    subscriber = await hub.subscribe(ORGANIZATION_ID)
+
+    ((event, snapshot),) = _messages(subscriber)
+    assert event == "snapshot"
+    assert (snapshot[0]["latitude"], snapshot[0]["longitude"]) == (-23.9, -46.9)
+
+
+async def _reloaded(organization_id: int) -> None:
+    while organization_id in live_position_hub._reloading:
+        await asyncio.sleep(0.01)
+
+
+async def test_vehicle_changes_reload_the_snapshot(db_session: AsyncSession, monkeypatch):
+    organization_id = 4242
+    monkeypatch.setattr(live_positions, "SessionLocal", sessionmaker(bind=db_session.bind, class_=AsyncSession))
+    vehicle = Vehicle(
+        brand="VW", model="Gol", year=2020, organization_id=organization_id,
+        license_plate="LIV1E25", last_latitude=-23.0, last_longitude=-46.0,
+    )
+    db_session.add(vehicle)
+    await db_session.commit()
+    await db_session.refresh(vehicle)
+    subscriber = await live_position_hub.subscribe(organization_id)
+    try:
+        vehicle = await crud.vehicle.update(db_session, db_vehicle=vehicle, vehicle_in=VehicleUpdate(status=VehicleStatus.MAINTENANCE))
+        await asyncio.wait_for(_reloaded(organization_id), timeout=5)
+        assert live_position_hub.get_snapshot(organization_id)[0]["status"] == VehicleStatus.MAINTENANCE.value
+
+        # Colunas que não aparecem no mapa não pedem releitura
+        vehicle.current_km = 10
+        await db_session.commit()
+        assert organization_id not in live_position_hub._reloading
+
+        await db_session.refresh(vehicle)
+        await crud.vehicle.remove(db_session, db_vehicle=vehicle)
+        await asyncio.wait_for(_reloaded(organization_id), timeout=5)
+        assert live_position_hub.get_snapshot(organization_id) == []
+        assert [event for event, _ in _messages(subscriber)] == ["snapshot", "snapshot", "snapshot"]
+    finally:
+        live_position_hub.unsubscribe(subscriber)
@@ -0,0 +1,105 @@
+# backend/tests/test_location_history.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.models.location_history_model import LocationHistory, LocationHistoryMinute
+
+VEHICLE_ID = 1
+ORGANIZATION_ID = 1
+
+
+@pytest.fixture
+async def history_session(db_session: AsyncSession) -> AsyncSession:
+    await db_session.execute(delete(LocationHistory))
+    await db_session.execute(delete(LocationHistoryMinute))
+    await db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def minute() -> datetime:
+    """Um minuto recente (dentro da retenção dos pontos brutos), em UTC."""
+    return (datetime.now(timezone.utc) - timedelta(hours=1)).replace(second=0, microsecond=0)
+
+
+def _raw(timestamp: datetime, latitude: float, longitude: float = -46.6) -> LocationHistory:
+    return LocationHistory(
+        vehicle_id=VEHICLE_ID, organization_id=ORGANIZATION_ID,
+        timestamp=timestamp, latitude=latitude, longitude=longitude,
+    )
+
+
+def _naive(timestamp: datetime) -> datetime:
+    # sqlite devolve os timestamps sem fuso
+    return timestamp.replace(tzinfo=None)
+
+
+async def test_rollup_keeps_the_last_point_of_each_minute(history_session: AsyncSession, minute: datetime):
+    history_session.add_all([
+        _raw(minute + timedelta(seconds=10), -23.1),
+        _raw(minute + timedelta(seconds=40), -23.2),
+        _raw(minute + timedelta(minutes=1, seconds=5), -23.3),
+    ])
+    await history_session.commit()
+
+    window = dict(start=minute, end=minute + timedelta(minutes=2))
+    assert await crud.location_history.rollup_minutes(history_session, **window) == 2
+    await history_session.commit()
+    # Os minutos já agregados são ignorados: a agregação pode repetir a mesma janela
+    assert await crud.location_history.rollup_minutes(history_session, **window) == 0
+
+    rows = (await history_session.execute(
+        select(LocationHistoryMinute.bucket, LocationHistoryMinute.latitude).order_by(LocationHistoryMinute.bucket)
+    )).all()
+    assert [(bucket, latitude) for bucket, latitude in rows] == [
+        (_naive(minute), -23.2),
+        (_naive(minute + timedelta(minutes=1)), -23.3),
+    ]
+
+
+async def test_track_points_switch_from_minutes_to_raw_points(history_session: AsyncSession, minute: datetime):
+    # Histórico por minuto até ao minuto do primeiro ponto bruto (inclusive)
+    for offset in range(3):
+        history_session.add(LocationHistoryMinute(
+            vehicle_id=VEHICLE_ID, organization_id=ORGANIZATION_ID,
+            bucket=minute + timedelta(minutes=offset - 2), latitude=-20.0 - offset, longitude=-46.6,
+        ))
+    history_session.add_all([
+        _raw(minute + timedelta(seconds=30), -23.0),
+        _raw(minute + timedelta(minutes=1, seconds=10), -23.1),
+        _raw(minute + timedelta(minutes=9), -23.9), # Fora da janela
+    ])
+    await history_session.commit()
+
+    points = [
+        (_naive(timestamp), latitude)
+        async for timestamp, latitude, _ in crud.location_history.iter_track_points(
+            history_session, vehicle_id=VEHICLE_ID, start=minute - timedelta(minutes=5), end=minute + timedelta(minutes=5)
+        )
+    ]
+    # O minuto agregado que contém o primeiro ponto bruto não se sobrepõe aos pontos brutos
+    assert points == [
+        (_naive(minute - timedelta(minutes=2)), -20.0),
+        (_naive(minute - timedelta(minutes=1)), -21.0),
+        (_naive(minute + timedelta(seconds=30)), -23.0),
+        (_naive(minute + timedelta(minutes=1, seconds=10)), -23.1),
+    ]
+
+
+async def test_track_points_use_minutes_only_without_raw_points(history_session: AsyncSession, minute: datetime):
+    history_session.add(LocationHistoryMinute(
+        vehicle_id=VEHICLE_ID, organization_id=ORGANIZATION_ID, bucket=minute, latitude=-22.0, longitude=-46.6,
+    ))
+    await history_session.commit()
+
+    points = [
+        point async for point in crud.location_history.iter_track_points(
+            history_session, vehicle_id=VEHICLE_ID, start=minute, end=minute + timedelta(minutes=1)
+        )
+    ]
+    assert [(_naive(timestamp), latitude) for timestamp, latitude, _ in points] == [(_naive(minute), -22.0)]
@@ -0,0 +1,94 @@
+# backend/tests/test_telemetry_tasks.py
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.core.config import settings
+from app.models.telemetry_sample_model import TelemetrySample
+from app.models.vehicle_model import Vehicle
+from app.schemas.telemetry_schema import TelemetryPayload
+from app.services.device_registry import device_registry
+from app.tasks import location_history_tasks, telemetry_tasks
+
+START = datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+async def vehicle(db_session: AsyncSession):
+    device_registry.invalidate()
+    vehicle = Vehicle(
+        brand="VW", model="Gol", year=2020, organization_id=1, telemetry_device_id=f"dev-{uuid.uuid4().hex[:8]}"
+    )
+    db_session.add(vehicle)
+    await db_session.commit()
+    await db_session.refresh(vehicle)
+    yield vehicle
+    await db_session.refresh(vehicle)
+    await crud.vehicle.remove(db_session, db_vehicle=vehicle)
+
+
+@pytest.fixture
+def published(db_session: AsyncSession, monkeypatch):
+    """Lotes gravados na base de testes; as posições publicadas ficam na lista."""
+    monkeypatch.setattr(telemetry_tasks, "SessionLocal", sessionmaker(bind=db_session.bind, class_=AsyncSession))
+    positions = []
+
+    async def publish(db, batch):
+        positions.extend(batch)
+
+    monkeypatch.setattr(telemetry_tasks, "publish_positions", publish)
+    return positions
+
+
+def _report(vehicle: Vehicle, minutes: int, latitude: float, engine_hours: float):
+    payload = TelemetryPayload(
+        device_id=vehicle.telemetry_device_id, timestamp=START + timedelta(minutes=minutes),
+        latitude=latitude, longitude=-46.0, engine_hours=engine_hours,
+    )
+    return payload, vehicle.organization_id
+
+
+async def test_late_report_keeps_the_position_but_not_the_engine_hours(
+    db_session: AsyncSession, vehicle: Vehicle, published
+):
+    await telemetry_tasks._write_batch([_report(vehicle, 2, -23.2, 100.0)])
+    # Pacote atrasado: posição mais antiga, mas o horímetro pode avançar
+    await telemetry_tasks._write_batch([_report(vehicle, 1, -23.1, 101.0)])
+
+    await db_session.refresh(vehicle)
+    assert (vehicle.last_latitude, vehicle.current_engine_hours) == (-23.2, 101.0)
+    assert published == [(1, vehicle.id, -23.2, -46.0)]
+
+
+async def test_telemetry_retention_deletes_in_batches(db_session: AsyncSession, vehicle: Vehicle, monkeypatch):
+    await db_session.execute(delete(TelemetrySample))
+    cutoff = START + timedelta(days=1)
+    db_session.add_all(
+        TelemetrySample(
+            device_id=vehicle.telemetry_device_id, vehicle_id=vehicle.id, organization_id=1,
+            timestamp=timestamp, latitude=-23.0, longitude=-46.0, engine_hours=1.0,
+        )
+        for timestamp in [START + timedelta(minutes=i) for i in range(5)] + [cutoff, cutoff + timedelta(hours=1)]
+    )
+    await db_session.commit()
+
+    calls = []
+    delete_samples_before = crud.telemetry.delete_samples_before
+
+    async def counted(db, **kwargs):
+        calls.append(kwargs["batch_size"])
+        return await delete_samples_before(db, **kwargs)
+
+    monkeypatch.setattr(settings, "TELEMETRY_RETENTION_BATCH_SIZE", 2)
+    monkeypatch.setattr(crud.telemetry, "delete_samples_before", counted)
+
+    assert await location_history_tasks._prune_telemetry(db_session, cutoff=cutoff) == 5
+    assert calls == [2, 2, 2] # 2 + 2 + 1
+    remaining = await db_session.execute(select(func.count()).select_from(TelemetrySample))
+    assert remaining.scalar_one() == 2
@@ -0,0 +1,89 @@
+# backend/tests/test_track.py
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.models.location_history_model import LocationHistory, LocationHistoryMinute
+from app.models.user_model import User, UserRole
+from app.services import track_service
+from main import app
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+LATITUDE, LONGITUDE = -23.5, -46.6
+STEP = 0.001 # ~111 m por minuto: ~6,7 km/h
+
+
+def _point(minutes: float, latitude: float = LATITUDE, longitude: float = LONGITUDE):
+    return START + timedelta(minutes=minutes), latitude, longitude
+
+
+def test_simplify_keeps_the_corners_within_tolerance():
+    # Sobe em linha reta até ao vértice e volta: só o vértice se afasta da reta dos extremos
+    points = [_point(i, LATITUDE + i * STEP, LONGITUDE + STEP * (5 - abs(i - 5))) for i in range(11)]
+
+    assert track_service.simplify(points, tolerance_m=10, max_points=100) == [points[0], points[5], points[10]]
+    # O orçamento de pontos corta antes da tolerância
+    assert track_service.simplify(points, tolerance_m=10, max_points=2) == [points[0], points[10]]
+    assert track_service.simplify(points, tolerance_m=1_000_000, max_points=100) == [points[0], points[10]]
+    assert track_service.simplify(points[:1], tolerance_m=10, max_points=100) == points[:1]
+
+
+@pytest.fixture
+async def track_session(db_session: AsyncSession) -> AsyncSession:
+    await db_session.execute(delete(LocationHistory))
+    await db_session.execute(delete(LocationHistoryMinute))
+    await db_session.commit()
+    return db_session
+
+
+async def test_build_track_summarizes_stops_distance_and_noise(track_session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(track_service, "CHUNK_POINTS", 5) # Vários blocos pela thread
+    start = datetime.now(timezone.utc).replace(second=0, microsecond=0) - timedelta(hours=1)
+    # 10 minutos parado, depois 10 minutos para norte, com um salto impossível pelo meio
+    points = [(start + timedelta(minutes=i), LATITUDE, LONGITUDE) for i in range(11)]
+    points += [(start + timedelta(minutes=i), LATITUDE + (i - 10) * STEP, LONGITUDE) for i in range(11, 21)]
+    points.append((start + timedelta(minutes=15, seconds=30), LATITUDE + 1, LONGITUDE))
+    track_session.add_all(
+        LocationHistory(vehicle_id=1, organization_id=1, timestamp=timestamp, latitude=latitude, longitude=longitude)
+        for timestamp, latitude, longitude in points
+    )
+    await track_session.commit()
+
+    summary, stops, simplified = await track_service.build_track(
+        track_session, vehicle_id=1, start=start, end=start + timedelta(hours=1),
+        tolerance_m=10, max_points=100, min_stop_minutes=5,
+    )
+
+    assert summary.raw_points == 22
+    assert summary.discarded_points == 1
+    assert summary.distance_km == pytest.approx(1.112, abs=0.001)
+    assert (summary.stopped_minutes, summary.moving_minutes) == (10.0, 10.0)
+    assert summary.max_speed_kmh == pytest.approx(6.7, abs=0.1)
+    assert summary.avg_moving_speed_kmh == pytest.approx(6.7, abs=0.1)
+    assert [(stop.start, stop.end, stop.duration_minutes) for stop in stops] == [
+        (start, start + timedelta(minutes=10), 10.0)
+    ]
+    # Parado e depois em linha reta: bastam os extremos
+    assert [timestamp for timestamp, _, _ in simplified] == [start, start + timedelta(minutes=20)]
+    assert summary.returned_points == 2
+
+
+async def test_track_requires_a_positive_tolerance(client: AsyncClient):
+    app.dependency_overrides[deps.get_current_active_user] = lambda: User(
+        id=998, full_name="Track Test", email="track@test.com", hashed_password="x",
+        role=UserRole.CLIENTE_ATIVO, organization_id=1, is_active=True,
+    )
+    try:
+        response = await client.get(
+            "/vehicles/1/track",
+            params={"start": "2026-01-01T00:00:00Z", "end": "2026-01-01T01:00:00Z", "tolerance_m": 0},
+        )
+    finally:
+        app.dependency_overrides.pop(deps.get_current_active_user)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
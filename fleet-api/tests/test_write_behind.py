@@ -0,0 +1,110 @@
+# backend/tests/test_write_behind.py
+
+import asyncio
+
+import pytest
+
+from app.tasks.write_behind import WriteBehindBuffer
+
+
+class Sink:
+    """Destino dos lotes: regista-os e falha enquanto `failing` disser que sim."""
+
+    def __init__(self, failing=lambda batch: False):
+        self.failing = failing
+        self.batches = []
+
+    async def __call__(self, batch):
+        if self.failing(batch):
+            raise RuntimeError("falha ao gravar")
+        self.batches.append(list(batch))
+
+    @property
+    def written(self):
+        return [item for batch in self.batches for item in batch]
+
+
+def _buffer(sink, **overrides):
+    options = dict(max_items=10, batch_size=3, interval_seconds=0.01, max_attempts=2)
+    options.update(overrides)
+    return WriteBehindBuffer("teste", sink, **options)
+
+
+async def _drain(buffer):
+    while len(buffer):
+        try:
+            await buffer.flush()
+        except RuntimeError:
+            pass
+
+
+async def test_offer_is_all_or_nothing_and_flush_writes_in_batches():
+    sink = Sink()
+    buffer = _buffer(sink)
+
+    assert buffer.offer(list(range(8)))
+    assert not buffer.offer([8, 9, 10]) # Não cabem todos: nenhum é aceite
+    assert len(buffer) == 8
+
+    assert await buffer.flush() == 3
+    await _drain(buffer)
+    assert sink.batches == [[0, 1, 2], [3, 4, 5], [6, 7]]
+
+
+async def test_failed_batch_is_retried_before_newer_items():
+    attempts = []
+    sink = Sink(failing=lambda batch: attempts.append(batch) or len(attempts) == 1)
+    buffer = _buffer(sink)
+    buffer.offer([1, 2, 3])
+
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+    assert len(buffer) == 3 # O lote voltou ao buffer e conta para o limite
+
+    buffer.offer([4])
+    await _drain(buffer)
+    assert sink.batches == [[1, 2, 3], [4]]
+
+
+async def test_poison_item_is_isolated_and_dropped():
+    sink = Sink(failing=lambda batch: 3 in batch)
+    buffer = _buffer(sink, batch_size=4)
+    buffer.offer([1, 2, 3, 4, 5])
+
+    await _drain(buffer)
+
+    # O lote é dividido até o item inválido ficar sozinho; só ele se perde
+    assert sorted(sink.written) == [1, 2, 4, 5]
+    assert len(buffer) == 0
+
+
+async def test_requeue_never_exceeds_max_items():
+    sink = Sink(failing=lambda batch: True)
+    buffer = _buffer(sink, max_items=4, batch_size=3)
+    buffer.offer([1, 2, 3])
+
+    # Enquanto o lote está a ser gravado, novos itens ocupam o espaço dele
+    original_write = buffer.write_batch
+
+    async def write_and_fill(batch):
+        buffer.offer([10, 11, 12])
+        await original_write(batch)
+    buffer.write_batch = write_and_fill
+
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+    assert len(buffer) == 4
+
+
+async def test_worker_flushes_in_background_and_stop_drains():
+    sink = Sink()
+    buffer = _buffer(sink, batch_size=100, interval_seconds=0.01)
+    buffer.start()
+    buffer.offer([1, 2])
+    await asyncio.sleep(0.05)
+    assert sink.written == [1, 2]
+
+    buffer.offer([3])
+    await buffer.stop()
+    assert sink.written == [1, 2, 3]
+    assert len(buffer) == 0
@@ -1,15 +1,17 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from jose import JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_session
 from app.core.config import settings
+from app.core.jwks import decode_access_token
 from app.models.user import User
 from app.crud.crud_user import crud_user
 from app.schemas.token_schema import TokenPayload
 
-# tokenUrl agora é apenas nominal, a validação é com a SECRET_KEY
+# tokenUrl agora é apenas nominal, a validação é pelo JWKS do auth-api (ou SECRET_KEY)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
 async def get_current_user(
@@ -21,22 +23,24 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        # CORREÇÃO: Usa a chave e algoritmo do Hub (FASE 1)
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        # O 'sub' do token é o email do usuário
-        email: str = payload.get("sub")
-        if email is None:
+        # Tokens do auth-api pelo JWKS (kid); sem kid, HS256 com SECRET_KEY
+        payload = await decode_access_token(token)
+        subject = payload.get("sub")
+        if subject is None:
             raise credentials_exception
         
-        token_data = TokenPayload(sub=email)
+        token_data = TokenPayload(sub=subject)
 
     except (JWTError, ValidationError):
         raise credentials_exception
     
-    # Busca o usuário no banco de dados LOCAL do sales-api
-    user = await crud_user.get_by_email(db, email=token_data.sub)
+    # Busca o usuário no banco de dados LOCAL do sales-api. Os tokens do auth-api trazem o
+    # email (o sub é o ID no auth-api); os do login deste serviço trazem o ID local no sub.
+    email = payload.get("email")
+    if email:
+        user = await crud_user.get_by_email(db, email=email)
+    else:
+        user = await db.get(User, token_data.sub)
     
     if user is None:
         # Se o usuário é válido mas não existe no DB local, ele não foi sincronizado
@@ -60,4 +64,17 @@ async def get_current_active_superuser(
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def verify_internal_api_key(x_api_key: str | None = Header(None)) -> None:
+    """
+    Rotas internas (/users/internal/sync_user): só o auth-api, que envia
+    INTERNAL_API_KEY em X-API-Key, pode criar ou alterar perfis.
+    """
+    if not x_api_key or not settings.INTERNAL_API_KEY or not hmac.compare_digest(
+        x_api_key.encode(), settings.INTERNAL_API_KEY.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing internal API key",
+        )
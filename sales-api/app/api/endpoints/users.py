@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.dependencies import get_session, get_current_active_user
+from app.api.dependencies import get_session, get_current_active_user, verify_internal_api_key
 from app.crud.crud_user import crud_user
-from app.schemas.user import User, UserCreate, UserUpdate
+from app.schemas.user import User, UserCreate, UserUpdate, UserSyncUpdate, UserSyncDelete
 from app.core.security import get_password_hash # Importado para hashear senha
 from app.models.user import User as UserModel # Importado para o endpoint de sync
 
 router = APIRouter()
 
 # --- NOVO ENDPOINT DE SINCRONIZAÇÃO (FASE 4) ---
-@router.post("/internal/sync_user", response_model=User, status_code=status.HTTP_201_CREATED)
+@router.post("/internal/sync_user", response_model=User, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(verify_internal_api_key)])
 async def sync_user_profile(
     *,
     db: AsyncSession = Depends(get_session),
@@ -35,6 +36,53 @@ async def sync_user_profile(
     await db.refresh(db_obj)
     return db_obj
 
+@router.put("/internal/sync_user", response_model=User,
+             dependencies=[Depends(verify_internal_api_key)])
+async def sync_user_update(
+    *,
+    db: AsyncSession = Depends(get_session),
+    user_in: UserSyncUpdate,
+):
+    """
+    Endpoint interno para o auth-api propagar alterações de um usuário.
+    O usuário é identificado pelo e-mail anterior à alteração (lookup_email).
+    """
+    user = await crud_user.get_by_email(db, email=user_in.lookup_email)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    update_data = user_in.model_dump(exclude_unset=True, exclude={"lookup_email"})
+    if update_data.get("password"):
+        update_data["hashed_password"] = get_password_hash(update_data["password"])
+    update_data.pop("password", None)
+    for field, value in update_data.items():
+        if hasattr(user, field):
+            setattr(user, field, value)
+
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+@router.delete("/internal/sync_user", status_code=status.HTTP_204_NO_CONTENT,
+             dependencies=[Depends(verify_internal_api_key)])
+async def sync_user_delete(
+    *,
+    db: AsyncSession = Depends(get_session),
+    user_in: UserSyncDelete = Body(...),
+):
+    """
+    Endpoint interno para o auth-api propagar a remoção de um usuário.
+    O perfil local é desativado, não apagado: vendas e pedidos continuam a
+    referenciá-lo. Repetir o pedido não tem efeito.
+    """
+    user = await crud_user.get_by_email(db, email=user_in.email)
+    if user and user.is_active:
+        user.is_active = False
+        db.add(user)
+        await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 # --- FIM DO NOVO ENDPOINT ---
 
 
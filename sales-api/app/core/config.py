@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -10,6 +11,18 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Tokens do auth-api com 'kid' são verificados pelo JWKS (app/core/jwks.py); sem URL,
+    # só os tokens HS256 assinados com SECRET_KEY são aceites
+    AUTH_JWKS_URL: Optional[str] = os.getenv("AUTH_JWKS_URL") # p.ex. http://auth-api:8001/api/v1/.well-known/jwks.json
+    AUTH_JWT_ISSUER: Optional[str] = os.getenv("AUTH_JWT_ISSUER")
+    AUTH_JWT_AUDIENCE: Optional[str] = os.getenv("AUTH_JWT_AUDIENCE")
+    AUTH_JWKS_CACHE_SECONDS: int = 300
+    AUTH_JWKS_MIN_REFRESH_SECONDS: int = 60 # Releitura por kid desconhecido (rotação)
+    AUTH_JWKS_TIMEOUT_SECONDS: float = 5.0
+    # Tokens sem 'kid' (HS256 com SECRET_KEY): os do login deste serviço e os antigos do auth-api
+    ACCEPT_LEGACY_HS256_TOKENS: bool = os.getenv("ACCEPT_LEGACY_HS256_TOKENS", "true").lower() == "true"
+    # Mesmo valor que o INTERNAL_API_KEY do auth-api (X-API-Key em /users/internal)
+    INTERNAL_API_KEY: str = os.getenv("INTERNAL_API_KEY", "")
 
     class Config:
         case_sensitive = True
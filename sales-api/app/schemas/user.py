@@ -26,6 +26,15 @@ class UserUpdate(UserBase):
     password: Optional[str] = Field(None, min_length=8)
 
 
+class UserSyncUpdate(UserUpdate):
+    # E-mail atual do usuário (antes da alteração), enviado pelo auth-api
+    lookup_email: EmailStr
+
+
+class UserSyncDelete(BaseModel):
+    email: EmailStr
+
+
 class User(UserBase):
     id: int
     created_at: datetime